@@ -0,0 +1,161 @@
+"""partition_notifications_by_month
+
+Revision ID: a8b9c0d1e2f3
+Revises: f7a8b9c0d1e2
+Create Date: 2026-10-19 00:00:00.000000
+
+Partitionne notifications par mois sur created_at (PARTITION BY RANGE) :
+- une partition par mois (notifications_pYYYY_MM) du plus ancien mois présent
+  jusqu'à 3 mois après le mois courant, plus une partition DEFAULT de secours ;
+  les mois suivants sont créés par app/services/notification_partitions.py
+- clé primaire (id, created_at) : la clé de partitionnement doit en faire
+  partie ; la séquence notifications_id_seq est conservée
+- index définis sur la table mère, donc créés sur chaque partition :
+  (user_id, created_at DESC), non lues (partiel), (user_id, type, created_at)
+  et id ; les index mono-colonne is_read / created_at sont supprimés (la
+  partition elle-même filtre par date)
+- la rétention détache ou supprime des partitions entières : pas de DELETE
+  massif, pas de bloat
+"""
+from alembic import op
+
+# revision identifiers
+revision = "a8b9c0d1e2f3"
+down_revision = "f7a8b9c0d1e2"
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = "id, user_id, type, title, message, related_job_id, related_application_id, is_read, read_at, created_at"
+
+
+def _create_indexes() -> None:
+    op.execute("CREATE INDEX ix_notifications_id ON notifications (id)")
+    op.execute(
+        """
+        CREATE INDEX idx_notifications_user_unread
+        ON notifications (user_id, created_at DESC)
+        WHERE is_read = false
+    """
+    )
+    op.execute(
+        """
+        CREATE INDEX idx_notifications_user_type_date
+        ON notifications (user_id, type, created_at DESC)
+    """
+    )
+
+
+def upgrade() -> None:
+    # La séquence survit à l'ancienne table
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE notifications RENAME TO notifications_legacy")
+    op.execute("ALTER INDEX notifications_pkey RENAME TO notifications_legacy_pkey")
+    for index in (
+        "ix_notifications_id",
+        "ix_notifications_user_id",
+        "ix_notifications_is_read",
+        "ix_notifications_created_at",
+        "idx_notifications_user_unread",
+        "idx_notifications_user_type_date",
+    ):
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+
+    op.execute(
+        """
+        CREATE TABLE notifications (
+            id INTEGER NOT NULL DEFAULT nextval('notifications_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            type notificationtype NOT NULL,
+            title VARCHAR NOT NULL,
+            message TEXT NOT NULL,
+            related_job_id INTEGER REFERENCES jobs (id),
+            related_application_id INTEGER REFERENCES job_applications (id),
+            is_read BOOLEAN DEFAULT false,
+            read_at TIMESTAMP WITH TIME ZONE,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """
+    )
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY notifications.id")
+
+    # Partitions mensuelles : du plus ancien mois présent à M+3
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month_start date := date_trunc('month', coalesce(
+                (SELECT min(created_at) FROM notifications_legacy), now()))::date;
+            last_month date := (date_trunc('month', now()) + interval '3 months')::date;
+        BEGIN
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF notifications FOR VALUES FROM (%L) TO (%L)',
+                    'notifications_p' || to_char(month_start, 'YYYY_MM'),
+                    month_start, (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END $$;
+    """
+    )
+    op.execute("CREATE TABLE notifications_default PARTITION OF notifications DEFAULT")
+
+    op.execute(
+        f"""
+        INSERT INTO notifications ({COLUMNS})
+        SELECT id, user_id, type, title, message, related_job_id, related_application_id,
+               is_read, read_at, coalesce(created_at, now())
+        FROM notifications_legacy
+    """
+    )
+    op.execute("DROP TABLE notifications_legacy")
+
+    _create_indexes()
+    op.execute(
+        "CREATE INDEX ix_notifications_user_created ON notifications (user_id, created_at DESC)"
+    )
+
+
+def downgrade() -> None:
+    # Les partitions détachées/archivées par la rétention ne sont pas réintégrées
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE notifications RENAME TO notifications_partitioned")
+    op.execute(
+        "ALTER INDEX notifications_pkey RENAME TO notifications_partitioned_pkey"
+    )
+    for index in (
+        "ix_notifications_id",
+        "ix_notifications_user_created",
+        "idx_notifications_user_unread",
+        "idx_notifications_user_type_date",
+    ):
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+
+    op.execute(
+        """
+        CREATE TABLE notifications (
+            id INTEGER NOT NULL DEFAULT nextval('notifications_id_seq') PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            type notificationtype NOT NULL,
+            title VARCHAR NOT NULL,
+            message TEXT NOT NULL,
+            related_job_id INTEGER REFERENCES jobs (id),
+            related_application_id INTEGER REFERENCES job_applications (id),
+            is_read BOOLEAN DEFAULT false,
+            read_at TIMESTAMP WITH TIME ZONE,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+        )
+    """
+    )
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY notifications.id")
+    op.execute(
+        f"INSERT INTO notifications ({COLUMNS}) SELECT {COLUMNS} FROM notifications_partitioned"
+    )
+    op.execute("DROP TABLE notifications_partitioned CASCADE")
+
+    op.execute("CREATE INDEX ix_notifications_user_id ON notifications (user_id)")
+    op.execute("CREATE INDEX ix_notifications_is_read ON notifications (is_read)")
+    op.execute("CREATE INDEX ix_notifications_created_at ON notifications (created_at)")
+    _create_indexes()
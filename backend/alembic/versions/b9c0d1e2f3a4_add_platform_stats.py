@@ -0,0 +1,42 @@
+"""add_platform_stats
+
+Revision ID: b9c0d1e2f3a4
+Revises: a8b9c0d1e2f3
+Create Date: 2026-10-19 00:00:00.000000
+
+Ajoute la table platform_stats : compteurs plateforme pré-agrégés (par rôle,
+statut, pays, type de contrat, type de lieu, secteur…) reconstruits par
+app/services/platform_stats.py. Les statistiques admin, marché, dashboard
+admin et landing page lisent cette table au lieu de compter les tables
+users / jobs / job_applications / companies à chaque appel.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "b9c0d1e2f3a4"
+down_revision = "a8b9c0d1e2f3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "platform_stats",
+        sa.Column("metric", sa.String(length=50), nullable=False),
+        sa.Column(
+            "dimension", sa.String(length=100), nullable=False, server_default=""
+        ),
+        sa.Column("value", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("metric", "dimension"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("platform_stats")
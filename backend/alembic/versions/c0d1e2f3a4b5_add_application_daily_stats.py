@@ -0,0 +1,78 @@
+"""add_application_daily_stats
+
+Revision ID: c0d1e2f3a4b5
+Revises: b9c0d1e2f3a4
+Create Date: 2026-10-19 00:00:00.000000
+
+Ajoute la table application_daily_stats : rollup quotidien des candidatures
+par offre et employeur (reçues, par canal, par statut, passages en
+entretien), maintenu par deltas à chaque écriture. Le dashboard employeur et
+l'entonnoir de recrutement lisent ce rollup au lieu de parcourir toutes les
+candidatures de l'employeur.
+
+Les données existantes sont reprises : reçues et canal au jour de
+candidature, statut actuel compté au jour de candidature, entretiens en
+cours avec le délai updated_at - applied_at.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "c0d1e2f3a4b5"
+down_revision = "b9c0d1e2f3a4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "application_daily_stats",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("metric", sa.String(length=20), nullable=False),
+        sa.Column(
+            "dimension", sa.String(length=100), nullable=False, server_default=""
+        ),
+        sa.Column("employer_id", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total_seconds", sa.Float(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["employer_id"], ["employers.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("day", "job_id", "metric", "dimension"),
+    )
+    op.create_index(
+        "ix_application_daily_stats_employer_id",
+        "application_daily_stats",
+        ["employer_id"],
+    )
+
+    applied_day = "(a.applied_at AT TIME ZONE 'UTC')::date"
+    op.execute(
+        f"""
+        INSERT INTO application_daily_stats (day, job_id, metric, dimension, employer_id, count, total_seconds)
+        SELECT {applied_day}, a.job_id, 'received', '', j.employer_id, count(*), 0
+        FROM job_applications a JOIN jobs j ON j.id = a.job_id
+        GROUP BY 1, a.job_id, j.employer_id
+        UNION ALL
+        SELECT {applied_day}, a.job_id, 'source', coalesce(a.source_ref, 'direct'), j.employer_id, count(*), 0
+        FROM job_applications a JOIN jobs j ON j.id = a.job_id
+        GROUP BY 1, a.job_id, 4, j.employer_id
+        UNION ALL
+        SELECT {applied_day}, a.job_id, 'status', a.status::text, j.employer_id, count(*), 0
+        FROM job_applications a JOIN jobs j ON j.id = a.job_id
+        GROUP BY 1, a.job_id, a.status, j.employer_id
+        UNION ALL
+        SELECT {applied_day}, a.job_id, 'interview', '', j.employer_id, count(*),
+               sum(extract(epoch FROM a.updated_at - a.applied_at))
+        FROM job_applications a JOIN jobs j ON j.id = a.job_id
+        WHERE a.status = 'interview'
+        GROUP BY 1, a.job_id, j.employer_id
+    """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_application_daily_stats_employer_id", table_name="application_daily_stats"
+    )
+    op.drop_table("application_daily_stats")
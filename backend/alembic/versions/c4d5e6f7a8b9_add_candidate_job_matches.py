@@ -0,0 +1,53 @@
+"""add_candidate_job_matches
+
+Revision ID: c4d5e6f7a8b9
+Revises: b2c3d4e5f6a7
+Create Date: 2026-10-19 00:00:00.000000
+
+Ajoute la table candidate_job_matches : cache persistant des résultats de
+/api/ai-scoring/candidate/job-matches, une ligne par candidat.
+- profile_fingerprint / jobs_fingerprint : empreintes SHA-256 du profil et des
+  offres présélectionnées ; le cache est recalculé dès que l'une change
+- result : réponse JSON sérialisée
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = "c4d5e6f7a8b9"
+down_revision = "b2c3d4e5f6a7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "candidate_job_matches",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("candidate_id", sa.Integer(), nullable=False),
+        sa.Column("profile_fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("jobs_fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("match_limit", sa.Integer(), nullable=False),
+        sa.Column("result", postgresql.JSONB(), nullable=False),
+        sa.Column("generated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["candidate_id"], ["candidates.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_candidate_job_matches_id", "candidate_job_matches", ["id"])
+    op.create_index(
+        "ix_candidate_job_matches_candidate_id",
+        "candidate_job_matches",
+        ["candidate_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_candidate_job_matches_candidate_id", table_name="candidate_job_matches"
+    )
+    op.drop_index("ix_candidate_job_matches_id", table_name="candidate_job_matches")
+    op.drop_table("candidate_job_matches")
@@ -0,0 +1,83 @@
+"""add_application_status_events
+
+Revision ID: d1e2f3a4b5c6
+Revises: c0d1e2f3a4b5
+Create Date: 2026-10-19 00:00:00.000000
+
+Ajoute le journal append-only application_status_events : une ligne par
+transition de statut d'une candidature, indexée sur (job_id, occurred_at)
+pour les durées par étape et l'entonnoir dans le temps.
+
+L'historique existant n'est connu qu'en partie : chaque candidature reçoit
+un événement initial à applied_at, puis, si elle a quitté ce statut, un
+événement vers son statut actuel à updated_at.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "d1e2f3a4b5c6"
+down_revision = "c0d1e2f3a4b5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "application_status_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("application_id", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("employer_id", sa.Integer(), nullable=False),
+        sa.Column("from_status", sa.String(length=20), nullable=True),
+        sa.Column("to_status", sa.String(length=20), nullable=False),
+        sa.Column("actor_user_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "occurred_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["application_id"], ["job_applications.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["employer_id"], ["employers.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["actor_user_id"], ["users.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_application_status_events_application_id",
+        "application_status_events",
+        ["application_id"],
+    )
+    op.create_index(
+        "ix_application_status_events_job_occurred",
+        "application_status_events",
+        ["job_id", "occurred_at"],
+    )
+
+    op.execute(
+        """
+        INSERT INTO application_status_events (application_id, job_id, employer_id, from_status, to_status, occurred_at)
+        SELECT a.id, a.job_id, j.employer_id, NULL, 'applied', coalesce(a.applied_at, now())
+        FROM job_applications a JOIN jobs j ON j.id = a.job_id
+        UNION ALL
+        SELECT a.id, a.job_id, j.employer_id, 'applied', a.status::text,
+               greatest(coalesce(a.updated_at, a.applied_at, now()), coalesce(a.applied_at, now()))
+        FROM job_applications a JOIN jobs j ON j.id = a.job_id
+        WHERE a.status::text <> 'applied'
+    """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_application_status_events_job_occurred",
+        table_name="application_status_events",
+    )
+    op.drop_index(
+        "ix_application_status_events_application_id",
+        table_name="application_status_events",
+    )
+    op.drop_table("application_status_events")
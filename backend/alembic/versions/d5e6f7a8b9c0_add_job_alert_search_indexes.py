@@ -0,0 +1,63 @@
+"""add_job_alert_search_indexes
+
+Revision ID: d5e6f7a8b9c0
+Revises: c4d5e6f7a8b9
+Create Date: 2026-10-19 00:00:00.000000
+
+Index de recherche utilisés par le matching des alertes emploi
+(app/api/job_alerts.py:match_jobs_to_criteria) :
+- f_unaccent : wrapper IMMUTABLE de unaccent(), utilisable dans un index
+- idx_jobs_alert_fts : vecteur plein texte 'simple' sans accents sur
+  title + description + requirements (les trois champs des mots-clés ; pas de
+  racinisation, pour une sémantique « préfixe de token » identique à l'index
+  inversé des alertes)
+- idx_jobs_location_trgm : trigrammes sur location (ILIKE '%...%')
+
+L'expression de l'index doit rester identique à JOB_SEARCH_VECTOR_SQL.
+"""
+from alembic import op
+
+# revision identifiers
+revision = "d5e6f7a8b9c0"
+down_revision = "c4d5e6f7a8b9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent;")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+
+    # unaccent() est STABLE (dictionnaire modifiable) : le wrapper à dictionnaire
+    # explicite peut être déclaré IMMUTABLE et indexé
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+    """
+    )
+
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_jobs_alert_fts
+        ON jobs USING GIN(
+          to_tsvector('simple', f_unaccent(
+            coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(requirements, '')
+          ))
+        );
+    """
+    )
+
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_jobs_location_trgm
+        ON jobs USING GIN(location gin_trgm_ops);
+    """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_jobs_location_trgm;")
+    op.execute("DROP INDEX IF EXISTS idx_jobs_alert_fts;")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text);")
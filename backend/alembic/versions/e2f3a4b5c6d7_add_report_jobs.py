@@ -0,0 +1,66 @@
+"""add_report_jobs
+
+Revision ID: e2f3a4b5c6d7
+Revises: d1e2f3a4b5c6
+Create Date: 2026-10-19 00:00:00.000000
+
+Ajoute la table report_jobs : rapports PDF demandés via
+POST /api/reports/{kind}, générés en arrière-plan par le worker
+app/services/report_jobs.py et téléchargeables jusqu'à expires_at.
+- ix_report_jobs_queue : index partiel des rapports en file ou en cours,
+  dans l'ordre de demande
+- ix_report_jobs_expiry : index partiel des fichiers à purger
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "e2f3a4b5c6d7"
+down_revision = "d1e2f3a4b5c6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "report_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column(
+            "status", sa.String(length=20), nullable=False, server_default="pending"
+        ),
+        sa.Column("file_path", sa.String(), nullable=True),
+        sa.Column("size_bytes", sa.Integer(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.text("now()")
+        ),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_report_jobs_id", "report_jobs", ["id"])
+    op.create_index("ix_report_jobs_user_id", "report_jobs", ["user_id"])
+    op.create_index(
+        "ix_report_jobs_queue",
+        "report_jobs",
+        ["created_at", "id"],
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+    )
+    op.create_index(
+        "ix_report_jobs_expiry",
+        "report_jobs",
+        ["expires_at"],
+        postgresql_where=sa.text("status = 'completed'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_report_jobs_expiry", table_name="report_jobs")
+    op.drop_index("ix_report_jobs_queue", table_name="report_jobs")
+    op.drop_index("ix_report_jobs_user_id", table_name="report_jobs")
+    op.drop_index("ix_report_jobs_id", table_name="report_jobs")
+    op.drop_table("report_jobs")
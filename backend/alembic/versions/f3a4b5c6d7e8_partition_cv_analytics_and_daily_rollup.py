@@ -0,0 +1,178 @@
+"""partition_cv_analytics_and_daily_rollup
+
+Revision ID: f3a4b5c6d7e8
+Revises: e2f3a4b5c6d7
+Create Date: 2026-10-19 00:00:00.000000
+
+- cv_analytics_daily : rollup par (CV, jour, type d'événement, pays),
+  rempli depuis cv_analytics puis maintenu à chaque écriture par lots
+  (app/services/cv_analytics.py) ; les statistiques du CV Builder y sont lues
+- cv_analytics est partitionnée par mois sur created_at, sur le modèle de
+  notifications (a8b9c0d1e2f3) : partitions cv_analytics_pYYYY_MM du plus
+  ancien mois présent à M+3 plus une partition DEFAULT, clé primaire
+  (id, created_at), séquence cv_analytics_id_seq conservée ; les mois
+  suivants et la rétention (suppression de partitions entières) sont gérés
+  par app/services/cv_analytics_partitions.py
+- index : (cv_document_id, event_type, created_at DESC) et id ; les index
+  mono-colonne event_type / created_at sont supprimés
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "f3a4b5c6d7e8"
+down_revision = "e2f3a4b5c6d7"
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = "id, cv_document_id, event_type, ip_address, user_agent, referrer, country, city, created_at"
+
+
+def upgrade() -> None:
+    op.create_table(
+        "cv_analytics_daily",
+        sa.Column("cv_document_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("event_type", sa.String(length=20), nullable=False),
+        sa.Column("country", sa.String(length=100), nullable=False, server_default=""),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(
+            ["cv_document_id"], ["cv_documents.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("cv_document_id", "day", "event_type", "country"),
+    )
+    op.execute(
+        """
+        INSERT INTO cv_analytics_daily (cv_document_id, day, event_type, country, count)
+        SELECT cv_document_id,
+               (coalesce(created_at, now()) AT TIME ZONE 'UTC')::date,
+               left(event_type, 20),
+               left(coalesce(country, ''), 100),
+               count(*)
+        FROM cv_analytics
+        GROUP BY 1, 2, 3, 4
+    """
+    )
+
+    # La séquence survit à l'ancienne table
+    op.execute("ALTER SEQUENCE cv_analytics_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE cv_analytics RENAME TO cv_analytics_legacy")
+    op.execute("ALTER INDEX cv_analytics_pkey RENAME TO cv_analytics_legacy_pkey")
+    for index in (
+        "ix_cv_analytics_id",
+        "ix_cv_analytics_cv_document_id",
+        "ix_cv_analytics_event_type",
+        "ix_cv_analytics_created_at",
+        "ix_cv_analytics_document_event_date",
+    ):
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+
+    op.execute(
+        """
+        CREATE TABLE cv_analytics (
+            id INTEGER NOT NULL DEFAULT nextval('cv_analytics_id_seq'),
+            cv_document_id INTEGER NOT NULL REFERENCES cv_documents (id) ON DELETE CASCADE,
+            event_type VARCHAR NOT NULL,
+            ip_address VARCHAR,
+            user_agent VARCHAR,
+            referrer VARCHAR,
+            country VARCHAR,
+            city VARCHAR,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """
+    )
+    op.execute("ALTER SEQUENCE cv_analytics_id_seq OWNED BY cv_analytics.id")
+
+    # Partitions mensuelles : du plus ancien mois présent à M+3
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month_start date := date_trunc('month', coalesce(
+                (SELECT min(created_at) FROM cv_analytics_legacy), now()))::date;
+            last_month date := (date_trunc('month', now()) + interval '3 months')::date;
+        BEGIN
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF cv_analytics FOR VALUES FROM (%L) TO (%L)',
+                    'cv_analytics_p' || to_char(month_start, 'YYYY_MM'),
+                    month_start, (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END $$;
+    """
+    )
+    op.execute("CREATE TABLE cv_analytics_default PARTITION OF cv_analytics DEFAULT")
+
+    op.execute(
+        f"""
+        INSERT INTO cv_analytics ({COLUMNS})
+        SELECT id, cv_document_id, event_type, ip_address, user_agent, referrer, country, city,
+               coalesce(created_at, now())
+        FROM cv_analytics_legacy
+    """
+    )
+    op.execute("DROP TABLE cv_analytics_legacy")
+
+    op.execute("CREATE INDEX ix_cv_analytics_id ON cv_analytics (id)")
+    op.execute(
+        "CREATE INDEX ix_cv_analytics_cv_document_id ON cv_analytics (cv_document_id)"
+    )
+    op.execute(
+        """
+        CREATE INDEX ix_cv_analytics_document_event_date
+        ON cv_analytics (cv_document_id, event_type, created_at DESC)
+    """
+    )
+
+
+def downgrade() -> None:
+    # Les partitions supprimées par la rétention ne sont pas restaurées
+    op.execute("ALTER SEQUENCE cv_analytics_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE cv_analytics RENAME TO cv_analytics_partitioned")
+    op.execute("ALTER INDEX cv_analytics_pkey RENAME TO cv_analytics_partitioned_pkey")
+    for index in (
+        "ix_cv_analytics_id",
+        "ix_cv_analytics_cv_document_id",
+        "ix_cv_analytics_document_event_date",
+    ):
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+
+    op.execute(
+        """
+        CREATE TABLE cv_analytics (
+            id INTEGER NOT NULL DEFAULT nextval('cv_analytics_id_seq') PRIMARY KEY,
+            cv_document_id INTEGER NOT NULL REFERENCES cv_documents (id) ON DELETE CASCADE,
+            event_type VARCHAR NOT NULL,
+            ip_address VARCHAR,
+            user_agent VARCHAR,
+            referrer VARCHAR,
+            country VARCHAR,
+            city VARCHAR,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+        )
+    """
+    )
+    op.execute("ALTER SEQUENCE cv_analytics_id_seq OWNED BY cv_analytics.id")
+    op.execute(
+        f"INSERT INTO cv_analytics ({COLUMNS}) SELECT {COLUMNS} FROM cv_analytics_partitioned"
+    )
+    op.execute("DROP TABLE cv_analytics_partitioned CASCADE")
+
+    op.create_index("ix_cv_analytics_id", "cv_analytics", ["id"])
+    op.create_index(
+        "ix_cv_analytics_cv_document_id", "cv_analytics", ["cv_document_id"]
+    )
+    op.create_index("ix_cv_analytics_event_type", "cv_analytics", ["event_type"])
+    op.create_index("ix_cv_analytics_created_at", "cv_analytics", ["created_at"])
+    op.create_index(
+        "ix_cv_analytics_document_event_date",
+        "cv_analytics",
+        ["cv_document_id", "event_type", "created_at"],
+    )
+
+    op.drop_table("cv_analytics_daily")
@@ -0,0 +1,74 @@
+"""add_email_campaigns
+
+Revision ID: f7a8b9c0d1e2
+Revises: e6f7a8b9c0d1
+Create Date: 2026-10-19 00:00:00.000000
+
+Ajoute la table email_campaigns : envoi groupé d'un template aux candidats
+d'une offre ayant un statut donné (rejetés, présélectionnés…).
+- email_outbox.campaign_id : emails de la campagne dans l'outbox
+- sent_count / failed_count : progression mise à jour par le worker
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "f7a8b9c0d1e2"
+down_revision = "e6f7a8b9c0d1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "email_campaigns",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("company_id", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("template_id", sa.Integer(), nullable=True),
+        sa.Column("created_by_user_id", sa.Integer(), nullable=False),
+        sa.Column("application_status", sa.String(length=20), nullable=False),
+        sa.Column(
+            "status", sa.String(length=20), nullable=False, server_default="sending"
+        ),
+        sa.Column("total_recipients", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sent_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failed_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.text("now()")
+        ),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["company_id"], ["companies.id"]),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["template_id"], ["email_templates.id"], ondelete="SET NULL"
+        ),
+        sa.ForeignKeyConstraint(["created_by_user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_email_campaigns_id", "email_campaigns", ["id"])
+    op.create_index("ix_email_campaigns_company_id", "email_campaigns", ["company_id"])
+    op.create_index("ix_email_campaigns_job_id", "email_campaigns", ["job_id"])
+
+    op.add_column("email_outbox", sa.Column("campaign_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "fk_email_outbox_campaign_id",
+        "email_outbox",
+        "email_campaigns",
+        ["campaign_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.create_index("ix_email_outbox_campaign_id", "email_outbox", ["campaign_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_email_outbox_campaign_id", table_name="email_outbox")
+    op.drop_constraint(
+        "fk_email_outbox_campaign_id", "email_outbox", type_="foreignkey"
+    )
+    op.drop_column("email_outbox", "campaign_id")
+    op.drop_index("ix_email_campaigns_job_id", table_name="email_campaigns")
+    op.drop_index("ix_email_campaigns_company_id", table_name="email_campaigns")
+    op.drop_index("ix_email_campaigns_id", table_name="email_campaigns")
+    op.drop_table("email_campaigns")
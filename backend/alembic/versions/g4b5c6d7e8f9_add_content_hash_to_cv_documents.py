@@ -0,0 +1,37 @@
+"""add content_hash to cv_documents
+
+Revision ID: g4b5c6d7e8f9
+Revises: f3a4b5c6d7e8
+Create Date: 2026-10-19 00:00:00.000000
+
+- cv_documents.content_hash : SHA-256 (hex) de cv_data, indexé ; la
+  suppression du PDF d'un contenu abandonné vérifie sur cette colonne
+  qu'aucun autre CV n'a un contenu identique (au lieu d'une égalité sur la
+  colonne Text cv_data)
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "g4b5c6d7e8f9"
+down_revision = "f3a4b5c6d7e8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "cv_documents", sa.Column("content_hash", sa.String(length=64), nullable=True)
+    )
+    # Même empreinte que app.services.cv_pdf.cv_content_hash
+    op.execute(
+        "UPDATE cv_documents SET content_hash = encode(sha256(convert_to(cv_data, 'UTF8')), 'hex')"
+    )
+    op.create_index(
+        "ix_cv_documents_content_hash", "cv_documents", ["content_hash"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cv_documents_content_hash", table_name="cv_documents")
+    op.drop_column("cv_documents", "content_hash")
@@ -0,0 +1,49 @@
+"""spell_out_symbols_in_job_alert_fts
+
+Revision ID: h5c6d7e8f9a0
+Revises: g4b5c6d7e8f9
+Create Date: 2026-10-19 00:00:00.000000
+
+idx_jobs_alert_fts est reconstruit avec « + » et « # » écrits en toutes
+lettres avant to_tsvector (« C++ » → cplusplus, « C# » → csharp) : le parseur
+plein texte les traitait comme séparateurs, et la tsquery d'une alerte « C++ »
+devenait 'c':*, qui sélectionne toute offre contenant un mot en c. Même
+normalisation que app.services.job_alert_index.search_tokens.
+
+L'expression de l'index doit rester identique à JOB_SEARCH_VECTOR_SQL.
+"""
+from alembic import op
+
+# revision identifiers
+revision = "h5c6d7e8f9a0"
+down_revision = "g4b5c6d7e8f9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_jobs_alert_fts;")
+    op.execute(
+        """
+        CREATE INDEX idx_jobs_alert_fts
+        ON jobs USING GIN(
+          to_tsvector('simple', replace(replace(f_unaccent(
+            coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(requirements, '')
+          ), '+', 'plus'), '#', 'sharp'))
+        );
+    """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_jobs_alert_fts;")
+    op.execute(
+        """
+        CREATE INDEX idx_jobs_alert_fts
+        ON jobs USING GIN(
+          to_tsvector('simple', f_unaccent(
+            coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(requirements, '')
+          ))
+        );
+    """
+    )
@@ -0,0 +1,45 @@
+"""unique_active_report_job
+
+Revision ID: i6d7e8f9a0b1
+Revises: h5c6d7e8f9a0
+Create Date: 2026-10-19 00:00:00.000000
+
+uq_report_jobs_active_kind : index unique partiel (user_id, kind) des
+rapports en file ou en cours. enqueue_report vérifiait l'absence d'un tel
+rapport avant d'insérer : deux demandes simultanées (double clic) inséraient
+chacune le leur et le rapport était rendu deux fois. Les doublons déjà
+présents sont marqués en échec (le plus récent est conservé).
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision = "i6d7e8f9a0b1"
+down_revision = "h5c6d7e8f9a0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        UPDATE report_jobs SET status = 'failed', error = 'Demande en double', completed_at = now()
+        WHERE status IN ('pending', 'running')
+          AND id NOT IN (
+              SELECT max(id) FROM report_jobs
+              WHERE status IN ('pending', 'running')
+              GROUP BY user_id, kind
+          )
+    """
+    )
+    op.create_index(
+        "uq_report_jobs_active_kind",
+        "report_jobs",
+        ["user_id", "kind"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_report_jobs_active_kind", table_name="report_jobs")
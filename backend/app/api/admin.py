@@ -13,10 +13,15 @@ from app.models.base import (
     EmailTemplate, InterviewSchedule, JobPosting, IntegrationCredential
 )
 from app.auth import require_admin, PasswordHasher
+from app.services.application_stats import record_applications_removed
 from app.services.email_service import email_service
+from app.services.platform_stats import (
+    APPLICATIONS, COMPANIES, JOBS_BY_STATUS, NOTIFICATIONS, USERS_BY_ACTIVE, USERS_BY_ROLE,
+    USERS_RECENT_SIGNUPS, get_platform_stats,
+)
 from pydantic import BaseModel, EmailStr, ConfigDict
 from typing import List, Optional, Literal
-from datetime import datetime, timedelta
+from datetime import datetime
 import secrets
 import string
 
@@ -101,66 +106,22 @@ async def get_admin_statistics(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Récupérer les statistiques globales de la plateforme
+    Récupérer les statistiques globales de la plateforme (rollup platform_stats)
     """
-    from datetime import timezone
-    seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
-
-    # Tous les counts basés sur User en 1 seule requête (filtres via func.count().filter())
-    result = await db.execute(
-        select(
-            func.count().label("total"),
-            func.count().filter(User.role == UserRole.CANDIDATE).label("candidates"),
-            func.count().filter(User.role == UserRole.EMPLOYER).label("employers"),
-            func.count().filter(User.is_active == True).label("active"),
-            func.count().filter(User.is_active == False).label("inactive"),
-            func.count().filter(User.created_at >= seven_days_ago).label("recent"),
-        ).select_from(User)
-    )
-    user_stats = result.one()
-    total_users = user_stats.total
-    total_candidates = user_stats.candidates
-    total_employers = user_stats.employers
-    active_users = user_stats.active
-    inactive_users = user_stats.inactive
-    recent_signups = user_stats.recent
-
-    # Counts des autres entités en 1 seule requête (sous-requêtes scalaires)
-    result = await db.execute(
-        select(
-            select(func.count()).select_from(Company).scalar_subquery().label("companies"),
-            select(func.count()).select_from(Job).scalar_subquery().label("jobs"),
-            select(func.count()).select_from(JobApplication).scalar_subquery().label("applications"),
-            select(func.count()).select_from(Notification).scalar_subquery().label("notifications"),
-        )
-    )
-    entity_stats = result.one()
-    total_companies = entity_stats.companies
-    total_jobs = entity_stats.jobs
-    total_applications = entity_stats.applications
-    total_notifications = entity_stats.notifications
-
-    # Jobs par statut
-    result = await db.execute(
-        select(Job.status, func.count(Job.id).label('count'))
-        .group_by(Job.status)
-    )
-    jobs_by_status_query = result.all()
-
-    jobs_by_status = dict(jobs_by_status_query)
+    stats = await get_platform_stats(db)
 
     return AdminStats(
-        total_users=total_users,
-        total_candidates=total_candidates,
-        total_employers=total_employers,
-        total_companies=total_companies,
-        total_jobs=total_jobs,
-        total_applications=total_applications,
-        total_notifications=total_notifications,
-        active_users=active_users,
-        inactive_users=inactive_users,
-        jobs_by_status=jobs_by_status,
-        recent_signups=recent_signups
+        total_users=stats.total(USERS_BY_ROLE),
+        total_candidates=stats.get(USERS_BY_ROLE, UserRole.CANDIDATE.value),
+        total_employers=stats.get(USERS_BY_ROLE, UserRole.EMPLOYER.value),
+        total_companies=stats.get(COMPANIES),
+        total_jobs=stats.total(JOBS_BY_STATUS),
+        total_applications=stats.get(APPLICATIONS),
+        total_notifications=stats.get(NOTIFICATIONS),
+        active_users=stats.get(USERS_BY_ACTIVE, "true"),
+        inactive_users=stats.get(USERS_BY_ACTIVE, "false"),
+        jobs_by_status=dict(stats.breakdown(JOBS_BY_STATUS)),
+        recent_signups=stats.get(USERS_RECENT_SIGNUPS)
     )
 
 
@@ -379,6 +340,7 @@ async def _delete_candidate_data(db: AsyncSession, user: User) -> None:
             )
         )
 
+    await record_applications_removed(db, JobApplication.candidate_id == user.candidate.id)
     await db.execute(
         sql_delete(JobApplication).filter(
             JobApplication.candidate_id == user.candidate.id
@@ -3,20 +3,31 @@ API endpoints pour le scoring IA des candidatures
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_, or_, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from typing import List, Optional
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel, ConfigDict
+import asyncio
+import hashlib
 import os
-import io
 import json
 import httpx
 
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
 from app.auth import require_user
-from app.models.base import User, UserRole, Employer, JobApplication, Job, Candidate
+from app.logging_config import logger
+from app.models.base import User, UserRole, Employer, JobApplication, Job, JobStatus, Candidate, CandidateJobMatch
 from app.services.ai_scoring import get_ai_service
+from app.services.cv_parser import parse_cv_bytes
+from app.services.job_matching import job_index, candidate_query_weights, JOB_MATCH_SHORTLIST_SIZE
+from app.services.local_scoring import score_applicant, score_applicants
+
+# Nombre de candidatures (les mieux classées localement) affinées par Claude lors du scoring en masse
+AI_SCORING_REFINE_TOP_N = int(os.getenv("AI_SCORING_REFINE_TOP_N", "20"))
+# CV téléchargés simultanément lors du scoring en masse (le parsing reste borné par le pool)
+AI_SCORING_CV_FETCH_CONCURRENCY = int(os.getenv("AI_SCORING_CV_FETCH_CONCURRENCY", "8"))
 
 
 async def extract_cv_text(cv_url: Optional[str]) -> str:
@@ -43,29 +54,22 @@ async def extract_cv_text(cv_url: Optional[str]) -> str:
         if not file_bytes:
             return ""
 
-        # Détecter le format via magic bytes
-        if file_bytes.startswith(b"%PDF"):
-            import pypdf
-            reader = pypdf.PdfReader(io.BytesIO(file_bytes))
-            pages_text = [p.extract_text() for p in reader.pages if p.extract_text()]
-            extracted = "\n".join(pages_text).strip()
-        elif file_bytes.startswith(b"PK\x03\x04"):
-            # DOCX ou ODT (format ZIP)
-            import docx
-            doc = docx.Document(io.BytesIO(file_bytes))
-            extracted = "\n".join(p.text for p in doc.paragraphs if p.text.strip())
-        else:
-            # DOC (OLE2) — extraction basique du texte brut
-            extracted = file_bytes.decode("latin-1", errors="ignore")
-            # Filtrer les caractères non imprimables
-            import re
-            extracted = re.sub(r"[^\x20-\x7E\xA0-\xFF\n]", " ", extracted)
-            extracted = re.sub(r" {3,}", " ", extracted).strip()
-
-        return extracted[:8000]
+        # Parsing CPU-bound délégué au pool de processus (détection du format via magic bytes)
+        return await parse_cv_bytes(file_bytes)
     except Exception:
         return ""
 
+
+async def extract_cv_texts(cv_urls: List[Optional[str]]) -> List[str]:
+    """Extrait le texte de plusieurs CV en parallèle (AI_SCORING_CV_FETCH_CONCURRENCY à la fois)."""
+    slots = asyncio.Semaphore(AI_SCORING_CV_FETCH_CONCURRENCY)
+
+    async def extract(cv_url: Optional[str]) -> str:
+        async with slots:
+            return await extract_cv_text(cv_url)
+
+    return list(await asyncio.gather(*(extract(cv_url) for cv_url in cv_urls)))
+
 router = APIRouter()
 
 
@@ -159,6 +163,74 @@ class JobMatchesResponse(BaseModel):
     generated_at: datetime
 
 
+# ===== SCORING DES CANDIDATURES =====
+
+def _ai_service_or_none():
+    """Service IA, ou None s'il ne peut pas être initialisé (clé API absente)."""
+    try:
+        return get_ai_service()
+    except Exception as e:
+        logger.warning(f"Service IA indisponible, scoring local utilisé: {type(e).__name__}")
+        return None
+
+
+def _build_candidate_cv_text(candidate: Candidate, pdf_content: str) -> str:
+    """Texte du CV envoyé à l'IA (profil + contenu extrait du fichier)."""
+    cv_text = f"""
+Nom: {candidate.user.first_name} {candidate.user.last_name}
+Email: {candidate.user.email}
+Téléphone: {candidate.phone or 'Non renseigné'}
+Localisation: {candidate.location or 'Non renseignée'}
+Titre: {candidate.title or 'Non renseigné'}
+Résumé: {candidate.summary or 'Non renseigné'}
+Années d'expérience: {candidate.years_experience or 0}
+"""
+    if pdf_content:
+        cv_text += f"\n\n--- Contenu extrait du fichier CV ---\n{pdf_content}"
+    return cv_text
+
+
+async def _ai_score_application(ai_service, job: Job, candidate: Candidate, pdf_content: str) -> Optional[dict]:
+    """
+    Score une candidature avec Claude.
+
+    Retourne None si le service est indisponible ou n'a pas pu produire de score,
+    l'appelant se rabat alors sur le scoring local.
+    """
+    if ai_service is None:
+        return None
+
+    candidate_experience = ""
+    if candidate.experiences:
+        candidate_experience = "\n".join([
+            f"- {exp.title} chez {exp.company} ({exp.start_date} - {exp.end_date or 'Présent'})"
+            for exp in candidate.experiences
+        ])
+
+    candidate_skills = ""
+    if candidate.skills:
+        candidate_skills = ", ".join([skill.name for skill in candidate.skills])
+
+    try:
+        score_result = await ai_service.score_candidate(
+            job_title=job.title,
+            job_description=job.description,
+            job_requirements=job.requirements,
+            job_responsibilities=job.responsibilities,
+            candidate_cv_text=_build_candidate_cv_text(candidate, pdf_content),
+            candidate_experience=candidate_experience,
+            candidate_skills=candidate_skills,
+            company_id=job.company_id,
+        )
+    except Exception as e:
+        logger.error(f"Erreur lors du scoring IA de la candidature: {type(e).__name__}")
+        return None
+
+    if score_result.get("score") is None:
+        return None
+    return score_result
+
+
 # ===== ENDPOINTS =====
 
 @router.post("/score-application", response_model=ScoreApplicationResponse)
@@ -168,7 +240,7 @@ async def score_single_application(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Score une candidature individuelle avec l'IA
+    Score une candidature individuelle avec l'IA (scoring local si l'IA est indisponible)
     Accessible uniquement aux employeurs pour leurs propres offres
     """
     
@@ -204,51 +276,18 @@ async def score_single_application(
     if application.job.employer_id != employer.id:
         raise HTTPException(status_code=403, detail="Cette candidature ne vous appartient pas")
     
-    # Extraire les données pour l'IA
     job = application.job
     candidate = application.candidate
 
     # Extraire le contenu du fichier PDF si disponible
     pdf_content = await extract_cv_text(candidate.cv_url)
 
-    # Construire le texte du CV (profil + contenu PDF)
-    cv_text = f"""
-Nom: {candidate.user.first_name} {candidate.user.last_name}
-Email: {candidate.user.email}
-Téléphone: {candidate.phone or 'Non renseigné'}
-Localisation: {candidate.location or 'Non renseignée'}
-Titre: {candidate.title or 'Non renseigné'}
-Résumé: {candidate.summary or 'Non renseigné'}
-Années d'expérience: {candidate.years_experience or 0}
-"""
-    if pdf_content:
-        cv_text += f"\n\n--- Contenu extrait du fichier CV ---\n{pdf_content}"
+    # IA en priorité, scoring local si le service est indisponible
+    score_result = await _ai_score_application(_ai_service_or_none(), job, candidate, pdf_content)
+    if score_result is None:
+        score_result = score_applicant(job, candidate, pdf_content)
 
-    # Ajouter les expériences
-    candidate_experience = ""
-    if candidate.experiences:
-        candidate_experience = "\n".join([
-            f"- {exp.title} chez {exp.company} ({exp.start_date} - {exp.end_date or 'Présent'})"
-            for exp in candidate.experiences
-        ])
-
-    # Ajouter les compétences
-    candidate_skills = ""
-    if candidate.skills:
-        candidate_skills = ", ".join([skill.name for skill in candidate.skills])
-
-    # Appeler l'IA pour le scoring
     try:
-        score_result = await get_ai_service().score_candidate(
-            job_title=job.title,
-            job_description=job.description,
-            job_requirements=job.requirements,
-            job_responsibilities=job.responsibilities,
-            candidate_cv_text=cv_text,
-            candidate_experience=candidate_experience,
-            candidate_skills=candidate_skills
-        )
-        
         # Mettre à jour la candidature avec le score
         application.ai_score = score_result["score"]
         application.ai_score_details = score_result
@@ -276,7 +315,12 @@ async def score_all_job_applications(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Score toutes les candidatures d'une offre avec l'IA
+    Score toutes les candidatures d'une offre
+
+    Toutes les candidatures sont pré-classées par le scoring local ; Claude
+    n'analyse que les AI_SCORING_REFINE_TOP_N premières. Les candidatures
+    qui n'ont qu'un score local (engine "local") sont reprises à chaque
+    passage, pour que Claude puisse les affiner plus tard.
     """
     
     if current_user.role != UserRole.EMPLOYER:
@@ -298,7 +342,7 @@ async def score_all_job_applications(
     if not job:
         raise HTTPException(status_code=404, detail="Offre introuvable ou non autorisée")
     
-    # Récupérer toutes les candidatures non scorées
+    # Récupérer toutes les candidatures non scorées ou scorées localement
     stmt = (
         select(JobApplication)
         .options(
@@ -309,7 +353,10 @@ async def score_all_job_applications(
         .filter(
             and_(
                 JobApplication.job_id == request.job_id,
-                JobApplication.ai_score == None  # Seulement les non-scorées
+                or_(
+                    JobApplication.ai_score == None,
+                    JobApplication.ai_score_details["engine"].as_string() == "local",
+                )
             )
         )
     )
@@ -325,60 +372,38 @@ async def score_all_job_applications(
             message="Aucune candidature à scorer (toutes déjà analysées)"
         )
     
-    scored_count = 0
-    failed_count = 0
-    
-    # Scorer chaque candidature
-    for application in applications:
-        try:
-            candidate = application.candidate
+    candidates = [application.candidate for application in applications]
+    pdf_contents = await extract_cv_texts([candidate.cv_url for candidate in candidates])
 
-            # Extraire le contenu du fichier PDF si disponible
-            pdf_content = await extract_cv_text(candidate.cv_url)
+    # Pré-classement local de toutes les candidatures en une passe vectorisée
+    local_results = score_applicants(job, candidates, pdf_contents)
+    ranking = sorted(range(len(applications)), key=lambda i: local_results[i]["score"], reverse=True)
 
-            cv_text = f"""
-Nom: {candidate.user.first_name} {candidate.user.last_name}
-Email: {candidate.user.email}
-Téléphone: {candidate.phone or 'Non renseigné'}
-Localisation: {candidate.location or 'Non renseignée'}
-Titre: {candidate.title or 'Non renseigné'}
-Résumé: {candidate.summary or 'Non renseigné'}
-Années d'expérience: {candidate.years_experience or 0}
-"""
-            if pdf_content:
-                cv_text += f"\n\n--- Contenu extrait du fichier CV ---\n{pdf_content}"
+    # Claude n'affine que le haut du pipeline ; le reste garde le score local
+    ai_service = _ai_service_or_none()
+    refine = set(ranking[:AI_SCORING_REFINE_TOP_N]) if ai_service else set()
 
-            candidate_experience = ""
-            if candidate.experiences:
-                candidate_experience = "\n".join([
-                    f"- {exp.title} chez {exp.company} ({exp.start_date} - {exp.end_date or 'Présent'})"
-                    for exp in candidate.experiences
-                ])
+    scored_count = 0
+    failed_count = 0
+    local_count = 0
+    analyzed_at = datetime.now(timezone.utc)
+
+    for i in ranking:
+        application = applications[i]
+        score_result = None
+        if i in refine:
+            score_result = await _ai_score_application(ai_service, job, candidates[i], pdf_contents[i])
+            if score_result is None:
+                failed_count += 1
+        if score_result is None:
+            score_result = local_results[i]
+            local_count += 1
 
-            candidate_skills = ""
-            if candidate.skills:
-                candidate_skills = ", ".join([skill.name for skill in candidate.skills])
+        application.ai_score = score_result["score"]
+        application.ai_score_details = score_result
+        application.ai_analyzed_at = analyzed_at
+        scored_count += 1
 
-            score_result = await get_ai_service().score_candidate(
-                job_title=job.title,
-                job_description=job.description,
-                job_requirements=job.requirements,
-                job_responsibilities=job.responsibilities,
-                candidate_cv_text=cv_text,
-                candidate_experience=candidate_experience,
-                candidate_skills=candidate_skills
-            )
-            
-            application.ai_score = score_result["score"]
-            application.ai_score_details = score_result
-            application.ai_analyzed_at = datetime.now(timezone.utc)
-            
-            scored_count += 1
-            
-        except Exception as e:
-            print(f"Erreur lors du scoring de la candidature {application.id}: {e}")
-            failed_count += 1
-    
     try:
         await db.commit()
         
@@ -387,7 +412,10 @@ Années d'expérience: {candidate.years_experience or 0}
             job_id=request.job_id,
             scored_count=scored_count,
             failed_count=failed_count,
-            message=f"{scored_count} candidatures scorées avec succès, {failed_count} échecs"
+            message=(
+                f"{scored_count} candidatures scorées avec succès "
+                f"({local_count} par scoring local), {failed_count} échecs IA"
+            )
         )
     except Exception as e:
         await db.rollback()
@@ -481,45 +509,95 @@ async def get_scored_applications(
     )
 
 
-@router.get("/candidate/job-matches", response_model=JobMatchesResponse)
-async def get_candidate_job_matches(
-    limit: int = Query(5, ge=1, le=20),
-    current_user: User = Depends(require_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """
-    Retourne les offres d'emploi actives les mieux matchées pour le candidat connecté.
-    Utilise Claude pour analyser le profil et classer les offres.
-    Accessible uniquement aux candidats.
-    """
-    if current_user.role != UserRole.CANDIDATE:
-        raise HTTPException(status_code=403, detail="Accès réservé aux candidats")
+# ─────────────────────────────────────────────────────────────────────────────
+# Matching candidat → offres (avec cache persistant par candidat)
+# ─────────────────────────────────────────────────────────────────────────────
 
-    # Charger le profil candidat complet
-    stmt = (
-        select(Candidate)
-        .options(
-            selectinload(Candidate.experiences),
-            selectinload(Candidate.educations),
-            selectinload(Candidate.skills),
-        )
-        .filter(Candidate.user_id == current_user.id)
+# Au-delà de ce délai, un résultat encore valide est servi puis recalculé en arrière-plan
+JOB_MATCHES_CACHE_TTL_SECONDS = int(os.getenv("JOB_MATCHES_CACHE_TTL_SECONDS", "21600"))
+
+# Rafraîchissements en arrière-plan en cours (candidate_id -> tâche)
+_job_matches_refresh_tasks: dict = {}
+
+
+def _candidate_profile_query():
+    """Requête de chargement du profil candidat complet."""
+    return select(Candidate).options(
+        selectinload(Candidate.user),
+        selectinload(Candidate.experiences),
+        selectinload(Candidate.educations),
+        selectinload(Candidate.skills),
     )
-    result = await db.execute(stmt)
-    candidate = result.scalar_one_or_none()
-    if not candidate:
-        raise HTTPException(status_code=404, detail="Profil candidat introuvable")
 
-    # Charger les offres actives (max 30 pour ne pas surcharger le prompt)
-    jobs_stmt = (
+
+def _profile_fingerprint(candidate: Candidate) -> str:
+    """Empreinte SHA-256 des éléments du profil utilisés pour le matching."""
+    payload = {
+        "title": candidate.title,
+        "summary": candidate.summary,
+        "years_experience": candidate.years_experience,
+        "location": candidate.location,
+        "cv": [candidate.cv_url, candidate.cv_uploaded_at],
+        "skills": sorted(
+            [s.name, s.level, s.category.value if hasattr(s.category, 'value') else str(s.category)]
+            for s in candidate.skills
+        ),
+        "experiences": sorted(
+            [e.title, e.company, e.start_date, e.end_date or "", e.description or ""]
+            for e in candidate.experiences
+        ),
+        "educations": sorted(
+            [e.degree, e.school, e.start_date, e.end_date]
+            for e in candidate.educations
+        ),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+async def _shortlist_job_ids(db: AsyncSession, candidate: Candidate, limit: int) -> List[int]:
+    """Présélectionne localement les offres à soumettre à l'IA."""
+    # Pré-classement local (BM25) de toutes les offres publiées : seul le top-K est envoyé à l'IA
+    await job_index.refresh(db)
+    query_weights = candidate_query_weights(
+        title=candidate.title,
+        summary=candidate.summary,
+        skills=[s.name for s in candidate.skills],
+        experiences=[(e.title, e.description) for e in candidate.experiences],
+    )
+    shortlist_size = max(JOB_MATCH_SHORTLIST_SIZE, limit)
+    shortlist_ids = [job_id for job_id, _ in job_index.top_k(query_weights, shortlist_size)]
+
+    # Profil trop pauvre pour le classement local : compléter avec les offres les plus récentes
+    if len(shortlist_ids) < limit:
+        recent_result = await db.execute(
+            select(Job.id)
+            .filter(Job.status == JobStatus.PUBLISHED)
+            .order_by(Job.posted_at.desc().nullslast())
+            .limit(shortlist_size)
+        )
+        for job_id in recent_result.scalars():
+            if len(shortlist_ids) >= shortlist_size:
+                break
+            if job_id not in shortlist_ids:
+                shortlist_ids.append(job_id)
+
+    return shortlist_ids
+
+
+async def _compute_job_matches(
+    db: AsyncSession,
+    candidate: Candidate,
+    shortlist_ids: List[int],
+    limit: int,
+) -> JobMatchesResponse:
+    """Analyse les offres présélectionnées avec Claude."""
+    jobs_result = await db.execute(
         select(Job)
         .options(selectinload(Job.company))
-        .filter(Job.status == "published")
-        .order_by(Job.posted_at.desc().nullslast())
-        .limit(30)
+        .filter(Job.id.in_(shortlist_ids), Job.status == JobStatus.PUBLISHED)
     )
-    jobs_result = await db.execute(jobs_stmt)
-    active_jobs = jobs_result.scalars().all()
+    jobs_by_id = {job.id: job for job in jobs_result.scalars().all()}
+    active_jobs = [jobs_by_id[job_id] for job_id in shortlist_ids if job_id in jobs_by_id]
 
     if not active_jobs:
         return JobMatchesResponse(
@@ -529,7 +607,7 @@ async def get_candidate_job_matches(
         )
 
     # Construire le profil candidat pour le prompt
-    candidate_profile = f"""Nom: {current_user.first_name} {current_user.last_name}
+    candidate_profile = f"""Nom: {candidate.user.first_name} {candidate.user.last_name}
 Titre recherché: {candidate.title or 'Non renseigné'}
 Résumé: {candidate.summary or 'Non renseigné'}
 Années d'expérience: {candidate.years_experience or 0}
@@ -602,6 +680,7 @@ Ordonne les matches du score le plus élevé au plus faible. Maximum {min(limit,
     try:
         ai_service = get_ai_service()
         message = await ai_service.client.messages.create(
+            operation="job_matches",
             model=ai_service.model,
             max_tokens=1500,
             temperature=0.2,
@@ -646,16 +725,122 @@ Ordonne les matches du score le plus élevé au plus faible. Maximum {min(limit,
 
         return JobMatchesResponse(
             matches=matches,
-            total_jobs_analyzed=len(active_jobs),
+            total_jobs_analyzed=max(len(job_index), len(active_jobs)),
             generated_at=datetime.now(timezone.utc)
         )
 
     except Exception as e:
-        from app.logging_config import logger
         logger.error(f"Erreur matching IA candidat: {type(e).__name__}: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors du matching IA. Réessayez dans quelques instants.")
 
 
+async def _store_job_matches(
+    db: AsyncSession,
+    candidate_id: int,
+    profile_fingerprint: str,
+    jobs_fingerprint: str,
+    limit: int,
+    response: JobMatchesResponse,
+) -> None:
+    """Enregistre (upsert) le résultat du matching pour le candidat."""
+    result = await db.execute(
+        select(CandidateJobMatch).filter(CandidateJobMatch.candidate_id == candidate_id)
+    )
+    cached = result.scalar_one_or_none()
+    if cached is None:
+        cached = CandidateJobMatch(candidate_id=candidate_id)
+        db.add(cached)
+    cached.profile_fingerprint = profile_fingerprint
+    cached.jobs_fingerprint = jobs_fingerprint
+    cached.match_limit = limit
+    cached.result = response.model_dump(mode="json")
+    cached.generated_at = response.generated_at
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Calcul concurrent pour le même candidat : l'autre résultat est tout aussi valide
+        await db.rollback()
+
+
+async def _refresh_job_matches(candidate_id: int, limit: int) -> None:
+    """Recalcule le matching d'un candidat hors requête, dans sa propre session."""
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(_candidate_profile_query().filter(Candidate.id == candidate_id))
+            candidate = result.scalar_one_or_none()
+            if not candidate:
+                return
+            shortlist_ids = await _shortlist_job_ids(db, candidate, limit)
+            response = await _compute_job_matches(db, candidate, shortlist_ids, limit)
+            await _store_job_matches(
+                db, candidate.id, _profile_fingerprint(candidate),
+                job_index.fingerprint(shortlist_ids), limit, response,
+            )
+    except Exception as e:
+        logger.warning(f"Rafraîchissement matching candidat {candidate_id} échoué: {type(e).__name__}")
+
+
+def _schedule_job_matches_refresh(candidate_id: int, limit: int) -> None:
+    """Lance un rafraîchissement en arrière-plan (un seul à la fois par candidat)."""
+    if candidate_id in _job_matches_refresh_tasks:
+        return
+    task = asyncio.create_task(_refresh_job_matches(candidate_id, limit))
+    _job_matches_refresh_tasks[candidate_id] = task
+    task.add_done_callback(lambda _: _job_matches_refresh_tasks.pop(candidate_id, None))
+
+
+@router.get("/candidate/job-matches", response_model=JobMatchesResponse)
+async def get_candidate_job_matches(
+    limit: int = Query(5, ge=1, le=20),
+    current_user: User = Depends(require_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Retourne les offres d'emploi actives les mieux matchées pour le candidat connecté.
+    Les offres publiées sont pré-classées localement (BM25) ; Claude analyse et
+    explique uniquement le top-K.
+    Le résultat est mis en cache par candidat tant que le profil et les offres
+    présélectionnées ne changent pas.
+    Accessible uniquement aux candidats.
+    """
+    if current_user.role != UserRole.CANDIDATE:
+        raise HTTPException(status_code=403, detail="Accès réservé aux candidats")
+
+    # Charger le profil candidat complet
+    result = await db.execute(_candidate_profile_query().filter(Candidate.user_id == current_user.id))
+    candidate = result.scalar_one_or_none()
+    if not candidate:
+        raise HTTPException(status_code=404, detail="Profil candidat introuvable")
+
+    shortlist_ids = await _shortlist_job_ids(db, candidate, limit)
+    profile_fingerprint = _profile_fingerprint(candidate)
+    jobs_fingerprint = job_index.fingerprint(shortlist_ids)
+
+    # Servir le cache si le profil et les offres présélectionnées n'ont pas changé
+    cached_result = await db.execute(
+        select(CandidateJobMatch).filter(CandidateJobMatch.candidate_id == candidate.id)
+    )
+    cached = cached_result.scalar_one_or_none()
+    if (
+        cached
+        and cached.profile_fingerprint == profile_fingerprint
+        and cached.jobs_fingerprint == jobs_fingerprint
+        and cached.match_limit >= limit
+    ):
+        generated_at = cached.generated_at
+        if generated_at.tzinfo is None:
+            generated_at = generated_at.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) - generated_at > timedelta(seconds=JOB_MATCHES_CACHE_TTL_SECONDS):
+            _schedule_job_matches_refresh(candidate.id, cached.match_limit)
+        response = JobMatchesResponse(**cached.result)
+        response.matches = response.matches[:limit]
+        return response
+
+    response = await _compute_job_matches(db, candidate, shortlist_ids, limit)
+    await _store_job_matches(db, candidate.id, profile_fingerprint, jobs_fingerprint, limit, response)
+    return response
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Préparation entretien IA
 # ─────────────────────────────────────────────────────────────────────────────
@@ -784,6 +969,8 @@ Réponds UNIQUEMENT en JSON valide (sans markdown) :
     try:
         ai_service = get_ai_service()
         message = await ai_service.client.messages.create(
+            operation="interview_prep",
+            company_id=job.company_id,
             model=ai_service.model,
             max_tokens=2500,
             temperature=0.3,
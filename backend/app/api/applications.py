@@ -5,10 +5,15 @@ from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from app.database import get_db
-from app.models.base import JobApplication, Job, User, Employer, NotificationType, Candidate
+from app.models.base import (
+    JobApplication, Job, User, Employer, NotificationType, Candidate, ApplicationStatus, EmailTemplateType,
+)
 from app.auth import require_user
-from app.api.notifications import create_notification
-from app.services.email_service import email_service
+from app.api.notifications import publish_notifications, stage_notifications
+from app.services.application_stats import (
+    record_application_created, record_applications_removed, record_status_change,
+)
+from app.services.email_outbox import enqueue_default_template_email, enqueue_email, wake_email_outbox_worker
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime, timezone
 import logging
@@ -234,91 +239,62 @@ async def create_application(
     )
 
     db.add(application)
-    await db.commit()
-    await db.refresh(application)
-
-    # Incrémenter le compteur de candidatures du job
-    try:
-        job.applications_count = (job.applications_count or 0) + 1
-        await db.commit()
-    except Exception:
-        pass
+    await db.flush()
 
-    # Créer une notification pour l'employeur
-    try:
-        # Récupérer le job avec l'employeur
-        job_employer_result = await db.execute(
-            select(Job).options(selectinload(Job.employer)).filter(Job.id == application_data.job_id)
+    # Email de confirmation au candidat (si template configuré), mis en file
+    # dans la même transaction que la candidature
+    from app.models.base import Company
+    company_name = (await db.execute(
+        select(Company.name).where(Company.id == job.company_id)
+    )).scalar_one_or_none()
+    email_queued = False
+    if company_name:
+        variables = {
+            "candidate_name": f"{current_user.first_name} {current_user.last_name}",
+            "candidate_first_name": current_user.first_name,
+            "candidate_last_name": current_user.last_name,
+            "candidate_email": current_user.email,
+            "job_title": job.title,
+            "job_location": job.location or "Non spécifiée",
+            "company_name": company_name,
+            "application_date": datetime.now(timezone.utc).strftime("%d/%m/%Y"),
+            "application_status": "Candidature reçue"
+        }
+        email_queued = await enqueue_default_template_email(
+            db,
+            company_id=job.company_id,
+            template_type=EmailTemplateType.APPLICATION_RECEIVED,
+            to_email=current_user.email,
+            variables=variables,
+            dedup_key=f"application:{application.id}:received",
         )
-        job_with_employer = job_employer_result.scalar_one_or_none()
-        if job_with_employer and job_with_employer.employer:
-            await create_notification(
-                db=db,
-                user_id=job_with_employer.employer.user_id,
-                type=NotificationType.NEW_APPLICATION,
-                title="📝 Nouvelle candidature reçue",
-                message=f"{current_user.first_name} {current_user.last_name} a postulé pour le poste de {job.title}",
-                related_job_id=application_data.job_id,
-                related_application_id=application.id
-            )
-    except Exception as e:
-        print(f"Erreur lors de la création de la notification: {e}")
-        # Ne pas bloquer si la notification échoue
-    
-    # Envoyer un email de confirmation au candidat (si template configuré)
-    try:
-        from app.models.base import EmailTemplate, EmailTemplateType, Company
-        
-        # Récupérer le job avec la company
-        job_company_result = await db.execute(
-            select(Job).options(selectinload(Job.company)).filter(Job.id == application_data.job_id)
+
+    # Compteur de candidatures du job, rollup d'analytics et notification de
+    # l'employeur, dans la même transaction que la candidature
+    job.applications_count = (job.applications_count or 0) + 1
+    await record_application_created(db, application, job.employer_id, actor_user_id=current_user.id)
+
+    notifications = []
+    employer_user_id = (await db.execute(
+        select(Employer.user_id).filter(Employer.id == job.employer_id)
+    )).scalar_one_or_none()
+    if employer_user_id:
+        notifications = await stage_notifications(
+            db,
+            [employer_user_id],
+            type=NotificationType.NEW_APPLICATION,
+            title="📝 Nouvelle candidature reçue",
+            message=f"{current_user.first_name} {current_user.last_name} a postulé pour le poste de {job.title}",
+            related_job_id=application_data.job_id,
+            related_application_id=application.id
         )
-        job_with_company = job_company_result.scalar_one_or_none()
-        
-        if job_with_company and job_with_company.company:
-            # Récupérer le template par défaut "application_received"
-            template_result = await db.execute(
-                select(EmailTemplate).where(
-                    EmailTemplate.company_id == job_with_company.company_id,
-                    EmailTemplate.type == EmailTemplateType.APPLICATION_RECEIVED,
-                    EmailTemplate.is_default == True,
-                    EmailTemplate.is_active == True
-                )
-            )
-            template = template_result.scalar_one_or_none()
-            
-            if template:
-                # Préparer les variables pour le template
-                variables = {
-                    "candidate_name": f"{current_user.first_name} {current_user.last_name}",
-                    "candidate_first_name": current_user.first_name,
-                    "candidate_last_name": current_user.last_name,
-                    "candidate_email": current_user.email,
-                    "job_title": job.title,
-                    "job_location": job.location or "Non spécifiée",
-                    "company_name": job_with_company.company.name,
-                    "application_date": datetime.now(timezone.utc).strftime("%d/%m/%Y"),
-                    "application_status": "Candidature reçue"
-                }
-                
-                # Envoyer l'email
-                email_sent = await email_service.send_from_template(
-                    template_id=template.id,
-                    to_email=current_user.email,
-                    variables=variables,
-                    db=db
-                )
-                
-                if email_sent:
-                    logger.info(f"✅ Application confirmation email sent to {current_user.email}")
-                else:
-                    logger.warning(f"⚠️ Failed to send application confirmation email to {current_user.email}")
-            else:
-                logger.debug(f"No default 'application_received' template found for company {job_with_company.company_id}")
-    except Exception as e:
-        logger.error(f"❌ Error sending application confirmation email: {e}")
-        # Ne pas bloquer si l'envoi d'email échoue
 
+    await db.commit()
+    await db.refresh(application)
+    if email_queued:
+        wake_email_outbox_worker()
+    await publish_notifications(notifications)
+    
     # Récupérer avec les données du job et de la company
     from app.models.base import Company
     app_with_job_result = await db.execute(
@@ -506,6 +482,7 @@ async def withdraw_application(
     if job_obj and job_obj.applications_count and job_obj.applications_count > 0:
         job_obj.applications_count -= 1
 
+    await record_applications_removed(db, JobApplication.id == application.id)
     await db.delete(application)
     await db.commit()
 
@@ -652,6 +629,67 @@ async def get_employer_applications(
         total_pages=total_pages
     )
 
+# Statuts déclenchant un email au candidat (template par défaut de l'entreprise)
+STATUS_EMAIL_TEMPLATE_TYPES = {
+    ApplicationStatus.INTERVIEW: EmailTemplateType.INTERVIEW_INVITATION,
+    ApplicationStatus.ACCEPTED: EmailTemplateType.OFFER_LETTER,
+    ApplicationStatus.REJECTED: EmailTemplateType.APPLICATION_REJECTED,
+}
+
+# Titre de la notification in-app envoyée au candidat
+STATUS_NOTIFICATION_TITLES = {
+    ApplicationStatus.VIEWED: "👁️ Votre candidature a été vue",
+    ApplicationStatus.SHORTLISTED: "⭐ Vous avez été présélectionné(e)",
+    ApplicationStatus.INTERVIEW: "🎯 Vous êtes convoqué(e) en entretien",
+    ApplicationStatus.ACCEPTED: "🎉 Félicitations! Votre candidature a été acceptée",
+    ApplicationStatus.REJECTED: "❌ Votre candidature n'a pas été retenue",
+}
+
+
+async def _queue_status_change_email(
+    db: AsyncSession,
+    application: JobApplication,
+    new_status: ApplicationStatus,
+    recruiter: User,
+) -> bool:
+    """Met en file (sans commit) l'email de changement de statut, si un template par défaut existe."""
+    from app.models.base import Company
+
+    template_type = STATUS_EMAIL_TEMPLATE_TYPES.get(new_status)
+    if template_type is None:
+        return False
+
+    candidate_user = (await db.execute(
+        select(User).where(User.id == application.candidate.user_id)
+    )).scalar_one_or_none()
+    company_name = (await db.execute(
+        select(Company.name).where(Company.id == application.job.company_id)
+    )).scalar_one_or_none()
+    if candidate_user is None or company_name is None:
+        return False
+
+    variables = {
+        "candidate_name": f"{candidate_user.first_name} {candidate_user.last_name}",
+        "candidate_first_name": candidate_user.first_name,
+        "candidate_last_name": candidate_user.last_name,
+        "candidate_email": candidate_user.email,
+        "job_title": application.job.title,
+        "job_location": application.job.location or "Non spécifiée",
+        "company_name": company_name,
+        "application_status": new_status.value,
+        "application_date": application.applied_at.strftime("%d/%m/%Y") if application.applied_at else "",
+        "recruiter_name": recruiter.name or recruiter.email,
+        "recruiter_email": recruiter.email
+    }
+    return await enqueue_default_template_email(
+        db,
+        company_id=application.job.company_id,
+        template_type=template_type,
+        to_email=candidate_user.email,
+        variables=variables,
+    )
+
+
 @router.put("/employer/applications/{application_id}/status")
 async def update_application_status(
     application_id: int,
@@ -696,108 +734,31 @@ async def update_application_status(
         old_status = application.status
         new_status = ApplicationStatus(request.status)
         application.status = new_status
+
+        # Email et notification du candidat selon le nouveau statut, dans la
+        # même transaction que le changement de statut
+        email_queued = False
+        notifications = []
+        if old_status != new_status:
+            email_queued = await _queue_status_change_email(db, application, new_status, current_user)
+            await record_status_change(
+                db, application, employer.id, old_status, new_status, actor_user_id=current_user.id
+            )
+            notifications = await stage_notifications(
+                db,
+                [application.candidate.user_id],
+                type=NotificationType.STATUS_CHANGE,
+                title=STATUS_NOTIFICATION_TITLES.get(new_status, "📬 Mise à jour de votre candidature"),
+                message=f"Votre candidature pour le poste de {application.job.title} a été mise à jour: {new_status.value}",
+                related_job_id=application.job_id,
+                related_application_id=application.id
+            )
+
         await db.commit()
         await db.refresh(application)
-        
-        # Créer une notification pour le candidat si le statut a changé
-        if old_status != new_status:
-            try:
-                status_messages = {
-                    ApplicationStatus.VIEWED: "👁️ Votre candidature a été vue",
-                    ApplicationStatus.SHORTLISTED: "⭐ Vous avez été présélectionné(e)",
-                    ApplicationStatus.INTERVIEW: "🎯 Vous êtes convoqué(e) en entretien",
-                    ApplicationStatus.ACCEPTED: "🎉 Félicitations! Votre candidature a été acceptée",
-                    ApplicationStatus.REJECTED: "❌ Votre candidature n'a pas été retenue"
-                }
-                
-                title = status_messages.get(new_status, "📬 Mise à jour de votre candidature")
-                message = f"Votre candidature pour le poste de {application.job.title} a été mise à jour: {new_status.value}"
-
-                await create_notification(
-                    db=db,
-                    user_id=application.candidate.user_id,
-                    type=NotificationType.STATUS_CHANGE,
-                    title=title,
-                    message=message,
-                    related_job_id=application.job_id,
-                    related_application_id=application.id
-                )
-            except Exception as e:
-                print(f"Erreur lors de la création de la notification: {e}")
-                # Ne pas bloquer si la notification échoue
-            
-            # Envoyer un email selon le nouveau statut
-            try:
-                from app.models.base import EmailTemplate, EmailTemplateType, Company
-                
-                # Mapping des statuts vers les types de templates
-                status_to_template_type = {
-                    ApplicationStatus.INTERVIEW: EmailTemplateType.INTERVIEW_INVITATION,
-                    ApplicationStatus.ACCEPTED: EmailTemplateType.OFFER,
-                    ApplicationStatus.REJECTED: EmailTemplateType.REJECTION
-                }
-                
-                template_type = status_to_template_type.get(new_status)
-                
-                if template_type:
-                    # Récupérer le job avec la company
-                    job_company_result = await db.execute(
-                        select(Job).options(selectinload(Job.company)).filter(Job.id == application.job_id)
-                    )
-                    job_with_company = job_company_result.scalar_one_or_none()
-                    
-                    if job_with_company and job_with_company.company:
-                        # Récupérer le template par défaut pour ce type
-                        template_result = await db.execute(
-                            select(EmailTemplate).where(
-                                EmailTemplate.company_id == job_with_company.company_id,
-                                EmailTemplate.type == template_type,
-                                EmailTemplate.is_default == True,
-                                EmailTemplate.is_active == True
-                            )
-                        )
-                        template = template_result.scalar_one_or_none()
-                        
-                        if template:
-                            # Récupérer les infos du candidat
-                            candidate_user_result = await db.execute(
-                                select(User).filter(User.id == application.candidate.user_id)
-                            )
-                            candidate_user = candidate_user_result.scalar_one_or_none()
-                            
-                            if candidate_user:
-                                # Préparer les variables pour le template
-                                variables = {
-                                    "candidate_name": f"{candidate_user.first_name} {candidate_user.last_name}",
-                                    "candidate_first_name": candidate_user.first_name,
-                                    "candidate_last_name": candidate_user.last_name,
-                                    "candidate_email": candidate_user.email,
-                                    "job_title": application.job.title,
-                                    "job_location": application.job.location or "Non spécifiée",
-                                    "company_name": job_with_company.company.name,
-                                    "application_status": new_status.value,
-                                    "application_date": application.applied_at.strftime("%d/%m/%Y") if application.applied_at else "",
-                                    "recruiter_name": current_user.name or current_user.email,
-                                    "recruiter_email": current_user.email
-                                }
-                                
-                                # Envoyer l'email
-                                email_sent = await email_service.send_from_template(
-                                    template_id=template.id,
-                                    to_email=candidate_user.email,
-                                    variables=variables,
-                                    db=db
-                                )
-                                
-                                if email_sent:
-                                    logger.info(f"✅ Status change email ({template_type.value}) sent to {candidate_user.email}")
-                                else:
-                                    logger.warning(f"⚠️ Failed to send status change email to {candidate_user.email}")
-                        else:
-                            logger.debug(f"No default template of type '{template_type.value}' found for company {job_with_company.company_id}")
-            except Exception as e:
-                logger.error(f"❌ Error sending status change email: {e}")
-                # Ne pas bloquer si l'envoi d'email échoue
+        if email_queued:
+            wake_email_outbox_worker()
+        await publish_notifications(notifications)
         
         # ── Targetym : synchroniser le stage du Kanban (tous statuts) ────────
         try:
@@ -979,33 +940,8 @@ async def send_quick_message(
 
     old_status = application.status
     application.status = new_status
-    await db.commit()
-    await db.refresh(application)
 
-    # Notification in-app
-    if old_status != new_status:
-        try:
-            status_messages = {
-                ApplicationStatus.VIEWED: "👁️ Votre candidature a été vue",
-                ApplicationStatus.SHORTLISTED: "⭐ Vous avez été présélectionné(e)",
-                ApplicationStatus.INTERVIEW: "🎯 Vous êtes convoqué(e) en entretien",
-                ApplicationStatus.ACCEPTED: "🎉 Félicitations ! Votre candidature a été acceptée",
-                ApplicationStatus.REJECTED: "❌ Votre candidature n'a pas été retenue",
-            }
-            title = status_messages.get(new_status, "📬 Mise à jour de votre candidature")
-            await create_notification(
-                db=db,
-                user_id=application.candidate.user_id,
-                type=NotificationType.STATUS_CHANGE,
-                title=title,
-                message=f"Votre candidature pour le poste de {application.job.title} : {new_status.value}",
-                related_job_id=application.job_id,
-                related_application_id=application.id,
-            )
-        except Exception as e:
-            logger.warning(f"Notification échouée (non bloquant) : {e}")
-
-    # Envoi de l'email avec le message personnalisé
+    # Email avec le message personnalisé, mis en file dans la même transaction
     candidate_user_result = await db.execute(
         select(User).filter(User.id == application.candidate.user_id)
     )
@@ -1013,37 +949,44 @@ async def send_quick_message(
 
     email_sent = False
     if candidate_user:
-        try:
-            # Construire le HTML du message
-            html_body = f"""
-            <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto; padding: 24px;">
-              <p style="font-size: 16px; color: #1f2937;">{request.message.replace(chr(10), '<br>')}</p>
-              <hr style="border: none; border-top: 1px solid #e5e7eb; margin: 24px 0;">
-              <p style="font-size: 12px; color: #9ca3af;">
-                Cet email a été envoyé par {current_user.first_name} {current_user.last_name}
-                via la plateforme IntoWork.
-              </p>
-            </div>
-            """
-            from resend import Emails
-            import resend
-            import os
-            resend.api_key = os.getenv("RESEND_API_KEY", "")
-            from_email = os.getenv("FROM_EMAIL", "INTOWORK <noreply@intowork.co>")
-            params = {
-                "from": from_email,
-                "to": [candidate_user.email],
-                "subject": request.subject,
-                "html": html_body,
-            }
-            Emails.send(params)
-            email_sent = True
-            logger.info(f"✅ Quick message sent to {candidate_user.email} (status={new_status.value})")
-        except Exception as e:
-            logger.error(f"❌ Quick message email failed : {e}")
+        # Construire le HTML du message
+        html_body = f"""
+        <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto; padding: 24px;">
+          <p style="font-size: 16px; color: #1f2937;">{request.message.replace(chr(10), '<br>')}</p>
+          <hr style="border: none; border-top: 1px solid #e5e7eb; margin: 24px 0;">
+          <p style="font-size: 12px; color: #9ca3af;">
+            Cet email a été envoyé par {current_user.first_name} {current_user.last_name}
+            via la plateforme IntoWork.
+          </p>
+        </div>
+        """
+        email_sent = await enqueue_email(db, candidate_user.email, request.subject, html_body)
+
+    # Notification in-app
+    notifications = []
+    if old_status != new_status:
+        await record_status_change(
+            db, application, employer.id, old_status, new_status, actor_user_id=current_user.id
+        )
+        notifications = await stage_notifications(
+            db,
+            [application.candidate.user_id],
+            type=NotificationType.STATUS_CHANGE,
+            title=STATUS_NOTIFICATION_TITLES.get(new_status, "📬 Mise à jour de votre candidature"),
+            message=f"Votre candidature pour le poste de {application.job.title} : {new_status.value}",
+            related_job_id=application.job_id,
+            related_application_id=application.id,
+        )
+
+    await db.commit()
+    await db.refresh(application)
+    if email_sent:
+        wake_email_outbox_worker()
+        logger.info(f"✅ Quick message queued for {candidate_user.email} (status={new_status.value})")
+    await publish_notifications(notifications)
 
     return {
-        "message": "Statut mis à jour" + (" et email envoyé" if email_sent else " (email non envoyé)"),
+        "message": "Statut mis à jour" + (" et email programmé" if email_sent else " (email non envoyé)"),
         "application_id": application.id,
         "new_status": application.status.value,
         "email_sent": email_sent,
@@ -25,6 +25,7 @@ from app.auth import (
     PasswordHasher, Auth, CurrentUser, DBSession,
     REFRESH_TOKEN_EXPIRATION_DAYS
 )
+from app.services.application_stats import record_applications_removed
 from app.services.email_service import email_service
 from app.schemas import (
     SignUpRequest, SignInRequest, OAuthSignInRequest, AuthResponse, AuthUserData,
@@ -562,7 +563,8 @@ async def delete_account(
 
         # Si c'est un candidat, supprimer les candidatures d'abord
         if user.role == UserRole.CANDIDATE and candidate:
-            # Supprimer toutes les candidatures (ASYNC)
+            # Supprimer toutes les candidatures (ASYNC), rollup d'analytics compris
+            await record_applications_removed(db, JobApplication.candidate_id == candidate.id)
             await db.execute(
                 sql_delete(JobApplication).filter(
                     JobApplication.candidate_id == candidate.id
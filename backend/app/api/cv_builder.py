@@ -11,11 +11,28 @@ Inspired by 5minportfolio.dev - Full-featured CV builder with:
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, update, delete as sql_delete
+from sqlalchemy import select, func, update, exists, delete as sql_delete
 from sqlalchemy.orm import selectinload
-from app.database import get_db
-from app.models.base import User, CVDocument, CVAnalytics, CVTemplate
+from app.database import AsyncSessionLocal, get_db
+from app.models.base import User, CVDocument, CVAnalytics, CVAnalyticsDaily, CVTemplate
 from app.auth import require_user
+from app.services.cv_pdf import (
+    CVPDFRenderError,
+    cached_cv_pdf,
+    cv_content_hash,
+    cv_pdf_key,
+    discard_cv_pdf,
+    render_cv_pdf,
+    schedule_cv_pdf_prerender,
+)
+from app.services.cv_analytics import (
+    EVENT_VIEW,
+    pending_downloads,
+    pending_views,
+    record_cv_download,
+    record_cv_view,
+)
+from app.services.cv_renderer import render_cv_html
 from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta, timezone
@@ -24,14 +41,9 @@ import json
 import os
 import re
 import hashlib
-from pathlib import Path
 
 router = APIRouter()
 
-# Directory for generated PDFs
-PDF_DIR = Path(__file__).parent.parent.parent / "uploads" / "pdfs"
-PDF_DIR.mkdir(parents=True, exist_ok=True)
-
 
 # ==================== Pydantic Schemas ====================
 
@@ -184,6 +196,48 @@ def get_template_enum(template_str: str) -> CVTemplate:
         return CVTemplate.ELEGANCE
 
 
+def _record_view(cv: CVDocument, request: Request) -> None:
+    """Buffer a view of the CV (anonymized IP, truncated headers)"""
+    client_ip = request.client.host if request.client else None
+    user_agent = request.headers.get("user-agent", "")
+    referrer = request.headers.get("referer", "")
+    record_cv_view(
+        cv.id,
+        ip_address=anonymize_ip(client_ip) if client_ip else None,
+        user_agent=user_agent[:500] if user_agent else None,
+        referrer=referrer[:500] if referrer else None
+    )
+
+
+def prerender_pdf(cv_data_json: str, template: CVTemplate) -> None:
+    """Start rendering the PDF of freshly saved CV content in the background"""
+    cv_data = json.loads(cv_data_json)
+    schedule_cv_pdf_prerender(
+        cv_pdf_key(cv_data, template.value),
+        render_cv_html(cv_data, template.value)
+    )
+
+
+async def _content_in_use(db: AsyncSession, content_hash: str, template: CVTemplate) -> bool:
+    return await db.scalar(
+        select(exists().where(CVDocument.content_hash == content_hash, CVDocument.template == template))
+    )
+
+
+async def release_pdf(db: AsyncSession, cv_data_json: str, template: CVTemplate) -> None:
+    """Delete the PDF of abandoned CV content unless another CV still has identical content"""
+    content_hash = cv_content_hash(cv_data_json)
+    if await _content_in_use(db, content_hash, template):
+        return
+
+    async def still_used() -> bool:
+        # Re-checked once an in-flight render of this content has finished
+        async with AsyncSessionLocal() as session:
+            return await _content_in_use(session, content_hash, template)
+
+    discard_cv_pdf(cv_pdf_key(json.loads(cv_data_json), template.value), still_used)
+
+
 # ==================== API Endpoints ====================
 
 @router.post("/save", response_model=CVDocumentResponse)
@@ -207,8 +261,11 @@ async def save_cv(
         template_enum = get_template_enum(request.template)
 
         if existing_cv:
+            previous_content = (existing_cv.cv_data, existing_cv.template)
+
             # Update existing CV
             existing_cv.cv_data = cv_data_json
+            existing_cv.content_hash = cv_content_hash(cv_data_json)
             existing_cv.template = template_enum
             existing_cv.title = request.title
             existing_cv.is_public = request.is_public
@@ -232,6 +289,10 @@ async def save_cv(
             await db.commit()
             await db.refresh(existing_cv)
 
+            if previous_content != (cv_data_json, template_enum):
+                await release_pdf(db, *previous_content)
+            prerender_pdf(cv_data_json, template_enum)
+
             logger.info(f"Updated CV for user {user.id}")
 
             return CVDocumentResponse(
@@ -263,6 +324,7 @@ async def save_cv(
             new_cv = CVDocument(
                 user_id=user.id,
                 cv_data=cv_data_json,
+                content_hash=cv_content_hash(cv_data_json),
                 template=template_enum,
                 title=request.title or f"CV de {personal.firstName} {personal.lastName}",
                 slug=unique_slug,
@@ -273,6 +335,8 @@ async def save_cv(
             await db.commit()
             await db.refresh(new_cv)
 
+            prerender_pdf(cv_data_json, template_enum)
+
             logger.info(f"Created new CV for user {user.id} with slug {unique_slug}")
 
             return CVDocumentResponse(
@@ -398,24 +462,8 @@ async def get_public_cv(
                 detail="CV not found or not public"
             )
 
-        # Track the view
-        client_ip = request.client.host if request.client else None
-        user_agent = request.headers.get("user-agent", "")
-        referrer = request.headers.get("referer", "")
-
-        analytics = CVAnalytics(
-            cv_document_id=cv.id,
-            event_type="view",
-            ip_address=anonymize_ip(client_ip) if client_ip else None,
-            user_agent=user_agent[:500] if user_agent else None,
-            referrer=referrer[:500] if referrer else None
-        )
-        db.add(analytics)
-
-        # Increment view counter
-        cv.views_count += 1
-
-        await db.commit()
+        # Track the view (buffered, written by the analytics flusher)
+        _record_view(cv, request)
 
         cv_data = CVData.model_validate_json(cv.cv_data)
 
@@ -423,7 +471,7 @@ async def get_public_cv(
             slug=cv.slug,
             template=cv.template.value,
             cv_data=cv_data,
-            views_count=cv.views_count
+            views_count=cv.views_count + pending_views(cv.id)
         )
 
     except HTTPException:
@@ -443,7 +491,7 @@ async def generate_pdf(
 ):
     """
     Generate a PDF version of the user's CV.
-    Uses WeasyPrint to convert HTML to PDF.
+    Uses WeasyPrint (worker pool) to convert HTML to PDF, cached by content hash.
     """
     try:
         result = await db.execute(
@@ -457,64 +505,30 @@ async def generate_pdf(
                 detail="CV not found. Please save your CV first."
             )
 
-        # Check if we have a cached PDF (less than 24h old)
-        if cv.pdf_url and cv.pdf_generated_at:
-            cache_age = datetime.now(timezone.utc) - cv.pdf_generated_at.replace(tzinfo=timezone.utc)
-            pdf_path = PDF_DIR / f"{cv.slug}.pdf"
-            if cache_age < timedelta(hours=24) and pdf_path.exists():
-                logger.info(f"Returning cached PDF for {cv.slug}")
-                # Track download
-                analytics = CVAnalytics(
-                    cv_document_id=cv.id,
-                    event_type="download"
-                )
-                db.add(analytics)
-                cv.downloads_count += 1
-                await db.commit()
-
-                return FileResponse(
-                    path=str(pdf_path),
-                    filename=f"CV-{cv.slug}.pdf",
-                    media_type="application/pdf"
-                )
-
-        # Generate new PDF
+        # PDF adressé par contenu : servi depuis le disque s'il a déjà été rendu
+        # (en général par le pré-rendu lancé après la sauvegarde)
         cv_data = json.loads(cv.cv_data)
-        html_content = generate_cv_html(cv_data, cv.template.value)
-
-        # Create PDF file
-        pdf_filename = f"{cv.slug}.pdf"
-        pdf_path = PDF_DIR / pdf_filename
-
+        template = cv.template.value
+        key = cv_pdf_key(cv_data, template)
         try:
-            from weasyprint import HTML
-            HTML(string=html_content).write_pdf(str(pdf_path))
-        except ImportError:
-            # Fallback: save HTML and return error message
-            logger.warning("WeasyPrint not installed. Returning HTML instead.")
-            html_path = PDF_DIR / f"{cv.slug}.html"
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            pdf_path = cached_cv_pdf(key) or await render_cv_pdf(key, render_cv_html(cv_data, template))
+        except CVPDFRenderError as e:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="PDF generation not available. Please install weasyprint."
+                detail=str(e)
             )
 
         # Update cache info
-        cv.pdf_url = str(pdf_path)
-        cv.pdf_generated_at = datetime.now(timezone.utc)
+        if cv.pdf_url != str(pdf_path):
+            cv.pdf_url = str(pdf_path)
+            cv.pdf_generated_at = datetime.now(timezone.utc)
 
-        # Track download
-        analytics = CVAnalytics(
-            cv_document_id=cv.id,
-            event_type="download"
-        )
-        db.add(analytics)
-        cv.downloads_count += 1
+        # Track download (buffered, written by the analytics flusher)
+        record_cv_download(cv.id)
 
         await db.commit()
 
-        logger.info(f"Generated PDF for CV {cv.slug}")
+        logger.info(f"Served PDF for CV {cv.slug}")
 
         return FileResponse(
             path=str(pdf_path),
@@ -551,23 +565,9 @@ async def track_view(
                 detail="CV not found"
             )
 
-        client_ip = request.client.host if request.client else None
-        user_agent = request.headers.get("user-agent", "")
-        referrer = request.headers.get("referer", "")
-
-        analytics = CVAnalytics(
-            cv_document_id=cv.id,
-            event_type="view",
-            ip_address=anonymize_ip(client_ip) if client_ip else None,
-            user_agent=user_agent[:500] if user_agent else None,
-            referrer=referrer[:500] if referrer else None
-        )
-        db.add(analytics)
-        cv.views_count += 1
-
-        await db.commit()
+        _record_view(cv, request)
 
-        return {"status": "tracked", "views_count": cv.views_count}
+        return {"status": "tracked", "views_count": cv.views_count + pending_views(cv.id)}
 
     except HTTPException:
         raise
@@ -601,55 +601,56 @@ async def get_analytics(
             )
 
         # Get total counts
-        total_views = cv.views_count
-        total_downloads = cv.downloads_count
+        total_views = cv.views_count + pending_views(cv.id)
+        total_downloads = cv.downloads_count + pending_downloads(cv.id)
 
-        # Get views by date (last 30 days)
+        # Get views by date (last 30 days, from the daily rollup)
         thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
         result = await db.execute(
             select(
-                func.date(CVAnalytics.created_at).label('date'),
-                func.count().label('count')
+                CVAnalyticsDaily.day,
+                func.sum(CVAnalyticsDaily.count).label('count')
             )
             .where(
-                CVAnalytics.cv_document_id == cv.id,
-                CVAnalytics.event_type == "view",
-                CVAnalytics.created_at >= thirty_days_ago
+                CVAnalyticsDaily.cv_document_id == cv.id,
+                CVAnalyticsDaily.event_type == EVENT_VIEW,
+                CVAnalyticsDaily.day >= thirty_days_ago.date()
             )
-            .group_by(func.date(CVAnalytics.created_at))
-            .order_by(func.date(CVAnalytics.created_at))
+            .group_by(CVAnalyticsDaily.day)
+            .order_by(CVAnalyticsDaily.day)
         )
         views_by_date = [
-            {"date": str(row.date), "count": row.count}
+            {"date": row.day.isoformat(), "count": row.count}
             for row in result.fetchall()
         ]
 
-        # Get views by country
+        # Get views by country (from the daily rollup)
         result = await db.execute(
             select(
-                CVAnalytics.country,
-                func.count().label('count')
+                CVAnalyticsDaily.country,
+                func.sum(CVAnalyticsDaily.count).label('count')
             )
             .where(
-                CVAnalytics.cv_document_id == cv.id,
-                CVAnalytics.event_type == "view",
-                CVAnalytics.country.isnot(None)
+                CVAnalyticsDaily.cv_document_id == cv.id,
+                CVAnalyticsDaily.event_type == EVENT_VIEW,
+                CVAnalyticsDaily.country != ""
             )
-            .group_by(CVAnalytics.country)
-            .order_by(func.count().desc())
+            .group_by(CVAnalyticsDaily.country)
+            .order_by(func.sum(CVAnalyticsDaily.count).desc())
             .limit(10)
         )
         views_by_country = [
-            {"country": row.country or "Unknown", "count": row.count}
+            {"country": row.country, "count": row.count}
             for row in result.fetchall()
         ]
 
-        # Get recent views
+        # Get recent views (raw events, recent partitions only)
         result = await db.execute(
             select(CVAnalytics)
             .where(
                 CVAnalytics.cv_document_id == cv.id,
-                CVAnalytics.event_type == "view"
+                CVAnalytics.event_type == EVENT_VIEW,
+                CVAnalytics.created_at >= thirty_days_ago
             )
             .order_by(CVAnalytics.created_at.desc())
             .limit(10)
@@ -697,16 +698,15 @@ async def delete_cv(
                 detail="CV not found"
             )
 
-        # Delete PDF if exists
-        if cv.pdf_url:
-            pdf_path = Path(cv.pdf_url)
-            if pdf_path.exists():
-                pdf_path.unlink()
+        content = (cv.cv_data, cv.template)
 
         # Delete CV (cascade deletes analytics)
         await db.delete(cv)
         await db.commit()
 
+        # Delete PDF unless shared with another identical CV
+        await release_pdf(db, *content)
+
         logger.info(f"Deleted CV for user {user.id}")
 
         return {"status": "deleted", "message": "CV and all analytics deleted"}
@@ -755,323 +755,3 @@ async def toggle_public(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error toggling public status"
         )
-
-
-# ==================== HTML Template Generation ====================
-
-def generate_cv_html(cv_data: dict, template: str) -> str:
-    """Generate HTML for PDF rendering based on template"""
-
-    personal = cv_data.get('personalInfo', {})
-    experiences = cv_data.get('experiences', [])
-    educations = cv_data.get('educations', [])
-    skills = cv_data.get('skills', [])
-    languages = cv_data.get('languages', [])
-
-    # Template-specific colors
-    TEMPLATE_COLORS = {
-        'elegance': {'primary': '#6B9B5F', 'secondary': '#4A7A3F', 'bg': '#E8F0E5'},
-        'bold': {'primary': '#6B46C1', 'secondary': '#4A2E8F', 'bg': '#EDE9F7'},
-        'minimal': {'primary': '#1f2937', 'secondary': '#6b7280', 'bg': '#f9fafb'},
-        'creative': {'primary': '#F7C700', 'secondary': '#C49E00', 'bg': '#FFF9E0'},
-        'executive': {'primary': '#1e3a5f', 'secondary': '#0f172a', 'bg': '#f8fafc'}
-    }
-
-    colors = TEMPLATE_COLORS.get(template, TEMPLATE_COLORS['elegance'])
-
-    # Generate experiences HTML
-    exp_html = ""
-    for exp in experiences:
-        end_date = "Present" if exp.get('current') else exp.get('endDate', '')
-        exp_html += f"""
-        <div class="item">
-            <div class="item-header">
-                <div>
-                    <div class="item-title">{exp.get('position', '')}</div>
-                    <div class="item-subtitle">{exp.get('company', '')}</div>
-                </div>
-                <div class="item-date">{exp.get('startDate', '')} - {end_date}</div>
-            </div>
-            <div class="item-description">{exp.get('description', '')}</div>
-        </div>
-        """
-
-    # Generate educations HTML
-    edu_html = ""
-    for edu in educations:
-        edu_html += f"""
-        <div class="item">
-            <div class="item-header">
-                <div>
-                    <div class="item-title">{edu.get('degree', '')} - {edu.get('field', '')}</div>
-                    <div class="item-subtitle">{edu.get('school', '')}</div>
-                </div>
-                <div class="item-date">{edu.get('startDate', '')} - {edu.get('endDate', '')}</div>
-            </div>
-            <div class="item-description">{edu.get('description', '')}</div>
-        </div>
-        """
-
-    # Generate skills HTML
-    skills_html = ""
-    for skill in skills:
-        level = skill.get('level', 50)
-        skills_html += f"""
-        <div class="skill">
-            <div class="skill-name">{skill.get('name', '')}</div>
-            <div class="skill-bar">
-                <div class="skill-level" style="width: {level}%"></div>
-            </div>
-        </div>
-        """
-
-    # Generate languages HTML
-    lang_html = ""
-    for lang in languages:
-        lang_html += f"""
-        <div class="language">
-            <span class="lang-name">{lang.get('name', '')}</span>
-            <span class="lang-level">{lang.get('level', '')}</span>
-        </div>
-        """
-
-    html = f"""
-<!DOCTYPE html>
-<html lang="fr">
-<head>
-    <meta charset="UTF-8">
-    <title>CV - {personal.get('firstName', '')} {personal.get('lastName', '')}</title>
-    <style>
-        @page {{
-            size: A4;
-            margin: 0;
-        }}
-
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-
-        body {{
-            font-family: 'Helvetica Neue', Arial, sans-serif;
-            font-size: 11pt;
-            line-height: 1.4;
-            color: #333;
-            background: white;
-        }}
-
-        .cv-container {{
-            width: 210mm;
-            min-height: 297mm;
-            padding: 15mm;
-        }}
-
-        .header {{
-            background: {colors['primary']};
-            color: white;
-            padding: 20px 25px;
-            margin: -15mm -15mm 20px -15mm;
-            display: flex;
-            align-items: center;
-            gap: 20px;
-        }}
-
-        .photo {{
-            width: 80px;
-            height: 80px;
-            border-radius: 50%;
-            border: 3px solid white;
-            object-fit: cover;
-        }}
-
-        .header-info h1 {{
-            font-size: 24pt;
-            font-weight: 700;
-            margin-bottom: 5px;
-        }}
-
-        .header-info .title {{
-            font-size: 14pt;
-            opacity: 0.9;
-        }}
-
-        .contact {{
-            display: flex;
-            flex-wrap: wrap;
-            gap: 15px;
-            margin-bottom: 20px;
-            padding: 10px 0;
-            border-bottom: 2px solid {colors['bg']};
-        }}
-
-        .contact-item {{
-            font-size: 10pt;
-            color: #666;
-        }}
-
-        .summary {{
-            background: {colors['bg']};
-            padding: 15px;
-            border-radius: 8px;
-            margin-bottom: 20px;
-            border-left: 4px solid {colors['primary']};
-        }}
-
-        .section {{
-            margin-bottom: 20px;
-        }}
-
-        .section-title {{
-            color: {colors['primary']};
-            font-size: 14pt;
-            font-weight: 700;
-            padding-bottom: 8px;
-            border-bottom: 2px solid {colors['primary']};
-            margin-bottom: 15px;
-        }}
-
-        .item {{
-            margin-bottom: 15px;
-            padding-bottom: 15px;
-            border-bottom: 1px solid #eee;
-        }}
-
-        .item:last-child {{
-            border-bottom: none;
-        }}
-
-        .item-header {{
-            display: flex;
-            justify-content: space-between;
-            align-items: flex-start;
-            margin-bottom: 8px;
-        }}
-
-        .item-title {{
-            font-weight: 600;
-            font-size: 12pt;
-            color: {colors['secondary']};
-        }}
-
-        .item-subtitle {{
-            color: #666;
-            font-size: 10pt;
-        }}
-
-        .item-date {{
-            color: {colors['primary']};
-            font-size: 10pt;
-            font-weight: 500;
-        }}
-
-        .item-description {{
-            font-size: 10pt;
-            color: #555;
-        }}
-
-        .two-columns {{
-            display: flex;
-            gap: 30px;
-        }}
-
-        .column {{
-            flex: 1;
-        }}
-
-        .skill {{
-            margin-bottom: 10px;
-        }}
-
-        .skill-name {{
-            font-size: 10pt;
-            margin-bottom: 4px;
-        }}
-
-        .skill-bar {{
-            height: 8px;
-            background: {colors['bg']};
-            border-radius: 4px;
-            overflow: hidden;
-        }}
-
-        .skill-level {{
-            height: 100%;
-            background: {colors['primary']};
-            border-radius: 4px;
-        }}
-
-        .language {{
-            display: flex;
-            justify-content: space-between;
-            padding: 8px 0;
-            border-bottom: 1px solid #eee;
-        }}
-
-        .lang-name {{
-            font-weight: 500;
-        }}
-
-        .lang-level {{
-            color: {colors['primary']};
-            font-weight: 600;
-        }}
-    </style>
-</head>
-<body>
-    <div class="cv-container">
-        <div class="header">
-            {f'<img src="{personal.get("photo")}" class="photo" />' if personal.get('photo') else ''}
-            <div class="header-info">
-                <h1>{personal.get('firstName', '')} {personal.get('lastName', '')}</h1>
-                <div class="title">{personal.get('title', '')}</div>
-            </div>
-        </div>
-
-        <div class="contact">
-            {f'<div class="contact-item">{personal.get("email")}</div>' if personal.get('email') else ''}
-            {f'<div class="contact-item">{personal.get("phone")}</div>' if personal.get('phone') else ''}
-            {f'<div class="contact-item">{personal.get("address")}</div>' if personal.get('address') else ''}
-        </div>
-
-        {f'<div class="summary">{personal.get("summary")}</div>' if personal.get('summary') else ''}
-
-        {f'''
-        <div class="section">
-            <div class="section-title">Experience Professionnelle</div>
-            {exp_html}
-        </div>
-        ''' if experiences else ''}
-
-        {f'''
-        <div class="section">
-            <div class="section-title">Formation</div>
-            {edu_html}
-        </div>
-        ''' if educations else ''}
-
-        <div class="two-columns">
-            {f'''
-            <div class="column">
-                <div class="section">
-                    <div class="section-title">Competences</div>
-                    {skills_html}
-                </div>
-            </div>
-            ''' if skills else ''}
-
-            {f'''
-            <div class="column">
-                <div class="section">
-                    <div class="section-title">Langues</div>
-                    {lang_html}
-                </div>
-            </div>
-            ''' if languages else ''}
-        </div>
-    </div>
-</body>
-</html>
-"""
-
-    return html
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
-from app.database import get_db
+from app.database import gather_reads, get_db
 from app.models.base import (
     User, Candidate, Experience, Education, Skill,
-    Employer, Job, JobApplication, ApplicationStatus, JobStatus, UserRole
+    Employer, Job, JobApplication, ApplicationStatus, JobStatus, UserRole, ApplicationDailyStat
 )
 from app.auth import require_user
+from app.services.application_stats import (
+    METRIC_INTERVIEW, METRIC_STATUS, employer_summary_query, get_stage_durations, get_status_timeline,
+    response_rate,
+)
 from app.services.employer_service import get_or_create_employer
+from app.services.platform_stats import APPLICATIONS, JOBS_BY_STATUS, USERS_BY_ROLE, get_platform_stats
 from pydantic import BaseModel
 from typing import List, Optional
 import logging
@@ -50,18 +54,11 @@ async def get_dashboard_data(
             # Les admins doivent utiliser /api/admin/* endpoints
             # Retourner un dashboard minimal pour éviter l'erreur
 
-            # Totaux plateforme en 1 seule requête (sous-requêtes scalaires)
-            result = await db.execute(
-                select(
-                    select(func.count()).select_from(User).scalar_subquery().label("users"),
-                    select(func.count()).select_from(Job).scalar_subquery().label("jobs"),
-                    select(func.count()).select_from(JobApplication).scalar_subquery().label("applications"),
-                )
-            )
-            totals = result.one()
-            users_count = totals.users
-            jobs_count = totals.jobs
-            applications_count = totals.applications
+            # Totaux plateforme (rollup platform_stats)
+            platform_stats = await get_platform_stats(db)
+            users_count = platform_stats.total(USERS_BY_ROLE)
+            jobs_count = platform_stats.total(JOBS_BY_STATUS)
+            applications_count = platform_stats.get(APPLICATIONS)
 
             return {
                 "stats": [
@@ -169,28 +166,42 @@ async def get_dashboard_data(
                     "profileCompletion": 30  # 30% car profil créé mais pas d'entreprise
                 }
 
-            # Offres actives + candidatures + entretiens + taux de réponse en 1 seule requête
-            result = await db.execute(
-                select(
-                    func.count().label("total"),
-                    func.count().filter(JobApplication.status == ApplicationStatus.INTERVIEW).label("interviews"),
-                    func.count().filter(JobApplication.status.in_([
-                        ApplicationStatus.REJECTED, ApplicationStatus.ACCEPTED,
-                        ApplicationStatus.INTERVIEW, ApplicationStatus.SHORTLISTED,
-                        ApplicationStatus.VIEWED
-                    ])).label("responded"),
-                    select(func.count()).select_from(Job).filter(
-                        Job.employer_id == employer.id, Job.status == JobStatus.PUBLISHED
-                    ).scalar_subquery().label("active_jobs"),
-                ).select_from(JobApplication).join(Job).filter(Job.employer_id == employer.id)
+            # Offres actives + candidatures + entretiens + taux de réponse en 1 seule
+            # requête sur le rollup quotidien (coût indépendant du volume de candidatures)
+            stats_stmt = employer_summary_query(employer.id)
+            # Dernière offre publiée, dernière candidature reçue, dernier entretien planifié
+            last_job_stmt = (
+                select(Job.title, Job.created_at)
+                .filter(Job.employer_id == employer.id)
+                .order_by(Job.created_at.desc()).limit(1)
+            )
+            last_application_stmt = (
+                select(Job.title, JobApplication.applied_at)
+                .join(Job, Job.id == JobApplication.job_id)
+                .filter(Job.employer_id == employer.id)
+                .order_by(JobApplication.applied_at.desc()).limit(1)
+            )
+            last_interview_stmt = (
+                select(Job.title, JobApplication.updated_at)
+                .join(Job, Job.id == JobApplication.job_id)
+                .filter(Job.employer_id == employer.id, JobApplication.status == ApplicationStatus.INTERVIEW)
+                .order_by(JobApplication.updated_at.desc()).limit(1)
+            )
+
+            # Requêtes indépendantes : exécutées en parallèle
+            row, last_job, last_application, last_interview = await gather_reads(
+                db,
+                lambda session: _one(session, stats_stmt),
+                lambda session: _first(session, last_job_stmt),
+                lambda session: _first(session, last_application_stmt),
+                lambda session: _first(session, last_interview_stmt),
             )
-            row = result.one()
             active_jobs_count = row.active_jobs or 0
             applications_count = row.total or 0
             interviews_count = row.interviews or 0
             responded_applications = row.responded or 0
             total_applications = applications_count
-            response_rate = f"{round((responded_applications / total_applications) * 100) if total_applications else 0}%"
+            response_rate_label = f"{response_rate(total_applications, responded_applications)}%"
 
             # Statistiques pour employeur
             stats = [
@@ -217,19 +228,15 @@ async def get_dashboard_data(
                 },
                 {
                     "title": "Taux de réponse",
-                    "value": response_rate,
-                    "change": response_rate,
+                    "value": response_rate_label,
+                    "change": response_rate_label,
                     "changeType": "increase" if responded_applications > 0 else "neutral",
                     "color": "orange"
                 }
             ]
 
-            # Activités récentes (exemples)
+            # Activités récentes
             recent_activities = []
-            # Dernière offre publiée
-            stmt = select(Job).filter(Job.employer_id == employer.id).order_by(Job.created_at.desc()).limit(1)
-            result = await db.execute(stmt)
-            last_job = result.scalar_one_or_none()
             if last_job:
                 recent_activities.append({
                     "id": 1,
@@ -238,27 +245,19 @@ async def get_dashboard_data(
                     "time": _format_time_ago(last_job.created_at),
                     "type": "job_post"
                 })
-            # Dernière candidature reçue
-            stmt = select(JobApplication).join(Job).filter(Job.employer_id == employer.id).order_by(JobApplication.applied_at.desc()).limit(1).options(selectinload(JobApplication.job))
-            result = await db.execute(stmt)
-            last_application = result.scalar_one_or_none()
             if last_application:
                 recent_activities.append({
                     "id": 2,
                     "action": "Nouvelle candidature reçue",
-                    "target": last_application.job.title,
+                    "target": last_application.title,
                     "time": _format_time_ago(last_application.applied_at),
                     "type": "application"
                 })
-            # Dernier entretien planifié
-            stmt = select(JobApplication).join(Job).filter(Job.employer_id == employer.id, JobApplication.status == ApplicationStatus.INTERVIEW).order_by(JobApplication.updated_at.desc()).limit(1).options(selectinload(JobApplication.job))
-            result = await db.execute(stmt)
-            last_interview = result.scalar_one_or_none()
             if last_interview:
                 recent_activities.append({
                     "id": 3,
                     "action": "Entretien planifié",
-                    "target": last_interview.job.title,
+                    "target": last_interview.title,
                     "time": _format_time_ago(last_interview.updated_at),
                     "type": "interview"
                 })
@@ -279,66 +278,42 @@ async def get_dashboard_data(
         
         # Logique pour CANDIDATE
         else:
-            # Récupérer le candidat lié à l'utilisateur avec relations
-            stmt = select(Candidate).filter(Candidate.user_id == current_user.id).options(
-                selectinload(Candidate.experiences),
-                selectinload(Candidate.educations),
-                selectinload(Candidate.skills)
+            # Profil, compteurs et dernière candidature : requêtes indépendantes
+            # (toutes indexées par user_id), exécutées en parallèle
+            candidate_id = select(Candidate.id).filter(Candidate.user_id == current_user.id).scalar_subquery()
+            counts_stmt = select(
+                select(func.count()).select_from(JobApplication)
+                    .filter(JobApplication.candidate_id == candidate_id)
+                    .scalar_subquery().label("applications"),
+                select(func.count()).select_from(Job)
+                    .filter(Job.status == JobStatus.PUBLISHED)
+                    .scalar_subquery().label("available_jobs"),
+                select(func.count()).select_from(JobApplication)
+                    .filter(
+                        JobApplication.candidate_id == candidate_id,
+                        JobApplication.status == ApplicationStatus.INTERVIEW,
+                    )
+                    .scalar_subquery().label("interviews"),
+            )
+            last_application_stmt = (
+                select(Job.title, JobApplication.applied_at)
+                .join(Job, Job.id == JobApplication.job_id)
+                .filter(JobApplication.candidate_id == candidate_id)
+                .order_by(JobApplication.applied_at.desc()).limit(1)
             )
-            result = await db.execute(stmt)
-            candidate = result.scalar_one_or_none()
-            if not candidate:
+            profile, counts, last_application = await gather_reads(
+                db,
+                lambda session: _candidate_profile(session, current_user.id),
+                lambda session: _one(session, counts_stmt),
+                lambda session: _first(session, last_application_stmt),
+            )
+            if not profile:
                 raise HTTPException(status_code=404, detail="Candidat non trouvé")
 
-            # Candidatures envoyées + offres disponibles + entretiens en 1 seule requête
-            result = await db.execute(
-                select(
-                    select(func.count()).select_from(JobApplication)
-                        .filter(JobApplication.candidate_id == candidate.id)
-                        .scalar_subquery().label("applications"),
-                    select(func.count()).select_from(Job)
-                        .filter(Job.status == JobStatus.PUBLISHED)
-                        .scalar_subquery().label("available_jobs"),
-                    select(func.count()).select_from(JobApplication)
-                        .filter(
-                            JobApplication.candidate_id == candidate.id,
-                            JobApplication.status == ApplicationStatus.INTERVIEW,
-                        )
-                        .scalar_subquery().label("interviews"),
-                )
-            )
-            counts = result.one()
             applications_count = counts.applications or 0
             available_jobs_count = counts.available_jobs or 0
             interviews_count = counts.interviews or 0
-
-            # Calcul du pourcentage de complétion du profil
-            fields = [
-                current_user.first_name,
-                current_user.last_name,
-                current_user.email,
-                candidate.phone,
-                candidate.location,
-                candidate.title,
-                candidate.summary
-            ]
-            filled_fields = len([field for field in fields if field and str(field).strip()])
-            profile_completion = (filled_fields / len(fields)) * 100
-            
-            # Ajouter les bonus pour expérience, éducation et compétences
-            has_experience = len(candidate.experiences) > 0 if candidate.experiences else False
-            has_education = len(candidate.educations) > 0 if candidate.educations else False
-            has_skills = len(candidate.skills) > 0 if candidate.skills else False
-            
-            total_completion = profile_completion * 0.6
-            if has_experience:
-                total_completion += 15
-            if has_education:
-                total_completion += 15
-            if has_skills:
-                total_completion += 10
-            
-            completion = round(total_completion)
+            completion = _profile_completion(current_user, profile)
 
             # Statistiques pour candidat
             stats = [
@@ -376,17 +351,11 @@ async def get_dashboard_data(
             recent_activities = []
 
             # Dernière candidature envoyée
-            stmt = select(JobApplication).filter(
-                JobApplication.candidate_id == candidate.id
-            ).order_by(JobApplication.applied_at.desc()).limit(1).options(selectinload(JobApplication.job))
-            result = await db.execute(stmt)
-            last_application = result.scalar_one_or_none()
-
             if last_application:
                 recent_activities.append({
                     "id": 1,
                     "action": "Candidature envoyée",
-                    "target": last_application.job.title,
+                    "target": last_application.title,
                     "time": _format_time_ago(last_application.applied_at),
                     "type": "application"
                 })
@@ -424,6 +393,54 @@ async def get_dashboard_data(
             detail=f"Erreur lors de la récupération des données du dashboard: {str(e)}"
         )
 
+async def _one(session: AsyncSession, stmt):
+    return (await session.execute(stmt)).one()
+
+
+async def _first(session: AsyncSession, stmt):
+    return (await session.execute(stmt)).first()
+
+
+async def _candidate_profile(db: AsyncSession, user_id: int):
+    """
+    Champs du profil candidat utiles à la complétion, avec présence
+    d'expériences / formations / compétences (EXISTS), en une requête
+    """
+    stmt = select(
+        Candidate.phone, Candidate.location, Candidate.title, Candidate.summary,
+        select(Experience.id).filter(Experience.candidate_id == Candidate.id).exists().label("has_experience"),
+        select(Education.id).filter(Education.candidate_id == Candidate.id).exists().label("has_education"),
+        select(Skill.id).filter(Skill.candidate_id == Candidate.id).exists().label("has_skills"),
+    ).filter(Candidate.user_id == user_id)
+    return (await db.execute(stmt)).first()
+
+
+def _profile_completion(user: User, profile) -> int:
+    """Pourcentage de complétion du profil (même logique que le frontend)"""
+    fields = [
+        user.first_name,
+        user.last_name,
+        user.email,
+        profile.phone,
+        profile.location,
+        profile.title,
+        profile.summary
+    ]
+    filled_fields = len([field for field in fields if field and str(field).strip()])
+    profile_completion = (filled_fields / len(fields)) * 100
+
+    # Bonus pour expérience, éducation et compétences
+    total_completion = profile_completion * 0.6
+    if profile.has_experience:
+        total_completion += 15
+    if profile.has_education:
+        total_completion += 15
+    if profile.has_skills:
+        total_completion += 10
+
+    return round(total_completion)
+
+
 def _format_time_ago(dt: datetime) -> str:
     """Formater une date en temps relatif"""
     now = datetime.now(timezone.utc)
@@ -454,13 +471,7 @@ async def get_recent_activities(
     """Récupérer les activités récentes de l'utilisateur"""
 
     try:
-        stmt = select(Candidate).filter(Candidate.user_id == current_user.id).options(
-            selectinload(Candidate.experiences),
-            selectinload(Candidate.educations),
-            selectinload(Candidate.skills)
-        )
-        result = await db.execute(stmt)
-        candidate = result.scalar_one_or_none()
+        profile = await _candidate_profile(db, current_user.id)
         
         activities = []
         
@@ -483,34 +494,8 @@ async def get_recent_activities(
         ))
         
         # Activité basée sur les données du profil
-        if candidate:
-            # Calcul du pourcentage de complétion (même logique que le frontend)
-            fields = [
-                current_user.first_name,
-                current_user.last_name,
-                current_user.email,
-                candidate.phone,
-                candidate.location,
-                candidate.title,
-                candidate.summary
-            ]
-            filled_fields = len([field for field in fields if field and str(field).strip()])
-            profile_completion = (filled_fields / len(fields)) * 100
-            
-            # Ajouter les bonus pour expérience, éducation et compétences
-            has_experience = len(candidate.experiences) > 0 if candidate.experiences else False
-            has_education = len(candidate.educations) > 0 if candidate.educations else False
-            has_skills = len(candidate.skills) > 0 if candidate.skills else False
-            
-            total_completion = profile_completion * 0.6
-            if has_experience:
-                total_completion += 15
-            if has_education:
-                total_completion += 15
-            if has_skills:
-                total_completion += 10
-            
-            completion = round(total_completion)
+        if profile:
+            completion = _profile_completion(current_user, profile)
             
             activities.append(RecentActivity(
                 id=3,
@@ -532,6 +517,9 @@ async def get_recent_activities(
 
 # ── Entonnoir recrutement employeur ──────────────────────────────────────────
 
+# Période couverte par les durées par étape
+FUNNEL_LOOKBACK_DAYS = 90
+
 @router.get("/dashboard/employer-funnel")
 async def get_employer_funnel(
     current_user: User = Depends(require_user),
@@ -557,6 +545,7 @@ async def get_employer_funnel(
             "by_job": [],
             "conversion_rate": 0,
             "avg_days_to_interview": None,
+            "stage_durations": [],
         }
 
     # ── Entonnoir global par statut ───────────────────────────────────────
@@ -575,13 +564,28 @@ async def get_employer_funnel(
         ApplicationStatus.ACCEPTED: "Accepté",
     }
 
-    counts_result = await db.execute(
-        select(JobApplication.status, func.count().label("cnt"))
-        .join(Job)
-        .where(Job.employer_id == employer.id)
-        .group_by(JobApplication.status)
+    # Un seul passage sur le rollup : comptes par statut et cumul des délais
+    # candidature → entretien
+    rollup_result = await db.execute(
+        select(
+            ApplicationDailyStat.metric,
+            ApplicationDailyStat.dimension,
+            func.sum(ApplicationDailyStat.count).label("cnt"),
+            func.sum(ApplicationDailyStat.total_seconds).label("seconds"),
+        )
+        .where(
+            ApplicationDailyStat.employer_id == employer.id,
+            ApplicationDailyStat.metric.in_([METRIC_STATUS, METRIC_INTERVIEW]),
+        )
+        .group_by(ApplicationDailyStat.metric, ApplicationDailyStat.dimension)
     )
-    counts_map = {row.status: row.cnt for row in counts_result.fetchall()}
+    counts_map = {}
+    interview_count, interview_seconds = 0, 0.0
+    for row in rollup_result.fetchall():
+        if row.metric == METRIC_STATUS:
+            counts_map[ApplicationStatus(row.dimension)] = row.cnt or 0
+        else:
+            interview_count, interview_seconds = row.cnt or 0, row.seconds or 0.0
 
     total_applied = sum(counts_map.values()) or 1
     funnel = []
@@ -595,12 +599,17 @@ async def get_employer_funnel(
         })
 
     # ── Top 5 offres par volume de candidatures ───────────────────────────
+    job_total = func.coalesce(func.sum(ApplicationDailyStat.count), 0)
     by_job_result = await db.execute(
-        select(Job.id, Job.title, func.count(JobApplication.id).label("total"))
-        .join(JobApplication, Job.id == JobApplication.job_id, isouter=True)
+        select(Job.id, Job.title, job_total.label("total"))
+        .join(
+            ApplicationDailyStat,
+            (ApplicationDailyStat.job_id == Job.id) & (ApplicationDailyStat.metric == METRIC_STATUS),
+            isouter=True,
+        )
         .where(Job.employer_id == employer.id)
         .group_by(Job.id, Job.title)
-        .order_by(func.count(JobApplication.id).desc())
+        .order_by(job_total.desc())
         .limit(5)
     )
     by_job = [
@@ -617,27 +626,60 @@ async def get_employer_funnel(
     conversion_rate = round(accepted / total_applied * 100, 1)
 
     # ── Temps moyen candidature → entretien ──────────────────────────────
-    avg_days_result = await db.execute(
-        select(
-            func.avg(
-                func.extract(
-                    "epoch",
-                    JobApplication.updated_at - JobApplication.applied_at
-                ) / 86400
-            )
-        )
-        .join(Job)
-        .where(
-            Job.employer_id == employer.id,
-            JobApplication.status == ApplicationStatus.INTERVIEW,
-        )
+    # Toutes les candidatures passées en entretien, même si elles ont évolué depuis
+    avg_days_to_interview = (
+        round(interview_seconds / interview_count / 86400, 1) if interview_count else None
     )
-    avg_days_raw = avg_days_result.scalar()
-    avg_days_to_interview = round(float(avg_days_raw), 1) if avg_days_raw else None
+
+    # ── Temps moyen passé dans chaque étape (journal des statuts) ─────────
+    since = datetime.now(timezone.utc) - timedelta(days=FUNNEL_LOOKBACK_DAYS)
+    durations = await get_stage_durations(db, employer.id, since)
+    stage_durations = [
+        {
+            "status": st.value,
+            "label": status_labels[st],
+            "avg_days": round(durations[st.value][0] / 86400, 1),
+            "count": durations[st.value][1],
+        }
+        for st in status_order
+        if st.value in durations
+    ]
 
     return {
         "funnel": funnel,
         "by_job": by_job,
         "conversion_rate": conversion_rate,
         "avg_days_to_interview": avg_days_to_interview,
+        "stage_durations": stage_durations,
+    }
+
+
+@router.get("/dashboard/employer-funnel/timeline")
+async def get_employer_funnel_timeline(
+    days: int = Query(30, ge=1, le=365),
+    current_user: User = Depends(require_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Entonnoir dans le temps : nombre de candidatures entrées dans chaque
+    statut, jour par jour, sur les `days` derniers jours
+    """
+    if current_user.role.value not in ("employer", "admin"):
+        raise HTTPException(status_code=403, detail="Accès réservé aux employeurs")
+
+    employer_result = await db.execute(
+        select(Employer).where(Employer.user_id == current_user.id)
+    )
+    employer = employer_result.scalar_one_or_none()
+    if not employer or not employer.company_id:
+        return {"days": days, "timeline": []}
+
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    timeline = {}
+    for day, stage, count in await get_status_timeline(db, employer.id, since):
+        timeline.setdefault(day.isoformat(), {})[stage] = count
+
+    return {
+        "days": days,
+        "timeline": [{"date": day, "counts": counts} for day, counts in timeline.items()],
     }
@@ -0,0 +1,256 @@
+"""
+API Routes for Email Campaigns (ATS Phase 2)
+Envoi groupé d'un template email à tous les candidats d'une offre ayant un
+statut donné (ex: tous les rejetés, tous les présélectionnés)
+"""
+
+from datetime import datetime, timezone
+from typing import Annotated, List, Optional
+
+from app.api.email_templates import get_employer_profile
+from app.auth import require_employer
+from app.database import get_db
+from app.models.base import (
+    ApplicationStatus,
+    Candidate,
+    Company,
+    EmailCampaign,
+    EmailCampaignStatus,
+    EmailTemplate,
+    Employer,
+    Job,
+    JobApplication,
+    User,
+)
+from app.services.email_outbox import enqueue_many, wake_email_outbox_worker
+from app.services.template_renderer import template_cache
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel, Field
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+router = APIRouter(prefix="/email-campaigns", tags=["email-campaigns"])
+
+
+# ========================================
+# Pydantic Schemas
+# ========================================
+
+
+class EmailCampaignCreate(BaseModel):
+    """Création d'une campagne d'emails groupés"""
+
+    job_id: int = Field(..., description="Offre dont les candidats sont ciblés")
+    template_id: int = Field(..., description="Template email à envoyer")
+    application_status: ApplicationStatus = Field(
+        ..., description="Statut des candidatures ciblées"
+    )
+
+
+class EmailCampaignResponse(BaseModel):
+    """Campagne et progression de l'envoi"""
+
+    id: int
+    job_id: int
+    template_id: Optional[int]
+    application_status: str
+    status: EmailCampaignStatus
+    total_recipients: int
+    sent_count: int
+    failed_count: int
+    pending_count: int
+    created_at: Optional[datetime]
+    completed_at: Optional[datetime]
+
+
+def _campaign_response(campaign: EmailCampaign) -> EmailCampaignResponse:
+    return EmailCampaignResponse(
+        id=campaign.id,
+        job_id=campaign.job_id,
+        template_id=campaign.template_id,
+        application_status=campaign.application_status,
+        status=campaign.status,
+        total_recipients=campaign.total_recipients,
+        sent_count=campaign.sent_count,
+        failed_count=campaign.failed_count,
+        pending_count=max(
+            campaign.total_recipients - campaign.sent_count - campaign.failed_count, 0
+        ),
+        created_at=campaign.created_at,
+        completed_at=campaign.completed_at,
+    )
+
+
+# ========================================
+# API Routes
+# ========================================
+
+
+@router.post(
+    "", response_model=EmailCampaignResponse, status_code=status.HTTP_201_CREATED
+)
+async def create_email_campaign(
+    campaign_data: EmailCampaignCreate,
+    employer: Annotated[Employer, Depends(get_employer_profile)],
+    current_user: Annotated[User, Depends(require_employer)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """
+    Envoyer un template à tous les candidats d'une offre ayant le statut donné
+
+    Les destinataires sont résolus en une requête, les emails rendus via le
+    cache de templates compilés puis mis en file dans l'outbox en un INSERT
+    multi-lignes ; le worker de l'outbox les envoie ensuite par lots.
+    """
+    job = (
+        await db.execute(
+            select(Job).where(
+                Job.id == campaign_data.job_id, Job.company_id == employer.company_id
+            )
+        )
+    ).scalar_one_or_none()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+
+    template = (
+        await db.execute(
+            select(EmailTemplate).where(
+                EmailTemplate.id == campaign_data.template_id,
+                EmailTemplate.company_id == employer.company_id,
+                EmailTemplate.is_active == True,
+            )
+        )
+    ).scalar_one_or_none()
+    if not template:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Template not found"
+        )
+
+    company_name = (
+        await db.execute(select(Company.name).where(Company.id == employer.company_id))
+    ).scalar_one_or_none() or ""
+
+    # Destinataires : une seule requête
+    recipients = (
+        await db.execute(
+            select(
+                JobApplication.id,
+                JobApplication.applied_at,
+                User.email,
+                User.first_name,
+                User.last_name,
+            )
+            .join(Candidate, Candidate.id == JobApplication.candidate_id)
+            .join(User, User.id == Candidate.user_id)
+            .where(
+                JobApplication.job_id == job.id,
+                JobApplication.status == campaign_data.application_status,
+            )
+            .order_by(JobApplication.id)
+        )
+    ).all()
+    if not recipients:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No applications with this status for this job",
+        )
+
+    campaign = EmailCampaign(
+        company_id=employer.company_id,
+        job_id=job.id,
+        template_id=template.id,
+        created_by_user_id=current_user.id,
+        application_status=campaign_data.application_status.value,
+        status=EmailCampaignStatus.SENDING,
+        total_recipients=len(recipients),
+        sent_count=0,
+        failed_count=0,
+    )
+    db.add(campaign)
+    await db.flush()
+
+    compiled = template_cache.get(template)
+    common = {
+        "job_title": job.title,
+        "job_location": job.location or "Non spécifiée",
+        "company_name": company_name,
+        "application_status": campaign_data.application_status.value,
+        "recruiter_name": current_user.name or current_user.email,
+        "recruiter_email": current_user.email,
+    }
+    emails = []
+    for recipient in recipients:
+        subject, html = compiled.render(
+            {
+                **common,
+                "candidate_name": f"{recipient.first_name} {recipient.last_name}",
+                "candidate_first_name": recipient.first_name,
+                "candidate_last_name": recipient.last_name,
+                "candidate_email": recipient.email,
+                "application_date": recipient.applied_at.strftime("%d/%m/%Y")
+                if recipient.applied_at
+                else "",
+            }
+        )
+        emails.append(
+            {
+                "to_email": recipient.email,
+                "subject": subject,
+                "html": html,
+                "template_id": template.id,
+                "dedup_key": f"campaign:{campaign.id}:application:{recipient.id}",
+            }
+        )
+    await enqueue_many(db, emails, campaign_id=campaign.id)
+
+    await db.execute(
+        update(EmailTemplate)
+        .where(EmailTemplate.id == template.id)
+        .values(
+            usage_count=EmailTemplate.usage_count + len(emails),
+            last_used_at=datetime.now(timezone.utc),
+        )
+    )
+    await db.commit()
+    await db.refresh(campaign)
+    wake_email_outbox_worker()
+
+    return _campaign_response(campaign)
+
+
+@router.get("", response_model=List[EmailCampaignResponse])
+async def list_email_campaigns(
+    employer: Annotated[Employer, Depends(get_employer_profile)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    job_id: Optional[int] = Query(None, description="Filtrer par offre"),
+):
+    """Lister les campagnes de l'entreprise (plus récentes en premier)"""
+    query = select(EmailCampaign).where(EmailCampaign.company_id == employer.company_id)
+    if job_id is not None:
+        query = query.where(EmailCampaign.job_id == job_id)
+    result = await db.execute(query.order_by(EmailCampaign.id.desc()))
+    return [_campaign_response(campaign) for campaign in result.scalars().all()]
+
+
+@router.get("/{campaign_id}", response_model=EmailCampaignResponse)
+async def get_email_campaign(
+    campaign_id: int,
+    employer: Annotated[Employer, Depends(get_employer_profile)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Progression d'une campagne (envoyés, échecs, en attente)"""
+    campaign = (
+        await db.execute(
+            select(EmailCampaign).where(
+                EmailCampaign.id == campaign_id,
+                EmailCampaign.company_id == employer.company_id,
+            )
+        )
+    ).scalar_one_or_none()
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Campaign not found"
+        )
+    return _campaign_response(campaign)
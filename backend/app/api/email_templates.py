@@ -13,6 +13,7 @@ from datetime import datetime
 from app.database import get_db
 from app.auth import require_employer, require_employer_or_admin
 from app.models.base import EmailTemplate, EmailTemplateType, User, Employer
+from app.services.template_renderer import template_cache
 
 router = APIRouter(prefix="/email-templates", tags=["email-templates"])
 
@@ -508,6 +509,7 @@ async def update_email_template(
         setattr(template, field, value)
     
     await db.commit()
+    template_cache.invalidate(template_id)
     await db.refresh(template)
     
     return template
@@ -538,6 +540,7 @@ async def delete_email_template(
     # Supprimer définitivement le template
     await db.delete(template)
     await db.commit()
+    template_cache.invalidate(template_id)
 
     return None
 
@@ -27,6 +27,8 @@ from app.models.base import IntegrationCredential, IntegrationProvider, Employer
 from app.services.linkedin_service import linkedin_service
 from app.services.google_calendar_service import google_calendar_service
 from app.services.outlook_calendar_service import outlook_calendar_service
+from app.services.job_alert_dispatcher import schedule_instant_job_alerts
+from app.services.job_alert_index import IndexedJob
 
 router = APIRouter(prefix="/integrations", tags=["integrations"])
 
@@ -1315,7 +1317,9 @@ async def webhook_sync_job(
         location_type = "on_site"
 
     if existing_job:
-        # Mise à jour
+        # Mise à jour ; une offre déjà publiée n'est renvoyée qu'aux alertes
+        # que sa version précédente ne satisfaisait pas
+        previous = IndexedJob.from_row(existing_job) if existing_job.status == JobStatus.PUBLISHED else None
         existing_job.title = job_data.get("title", existing_job.title)
         existing_job.description = job_data.get("description", existing_job.description)
         existing_job.location = job_data.get("location", existing_job.location)
@@ -1326,6 +1330,7 @@ async def webhook_sync_job(
         existing_job.currency = job_data.get("currency", "XOF")
         existing_job.status = JobStatus.PUBLISHED
         await db.commit()
+        schedule_instant_job_alerts(existing_job.id, previous=previous)
         logger.info(f"✅ Job Targetym #{targetym_job_id} mis à jour dans IntoWork (job_id={existing_job.id})")
         return {"synced": True, "job_id": existing_job.id, "action": "updated"}
     else:
@@ -1347,5 +1352,6 @@ async def webhook_sync_job(
         db.add(new_job)
         await db.commit()
         await db.refresh(new_job)
+        schedule_instant_job_alerts(new_job.id)
         logger.info(f"✅ Job Targetym #{targetym_job_id} créé dans IntoWork (job_id={new_job.id})")
         return {"synced": True, "job_id": new_job.id, "action": "created"}
@@ -5,14 +5,18 @@ Permet aux candidats de créer des alertes personnalisées pour recevoir des not
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete as sql_delete, func, and_, or_
+from sqlalchemy import select, update, delete as sql_delete, func, and_, or_, text, false
 from typing import Annotated, List, Optional
 from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
 from app.database import get_db
 from app.auth import require_candidate
-from app.models.base import JobAlert, JobAlertFrequency, Candidate, Job, JobType, JobLocation
+from app.models.base import JobAlert, JobAlertFrequency, Candidate, Job, JobStatus, JobType, JobLocation
+from app.services.job_alert_index import (
+    JOB_SEARCH_VECTOR_SQL, SEARCH_SYMBOL_WORDS, compile_keywords_tsquery, job_alert_index, keyword_groups,
+    keywords_match_nothing,
+)
 
 router = APIRouter(prefix="/job-alerts", tags=["job-alerts"])
 
@@ -74,30 +78,69 @@ class MatchingJobsResponse(BaseModel):
 # Helpers
 # ========================================
 
+def _keyword_filter(criteria: dict, dialect: str):
+    """
+    Filtre mots-clés : une seule tsquery sur le vecteur plein texte indexé
+    (idx_jobs_alert_fts) en PostgreSQL, ILIKE par token ailleurs (tests SQLite).
+    Des mots-clés sans token exploitable ne sélectionnent aucune offre.
+    """
+    if keywords_match_nothing(criteria.get("keywords")):
+        return false()
+    if dialect == "postgresql":
+        tsquery = compile_keywords_tsquery(criteria.get("keywords"))
+        if tsquery is None:
+            return None
+        return text(f"{JOB_SEARCH_VECTOR_SQL} @@ to_tsquery('simple', :alert_tsquery)").bindparams(
+            alert_tsquery=tsquery
+        )
+
+    groups = keyword_groups(criteria.get("keywords"))
+    if not groups:
+        return None
+    columns = [_search_text(column) for column in (Job.title, Job.description, Job.requirements)]
+    return or_(*(
+        and_(*(or_(*(column.ilike(f"%{token}%") for column in columns)) for token in group))
+        for group in groups
+    ))
+
+
+def _search_text(column):
+    """Colonne avec + et # écrits en toutes lettres, comme les tokens de search_tokens."""
+    for symbol, word in SEARCH_SYMBOL_WORDS:
+        column = func.replace(column, symbol, word)
+    return column
+
+
+def _validate_keywords(criteria: JobAlertCriteria) -> None:
+    """Refuse des mots-clés dont aucun n'est exploitable (mots vides, une seule lettre)."""
+    if keywords_match_nothing(criteria.keywords):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Keywords must contain at least one searchable word (two characters or more, not a stopword)"
+        )
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 async def match_jobs_to_criteria(db: AsyncSession, criteria: dict, limit: int = 50) -> List[Job]:
     """
     Trouve les jobs correspondant aux critères d'une alerte
+
+    Même sémantique que l'index inversé des alertes (app/services/job_alert_index.py).
     """
-    query = select(Job).where(Job.status == "published")
+    query = select(Job).where(Job.status == JobStatus.PUBLISHED)
     
     # Filtrer par mots-clés (title, description, requirements)
-    if criteria.get("keywords"):
-        keywords = criteria["keywords"]
-        keyword_filters = []
-        for keyword in keywords:
-            keyword_filters.append(
-                or_(
-                    Job.title.ilike(f"%{keyword}%"),
-                    Job.description.ilike(f"%{keyword}%"),
-                    Job.requirements.ilike(f"%{keyword}%")
-                )
-            )
-        if keyword_filters:
-            query = query.where(or_(*keyword_filters))
+    keyword_filter = _keyword_filter(criteria, db.get_bind().dialect.name)
+    if keyword_filter is not None:
+        query = query.where(keyword_filter)
     
-    # Filtrer par localisation
-    if criteria.get("location"):
-        query = query.where(Job.location.ilike(f"%{criteria['location']}%"))
+    # Filtrer par localisation (index trigramme idx_jobs_location_trgm)
+    location = (criteria.get("location") or "").strip()
+    if location:
+        query = query.where(Job.location.ilike(f"%{_escape_like(location)}%", escape="\\"))
     
     # Filtrer par types de contrat
     if criteria.get("job_types"):
@@ -141,19 +184,26 @@ async def create_job_alert(
 ):
     """Créer une nouvelle alerte emploi"""
     
+    _validate_keywords(alert_data.criteria)
+
     # Convertir les critères en dict pour stockage JSONB
-    criteria_dict = alert_data.criteria.model_dump(exclude_none=True)
+    criteria_dict = alert_data.criteria.model_dump(mode="json", exclude_none=True)
+
+    # Seules les offres publiées après la création de l'alerte seront envoyées
+    latest_job_id = (await db.execute(select(func.max(Job.id)))).scalar()
     
     new_alert = JobAlert(
         candidate_id=candidate.id,
         name=alert_data.name,
         criteria=criteria_dict,
-        frequency=alert_data.frequency
+        frequency=alert_data.frequency,
+        last_matching_job_id=latest_job_id
     )
     
     db.add(new_alert)
     await db.commit()
     await db.refresh(new_alert)
+    job_alert_index.upsert_alert(new_alert)
     
     return new_alert
 
@@ -294,10 +344,12 @@ async def update_job_alert(
     if update_data.is_active is not None:
         alert.is_active = update_data.is_active
     if update_data.criteria is not None:
-        alert.criteria = update_data.criteria.model_dump(exclude_none=True)
+        _validate_keywords(update_data.criteria)
+        alert.criteria = update_data.criteria.model_dump(mode="json", exclude_none=True)
     
     await db.commit()
     await db.refresh(alert)
+    job_alert_index.upsert_alert(alert)
     
     return alert
 
@@ -326,6 +378,7 @@ async def delete_job_alert(
     
     await db.delete(alert)
     await db.commit()
+    job_alert_index.remove(alert_id)
     
     return None
 
@@ -356,6 +409,7 @@ async def toggle_job_alert(
     alert.is_active = not alert.is_active
     await db.commit()
     await db.refresh(alert)
+    job_alert_index.upsert_alert(alert)
     
     return alert
 
@@ -7,7 +7,7 @@ This module implements job posting endpoints using FastAPI 0.100+ patterns:
 - Centralized Pydantic schemas
 """
 
-from typing import Annotated, Optional
+from typing import Annotated, List, Optional
 from fastapi import status, APIRouter, Depends, HTTPException, Query, Response, Path, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import desc, select, func
@@ -30,6 +30,12 @@ from app.schemas import (
 )
 from app.services.employer_service import get_or_create_employer
 from app.services.cloudinary_service import CloudinaryService
+from app.services.job_alert_dispatcher import schedule_instant_job_alerts
+from app.services.job_alert_index import IndexedJob
+from app.services.platform_stats import (
+    APPLICATIONS, CANDIDATES, COMPANIES, JOBS_BY_STATUS, PUBLISHED_JOBS_BY_COUNTRY, PUBLISHED_JOBS_BY_INDUSTRY,
+    PUBLISHED_JOBS_BY_LOCATION_TYPE, PUBLISHED_JOBS_BY_TYPE, get_platform_stats,
+)
 
 router = APIRouter()
 
@@ -304,84 +310,23 @@ async def get_market_stats(
     db: DBSession = None
 ) -> MarketStatsResponse:
     """
-    Statistiques publiques du marché de l'emploi.
+    Statistiques publiques du marché de l'emploi (rollup platform_stats).
     Aucune authentification requise.
     """
-    # Totaux
-    total_jobs_res = await db.execute(
-        select(func.count()).select_from(Job).filter(Job.status == JobStatus.PUBLISHED)
-    )
-    total_jobs = total_jobs_res.scalar() or 0
-
-    total_apps_res = await db.execute(select(func.count()).select_from(JobApplication))
-    total_applications = total_apps_res.scalar() or 0
+    stats = await get_platform_stats(db)
 
-    total_companies_res = await db.execute(select(func.count()).select_from(Company))
-    total_companies = total_companies_res.scalar() or 0
-
-    total_cands_res = await db.execute(select(func.count()).select_from(Candidate))
-    total_candidates = total_cands_res.scalar() or 0
-
-    # Offres par pays
-    by_country_res = await db.execute(
-        select(Job.country, func.count().label("cnt"))
-        .filter(Job.status == JobStatus.PUBLISHED, Job.country.isnot(None))
-        .group_by(Job.country)
-        .order_by(desc("cnt"))
-        .limit(10)
-    )
-    jobs_by_country = [
-        MarketStatItem(label=row.country, count=row.cnt)
-        for row in by_country_res.all()
-    ]
-
-    # Offres par type de contrat
-    by_type_res = await db.execute(
-        select(Job.job_type, func.count().label("cnt"))
-        .filter(Job.status == JobStatus.PUBLISHED)
-        .group_by(Job.job_type)
-        .order_by(desc("cnt"))
-    )
-    jobs_by_type = [
-        MarketStatItem(label=row.job_type, count=row.cnt)
-        for row in by_type_res.all()
-    ]
-
-    # Offres par type de lieu (remote/on-site/hybrid)
-    by_loc_res = await db.execute(
-        select(Job.location_type, func.count().label("cnt"))
-        .filter(Job.status == JobStatus.PUBLISHED)
-        .group_by(Job.location_type)
-        .order_by(desc("cnt"))
-    )
-    jobs_by_location_type = [
-        MarketStatItem(label=row.location_type, count=row.cnt)
-        for row in by_loc_res.all()
-    ]
-
-    # Top industries (via Company)
-    top_industries_res = await db.execute(
-        select(Company.industry, func.count().label("cnt"))
-        .join(Job, Job.company_id == Company.id)
-        .filter(Job.status == JobStatus.PUBLISHED, Company.industry.isnot(None))
-        .group_by(Company.industry)
-        .order_by(desc("cnt"))
-        .limit(8)
-    )
-    top_industries = [
-        MarketStatItem(label=row.industry, count=row.cnt)
-        for row in top_industries_res.all()
-    ]
+    def items(metric: str, limit: Optional[int] = None) -> List[MarketStatItem]:
+        return [MarketStatItem(label=label, count=count) for label, count in stats.breakdown(metric, limit)]
 
     return MarketStatsResponse(
-        total_jobs=total_jobs,
-        total_applications=total_applications,
-        total_companies=total_companies,
-        total_candidates=total_candidates,
-        jobs_by_country=jobs_by_country,
-        jobs_by_type=jobs_by_type,
-        jobs_by_location_type=jobs_by_location_type,
-        top_industries=top_industries,
+        total_jobs=stats.get(JOBS_BY_STATUS, JobStatus.PUBLISHED.value),
+        total_applications=stats.get(APPLICATIONS),
+        total_companies=stats.get(COMPANIES),
+        total_candidates=stats.get(CANDIDATES),
+        jobs_by_country=items(PUBLISHED_JOBS_BY_COUNTRY, 10),
+        jobs_by_type=items(PUBLISHED_JOBS_BY_TYPE),
+        jobs_by_location_type=items(PUBLISHED_JOBS_BY_LOCATION_TYPE),
+        top_industries=items(PUBLISHED_JOBS_BY_INDUSTRY, 8),
     )
 
 
@@ -485,6 +430,9 @@ async def create_job(
 
     logger.info(f"Offre créée avec succès: id={job_obj.id}")
 
+    # Alertes emploi INSTANT correspondant à la nouvelle offre
+    schedule_instant_job_alerts(job_obj.id)
+
     return JobResponse(
         id=job_obj.id,
         title=job_obj.title,
@@ -553,6 +501,9 @@ async def update_job(
         logger.error(f"Valeur job_type invalide: {job.job_type}")
         raise HTTPException(status_code=400, detail=f"Type de contrat invalide: {job.job_type}")
 
+    # Version avant modification, pour ne notifier que les alertes nouvellement satisfaites
+    previous = IndexedJob.from_row(job_obj)
+
     # Mettre à jour les champs
     try:
         job_obj.title = job.title
@@ -582,6 +533,10 @@ async def update_job(
         await db.refresh(job_obj)
         logger.info(f"Offre id={job_id} mise à jour avec succès")
 
+        # Alertes emploi INSTANT que l'offre modifiée satisfait désormais
+        if job_obj.status == JobStatus.PUBLISHED and IndexedJob.from_row(job_obj) != previous:
+            schedule_instant_job_alerts(job_obj.id, previous=previous)
+
         company = employer.company
         return JobResponse(
             id=job_obj.id,
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from app.rate_limiter import limiter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import desc, select, func, update, delete as sql_delete
+from sqlalchemy import desc, insert, select, func, update, delete as sql_delete
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Sequence
 from datetime import datetime
 from loguru import logger
 from app.database import get_db
-from app.auth import require_user
+from app.auth import BearerCredentials, get_current_user, require_user
 from app.models.base import User, Notification, NotificationType
+from app.services.notification_counter import (
+    adjust_unread_count, adjust_unread_counts, get_unread_count as get_cached_unread_count,
+)
+from app.services.notification_stream import (
+    NOTIFICATIONS_STREAM_KEEPALIVE_SECONDS, NOTIFICATIONS_STREAM_REPLAY_LIMIT, NOTIFICATIONS_STREAM_TICKET_SECONDS,
+    format_sse, issue_stream_ticket, notification_broker, redeem_stream_ticket,
+)
 
 router = APIRouter()
 # ==================== Modèles Pydantic ====================
@@ -32,6 +41,32 @@ class NotificationListResponse(BaseModel):
 class MarkAsReadRequest(BaseModel):
     notification_ids: List[int]
 
+
+def _to_response(notif: Notification) -> NotificationResponse:
+    return NotificationResponse(
+        id=notif.id,
+        type=notif.type.value,
+        title=notif.title,
+        message=notif.message,
+        related_job_id=notif.related_job_id,
+        related_application_id=notif.related_application_id,
+        is_read=notif.is_read,
+        read_at=notif.read_at,
+        created_at=notif.created_at
+    )
+
+
+def _notification_event(notif: Notification) -> dict:
+    return {"event": "notification", "id": notif.id, "data": _to_response(notif).model_dump(mode="json")}
+
+
+async def _publish(user_id: int, events: List[dict]) -> None:
+    """Publie sur le canal temps réel de l'utilisateur (jamais bloquant pour l'appelant)."""
+    try:
+        await notification_broker.publish(user_id, events)
+    except Exception as e:
+        logger.warning(f"Publication temps réel échouée pour user_id={user_id}: {e}")
+
 # Routes
 
 @router.get("", response_model=NotificationListResponse)
@@ -51,16 +86,11 @@ async def get_notifications(
     if unread_only:
         query = query.filter(Notification.is_read == False)
 
-    # Compter le total et les non lues en 1 seule requête
-    counts_result = await db.execute(
-        select(
-            func.count().label("total"),
-            func.count().filter(Notification.is_read == False).label("unread"),
-        ).select_from(Notification).filter(Notification.user_id == current_user.id)
+    total_result = await db.execute(
+        select(func.count()).select_from(Notification).filter(Notification.user_id == current_user.id)
     )
-    counts = counts_result.one()
-    total = counts.total
-    unread_count = counts.unread
+    total = total_result.scalar()
+    unread_count = await get_cached_unread_count(db, current_user.id)
 
     # Récupérer les notifications paginées
     notifications_result = await db.execute(
@@ -69,19 +99,7 @@ async def get_notifications(
     notifications = notifications_result.scalars().all()
 
     return NotificationListResponse(
-        notifications=[
-            NotificationResponse(
-                id=notif.id,
-                type=notif.type.value,
-                title=notif.title,
-                message=notif.message,
-                related_job_id=notif.related_job_id,
-                related_application_id=notif.related_application_id,
-                is_read=notif.is_read,
-                read_at=notif.read_at,
-                created_at=notif.created_at
-            ) for notif in notifications
-        ],
+        notifications=[_to_response(notif) for notif in notifications],
         total=total,
         unread_count=unread_count
     )
@@ -92,17 +110,104 @@ async def get_unread_count(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Récupérer le nombre de notifications non lues
+    Récupérer le nombre de notifications non lues (compteur matérialisé)
     """
-    result = await db.execute(
-        select(func.count()).select_from(Notification).filter(
-            Notification.user_id == current_user.id,
-            Notification.is_read == False
-        )
-    )
-    count = result.scalar()
+    return {"unread_count": await get_cached_unread_count(db, current_user.id)}
+
+@router.post("/stream-ticket")
+async def create_stream_ticket(
+    current_user: User = Depends(require_user)
+):
+    """
+    Ticket d'ouverture du flux temps réel, à passer en ?ticket= à /stream
+
+    À usage unique et de courte durée : le client en redemande un avant
+    chaque (re)connexion de son EventSource.
+    """
+    return {
+        "ticket": await issue_stream_ticket(current_user.id),
+        "expires_in": NOTIFICATIONS_STREAM_TICKET_SECONDS,
+    }
+
+async def _require_stream_user(
+    credentials: BearerCredentials,
+    db: AsyncSession = Depends(get_db),
+    ticket: Optional[str] = Query(None, description="Ticket de POST /stream-ticket (EventSource ne peut pas envoyer d'en-tête)")
+) -> User:
+    if credentials is None and ticket:
+        user_id = await redeem_stream_ticket(ticket)
+        user = await db.get(User, user_id) if user_id is not None else None
+        if user is None or not user.is_active:
+            raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+        return user
+    user = await get_current_user(credentials, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    return user
+
+async def _event_stream(request: Request, user_id: int, queue: asyncio.Queue, initial_events: List[dict]) -> AsyncIterator[str]:
+    """Flux SSE : événements de reprise, puis événements temps réel et keepalive."""
+    try:
+        yield f"retry: {int(NOTIFICATIONS_STREAM_KEEPALIVE_SECONDS * 1000)}\n\n"
+        last_id = 0
+        for event in initial_events:
+            last_id = max(last_id, event.get("id") or 0)
+            yield format_sse(event)
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=NOTIFICATIONS_STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            # Déjà envoyée lors de la reprise
+            if event["event"] == "notification" and event["id"] <= last_id:
+                continue
+            yield format_sse(event)
+    finally:
+        notification_broker.unsubscribe(user_id, queue)
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    last_event_id: Optional[int] = Query(None, description="Dernier id reçu (à défaut de l'en-tête Last-Event-ID)"),
+    current_user: User = Depends(_require_stream_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Flux temps réel des notifications (Server-Sent Events)
+
+    Événements : notification (nouvelle notification), unread_count (delta ou
+    valeur absolue), resync (le client doit recharger la liste). À la
+    reconnexion, les notifications d'id > Last-Event-ID sont renvoyées.
+    """
+    header_id = request.headers.get("last-event-id")
+    if header_id and header_id.isdigit():
+        last_event_id = int(header_id)
 
-    return {"unread_count": count}
+    # Abonnement avant la lecture de l'état initial : aucun événement perdu entre les deux
+    user_id = current_user.id
+    queue = notification_broker.subscribe(user_id)
+    try:
+        initial_events = []
+        if last_event_id is not None:
+            missed = (await db.execute(
+                select(Notification)
+                .filter(Notification.user_id == user_id, Notification.id > last_event_id)
+                .order_by(Notification.id)
+                .limit(NOTIFICATIONS_STREAM_REPLAY_LIMIT)
+            )).scalars().all()
+            initial_events = [_notification_event(notif) for notif in missed]
+        unread_count = await get_cached_unread_count(db, user_id)
+        initial_events.append({"event": "unread_count", "data": {"unread_count": unread_count}})
+    except Exception:
+        notification_broker.unsubscribe(user_id, queue)
+        raise
+
+    return StreamingResponse(
+        _event_stream(request, user_id, queue, initial_events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.put("/{notification_id}/read")
 async def mark_notification_as_read(
@@ -113,20 +218,31 @@ async def mark_notification_as_read(
     """
     Marquer une notification comme lue
     """
+    # UPDATE conditionnel : seul l'appel qui fait réellement passer la
+    # notification à lue décrémente le compteur (requêtes concurrentes)
     result = await db.execute(
-        select(Notification).filter(
+        update(Notification)
+        .filter(
             Notification.id == notification_id,
-            Notification.user_id == current_user.id
+            Notification.user_id == current_user.id,
+            Notification.is_read == False
         )
+        .values(is_read=True, read_at=datetime.now())
     )
-    notification = result.scalar_one_or_none()
-
-    if not notification:
-        raise HTTPException(status_code=404, detail="Notification introuvable")
+    if result.rowcount == 0:
+        exists = await db.execute(
+            select(Notification.id).filter(
+                Notification.id == notification_id,
+                Notification.user_id == current_user.id
+            )
+        )
+        if exists.scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Notification introuvable")
+        return {"message": "Notification marquée comme lue"}
 
-    notification.is_read = True
-    notification.read_at = datetime.now()
     await db.commit()
+    await adjust_unread_count(current_user.id, -1)
+    await _publish(current_user.id, [{"event": "unread_count", "data": {"delta": -1}}])
 
     return {"message": "Notification marquée comme lue"}
 
@@ -138,7 +254,7 @@ async def mark_all_as_read(
     """
     Marquer toutes les notifications comme lues
     """
-    await db.execute(
+    result = await db.execute(
         update(Notification)
         .filter(
             Notification.user_id == current_user.id,
@@ -147,6 +263,10 @@ async def mark_all_as_read(
         .values(is_read=True, read_at=datetime.now())
     )
     await db.commit()
+    # Delta plutôt que remise à 0 : une notification créée entre-temps reste comptée
+    if result.rowcount:
+        await adjust_unread_count(current_user.id, -result.rowcount)
+        await _publish(current_user.id, [{"event": "unread_count", "data": {"delta": -result.rowcount}}])
 
     return {"message": "Toutes les notifications marquées comme lues"}
 
@@ -160,46 +280,93 @@ async def delete_notification(
     Supprimer une notification
     """
     result = await db.execute(
-        select(Notification).filter(
+        sql_delete(Notification)
+        .filter(
             Notification.id == notification_id,
             Notification.user_id == current_user.id
         )
+        .returning(Notification.is_read)
     )
-    notification = result.scalar_one_or_none()
+    was_read = result.scalar_one_or_none()
 
-    if not notification:
+    if was_read is None:
         raise HTTPException(status_code=404, detail="Notification introuvable")
 
-    await db.delete(notification)
     await db.commit()
+    if not was_read:
+        await adjust_unread_count(current_user.id, -1)
+        await _publish(current_user.id, [{"event": "unread_count", "data": {"delta": -1}}])
 
     return {"message": "Notification supprimée"}
 
 # ==================== Fonctions utilitaires ====================
 
-async def create_notification(
+async def stage_notifications(
     db: AsyncSession,
-    user_id: int,
+    user_ids: Sequence[int],
     type: NotificationType,
     title: str,
     message: str,
     related_job_id: Optional[int] = None,
     related_application_id: Optional[int] = None
-):
+) -> List[Notification]:
     """
-    Créer une nouvelle notification
+    Ajouter une notification pour chaque utilisateur dans la transaction de l'appelant
+
+    Un seul INSERT multi-lignes ... RETURNING, sans commit : les notifications
+    sont validées (ou annulées) avec le changement métier de l'appelant, qui
+    appelle publish_notifications() après son commit.
     """
-    notification = Notification(
-        user_id=user_id,
-        type=type,
-        title=title,
-        message=message,
-        related_job_id=related_job_id,
-        related_application_id=related_application_id,
-        is_read=False
+    if not user_ids:
+        return []
+    rows = [
+        {
+            "user_id": user_id,
+            "type": type,
+            "title": title,
+            "message": message,
+            "related_job_id": related_job_id,
+            "related_application_id": related_application_id,
+            "is_read": False,
+        }
+        for user_id in user_ids
+    ]
+    result = await db.scalars(insert(Notification).returning(Notification), rows)
+    return list(result.all())
+
+
+async def stage_notification(
+    db: AsyncSession,
+    user_id: int,
+    type: NotificationType,
+    title: str,
+    message: str,
+    related_job_id: Optional[int] = None,
+    related_application_id: Optional[int] = None
+) -> Notification:
+    """Ajouter une notification dans la transaction de l'appelant (voir stage_notifications)"""
+    notifications = await stage_notifications(
+        db, [user_id], type, title, message,
+        related_job_id=related_job_id, related_application_id=related_application_id,
     )
-    db.add(notification)
-    await db.commit()
-    await db.refresh(notification)
-    logger.info(f"Notification créée pour user_id={user_id}, type={type.value}")
-    return notification
+    return notifications[0]
+
+
+async def publish_notifications(notifications: Sequence[Notification]) -> None:
+    """
+    Diffuser des notifications validées : compteurs de non lues et flux temps réel
+
+    À appeler après le commit de la transaction qui les a créées.
+    """
+    by_user: Dict[int, List[Notification]] = {}
+    for notification in notifications:
+        by_user.setdefault(notification.user_id, []).append(notification)
+    if not by_user:
+        return
+    logger.info(f"{len(notifications)} notification(s) créée(s) pour {len(by_user)} utilisateur(s)")
+    await adjust_unread_counts({user_id: len(items) for user_id, items in by_user.items()})
+    for user_id, items in by_user.items():
+        await _publish(user_id, [
+            *(_notification_event(notification) for notification in items),
+            {"event": "unread_count", "data": {"delta": len(items)}},
+        ])
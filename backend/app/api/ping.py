@@ -1,23 +1,15 @@
-import asyncio
-import time
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, Request
-from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-from app.models.base import Company, Job, JobApplication, User, UserRole
+from app.models.base import JobStatus, UserRole
 from app.rate_limiter import limiter
+from app.services.platform_stats import APPLICATIONS, COMPANIES, JOBS_BY_STATUS, USERS_BY_ROLE, get_platform_stats
 
 router = APIRouter()
 
-# Cache en mémoire pour les stats publiques (refresh toutes les 5 min)
-_stats_cache: dict = {}
-_stats_cache_ts: float = 0
-_cache_lock = asyncio.Lock()
-STATS_CACHE_TTL = 300  # 5 minutes
-
 
 @router.get("/ping")
 async def ping():
@@ -40,40 +32,11 @@ async def status():
 @router.get("/stats/public")
 @limiter.limit("30/minute")
 async def get_public_stats(request: Request, db: AsyncSession = Depends(get_db)):
-    """Statistiques publiques pour la landing page (cache 5 min, rate limited)."""
-    global _stats_cache, _stats_cache_ts
-
-    now = time.time()
-    if _stats_cache and (now - _stats_cache_ts) < STATS_CACHE_TTL:
-        return _stats_cache
-
-    async with _cache_lock:
-        # Re-verifier apres acquisition du lock (double-check pattern)
-        if _stats_cache and (time.time() - _stats_cache_ts) < STATS_CACHE_TTL:
-            return _stats_cache
-
-        result = await db.execute(
-            select(func.count()).select_from(User).filter(User.role == UserRole.CANDIDATE)
-        )
-        total_candidates = result.scalar() or 0
-
-        result = await db.execute(select(func.count()).select_from(Company))
-        total_companies = result.scalar() or 0
-
-        result = await db.execute(
-            select(func.count()).select_from(Job).filter(Job.status == "published")
-        )
-        active_jobs = result.scalar() or 0
-
-        result = await db.execute(select(func.count()).select_from(JobApplication))
-        total_applications = result.scalar() or 0
-
-        _stats_cache = {
-            "candidates": total_candidates,
-            "companies": total_companies,
-            "active_jobs": active_jobs,
-            "applications": total_applications,
-        }
-        _stats_cache_ts = time.time()
-
-    return _stats_cache
+    """Statistiques publiques pour la landing page (rollup platform_stats, rate limited)."""
+    stats = await get_platform_stats(db)
+    return {
+        "candidates": stats.get(USERS_BY_ROLE, UserRole.CANDIDATE.value),
+        "companies": stats.get(COMPANIES),
+        "active_jobs": stats.get(JOBS_BY_STATUS, JobStatus.PUBLISHED.value),
+        "applications": stats.get(APPLICATIONS),
+    }
@@ -1,40 +1,55 @@
 """
 API de génération de rapports PDF — IntoWork
 Endpoints pour candidat, employeur et admin.
+
+- GET /{kind}/pdf : rendu immédiat (limité à 5/minute)
+- POST /{kind} : mise en file d'une génération en arrière-plan, puis
+  GET /{id} pour l'état et GET /{id}/download pour le fichier
 """
 
-from datetime import datetime, timedelta, timezone
-from typing import Annotated
+from datetime import datetime
+from typing import Annotated, Awaitable, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from fastapi.responses import Response
-from sqlalchemy import func, select
+from fastapi.responses import FileResponse, Response
+from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.auth import require_user
 from app.database import get_db
-from app.models.base import (
-    ApplicationStatus,
-    Candidate,
-    Company,
-    Employer,
-    Job,
-    JobApplication,
-    JobStatus,
-    Notification,
-    User,
-    UserRole,
-)
+from app.models.base import ReportJob, ReportJobStatus, User, UserRole
 from app.rate_limiter import limiter
-from app.services.report_service import (
-    generate_admin_report,
-    generate_candidate_report,
-    generate_employer_report,
+from app.services.report_jobs import (
+    REPORT_KINDS,
+    SYNC_EMPLOYER_REPORT_JOBS,
+    ReportDataMissing,
+    artifact_path,
+    build_admin_report,
+    build_candidate_report,
+    build_employer_report,
+    enqueue_report,
 )
+from app.services.report_service import ReportRenderError
 
 router = APIRouter()
 
+# Noms des fichiers téléchargés, par type de rapport
+REPORT_FILENAMES = {
+    "candidate": "intowork_rapport_candidat",
+    "employer": "intowork_rapport_recrutement",
+    "admin": "intowork_rapport_plateforme",
+}
+
+
+async def _render(rendering: Awaitable[bytes]) -> bytes:
+    """Attendre le rendu PDF (pool de processus), 404 / 503 si le rendu est impossible."""
+    try:
+        return await rendering
+    except ReportDataMissing as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ReportRenderError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
 
 def _pdf_response(pdf_bytes: bytes, filename: str) -> Response:
     """Construire une réponse HTTP avec le PDF en téléchargement."""
@@ -45,6 +60,10 @@ def _pdf_response(pdf_bytes: bytes, filename: str) -> Response:
     )
 
 
+def _filename(kind: str, when: datetime) -> str:
+    return f"{REPORT_FILENAMES[kind]}_{when.strftime('%Y%m%d')}.pdf"
+
+
 # ═══════════════════════════════════════════════════════════════
 # RAPPORT CANDIDAT
 # ═══════════════════════════════════════════════════════════════
@@ -60,78 +79,8 @@ async def export_candidate_pdf(
     if current_user.role != UserRole.CANDIDATE:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Réservé aux candidats")
 
-    # Charger le profil candidat avec relations
-    result = await db.execute(
-        select(Candidate)
-        .filter(Candidate.user_id == current_user.id)
-        .options(
-            selectinload(Candidate.experiences),
-            selectinload(Candidate.educations),
-            selectinload(Candidate.skills),
-        )
-    )
-    candidate = result.scalar_one_or_none()
-    if not candidate:
-        raise HTTPException(status_code=404, detail="Profil candidat introuvable")
-
-    # Stats — candidatures + entretiens + offres disponibles en 1 seule requête
-    counts_result = await db.execute(
-        select(
-            select(func.count()).select_from(JobApplication)
-                .filter(JobApplication.candidate_id == candidate.id)
-                .scalar_subquery().label("apps"),
-            select(func.count()).select_from(JobApplication)
-                .filter(
-                    JobApplication.candidate_id == candidate.id,
-                    JobApplication.status == ApplicationStatus.INTERVIEW,
-                )
-                .scalar_subquery().label("interviews"),
-            select(func.count()).select_from(Job)
-                .filter(Job.status == JobStatus.PUBLISHED)
-                .scalar_subquery().label("available_jobs"),
-        )
-    )
-    counts = counts_result.one()
-    app_count = counts.apps or 0
-    interview_count = counts.interviews or 0
-    available_jobs = counts.available_jobs or 0
-
-    # Complétion profil
-    filled = sum(1 for v in [
-        current_user.first_name, current_user.last_name,
-        candidate.phone, candidate.location, candidate.title, candidate.summary,
-    ] if v)
-    has_exp = len(candidate.experiences) > 0
-    has_edu = len(candidate.educations) > 0
-    has_skills = len(candidate.skills) > 0
-    profile_completion = min(100, int((filled / 6) * 60 + has_exp * 15 + has_edu * 15 + has_skills * 10))
-
-    stats = [
-        {"title": "Candidatures", "value": str(app_count)},
-        {"title": "Entretiens", "value": str(interview_count)},
-        {"title": "Offres disponibles", "value": str(available_jobs)},
-        {"title": "Profil", "value": f"{profile_completion}%"},
-    ]
-
-    skills = [{"name": s.name, "category": s.category.value if hasattr(s.category, 'value') else s.category, "level": s.level} for s in candidate.skills]
-    experiences = [{"title": e.title, "company": e.company, "start_date": e.start_date, "end_date": e.end_date} for e in candidate.experiences]
-    educations = [{"degree": e.degree, "school": e.school, "start_date": e.start_date, "end_date": e.end_date} for e in candidate.educations]
-
-    pdf = generate_candidate_report(
-        user_name=f"{current_user.first_name or ''} {current_user.last_name or ''}".strip() or current_user.email,
-        email=current_user.email,
-        title=candidate.title,
-        location=candidate.location,
-        profile_completion=profile_completion,
-        stats=stats,
-        skills=skills,
-        experiences=experiences,
-        educations=educations,
-        activities=[],
-    )
-
-    filename = f"intowork_rapport_candidat_{datetime.now().strftime('%Y%m%d')}.pdf"
-    return _pdf_response(pdf, filename)
+    pdf = await _render(build_candidate_report(db, current_user))
+    return _pdf_response(pdf, _filename("candidate", datetime.now()))
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -149,78 +98,8 @@ async def export_employer_pdf(
     if current_user.role != UserRole.EMPLOYER:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Réservé aux employeurs")
 
-    result = await db.execute(
-        select(Employer).filter(Employer.user_id == current_user.id).options(selectinload(Employer.company))
-    )
-    employer = result.scalar_one_or_none()
-    if not employer or not employer.company:
-        raise HTTPException(status_code=404, detail="Profil employeur introuvable")
-
-    company = employer.company
-
-    # Stats agrégées en 1 requête
-    agg = (await db.execute(
-        select(
-            func.count().label("total"),
-            func.count().filter(JobApplication.status == ApplicationStatus.INTERVIEW).label("interviews"),
-            func.count().filter(JobApplication.status.in_([
-                ApplicationStatus.REJECTED, ApplicationStatus.ACCEPTED,
-                ApplicationStatus.INTERVIEW, ApplicationStatus.SHORTLISTED, ApplicationStatus.VIEWED,
-            ])).label("responded"),
-        ).select_from(JobApplication).join(Job).filter(Job.employer_id == employer.id)
-    )).one()
-
-    active_jobs_count = (await db.execute(
-        select(func.count()).select_from(Job).filter(Job.employer_id == employer.id, Job.status == JobStatus.PUBLISHED)
-    )).scalar() or 0
-
-    response_rate = round((agg.responded / agg.total) * 100) if agg.total else 0
-
-    stats = [
-        {"title": "Offres actives", "value": str(active_jobs_count)},
-        {"title": "Candidatures", "value": str(agg.total or 0)},
-        {"title": "Entretiens", "value": str(agg.interviews or 0)},
-        {"title": "Taux de reponse", "value": f"{response_rate}%"},
-    ]
-
-    # Liste des offres
-    jobs_result = await db.execute(
-        select(Job).filter(Job.employer_id == employer.id).order_by(Job.created_at.desc()).limit(20)
-    )
-    jobs_list = jobs_result.scalars().all()
-
-    # Compter les candidatures de toutes ces offres en 1 seule requête (évite le N+1)
-    job_ids = [job.id for job in jobs_list]
-    app_counts_map: dict = {}
-    if job_ids:
-        counts_result = await db.execute(
-            select(JobApplication.job_id, func.count(JobApplication.id).label("cnt"))
-            .where(JobApplication.job_id.in_(job_ids))
-            .group_by(JobApplication.job_id)
-        )
-        app_counts_map = {row.job_id: row.cnt for row in counts_result}
-
-    jobs_summary = []
-    for job in jobs_list:
-        jobs_summary.append({
-            "title": job.title,
-            "status": job.status.value if hasattr(job.status, 'value') else job.status,
-            "applications_count": app_counts_map.get(job.id, 0),
-            "posted_at": job.posted_at.strftime("%d/%m/%Y") if job.posted_at else None,
-        })
-
-    pdf = generate_employer_report(
-        user_name=f"{current_user.first_name or ''} {current_user.last_name or ''}".strip() or current_user.email,
-        company_name=company.name,
-        company_industry=company.industry,
-        company_size=company.size,
-        stats=stats,
-        activities=[],
-        jobs_summary=jobs_summary,
-    )
-
-    filename = f"intowork_rapport_recrutement_{datetime.now().strftime('%Y%m%d')}.pdf"
-    return _pdf_response(pdf, filename)
+    pdf = await _render(build_employer_report(db, current_user, job_limit=SYNC_EMPLOYER_REPORT_JOBS))
+    return _pdf_response(pdf, _filename("employer", datetime.now()))
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -238,42 +117,92 @@ async def export_admin_pdf(
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Réservé aux administrateurs")
 
-    total_users = (await db.execute(select(func.count()).select_from(User))).scalar() or 0
-    total_candidates = (await db.execute(select(func.count()).select_from(User).filter(User.role == UserRole.CANDIDATE))).scalar() or 0
-    total_employers = (await db.execute(select(func.count()).select_from(User).filter(User.role == UserRole.EMPLOYER))).scalar() or 0
-    total_companies = (await db.execute(select(func.count()).select_from(Company))).scalar() or 0
-    total_jobs = (await db.execute(select(func.count()).select_from(Job))).scalar() or 0
-    total_applications = (await db.execute(select(func.count()).select_from(JobApplication))).scalar() or 0
-    active_users = (await db.execute(select(func.count()).select_from(User).filter(User.is_active == True))).scalar() or 0
-    inactive_users = total_users - active_users
-
-    # Inscriptions 7 derniers jours
-    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-    recent_signups = (await db.execute(
-        select(func.count()).select_from(User).filter(User.created_at >= week_ago)
-    )).scalar() or 0
-
-    # Jobs par statut
-    jobs_by_status = {}
-    for job_status in ["published", "draft", "closed", "archived"]:
-        count = (await db.execute(
-            select(func.count()).select_from(Job).filter(Job.status == job_status)
-        )).scalar() or 0
-        jobs_by_status[job_status] = count
-
-    pdf = generate_admin_report(
-        admin_name=f"{current_user.first_name or ''} {current_user.last_name or ''}".strip() or current_user.email,
-        total_users=total_users,
-        total_candidates=total_candidates,
-        total_employers=total_employers,
-        total_companies=total_companies,
-        total_jobs=total_jobs,
-        total_applications=total_applications,
-        active_users=active_users,
-        inactive_users=inactive_users,
-        jobs_by_status=jobs_by_status,
-        recent_signups=recent_signups,
+    pdf = await _render(build_admin_report(db, current_user))
+    return _pdf_response(pdf, _filename("admin", datetime.now()))
+
+
+# ═══════════════════════════════════════════════════════════════
+# RAPPORTS ASYNCHRONES
+# ═══════════════════════════════════════════════════════════════
+
+class ReportJobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    size_bytes: Optional[int] = None
+    error: Optional[str] = None
+    download_url: Optional[str] = None
+
+
+def _job_response(job: ReportJob) -> ReportJobResponse:
+    download_url = None
+    if job.status == ReportJobStatus.COMPLETED:
+        download_url = f"/api/reports/{job.id}/download"
+    return ReportJobResponse(
+        id=job.id,
+        kind=job.kind,
+        status=job.status.value,
+        created_at=job.created_at,
+        completed_at=job.completed_at,
+        expires_at=job.expires_at,
+        size_bytes=job.size_bytes,
+        error=job.error,
+        download_url=download_url,
     )
 
-    filename = f"intowork_rapport_plateforme_{datetime.now().strftime('%Y%m%d')}.pdf"
-    return _pdf_response(pdf, filename)
+
+async def _get_own_job(db: AsyncSession, report_id: int, user: User) -> ReportJob:
+    job = await db.get(ReportJob, report_id)
+    if job is None or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Rapport introuvable")
+    return job
+
+
+@router.post("/{kind}", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+@limiter.limit("20/minute")
+async def request_report(
+    request: Request,
+    kind: str,
+    current_user: Annotated[User, Depends(require_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Mettre en file la génération d'un rapport (candidate, employer, admin)."""
+    if kind not in REPORT_KINDS:
+        raise HTTPException(status_code=404, detail="Type de rapport inconnu")
+    required_role, _ = REPORT_KINDS[kind]
+    if current_user.role != required_role:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Rapport non disponible pour ce rôle")
+
+    job = await enqueue_report(db, current_user, kind)
+    return _job_response(job)
+
+
+@router.get("/{report_id}", response_model=ReportJobResponse)
+async def get_report(
+    report_id: int,
+    current_user: Annotated[User, Depends(require_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """État d'un rapport demandé, avec le lien de téléchargement une fois généré."""
+    return _job_response(await _get_own_job(db, report_id, current_user))
+
+
+@router.get("/{report_id}/download")
+async def download_report(
+    report_id: int,
+    current_user: Annotated[User, Depends(require_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Télécharger le PDF d'un rapport généré (jusqu'à son expiration)."""
+    job = await _get_own_job(db, report_id, current_user)
+    path = artifact_path(job.id)
+    if job.status != ReportJobStatus.COMPLETED or not path.is_file():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Rapport non disponible ({job.status.value})")
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        filename=_filename(job.kind, job.completed_at or datetime.now()),
+    )
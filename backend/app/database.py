@@ -1,5 +1,8 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import StaticPool
+from typing import Any, Awaitable, Callable, List
+import asyncio
 import os
 from dotenv import load_dotenv
 
@@ -80,3 +83,41 @@ async def get_db():
             yield session
         finally:
             await session.close()
+
+
+# Lectures indépendantes en parallèle (dashboards)
+# Sessions simultanées par appel, et plafond global toutes requêtes confondues
+# (doit rester sous pool_size + max_overflow pour ne pas affamer le pool)
+PARALLEL_READS_PER_CALL = int(os.getenv("PARALLEL_READS_PER_CALL", "4"))
+PARALLEL_READS_MAX_SESSIONS = int(os.getenv("PARALLEL_READS_MAX_SESSIONS", "10"))
+
+_parallel_reads_slots = asyncio.Semaphore(PARALLEL_READS_MAX_SESSIONS)
+
+
+async def gather_reads(db: AsyncSession, *reads: Callable[[AsyncSession], Awaitable[Any]]) -> List[Any]:
+    """
+    Exécute des lectures indépendantes en parallèle, chacune sur sa propre
+    session du pool, et retourne leurs résultats dans l'ordre.
+
+    Chaque lecture est une coroutine `lambda session: ...` qui doit renvoyer
+    des valeurs simples (lignes, scalaires) : sa session est fermée dès la fin.
+    Le nombre de sessions est borné par appel et globalement. Sans vrai pool
+    (SQLite, StaticPool des tests) les lectures passent en séquence sur `db`.
+    """
+    engine = db.bind
+    if (
+        len(reads) < 2
+        or engine is None
+        or engine.dialect.name != "postgresql"
+        or isinstance(engine.pool, StaticPool)
+    ):
+        return [await read(db) for read in reads]
+
+    per_call = asyncio.Semaphore(PARALLEL_READS_PER_CALL)
+
+    async def run(read):
+        async with per_call, _parallel_reads_slots:
+            async with AsyncSession(engine, expire_on_commit=False, autoflush=False) as session:
+                return await read(session)
+
+    return list(await asyncio.gather(*(run(read) for read in reads)))
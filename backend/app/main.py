@@ -8,6 +8,23 @@ from app.logging_config import logger
 from app.middleware.request_id import RequestIDMiddleware
 from app.monitoring import setup_monitoring, create_metrics_endpoint, update_db_pool_metrics
 from app.cache import cache
+from app.services.cv_parser import shutdown_cv_parser
+from app.services.cv_analytics import start_cv_analytics_flusher, stop_cv_analytics_flusher
+from app.services.cv_analytics_partitions import (
+    start_cv_analytics_partition_maintenance, stop_cv_analytics_partition_maintenance,
+)
+from app.services.cv_pdf import shutdown_cv_pdf_renderer
+from app.services.cv_renderer import load_cv_templates
+from app.services.report_jobs import start_report_worker, stop_report_worker
+from app.services.report_service import shutdown_report_renderer, start_report_renderer
+from app.services.job_alert_dispatcher import start_job_alert_dispatcher, stop_job_alert_dispatcher
+from app.services.email_outbox import start_email_outbox_worker, stop_email_outbox_worker
+from app.services.notification_counter import start_unread_counter_reconciler, stop_unread_counter_reconciler
+from app.services.notification_partitions import (
+    start_notification_partition_maintenance, stop_notification_partition_maintenance,
+)
+from app.services.notification_stream import notification_broker
+from app.services.platform_stats import start_platform_stats_refresher, stop_platform_stats_refresher
 from app.api.ping import router as ping_router
 from app.api.users import router as users_router
 from app.api.auth_routes import router as auth_routes_router
@@ -23,6 +40,7 @@ from app.api.cv_builder import router as cv_builder_router
 from app.api.ai_scoring import router as ai_scoring_router
 # 🆕 ATS Phase 2 - February 2026
 from app.api.email_templates import router as email_templates_router
+from app.api.email_campaigns import router as email_campaigns_router
 from app.api.job_alerts import router as job_alerts_router
 from app.api.collaboration import router as collaboration_router
 from app.api.integrations import router as integrations_router
@@ -54,6 +72,36 @@ async def lifespan(app: FastAPI):
     from app.database import engine
     await update_db_pool_metrics(engine)
 
+    # Start job alert dispatcher
+    start_job_alert_dispatcher()
+
+    # Start email outbox worker
+    start_email_outbox_worker()
+
+    # Start unread counter reconciler
+    start_unread_counter_reconciler()
+
+    # Start notification partition maintenance
+    start_notification_partition_maintenance()
+
+    # Start platform stats rollup refresher
+    start_platform_stats_refresher()
+
+    # Start and warm up report rendering worker pool (also renders CV builder PDFs)
+    start_report_renderer()
+
+    # Compile CV builder templates
+    load_cv_templates()
+
+    # Start asynchronous report worker
+    start_report_worker()
+
+    # Start CV analytics flusher
+    start_cv_analytics_flusher()
+
+    # Start CV analytics partition maintenance
+    start_cv_analytics_partition_maintenance()
+
     logger.info("All services initialized successfully")
 
     yield
@@ -61,9 +109,43 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down INTOWORK Backend API...")
 
+    # Stop job alert dispatcher
+    await stop_job_alert_dispatcher()
+
+    # Stop email outbox worker
+    await stop_email_outbox_worker()
+
+    # Stop unread counter reconciler
+    await stop_unread_counter_reconciler()
+
+    # Stop notification partition maintenance
+    await stop_notification_partition_maintenance()
+
+    # Stop platform stats rollup refresher
+    await stop_platform_stats_refresher()
+
+    # Stop asynchronous report worker
+    await stop_report_worker()
+
+    # Stop CV analytics flusher (writes buffered events)
+    await stop_cv_analytics_flusher()
+
+    # Stop CV analytics partition maintenance
+    await stop_cv_analytics_partition_maintenance()
+
+    # Stop notifications pub/sub listener
+    await notification_broker.stop()
+
     # Disconnect Redis
     await cache.disconnect()
 
+    # Stop CV parsing worker pool
+    shutdown_cv_parser()
+
+    # Cancel CV builder PDF prerenders, then stop report rendering worker pool (shared)
+    shutdown_cv_pdf_renderer()
+    shutdown_report_renderer()
+
     # Dispose database engine
     await engine.dispose()
     logger.info("Database engine disposed successfully")
@@ -190,6 +272,7 @@ app.include_router(cv_builder_router, prefix="/api/cv-builder", tags=["cv-builde
 app.include_router(ai_scoring_router, prefix="/api/ai-scoring", tags=["ai-scoring"])
 # 🆕 ATS Phase 2 routers
 app.include_router(email_templates_router, prefix="/api", tags=["ats-email-templates"])
+app.include_router(email_campaigns_router, prefix="/api", tags=["ats-email-campaigns"])
 app.include_router(job_alerts_router, prefix="/api", tags=["ats-job-alerts"])
 app.include_router(collaboration_router, prefix="/api", tags=["ats-collaboration"])
 app.include_router(integrations_router, prefix="/api", tags=["ats-integrations"])
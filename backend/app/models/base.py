@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum as SQLEnum, LargeBinary, Float
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Boolean, ForeignKey, Enum as SQLEnum, LargeBinary, Float, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from sqlalchemy.dialects.postgresql import JSONB
 from app.database import Base
 import enum
@@ -353,6 +353,25 @@ class JobApplication(Base):
     selected_cv = relationship("CandidateCV", foreign_keys=[cv_id])  # CV sélectionné pour cette candidature
 
 
+class CandidateJobMatch(Base):
+    """Cache persistant des recommandations IA (/candidate/job-matches) par candidat"""
+    __tablename__ = "candidate_job_matches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
+
+    # Empreintes : le cache est invalide dès que l'une d'elles change
+    profile_fingerprint = Column(String(64), nullable=False)  # Compétences, expériences, formations, CV
+    jobs_fingerprint = Column(String(64), nullable=False)  # Offres présélectionnées (id + updated_at)
+
+    match_limit = Column(Integer, nullable=False)  # Nombre de résultats demandés lors du calcul
+    result = Column(JSONB, nullable=False)  # JobMatchesResponse sérialisée
+    generated_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Relations
+    candidate = relationship("Candidate")
+
+
 class NotificationType(enum.Enum):
     """Types de notifications"""
     NEW_APPLICATION = "new_application"  # Nouvelle candidature reçue (employeur)
@@ -363,6 +382,7 @@ class NotificationType(enum.Enum):
 
 
 class Notification(Base):
+    # Partitionnée par mois sur created_at (clé primaire physique : id, created_at)
     __tablename__ = "notifications"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -382,7 +402,7 @@ class Notification(Base):
     read_at = Column(DateTime(timezone=True), nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
     
     # Relations
     user = relationship("User")
@@ -496,6 +516,8 @@ class CVDocument(Base):
 
     # Données du CV (format JSON)
     cv_data = Column(Text, nullable=False)  # JSON string contenant toutes les données
+    # SHA-256 de cv_data : recherche indexée des CV au contenu identique (PDF partagé)
+    content_hash = Column(String(64), nullable=True, index=True)
 
     # Template et personnalisation
     template = Column(SQLEnum(CVTemplate), nullable=False, default=CVTemplate.ELEGANCE)
@@ -519,18 +541,23 @@ class CVDocument(Base):
 
     # Relations
     user = relationship("User")
-    analytics = relationship("CVAnalytics", back_populates="cv_document", cascade="all, delete-orphan")
+    # Événements et rollup supprimés par ON DELETE CASCADE (sans chargement ligne à ligne)
+    analytics = relationship(
+        "CVAnalytics", back_populates="cv_document", cascade="all, delete-orphan", passive_deletes=True
+    )
 
 
 class CVAnalytics(Base):
     """Analytics pour les vues et téléchargements de CV"""
+    # Partitionnée par mois sur created_at (clé primaire physique : id, created_at),
+    # écrite par lots (app/services/cv_analytics.py), rétention par partition
     __tablename__ = "cv_analytics"
 
     id = Column(Integer, primary_key=True, index=True)
-    cv_document_id = Column(Integer, ForeignKey("cv_documents.id"), nullable=False, index=True)
+    cv_document_id = Column(Integer, ForeignKey("cv_documents.id", ondelete="CASCADE"), nullable=False, index=True)
 
     # Type d'événement
-    event_type = Column(String, nullable=False, index=True)  # "view", "download", "share"
+    event_type = Column(String, nullable=False)  # "view", "download", "share"
 
     # Informations de l'événement
     ip_address = Column(String, nullable=True)  # IP du visiteur (anonymisée)
@@ -542,11 +569,33 @@ class CVAnalytics(Base):
     city = Column(String, nullable=True)
 
     # Timestamp
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     # Relations
     cv_document = relationship("CVDocument", back_populates="analytics")
 
+    __table_args__ = (
+        Index("ix_cv_analytics_document_event_date", "cv_document_id", "event_type", created_at.desc()),
+    )
+
+
+class CVAnalyticsDaily(Base):
+    """
+    Rollup quotidien des analytics de CV
+
+    Une ligne par (jour, CV, type d'événement, pays), incrémentée à chaque
+    écriture par lots de cv_analytics. Les statistiques du propriétaire sont
+    lues ici ; les événements bruts ne sont gardés que pendant la rétention.
+    """
+    __tablename__ = "cv_analytics_daily"
+
+    # Clé primaire (CV, jour, ...) : sert aussi les lectures par CV et période
+    cv_document_id = Column(Integer, ForeignKey("cv_documents.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    event_type = Column(String(20), primary_key=True)
+    country = Column(String(100), primary_key=True, default="")  # "" : pays inconnu
+    count = Column(Integer, nullable=False, default=0)
+
 
 # ========================================
 # 🆕 PHASE 2 - ATS FEATURES (Feb 2026)
@@ -595,6 +644,79 @@ class EmailTemplate(Base):
     created_by = relationship("User")
 
 
+class EmailOutboxStatus(enum.Enum):
+    """État d'un email de l'outbox"""
+    PENDING = "pending"  # En attente d'envoi (ou de nouvelle tentative)
+    SENT = "sent"  # Accepté par Resend
+    FAILED = "failed"  # Abandonné (rejeté ou tentatives épuisées)
+
+
+class EmailOutbox(Base):
+    """
+    Outbox transactionnelle des emails : écrite dans la même transaction que le
+    changement métier, vidée par le worker app/services/email_outbox.py
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html = Column(Text, nullable=False)
+    template_id = Column(Integer, ForeignKey("email_templates.id", ondelete="SET NULL"), nullable=True)
+    campaign_id = Column(Integer, ForeignKey("email_campaigns.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    # Clé de déduplication (ex: "application:42:received") : un seul email par clé
+    dedup_key = Column(String(200), nullable=True, unique=True)
+
+    status = Column(
+        SQLEnum(EmailOutboxStatus, native_enum=False, values_callable=lambda x: [e.value for e in x]),
+        nullable=False, default=EmailOutboxStatus.PENDING,
+    )
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    provider_message_id = Column(String, nullable=True)  # ID Resend
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class EmailCampaignStatus(enum.Enum):
+    """État d'une campagne d'emails groupés"""
+    SENDING = "sending"  # Emails en file dans l'outbox
+    COMPLETED = "completed"  # Tous les emails envoyés ou abandonnés
+
+
+class EmailCampaign(Base):
+    """Envoi groupé d'un template aux candidats d'une offre (par statut de candidature)"""
+    __tablename__ = "email_campaigns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    template_id = Column(Integer, ForeignKey("email_templates.id", ondelete="SET NULL"), nullable=True)
+    created_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    # Statut de candidature ciblé (ex: "rejected", "shortlisted")
+    application_status = Column(String(20), nullable=False)
+
+    status = Column(
+        SQLEnum(EmailCampaignStatus, native_enum=False, values_callable=lambda x: [e.value for e in x]),
+        nullable=False, default=EmailCampaignStatus.SENDING,
+    )
+    # Progression (mise à jour par le worker de l'outbox)
+    total_recipients = Column(Integer, nullable=False, default=0)
+    sent_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Relations
+    job = relationship("Job")
+    template = relationship("EmailTemplate")
+
+
 class JobAlertFrequency(enum.Enum):
     """Fréquence d'envoi des alertes emploi"""
     INSTANT = "instant"  # Dès qu'un nouveau job correspond
@@ -800,3 +922,112 @@ class IntegrationCredential(Base):
     company = relationship("Company")
     user = relationship("User")
 
+
+
+class PlatformStat(Base):
+    """
+    Statistiques plateforme pré-agrégées (rollup)
+
+    Une ligne par (métrique, dimension), ex: ("users_by_role", "candidate") ou
+    ("applications", ""). Reconstruite périodiquement par
+    app/services/platform_stats.py ; les endpoints de statistiques ne lisent
+    que cette table.
+    """
+    __tablename__ = "platform_stats"
+
+    metric = Column(String(50), primary_key=True)
+    dimension = Column(String(100), primary_key=True, default="")
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class ApplicationDailyStat(Base):
+    """
+    Rollup quotidien des candidatures par offre (et employeur)
+
+    Une ligne par (jour, offre, métrique, dimension), maintenue par deltas dans
+    la transaction de chaque écriture (app/services/application_stats.py) :
+    - received / "" : candidatures reçues ce jour
+    - source / source_ref : candidatures reçues par canal
+    - status / statut : variation nette du nombre de candidatures dans ce statut
+      (la somme sur tous les jours donne la répartition actuelle)
+    - interview / "" : passages en entretien, total_seconds = délais cumulés
+      depuis la candidature
+    """
+    __tablename__ = "application_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    metric = Column(String(20), primary_key=True)
+    dimension = Column(String(100), primary_key=True, default="")
+    employer_id = Column(Integer, ForeignKey("employers.id", ondelete="CASCADE"), nullable=False, index=True)
+    count = Column(Integer, nullable=False, default=0)
+    total_seconds = Column(Float, nullable=False, default=0)
+
+
+class ApplicationStatusEvent(Base):
+    """
+    Journal append-only des statuts des candidatures
+
+    Une ligne par transition (from_status NULL pour la candidature initiale),
+    écrite dans la transaction du changement de statut et jamais modifiée :
+    les durées par étape et l'entonnoir dans le temps se calculent par
+    fonctions de fenêtre sur l'index (job_id, occurred_at), sans dépendre de
+    updated_at.
+    """
+    __tablename__ = "application_status_events"
+    __table_args__ = (
+        Index("ix_application_status_events_job_occurred", "job_id", "occurred_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    application_id = Column(Integer, ForeignKey("job_applications.id", ondelete="CASCADE"), nullable=False, index=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False)
+    employer_id = Column(Integer, ForeignKey("employers.id", ondelete="CASCADE"), nullable=False)
+    from_status = Column(String(20), nullable=True)
+    to_status = Column(String(20), nullable=False)
+    actor_user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    occurred_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class ReportJobStatus(enum.Enum):
+    """État d'une génération de rapport asynchrone"""
+    PENDING = "pending"  # En file
+    RUNNING = "running"  # En cours de génération
+    COMPLETED = "completed"  # PDF disponible jusqu'à expires_at
+    FAILED = "failed"  # Génération impossible (voir error)
+    EXPIRED = "expired"  # Fichier supprimé après expiration
+
+
+class ReportJob(Base):
+    """
+    Rapport PDF généré en arrière-plan (POST /api/reports/{kind}) par le
+    worker app/services/report_jobs.py ; le fichier est conservé sur disque
+    jusqu'à expires_at
+    """
+    __tablename__ = "report_jobs"
+    __table_args__ = (
+        # Un seul rapport en file ou en cours par (utilisateur, type), même
+        # pour des demandes simultanées (double clic)
+        Index(
+            "uq_report_jobs_active_kind", "user_id", "kind", unique=True,
+            postgresql_where=text("status IN ('pending', 'running')"),
+            sqlite_where=text("status IN ('pending', 'running')"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String(20), nullable=False)  # candidate, employer, admin
+    status = Column(
+        SQLEnum(ReportJobStatus, native_enum=False, values_callable=lambda x: [e.value for e in x]),
+        nullable=False, default=ReportJobStatus.PENDING,
+    )
+    file_path = Column(String, nullable=True)  # Nom du fichier sous REPORTS_STORAGE_DIR (volume partagé)
+    size_bytes = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)  # Message affichable ; le détail technique est journalisé
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
@@ -5,6 +5,7 @@ This module sets up Prometheus metrics collection for:
 - HTTP request metrics (latency, status codes, throughput)
 - Database connection pool metrics
 - Custom business metrics (jobs created, applications submitted)
+- AI metrics (Anthropic latency, tokens, errors, retries, spend per company)
 - System resource metrics
 """
 
@@ -124,6 +125,40 @@ db_pool_overflow = Gauge(
 )
 
 
+# AI (Anthropic) metrics
+ai_request_duration_seconds = Histogram(
+    'intowork_ai_request_duration_seconds',
+    'Duration of Anthropic API calls in seconds (retries included)',
+    ['operation', 'model', 'status'],  # status: success, error
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 45.0, 60.0, 120.0)
+)
+
+ai_tokens = Histogram(
+    'intowork_ai_tokens',
+    'Tokens consumed per Anthropic API call',
+    ['operation', 'model', 'direction'],  # direction: input, output
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+)
+
+ai_errors_total = Counter(
+    'intowork_ai_errors_total',
+    'Total number of failed Anthropic API calls',
+    ['operation', 'error_type']
+)
+
+ai_retries_total = Counter(
+    'intowork_ai_retries_total',
+    'Total number of retried Anthropic API calls',
+    ['operation', 'error_type']
+)
+
+ai_company_tokens_spent = Gauge(
+    'intowork_ai_company_tokens_spent',
+    'Tokens spent on AI features per company since process start',
+    ['company_id', 'direction']
+)
+
+
 # ==================== Instrumentator Setup ====================
 
 def setup_monitoring(app: FastAPI):
@@ -233,6 +268,28 @@ def track_cache_miss(cache_key_prefix: str):
     cache_misses_total.labels(cache_key_prefix=cache_key_prefix).inc()
 
 
+def track_ai_call(operation: str, model: str, duration: float, error_type: str = None):
+    """Track an Anthropic API call (latency, and error type on failure)"""
+    status = "error" if error_type else "success"
+    ai_request_duration_seconds.labels(operation=operation, model=model, status=status).observe(duration)
+    if error_type:
+        ai_errors_total.labels(operation=operation, error_type=error_type).inc()
+
+
+def track_ai_retry(operation: str, error_type: str):
+    """Track a retried Anthropic API call"""
+    ai_retries_total.labels(operation=operation, error_type=error_type).inc()
+
+
+def track_ai_tokens(operation: str, model: str, input_tokens: int, output_tokens: int, company_id: int = None):
+    """Track tokens consumed by an Anthropic API call, per company when known"""
+    ai_tokens.labels(operation=operation, model=model, direction="input").observe(input_tokens)
+    ai_tokens.labels(operation=operation, model=model, direction="output").observe(output_tokens)
+    if company_id is not None:
+        ai_company_tokens_spent.labels(company_id=str(company_id), direction="input").inc(input_tokens)
+        ai_company_tokens_spent.labels(company_id=str(company_id), direction="output").inc(output_tokens)
+
+
 class MetricsTimer:
     """Context manager for timing operations"""
 
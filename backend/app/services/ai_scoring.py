@@ -5,9 +5,11 @@ Utilise Anthropic Claude pour analyser la compatibilité candidat-offre
 import os
 import json
 from typing import Dict, List, Optional
-from anthropic import Anthropic, AsyncAnthropic
+from anthropic import Anthropic
 from dotenv import load_dotenv
 
+from app.services.ai_telemetry import InstrumentedAsyncAnthropic
+
 load_dotenv()
 
 # Client synchrone pour les fonctions utilitaires de conversation
@@ -45,7 +47,7 @@ class AIEvaluationService:
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY n'est pas définie dans les variables d'environnement")
 
-        self.client = AsyncAnthropic(api_key=self.api_key)
+        self.client = InstrumentedAsyncAnthropic(api_key=self.api_key)
         self.model = "claude-sonnet-4-6"
     
     async def score_candidate(
@@ -57,9 +59,12 @@ class AIEvaluationService:
         candidate_cv_text: str,
         candidate_experience: Optional[str] = None,
         candidate_skills: Optional[str] = None,
+        company_id: Optional[int] = None,
     ) -> Dict:
         """
         Analyse la compatibilité entre un candidat et une offre d'emploi
+
+        company_id: entreprise à laquelle imputer les tokens consommés
         
         Returns:
             Dict avec:
@@ -83,6 +88,8 @@ class AIEvaluationService:
         
         try:
             message = await self.client.messages.create(
+                operation="score_candidate",
+                company_id=company_id,
                 model=self.model,
                 max_tokens=2000,
                 temperature=0.3,
@@ -0,0 +1,118 @@
+"""
+Télémétrie des appels Anthropic
+
+Enveloppe le client AsyncAnthropic pour exporter, à chaque appel
+messages.create, les métriques Prometheus définies dans app.monitoring :
+- Latence par opération / modèle / statut
+- Tokens d'entrée et de sortie
+- Erreurs par type d'exception
+- Tentatives de retry (gérées ici plutôt que par le SDK pour être comptées)
+- Tokens dépensés par entreprise
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Optional
+
+import anthropic
+from app.monitoring import track_ai_call, track_ai_retry, track_ai_tokens
+
+logger = logging.getLogger(__name__)
+
+
+# Configuration
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+AI_RETRY_BASE_DELAY_SECONDS = float(os.getenv("AI_RETRY_BASE_DELAY_SECONDS", "0.5"))
+AI_RETRY_MAX_DELAY_SECONDS = 8.0
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Erreurs transitoires : réseau, timeout, 429, 5xx (dont 529 overloaded)."""
+    if isinstance(error, (anthropic.APIConnectionError, anthropic.RateLimitError)):
+        return True
+    return isinstance(error, anthropic.APIStatusError) and error.status_code >= 500
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Délai avant la tentative suivante : Retry-After si fourni, sinon backoff exponentiel avec jitter."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), AI_RETRY_MAX_DELAY_SECONDS)
+    except ValueError:
+        pass
+    delay = AI_RETRY_BASE_DELAY_SECONDS * (2**attempt)
+    return min(delay, AI_RETRY_MAX_DELAY_SECONDS) * random.uniform(0.8, 1.2)
+
+
+class InstrumentedMessages:
+    """Équivalent instrumenté de client.messages."""
+
+    def __init__(self, messages, max_retries: int = AI_MAX_RETRIES):
+        self._messages = messages
+        self._max_retries = max_retries
+
+    async def create(
+        self, *, operation: str = "unknown", company_id: Optional[int] = None, **kwargs
+    ):
+        """
+        Appelle messages.create en enregistrant latence, tokens, erreurs et retries.
+
+        Args:
+            operation: Fonctionnalité appelante (label Prometheus)
+            company_id: Entreprise à laquelle imputer les tokens (optionnel)
+            **kwargs: Paramètres transmis tels quels à messages.create
+        """
+        model = kwargs.get("model", "unknown")
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                message = await self._messages.create(**kwargs)
+                break
+            except Exception as e:
+                error_type = type(e).__name__
+                if attempt < self._max_retries and _is_retryable(e):
+                    track_ai_retry(operation, error_type)
+                    delay = _retry_delay(e, attempt)
+                    logger.warning(
+                        f"AI call '{operation}' failed ({error_type}), retry {attempt + 1}/{self._max_retries} in {delay:.1f}s"
+                    )
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                    continue
+                track_ai_call(
+                    operation, model, time.perf_counter() - start, error_type=error_type
+                )
+                raise
+
+        track_ai_call(operation, model, time.perf_counter() - start)
+        usage = getattr(message, "usage", None)
+        if usage is not None:
+            track_ai_tokens(
+                operation,
+                model,
+                input_tokens=usage.input_tokens or 0,
+                output_tokens=usage.output_tokens or 0,
+                company_id=company_id,
+            )
+        return message
+
+
+class InstrumentedAsyncAnthropic:
+    """
+    Client AsyncAnthropic instrumenté.
+
+    Les retries du SDK sont désactivés : ils sont réalisés par
+    InstrumentedMessages afin d'être visibles dans les métriques.
+    """
+
+    def __init__(self, api_key: str, max_retries: int = AI_MAX_RETRIES):
+        self._client = anthropic.AsyncAnthropic(api_key=api_key, max_retries=0)
+        self.messages = InstrumentedMessages(
+            self._client.messages, max_retries=max_retries
+        )
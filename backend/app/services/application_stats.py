@@ -0,0 +1,372 @@
+"""
+Rollup quotidien des candidatures (table application_daily_stats)
+
+Chaque écriture sur une candidature (création, changement de statut, retrait,
+suppression de compte) applique ses deltas au rollup dans la même
+transaction, par INSERT ... ON CONFLICT DO UPDATE (count = count + delta).
+Le dashboard employeur et l'entonnoir de recrutement ne lisent que ce rollup :
+leur coût dépend du nombre d'offres et de jours, pas du nombre de
+candidatures.
+
+Les créations et changements de statut sont aussi journalisés dans
+application_status_events (append-only) : durées par étape et entonnoir dans
+le temps sont calculés par fonctions de fenêtre sur l'index
+(job_id, occurred_at), bornés à une période.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.models.base import (
+    ApplicationDailyStat,
+    ApplicationStatus,
+    ApplicationStatusEvent,
+    Job,
+    JobApplication,
+    JobStatus,
+)
+from sqlalchemy import func
+from sqlalchemy import insert as sql_insert
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+# Métriques
+METRIC_RECEIVED = "received"
+METRIC_SOURCE = "source"
+METRIC_STATUS = "status"
+METRIC_INTERVIEW = "interview"
+
+# Canal des candidatures sans source_ref
+DIRECT_SOURCE = "direct"
+
+# Statuts comptés comme une réponse de l'employeur (taux de réponse)
+RESPONDED_STATUSES = (
+    ApplicationStatus.REJECTED.value,
+    ApplicationStatus.ACCEPTED.value,
+    ApplicationStatus.INTERVIEW.value,
+    ApplicationStatus.SHORTLISTED.value,
+    ApplicationStatus.VIEWED.value,
+)
+
+# (jour, offre, employeur, métrique, dimension)
+_Key = Tuple[date, int, int, str, str]
+
+
+class ApplicationStatsDelta:
+    """Deltas à appliquer au rollup, regroupés par ligne cible"""
+
+    def __init__(self):
+        self._counts: Dict[_Key, int] = defaultdict(int)
+        self._seconds: Dict[_Key, float] = defaultdict(float)
+
+    def add(
+        self,
+        day: date,
+        job_id: int,
+        employer_id: int,
+        metric: str,
+        dimension: str = "",
+        count: int = 1,
+        seconds: float = 0.0,
+    ) -> None:
+        key = (day, job_id, employer_id, metric, dimension)
+        self._counts[key] += count
+        self._seconds[key] += seconds
+
+    def rows(self) -> List[dict]:
+        rows = []
+        for key, count in self._counts.items():
+            seconds = self._seconds[key]
+            if not count and not seconds:
+                continue
+            day, job_id, employer_id, metric, dimension = key
+            rows.append(
+                {
+                    "day": day,
+                    "job_id": job_id,
+                    "employer_id": employer_id,
+                    "metric": metric,
+                    "dimension": dimension,
+                    "count": count,
+                    "total_seconds": seconds,
+                }
+            )
+        return rows
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+async def apply_application_stats(
+    db: AsyncSession, delta: ApplicationStatsDelta
+) -> None:
+    """Applique les deltas dans la transaction de l'appelant (un INSERT multi-lignes)."""
+    rows = delta.rows()
+    if not rows:
+        return
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(ApplicationDailyStat).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "job_id", "metric", "dimension"],
+        set_={
+            "count": ApplicationDailyStat.count + stmt.excluded.count,
+            "total_seconds": ApplicationDailyStat.total_seconds
+            + stmt.excluded.total_seconds,
+        },
+    )
+    await db.execute(stmt)
+
+
+async def _append_status_event(
+    db: AsyncSession,
+    application: JobApplication,
+    employer_id: int,
+    from_status: Optional[ApplicationStatus],
+    to_status: ApplicationStatus,
+    occurred_at: datetime,
+    actor_user_id: Optional[int],
+) -> None:
+    await db.execute(
+        sql_insert(ApplicationStatusEvent).values(
+            application_id=application.id,
+            job_id=application.job_id,
+            employer_id=employer_id,
+            from_status=from_status.value if from_status else None,
+            to_status=to_status.value,
+            actor_user_id=actor_user_id,
+            occurred_at=occurred_at,
+        )
+    )
+
+
+async def record_application_created(
+    db: AsyncSession,
+    application: JobApplication,
+    employer_id: int,
+    actor_user_id: Optional[int] = None,
+) -> None:
+    """Nouvelle candidature : reçue, canal et statut initial"""
+    applied_at = _as_utc(application.applied_at or datetime.now(timezone.utc))
+    day = applied_at.date()
+    delta = ApplicationStatsDelta()
+    delta.add(day, application.job_id, employer_id, METRIC_RECEIVED)
+    delta.add(
+        day,
+        application.job_id,
+        employer_id,
+        METRIC_SOURCE,
+        application.source_ref or DIRECT_SOURCE,
+    )
+    delta.add(
+        day, application.job_id, employer_id, METRIC_STATUS, application.status.value
+    )
+    await apply_application_stats(db, delta)
+    await _append_status_event(
+        db,
+        application,
+        employer_id,
+        None,
+        application.status,
+        applied_at,
+        actor_user_id,
+    )
+
+
+async def record_status_change(
+    db: AsyncSession,
+    application: JobApplication,
+    employer_id: int,
+    old_status: ApplicationStatus,
+    new_status: ApplicationStatus,
+    now: Optional[datetime] = None,
+    actor_user_id: Optional[int] = None,
+) -> None:
+    """Changement de statut : transfert d'un statut à l'autre, passage en entretien"""
+    if old_status == new_status:
+        return
+    now = now or datetime.now(timezone.utc)
+    day = now.date()
+    delta = ApplicationStatsDelta()
+    delta.add(
+        day, application.job_id, employer_id, METRIC_STATUS, old_status.value, count=-1
+    )
+    delta.add(day, application.job_id, employer_id, METRIC_STATUS, new_status.value)
+    if new_status == ApplicationStatus.INTERVIEW and application.applied_at:
+        seconds = max((now - _as_utc(application.applied_at)).total_seconds(), 0.0)
+        delta.add(
+            day, application.job_id, employer_id, METRIC_INTERVIEW, seconds=seconds
+        )
+    await apply_application_stats(db, delta)
+    await _append_status_event(
+        db, application, employer_id, old_status, new_status, now, actor_user_id
+    )
+
+
+async def record_applications_removed(db: AsyncSession, *criteria) -> None:
+    """
+    Candidatures sur le point d'être supprimées (retrait, suppression de compte)
+
+    À appeler avant le DELETE, avec les mêmes critères : les statuts retirés
+    sont comptés en une requête groupée.
+    """
+    result = await db.execute(
+        select(
+            JobApplication.job_id, Job.employer_id, JobApplication.status, func.count()
+        )
+        .join(Job, Job.id == JobApplication.job_id)
+        .filter(*criteria)
+        .group_by(JobApplication.job_id, Job.employer_id, JobApplication.status)
+    )
+    day = datetime.now(timezone.utc).date()
+    delta = ApplicationStatsDelta()
+    for job_id, employer_id, application_status, count in result.all():
+        delta.add(
+            day,
+            job_id,
+            employer_id,
+            METRIC_STATUS,
+            application_status.value,
+            count=-count,
+        )
+    await apply_application_stats(db, delta)
+
+
+# ── Lectures du rollup ───────────────────────────────────────────────────────
+
+
+def _status_count(*criteria):
+    return func.coalesce(
+        func.sum(ApplicationDailyStat.count).filter(
+            ApplicationDailyStat.metric == METRIC_STATUS, *criteria
+        ),
+        0,
+    )
+
+
+def employer_summary_query(employer_id: int):
+    """
+    Offres publiées, candidatures, entretiens et réponses d'un employeur, en une
+    requête sur le rollup (dashboard employeur et rapport PDF employeur).
+
+    Colonnes : total, interviews, responded, active_jobs.
+    """
+    return (
+        select(
+            _status_count().label("total"),
+            _status_count(
+                ApplicationDailyStat.dimension == ApplicationStatus.INTERVIEW.value
+            ).label("interviews"),
+            _status_count(ApplicationDailyStat.dimension.in_(RESPONDED_STATUSES)).label(
+                "responded"
+            ),
+            select(func.count())
+            .select_from(Job)
+            .filter(Job.employer_id == employer_id, Job.status == JobStatus.PUBLISHED)
+            .scalar_subquery()
+            .label("active_jobs"),
+        )
+        .select_from(ApplicationDailyStat)
+        .filter(ApplicationDailyStat.employer_id == employer_id)
+    )
+
+
+def applications_per_job_query(employer_id: int):
+    """Sous-requête (job_id, applications) : candidatures actuelles de chaque offre, lues dans le rollup."""
+    return (
+        select(ApplicationDailyStat.job_id, _status_count().label("applications"))
+        .filter(ApplicationDailyStat.employer_id == employer_id)
+        .group_by(ApplicationDailyStat.job_id)
+        .subquery()
+    )
+
+
+def response_rate(total: int, responded: int) -> int:
+    """Taux de réponse en pourcentage entier."""
+    return round((responded / total) * 100) if total else 0
+
+
+# ── Analytics sur le journal des statuts ─────────────────────────────────────
+
+
+def _seconds_between(db: AsyncSession, start, end):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", end - start)
+    return (func.julianday(end) - func.julianday(start)) * 86400
+
+
+def _employer_job_ids(employer_id: int):
+    return select(Job.id).where(Job.employer_id == employer_id).scalar_subquery()
+
+
+async def get_stage_durations(
+    db: AsyncSession, employer_id: int, since: datetime
+) -> Dict[str, Tuple[float, int]]:
+    """
+    Temps moyen passé dans chaque statut par les candidatures de l'employeur
+
+    LEAD(occurred_at) sur le journal donne la sortie de chaque étape ; seules
+    les étapes entrées et quittées depuis `since` comptent. Retourne
+    {statut: (secondes moyennes, nombre d'étapes)}.
+    """
+    stages = (
+        select(
+            ApplicationStatusEvent.to_status.label("stage"),
+            ApplicationStatusEvent.occurred_at.label("entered_at"),
+            func.lead(ApplicationStatusEvent.occurred_at)
+            .over(
+                partition_by=ApplicationStatusEvent.application_id,
+                order_by=(
+                    ApplicationStatusEvent.occurred_at,
+                    ApplicationStatusEvent.id,
+                ),
+            )
+            .label("left_at"),
+        )
+        .where(
+            ApplicationStatusEvent.job_id.in_(_employer_job_ids(employer_id)),
+            ApplicationStatusEvent.occurred_at >= since,
+        )
+        .subquery()
+    )
+    duration = _seconds_between(db, stages.c.entered_at, stages.c.left_at)
+    result = await db.execute(
+        select(stages.c.stage, func.avg(duration), func.count())
+        .where(stages.c.left_at.is_not(None))
+        .group_by(stages.c.stage)
+    )
+    return {
+        stage: (float(avg_seconds or 0), count)
+        for stage, avg_seconds, count in result.all()
+    }
+
+
+async def get_status_timeline(
+    db: AsyncSession, employer_id: int, since: datetime
+) -> List[Tuple[date, str, int]]:
+    """Entrées dans chaque statut par jour depuis `since` : [(jour, statut, nombre)]"""
+    day = func.date(ApplicationStatusEvent.occurred_at)
+    result = await db.execute(
+        select(day.label("day"), ApplicationStatusEvent.to_status, func.count())
+        .where(
+            ApplicationStatusEvent.job_id.in_(_employer_job_ids(employer_id)),
+            ApplicationStatusEvent.occurred_at >= since,
+        )
+        .group_by(day, ApplicationStatusEvent.to_status)
+        .order_by(day, ApplicationStatusEvent.to_status)
+    )
+    return [
+        (
+            date.fromisoformat(row_day) if isinstance(row_day, str) else row_day,
+            stage,
+            count,
+        )
+        for row_day, stage, count in result.all()
+    ]
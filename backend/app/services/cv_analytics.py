@@ -0,0 +1,299 @@
+"""
+Ingestion des analytics du CV Builder — IntoWork
+
+Les vues des CV publics (GET /public/{slug}, POST /track-view/{slug}) et les
+téléchargements PDF ne déclenchent pas de transaction par événement : chaque
+événement est ajouté à un tampon en mémoire du processus, vidé toutes les
+CV_ANALYTICS_FLUSH_SECONDS (ou dès CV_ANALYTICS_FLUSH_BATCH événements) dans
+une seule transaction :
+- INSERT multi-lignes dans cv_analytics (partitionnée par mois)
+- upsert du rollup cv_analytics_daily (CV, jour, type, pays)
+- UPDATE agrégés de cv_documents.views_count / downloads_count
+Le rollup et les compteurs sont écrits par instructions de 1000 lignes (ou
+CV) au plus, dans la même transaction.
+
+Les événements pas encore écrits sont ajoutés aux compteurs renvoyés par
+l'API (pending_views, pending_downloads), de sorte qu'ils restent exacts.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.database import AsyncSessionLocal
+from app.models.base import CVAnalytics, CVAnalyticsDaily, CVDocument
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CV_ANALYTICS_FLUSH_ENABLED = (
+    os.getenv("CV_ANALYTICS_FLUSH_ENABLED", "true").lower() == "true"
+)
+CV_ANALYTICS_FLUSH_SECONDS = float(os.getenv("CV_ANALYTICS_FLUSH_SECONDS", "5"))
+CV_ANALYTICS_FLUSH_BATCH = int(os.getenv("CV_ANALYTICS_FLUSH_BATCH", "1000"))
+CV_ANALYTICS_BUFFER_MAX = int(os.getenv("CV_ANALYTICS_BUFFER_MAX", "50000"))
+
+EVENT_VIEW = "view"
+EVENT_DOWNLOAD = "download"
+
+# Lignes (ou CV) par instruction du rollup et des compteurs : reste loin de la
+# limite de 32767 paramètres par requête d'asyncpg
+_STATEMENT_ROWS = 1000
+
+# Compteur de cv_documents alimenté par chaque type d'événement
+_COUNTER_COLUMNS = {EVENT_VIEW: "views_count", EVENT_DOWNLOAD: "downloads_count"}
+
+# Événements en attente d'écriture et compteurs à ajouter par (CV, type)
+_events: List[dict] = []
+_pending: Dict[Tuple[int, str], int] = {}
+# Compteurs en cours d'écriture (flush non encore validé)
+_flushing: Dict[Tuple[int, str], int] = {}
+
+
+def _record(cv_document_id: int, event_type: str, **fields) -> None:
+    key = (cv_document_id, event_type)
+    _pending[key] = _pending.get(key, 0) + 1
+    if len(_events) >= CV_ANALYTICS_BUFFER_MAX:
+        # Base indisponible trop longtemps : le compteur reste exact, le détail est perdu
+        logger.warning(f"CV analytics buffer full, dropping {event_type} event")
+        return
+    _events.append(
+        {
+            "cv_document_id": cv_document_id,
+            "event_type": event_type,
+            "ip_address": fields.get("ip_address"),
+            "user_agent": fields.get("user_agent"),
+            "referrer": fields.get("referrer"),
+            "country": fields.get("country"),
+            "created_at": datetime.now(timezone.utc),
+        }
+    )
+    if len(_events) >= CV_ANALYTICS_FLUSH_BATCH:
+        wake_cv_analytics_flusher()
+
+
+def record_cv_view(
+    cv_document_id: int,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    referrer: Optional[str] = None,
+    country: Optional[str] = None,
+) -> None:
+    """Ajoute une vue au tampon (aucune écriture en base)."""
+    _record(
+        cv_document_id,
+        EVENT_VIEW,
+        ip_address=ip_address,
+        user_agent=user_agent,
+        referrer=referrer,
+        country=country,
+    )
+
+
+def record_cv_download(cv_document_id: int) -> None:
+    """Ajoute un téléchargement PDF au tampon (aucune écriture en base)."""
+    _record(cv_document_id, EVENT_DOWNLOAD)
+
+
+def _pending_count(cv_document_id: int, event_type: str) -> int:
+    key = (cv_document_id, event_type)
+    return _pending.get(key, 0) + _flushing.get(key, 0)
+
+
+def pending_views(cv_document_id: int) -> int:
+    """Vues enregistrées par ce processus mais pas encore écrites en base."""
+    return _pending_count(cv_document_id, EVENT_VIEW)
+
+
+def pending_downloads(cv_document_id: int) -> int:
+    """Téléchargements enregistrés par ce processus mais pas encore écrits en base."""
+    return _pending_count(cv_document_id, EVENT_DOWNLOAD)
+
+
+def _requeue(events: List[dict], counts: Dict[Tuple[int, str], int]) -> None:
+    _events[:0] = events[: max(0, CV_ANALYTICS_BUFFER_MAX - len(_events))]
+    for key, count in counts.items():
+        _pending[key] = _pending.get(key, 0) + count
+
+
+def daily_rollup_rows(events: List[dict]) -> List[dict]:
+    """Agrège des événements par (CV, jour UTC, type, pays)."""
+    counts: Dict[tuple, int] = {}
+    for event in events:
+        key = (
+            event["cv_document_id"],
+            event["created_at"].astimezone(timezone.utc).date(),
+            event["event_type"],
+            (event.get("country") or "")[:100],
+        )
+        counts[key] = counts.get(key, 0) + 1
+    return [
+        {
+            "cv_document_id": cv_document_id,
+            "day": day,
+            "event_type": event_type,
+            "country": country,
+            "count": count,
+        }
+        for (cv_document_id, day, event_type, country), count in counts.items()
+    ]
+
+
+async def _apply_daily_rollup(db: AsyncSession, events: List[dict]) -> None:
+    rows = daily_rollup_rows(events)
+    insert_ = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    for start in range(0, len(rows), _STATEMENT_ROWS):
+        stmt = insert_(CVAnalyticsDaily).values(rows[start : start + _STATEMENT_ROWS])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["cv_document_id", "day", "event_type", "country"],
+            set_={"count": CVAnalyticsDaily.count + stmt.excluded.count},
+        )
+        await db.execute(stmt)
+
+
+async def _apply_counters(db: AsyncSession, counts: Dict[Tuple[int, str], int]) -> None:
+    cv_document_ids = sorted({cv_document_id for cv_document_id, _ in counts})
+    for start in range(0, len(cv_document_ids), _STATEMENT_ROWS):
+        chunk = cv_document_ids[start : start + _STATEMENT_ROWS]
+        values = {}
+        for event_type, column_name in _COUNTER_COLUMNS.items():
+            per_cv = {
+                cv_document_id: counts[(cv_document_id, event_type)]
+                for cv_document_id in chunk
+                if (cv_document_id, event_type) in counts
+            }
+            if per_cv:
+                column = getattr(CVDocument, column_name)
+                values[column_name] = func.coalesce(column, 0) + case(
+                    per_cv, value=CVDocument.id, else_=0
+                )
+        if not values:
+            continue
+        await db.execute(
+            update(CVDocument)
+            .where(CVDocument.id.in_(chunk))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def flush_cv_analytics(db: AsyncSession) -> int:
+    """
+    Écrit le tampon : événements bruts, rollup quotidien et compteurs, en une transaction.
+
+    En cas d'échec ou d'annulation, le tampon est restauré pour la prochaine
+    tentative.
+
+    Returns:
+        Nombre d'événements écrits
+    """
+    global _events, _pending, _flushing
+    if not _events and not _pending:
+        return 0
+    events, counts = _events, _pending
+    _events, _pending, _flushing = [], {}, counts
+
+    try:
+        # CV supprimés depuis l'événement : leurs événements sont abandonnés
+        cv_document_ids = sorted({cv_document_id for cv_document_id, _ in counts})
+        existing = set()
+        for start in range(0, len(cv_document_ids), _STATEMENT_ROWS):
+            existing.update(
+                (
+                    await db.scalars(
+                        select(CVDocument.id).where(
+                            CVDocument.id.in_(
+                                cv_document_ids[start : start + _STATEMENT_ROWS]
+                            )
+                        )
+                    )
+                ).all()
+            )
+        events = [event for event in events if event["cv_document_id"] in existing]
+        counts = {key: count for key, count in counts.items() if key[0] in existing}
+
+        if events:
+            await db.execute(insert(CVAnalytics), events)
+            await _apply_daily_rollup(db, events)
+        await _apply_counters(db, counts)
+        await db.commit()
+    except BaseException:
+        # Annulation comprise (arrêt de l'application) : le tampon est restauré
+        # avant tout autre await, pour que le vidage final le retrouve
+        _requeue(events, counts)
+        await db.rollback()
+        raise
+    finally:
+        _flushing = {}
+    return len(events)
+
+
+# ── Worker ──────────────────────────────────────────────────────────────────
+
+_flush_task: Optional[asyncio.Task] = None
+_wake_event: Optional[asyncio.Event] = None
+
+
+def wake_cv_analytics_flusher() -> None:
+    """Réveille le flusher sans attendre le prochain intervalle (tampon plein)."""
+    if _wake_event is not None:
+        _wake_event.set()
+
+
+async def _flush() -> None:
+    async with AsyncSessionLocal() as db:
+        await flush_cv_analytics(db)
+
+
+async def _flush_loop() -> None:
+    while True:
+        _wake_event.clear()
+        try:
+            await _flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                f"CV analytics flush failed: {type(e).__name__}: {e}", exc_info=True
+            )
+        try:
+            await asyncio.wait_for(
+                _wake_event.wait(), timeout=CV_ANALYTICS_FLUSH_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_cv_analytics_flusher() -> None:
+    """Démarre le vidage périodique du tampon (appelé au démarrage de l'application)."""
+    global _flush_task, _wake_event
+    if not CV_ANALYTICS_FLUSH_ENABLED or _flush_task is not None:
+        return
+    _wake_event = asyncio.Event()
+    _flush_task = asyncio.create_task(_flush_loop())
+    logger.info(f"CV analytics flusher started (every {CV_ANALYTICS_FLUSH_SECONDS}s)")
+
+
+async def stop_cv_analytics_flusher() -> None:
+    """Arrête le flusher et écrit les événements encore en tampon."""
+    global _flush_task, _wake_event
+    if _flush_task is None:
+        return
+    _flush_task.cancel()
+    try:
+        await _flush_task
+    except asyncio.CancelledError:
+        pass
+    _flush_task = None
+    _wake_event = None
+    try:
+        # Protégé de l'annulation de l'arrêt : les événements en tampon sont écrits
+        await asyncio.shield(_flush())
+    except Exception as e:
+        logger.error(f"Final CV analytics flush failed: {type(e).__name__}: {e}")
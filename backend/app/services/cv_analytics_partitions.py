@@ -0,0 +1,60 @@
+"""
+Maintenance des partitions mensuelles de cv_analytics
+
+La table cv_analytics est partitionnée par mois sur created_at (migration
+f3a4b5c6d7e8), comme notifications. Une tâche quotidienne (MonthlyPartitions) :
+- crée à l'avance les partitions des CV_ANALYTICS_PARTITIONS_AHEAD_MONTHS
+  prochains mois
+- supprime les partitions dont le mois entier est plus vieux que
+  CV_ANALYTICS_RETENTION_MONTHS : les statistiques restent disponibles dans
+  le rollup cv_analytics_daily, seuls les événements bruts disparaissent
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.services.monthly_partitions import RETENTION_DROP, MonthlyPartitions
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Configuration
+CV_ANALYTICS_PARTITION_MAINTENANCE_ENABLED = (
+    os.getenv("CV_ANALYTICS_PARTITION_MAINTENANCE_ENABLED", "true").lower() == "true"
+)
+CV_ANALYTICS_PARTITION_MAINTENANCE_SECONDS = float(
+    os.getenv("CV_ANALYTICS_PARTITION_MAINTENANCE_SECONDS", "86400")
+)
+CV_ANALYTICS_PARTITIONS_AHEAD_MONTHS = int(
+    os.getenv("CV_ANALYTICS_PARTITIONS_AHEAD_MONTHS", "3")
+)
+CV_ANALYTICS_RETENTION_MONTHS = int(os.getenv("CV_ANALYTICS_RETENTION_MONTHS", "6"))
+
+partitions = MonthlyPartitions(
+    "cv_analytics",
+    lock_id=0x43564150,
+    ahead_months=CV_ANALYTICS_PARTITIONS_AHEAD_MONTHS,
+    retention_months=CV_ANALYTICS_RETENTION_MONTHS,
+    retention_mode=RETENTION_DROP,
+)
+
+partition_name = partitions.partition_name
+partition_month = partitions.partition_month
+expired_partitions = partitions.expired_partitions
+
+
+async def run_cv_analytics_partition_maintenance(
+    db: AsyncSession, now: Optional[datetime] = None
+) -> Dict[str, List[str]]:
+    """Crée les partitions à venir et supprime celles hors rétention ; retourne les partitions traitées."""
+    return await partitions.run(db, now)
+
+
+def start_cv_analytics_partition_maintenance() -> None:
+    """Démarre la maintenance des partitions (appelé au démarrage de l'application)."""
+    if CV_ANALYTICS_PARTITION_MAINTENANCE_ENABLED:
+        partitions.start(CV_ANALYTICS_PARTITION_MAINTENANCE_SECONDS)
+
+
+async def stop_cv_analytics_partition_maintenance() -> None:
+    """Arrête la maintenance des partitions."""
+    await partitions.stop()
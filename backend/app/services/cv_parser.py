@@ -0,0 +1,180 @@
+"""
+Service d'extraction de texte des CV (PDF, DOCX, DOC)
+
+L'analyse des documents (pypdf, python-docx) est CPU-bound : elle est exécutée
+dans un ProcessPoolExecutor borné pour ne jamais bloquer la boucle asyncio.
+
+Features:
+- Pool de processus borné (CV_PARSER_WORKERS)
+- Timeout par document (CV_PARSER_TIMEOUT_SECONDS), pool recyclé au dépassement
+- Limite mémoire par worker (CV_PARSER_MEMORY_LIMIT_MB, Unix uniquement)
+- Workers lancés par spawn : un processus neuf (environ 85 Mo d'espace
+  d'adressage, dont 60 Mo de données), indépendant de la taille du processus
+  de l'application au moment où le pool est créé ou recyclé
+- Extraction PDF en une seule passe, page par page, arrêtée dès max_chars atteint
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator
+
+from app.services.process_pool import WorkerPool
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+
+    RESOURCE_AVAILABLE = True
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+    RESOURCE_AVAILABLE = False
+
+
+# Configuration
+CV_PARSER_WORKERS = int(os.getenv("CV_PARSER_WORKERS", "2"))
+CV_PARSER_TIMEOUT_SECONDS = float(os.getenv("CV_PARSER_TIMEOUT_SECONDS", "10"))
+CV_PARSER_MEMORY_LIMIT_MB = int(os.getenv("CV_PARSER_MEMORY_LIMIT_MB", "512"))
+CV_PARSER_MAX_PAGES = int(os.getenv("CV_PARSER_MAX_PAGES", "30"))
+CV_TEXT_MAX_CHARS = 8000
+
+
+# ── Fonctions exécutées dans les workers ────────────────────────────────────
+
+
+def _init_worker(memory_limit_mb: int) -> None:
+    """
+    Initialise un worker : plafonne le segment de données du processus.
+
+    RLIMIT_DATA (tas et mappings anonymes privés, noyau >= 4.7) plutôt que
+    RLIMIT_AS : les bibliothèques partagées et les piles de threads ne sont
+    pas comptées, la limite porte sur ce que l'analyse d'un document alloue.
+    Elle s'ajoute aux données du worker après import (environ 60 Mo).
+    """
+    if RESOURCE_AVAILABLE and memory_limit_mb > 0:
+        limit = memory_limit_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+        except (ValueError, OSError):
+            pass
+
+
+def iter_pdf_pages(
+    file_bytes: bytes, max_pages: int = CV_PARSER_MAX_PAGES
+) -> Iterator[str]:
+    """Itère sur le texte des pages d'un PDF, en extrayant chaque page une seule fois."""
+    import pypdf
+
+    reader = pypdf.PdfReader(io.BytesIO(file_bytes))
+    for index, page in enumerate(reader.pages):
+        if index >= max_pages:
+            break
+        text = page.extract_text()
+        if text:
+            yield text
+
+
+def _extract_pdf(file_bytes: bytes, max_chars: int) -> str:
+    """Concatène les pages jusqu'à atteindre max_chars (les pages suivantes ne sont pas lues)."""
+    pages_text = []
+    total = 0
+    for text in iter_pdf_pages(file_bytes):
+        pages_text.append(text)
+        total += len(text) + 1
+        if total >= max_chars:
+            break
+    return "\n".join(pages_text).strip()
+
+
+def _extract_docx(file_bytes: bytes, max_chars: int) -> str:
+    """Extrait les paragraphes non vides d'un DOCX jusqu'à max_chars."""
+    import docx
+
+    doc = docx.Document(io.BytesIO(file_bytes))
+    paragraphs = []
+    total = 0
+    for p in doc.paragraphs:
+        if not p.text.strip():
+            continue
+        paragraphs.append(p.text)
+        total += len(p.text) + 1
+        if total >= max_chars:
+            break
+    return "\n".join(paragraphs)
+
+
+def _extract_legacy_doc(file_bytes: bytes) -> str:
+    """DOC (OLE2) — extraction basique du texte brut."""
+    extracted = file_bytes.decode("latin-1", errors="ignore")
+    # Filtrer les caractères non imprimables
+    extracted = re.sub(r"[^\x20-\x7E\xA0-\xFF\n]", " ", extracted)
+    return re.sub(r" {3,}", " ", extracted).strip()
+
+
+def parse_document(file_bytes: bytes, max_chars: int = CV_TEXT_MAX_CHARS) -> str:
+    """
+    Extrait le texte d'un document CV (détection du format via magic bytes).
+
+    Fonction synchrone et picklable : exécutée dans un worker du pool.
+    """
+    if file_bytes.startswith(b"%PDF"):
+        extracted = _extract_pdf(file_bytes, max_chars)
+    elif file_bytes.startswith(b"PK\x03\x04"):
+        # DOCX ou ODT (format ZIP)
+        extracted = _extract_docx(file_bytes, max_chars)
+    else:
+        extracted = _extract_legacy_doc(file_bytes)
+    return extracted[:max_chars]
+
+
+# ── Gestion du pool ─────────────────────────────────────────────────────────
+
+_pool = WorkerPool(
+    "CV parser",
+    max_workers=CV_PARSER_WORKERS,
+    initializer=_init_worker,
+    initargs=(CV_PARSER_MEMORY_LIMIT_MB,),
+    # spawn plutôt que fork : la limite mémoire ne dépend pas de la taille du parent
+    mp_context=multiprocessing.get_context("spawn"),
+)
+
+
+def shutdown_cv_parser() -> None:
+    """Arrête le pool de parsing (appelé à l'arrêt de l'application)."""
+    _pool.shutdown()
+
+
+async def parse_cv_bytes(
+    file_bytes: bytes,
+    timeout: float = CV_PARSER_TIMEOUT_SECONDS,
+    max_chars: int = CV_TEXT_MAX_CHARS,
+) -> str:
+    """
+    Extrait le texte d'un CV hors de la boucle d'événements.
+
+    Returns:
+        Le texte extrait (max_chars caractères max), ou "" en cas d'échec / timeout
+    """
+    if not file_bytes:
+        return ""
+
+    try:
+        return await _pool.run(timeout, parse_document, file_bytes, max_chars)
+    except asyncio.TimeoutError:
+        # Le pool est recyclé : le worker bloqué sur ce document est terminé
+        logger.warning(
+            f"CV parsing timed out after {timeout}s ({len(file_bytes)} bytes)"
+        )
+        return ""
+    except BrokenProcessPool:
+        # Worker tué (limite mémoire dépassée, crash de la librairie, recyclage)
+        logger.warning(f"CV parser worker crashed ({len(file_bytes)} bytes)")
+        return ""
+    except Exception as e:
+        logger.warning(f"CV parsing failed: {type(e).__name__}")
+        return ""
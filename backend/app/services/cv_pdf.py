@@ -0,0 +1,189 @@
+"""
+Service de rendu PDF du CV Builder — IntoWork
+
+Le rendu WeasyPrint est CPU-bound : il est exécuté dans le pool de processus
+des rapports PDF (report_service.write_html_pdf, REPORT_RENDER_WORKERS
+workers préchauffés au démarrage), avec son propre délai.
+
+Les PDF sont stockés par adresse de contenu : le nom du fichier est l'empreinte
+SHA-256 des données du CV, du template et de CV_RENDERER_VERSION. Deux CV
+identiques partagent le même fichier, une modification produit un nouveau
+fichier, et un PDF présent sur disque n'est jamais périmé. Après chaque
+sauvegarde, le PDF est rendu en arrière-plan pour que le téléchargement soit
+servi directement depuis le disque.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app.services.process_pool import InflightCalls
+from app.services.report_service import WEASYPRINT_AVAILABLE, write_html_pdf
+
+logger = logging.getLogger(__name__)
+
+# Version du rendu HTML/PDF : à incrémenter à chaque modification des templates
+# de CV, pour que les PDF déjà stockés ne soient plus servis
+CV_RENDERER_VERSION = "2"
+
+# Configuration
+CV_PDF_TIMEOUT_SECONDS = float(os.getenv("CV_PDF_TIMEOUT_SECONDS", "30"))
+CV_PDF_STORAGE_DIR = Path(
+    os.getenv(
+        "CV_PDF_STORAGE_DIR",
+        str(Path(__file__).parent.parent.parent / "storage" / "cv_pdfs"),
+    )
+)
+
+
+class CVPDFRenderError(RuntimeError):
+    """Rendu PDF du CV impossible (WeasyPrint absent, worker tué, délai dépassé)."""
+
+
+# ── Adressage par contenu ───────────────────────────────────────────────────
+
+
+def cv_pdf_key(cv_data: dict, template: str) -> str:
+    """Empreinte SHA-256 des données du CV, du template et de la version du rendu."""
+    payload = json.dumps(
+        [CV_RENDERER_VERSION, template, cv_data],
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cv_pdf_path(key: str) -> Path:
+    return CV_PDF_STORAGE_DIR / f"{key}.pdf"
+
+
+def cached_cv_pdf(key: str) -> Optional[Path]:
+    """Chemin du PDF déjà rendu pour cette empreinte, None s'il n'existe pas."""
+    path = cv_pdf_path(key)
+    return path if path.is_file() else None
+
+
+def cv_content_hash(cv_data_json: str) -> str:
+    """Empreinte SHA-256 du JSON stocké (colonne indexée cv_documents.content_hash)."""
+    return hashlib.sha256(cv_data_json.encode("utf-8")).hexdigest()
+
+
+# Rendus en cours, partagés entre le pré-rendu et les téléchargements
+_inflight = InflightCalls()
+
+# Pré-rendus lancés en arrière-plan, par empreinte (références conservées
+# jusqu'à leur fin)
+_prerender_tasks: Dict[str, "asyncio.Task[None]"] = {}
+
+# Suppressions différées jusqu'à la fin d'un rendu
+_discard_tasks: Set["asyncio.Task[None]"] = set()
+
+
+def _unlink(key: str) -> None:
+    try:
+        cv_pdf_path(key).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _rendering(key: str) -> bool:
+    return key in _prerender_tasks or key in _inflight
+
+
+async def _discard_after_render(
+    key: str, still_used: Callable[[], Awaitable[bool]]
+) -> None:
+    prerender = _prerender_tasks.get(key)
+    if prerender is not None:
+        await asyncio.wait([prerender])
+    await _inflight.wait(key)
+    try:
+        if not await still_used():
+            _unlink(key)
+    except Exception:
+        logger.exception(f"CV PDF discard failed ({key[:12]})")
+
+
+def discard_cv_pdf(key: str, still_used: Callable[[], Awaitable[bool]]) -> None:
+    """
+    Supprime le PDF d'une empreinte qui n'est plus référencée par aucun CV.
+
+    Si un rendu de cette empreinte est en cours (sauvegardes rapprochées), la
+    suppression attend sa fin et still_used() est réévalué : sinon le rendu
+    écrirait ensuite un fichier que plus rien ne supprime.
+    """
+    if not _rendering(key):
+        _unlink(key)
+        return
+    task = asyncio.create_task(_discard_after_render(key, still_used))
+    _discard_tasks.add(task)
+    task.add_done_callback(_discard_tasks.discard)
+
+
+def shutdown_cv_pdf_renderer() -> None:
+    """Annule les pré-rendus et suppressions en cours (appelé à l'arrêt de l'application, avant le pool des rapports)."""
+    for task in [*_prerender_tasks.values(), *_discard_tasks]:
+        task.cancel()
+
+
+async def _render_in_pool(html_content: str, path: Path) -> None:
+    try:
+        await write_html_pdf(html_content, path, CV_PDF_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"CV PDF rendering timed out after {CV_PDF_TIMEOUT_SECONDS}s ({path.name})"
+        )
+        raise CVPDFRenderError("PDF generation took too long.")
+    except BrokenProcessPool:
+        logger.warning(f"CV PDF render worker crashed ({path.name})")
+        raise CVPDFRenderError("PDF generation failed.")
+
+
+async def render_cv_pdf(key: str, html_content: str) -> Path:
+    """
+    Retourne le PDF de l'empreinte key, en le rendant dans le pool s'il n'existe pas.
+
+    Les demandes simultanées pour une même empreinte partagent le même rendu.
+
+    Raises:
+        CVPDFRenderError: WeasyPrint indisponible, worker tué ou délai dépassé
+    """
+    cached = cached_cv_pdf(key)
+    if cached is not None:
+        return cached
+    if not WEASYPRINT_AVAILABLE:
+        raise CVPDFRenderError(
+            "PDF generation not available. Please install weasyprint."
+        )
+
+    path = cv_pdf_path(key)
+
+    async def render() -> Path:
+        await _render_in_pool(html_content, path)
+        return path
+
+    return await _inflight.run(key, render)
+
+
+async def _prerender(key: str, html_content: str) -> None:
+    try:
+        await render_cv_pdf(key, html_content)
+    except CVPDFRenderError as e:
+        logger.warning(f"CV PDF prerender failed ({key[:12]}): {e}")
+    except Exception:
+        logger.exception(f"CV PDF prerender failed ({key[:12]})")
+
+
+def schedule_cv_pdf_prerender(key: str, html_content: str) -> None:
+    """Lance le rendu du PDF en arrière-plan (après une sauvegarde du CV)."""
+    if not WEASYPRINT_AVAILABLE or cached_cv_pdf(key) is not None or _rendering(key):
+        return
+    task = asyncio.create_task(_prerender(key, html_content))
+    _prerender_tasks[key] = task
+    task.add_done_callback(lambda _: _prerender_tasks.pop(key, None))
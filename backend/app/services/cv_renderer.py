@@ -0,0 +1,52 @@
+"""
+Rendu HTML des CV du CV Builder — IntoWork
+
+Les templates (elegance, bold, minimal, creative, executive) sont des templates
+Jinja2 autoéchappés (app/templates/cv) qui étendent un base.html commun et n'en
+changent que la palette. Ils sont compilés une seule fois au démarrage dans un
+environnement partagé (rendu PDF, pages publiques) ; le bytecode compilé est
+conservé sur disque pour les autres processus et les redémarrages.
+"""
+
+import logging
+import os
+from pathlib import Path
+
+from app.models.base import CVTemplate
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates" / "cv"
+CV_TEMPLATES = tuple(template.value for template in CVTemplate)
+DEFAULT_CV_TEMPLATE = CVTemplate.ELEGANCE.value
+
+# Configuration (répertoire temporaire du système si vide)
+CV_TEMPLATES_BYTECODE_DIR = os.getenv("CV_TEMPLATES_BYTECODE_DIR", "")
+
+_jinja_env = Environment(
+    loader=FileSystemLoader(str(TEMPLATES_DIR)),
+    autoescape=True,
+    auto_reload=False,
+    bytecode_cache=FileSystemBytecodeCache(CV_TEMPLATES_BYTECODE_DIR or None),
+)
+
+
+def load_cv_templates() -> None:
+    """Compile tous les templates de CV (appelé au démarrage de l'application)."""
+    for template in CV_TEMPLATES:
+        _jinja_env.get_template(f"{template}.html")
+    logger.info(f"CV templates compiled ({len(CV_TEMPLATES)})")
+
+
+def render_cv_html(cv_data: dict, template: str) -> str:
+    """Rend le HTML d'un CV ; un template inconnu retombe sur elegance."""
+    if template not in CV_TEMPLATES:
+        template = DEFAULT_CV_TEMPLATE
+    return _jinja_env.get_template(f"{template}.html").render(
+        personal=cv_data.get("personalInfo") or {},
+        experiences=cv_data.get("experiences") or [],
+        educations=cv_data.get("educations") or [],
+        skills=cv_data.get("skills") or [],
+        languages=cv_data.get("languages") or [],
+    )
@@ -0,0 +1,456 @@
+"""
+Outbox transactionnelle des emails
+
+Les endpoints n'envoient plus d'email eux-mêmes : ils insèrent une ligne
+email_outbox dans la transaction du changement métier (rien n'est envoyé si la
+transaction est annulée, rien n'est perdu si elle est validée). Un worker en
+arrière-plan vide ensuite l'outbox.
+
+Features:
+- Aucun appel réseau dans le chemin HTTP
+- Déduplication : dedup_key unique (INSERT ... ON CONFLICT DO NOTHING) et clé
+  d'idempotence Resend par lot
+- Envoi par lots via l'API batch de Resend (EmailService.send_batch), débit
+  limité à EMAIL_OUTBOX_MAX_BATCHES_PER_SECOND appels
+- Campagnes (envois groupés) : mise en file en un INSERT multi-lignes et
+  compteurs de progression sent_count / failed_count
+- Compteur d'utilisation des templates (usage_count) incrémenté par le worker
+  après un envoi réussi, hors de la transaction métier de l'appelant
+- Nouvelles tentatives avec backoff exponentiel, abandon après
+  EMAIL_OUTBOX_MAX_ATTEMPTS
+- Plusieurs instances : verrouillage des lignes (FOR UPDATE SKIP LOCKED)
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from app.database import AsyncSessionLocal
+from app.models.base import (
+    EmailCampaign,
+    EmailCampaignStatus,
+    EmailOutbox,
+    EmailOutboxStatus,
+    EmailTemplate,
+    EmailTemplateType,
+)
+from app.services.email_service import RESEND_BATCH_SIZE, email_service
+from sqlalchemy import and_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+# Configuration
+EMAIL_OUTBOX_WORKER_ENABLED = (
+    os.getenv("EMAIL_OUTBOX_WORKER_ENABLED", "true").lower() == "true"
+)
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+EMAIL_OUTBOX_BATCH_SIZE = min(
+    int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "100")), RESEND_BATCH_SIZE
+)
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = float(
+    os.getenv("EMAIL_OUTBOX_RETRY_BASE_SECONDS", "30")
+)
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = float(
+    os.getenv("EMAIL_OUTBOX_RETRY_MAX_SECONDS", "3600")
+)
+# Limite de débit de Resend (2 requêtes/s par défaut)
+EMAIL_OUTBOX_MAX_BATCHES_PER_SECOND = float(
+    os.getenv("EMAIL_OUTBOX_MAX_BATCHES_PER_SECOND", "2")
+)
+# Lignes par INSERT multi-lignes (limite de paramètres par requête)
+EMAIL_OUTBOX_INSERT_CHUNK_SIZE = 1000
+
+
+# ── Mise en file (dans la transaction de l'appelant) ────────────────────────
+
+
+async def enqueue_email(
+    db: AsyncSession,
+    to_email: str,
+    subject: str,
+    html: str,
+    template_id: Optional[int] = None,
+    dedup_key: Optional[str] = None,
+) -> bool:
+    """
+    Ajoute un email à l'outbox sans valider la transaction.
+
+    Returns:
+        False si un email de même dedup_key existe déjà
+    """
+    queued = await enqueue_many(
+        db,
+        [
+            {
+                "to_email": to_email,
+                "subject": subject,
+                "html": html,
+                "template_id": template_id,
+                "dedup_key": dedup_key,
+            }
+        ],
+    )
+    return queued > 0
+
+
+async def enqueue_many(
+    db: AsyncSession, emails: List[dict], campaign_id: Optional[int] = None
+) -> int:
+    """
+    Ajoute des emails à l'outbox en INSERT multi-lignes, sans valider la transaction.
+
+    Args:
+        emails: {"to_email", "subject", "html", "template_id"?, "dedup_key"?} par email
+
+    Returns:
+        Nombre d'emails ajoutés (les dedup_key déjà présentes sont ignorées)
+    """
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "to_email": email["to_email"],
+            "subject": email["subject"],
+            "html": email["html"],
+            "template_id": email.get("template_id"),
+            "campaign_id": campaign_id,
+            "dedup_key": email.get("dedup_key"),
+            "status": EmailOutboxStatus.PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+        }
+        for email in emails
+    ]
+    queued = 0
+    for start in range(0, len(rows), EMAIL_OUTBOX_INSERT_CHUNK_SIZE):
+        result = await db.execute(
+            insert(EmailOutbox)
+            .values(rows[start : start + EMAIL_OUTBOX_INSERT_CHUNK_SIZE])
+            .on_conflict_do_nothing(index_elements=["dedup_key"])
+        )
+        queued += result.rowcount
+    return queued
+
+
+async def enqueue_template_email(
+    db: AsyncSession,
+    template: EmailTemplate,
+    to_email: str,
+    variables: dict,
+    dedup_key: Optional[str] = None,
+) -> bool:
+    """
+    Rend un EmailTemplate et l'ajoute à l'outbox.
+
+    Le compteur d'utilisation du template est incrémenté par le worker une fois
+    l'email envoyé : aucune ligne email_templates n'est verrouillée dans la
+    transaction de l'appelant.
+    """
+    subject, html = email_service.render_template(template, variables)
+    return await enqueue_email(
+        db, to_email, subject, html, template_id=template.id, dedup_key=dedup_key
+    )
+
+
+async def enqueue_default_template_email(
+    db: AsyncSession,
+    company_id: int,
+    template_type: EmailTemplateType,
+    to_email: str,
+    variables: dict,
+    dedup_key: Optional[str] = None,
+) -> bool:
+    """
+    Met en file l'email du template par défaut (actif) de l'entreprise pour ce type.
+
+    Returns:
+        False si l'entreprise n'a pas de template par défaut (ou email déjà en file)
+    """
+    result = await db.execute(
+        select(EmailTemplate)
+        .where(
+            EmailTemplate.company_id == company_id,
+            EmailTemplate.type == template_type,
+            EmailTemplate.is_default == True,
+            EmailTemplate.is_active == True,
+        )
+        .limit(1)
+    )
+    template = result.scalar_one_or_none()
+    if template is None:
+        logger.debug(
+            f"No default '{template_type.value}' template found for company {company_id}"
+        )
+        return False
+    return await enqueue_template_email(db, template, to_email, variables, dedup_key)
+
+
+# ── Envoi ───────────────────────────────────────────────────────────────────
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    """Backoff exponentiel : base × 2^(tentatives - 1), plafonné."""
+    return timedelta(
+        seconds=min(
+            EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+            EMAIL_OUTBOX_RETRY_MAX_SECONDS,
+        )
+    )
+
+
+def _idempotency_key(outbox_ids) -> str:
+    digest = hashlib.sha256(",".join(str(i) for i in outbox_ids).encode()).hexdigest()
+    return f"email-outbox-{digest[:48]}"
+
+
+async def deliver_pending_emails(
+    db: AsyncSession,
+    now: Optional[datetime] = None,
+    limit: int = EMAIL_OUTBOX_BATCH_SIZE,
+) -> Dict[str, int]:
+    """
+    Envoie un lot d'emails dus et met à jour leur état.
+
+    Returns:
+        {"claimed", "sent", "retried", "failed"}
+    """
+    stats = {"claimed": 0, "sent": 0, "retried": 0, "failed": 0}
+    if not email_service.enabled:
+        return stats
+    now = now or datetime.now(timezone.utc)
+
+    query = (
+        select(
+            EmailOutbox.id,
+            EmailOutbox.to_email,
+            EmailOutbox.subject,
+            EmailOutbox.html,
+            EmailOutbox.attempts,
+            EmailOutbox.campaign_id,
+            EmailOutbox.template_id,
+        )
+        .where(
+            EmailOutbox.status == EmailOutboxStatus.PENDING,
+            EmailOutbox.next_attempt_at <= now,
+        )
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(limit)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Les lignes restent verrouillées jusqu'au commit : une autre instance passe aux suivantes
+        query = query.with_for_update(skip_locked=True)
+    rows = (await db.execute(query)).all()
+    stats["claimed"] = len(rows)
+    if not rows:
+        await db.rollback()
+        return stats
+
+    messages = [
+        {"to": row.to_email, "subject": row.subject, "html": row.html} for row in rows
+    ]
+    try:
+        message_ids = await email_service.send_batch(
+            messages, idempotency_key=_idempotency_key(r.id for r in rows)
+        )
+        error = None
+    except Exception as e:
+        message_ids = [None] * len(rows)
+        error = f"{type(e).__name__}: {e}"
+        logger.warning(f"Email outbox batch of {len(rows)} failed: {error}")
+
+    updates = []
+    # Progression par campagne : {campaign_id: [envoyés, abandonnés]}
+    progress: Dict[int, List[int]] = {}
+    # Envois réussis par template (hors campagnes, comptées à leur création)
+    template_usage: Dict[int, int] = {}
+    for row, message_id in zip(rows, message_ids):
+        attempts = row.attempts + 1
+        final_status = None
+        if message_id is not None:
+            updates.append(
+                {
+                    "id": row.id,
+                    "status": EmailOutboxStatus.SENT,
+                    "attempts": attempts,
+                    "provider_message_id": message_id,
+                    "sent_at": now,
+                    "last_error": None,
+                }
+            )
+            stats["sent"] += 1
+            final_status = EmailOutboxStatus.SENT
+            if row.template_id is not None and row.campaign_id is None:
+                template_usage[row.template_id] = (
+                    template_usage.get(row.template_id, 0) + 1
+                )
+        elif error is None:
+            # Rejeté par Resend (adresse invalide…) : une nouvelle tentative échouerait aussi
+            updates.append(
+                {
+                    "id": row.id,
+                    "status": EmailOutboxStatus.FAILED,
+                    "attempts": attempts,
+                    "last_error": "Rejected by Resend",
+                }
+            )
+            stats["failed"] += 1
+            final_status = EmailOutboxStatus.FAILED
+        elif attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+            updates.append(
+                {
+                    "id": row.id,
+                    "status": EmailOutboxStatus.FAILED,
+                    "attempts": attempts,
+                    "last_error": error,
+                }
+            )
+            stats["failed"] += 1
+            final_status = EmailOutboxStatus.FAILED
+        else:
+            updates.append(
+                {
+                    "id": row.id,
+                    "attempts": attempts,
+                    "last_error": error,
+                    "next_attempt_at": now + _retry_delay(attempts),
+                }
+            )
+            stats["retried"] += 1
+        if final_status is not None and row.campaign_id is not None:
+            counts = progress.setdefault(row.campaign_id, [0, 0])
+            counts[0 if final_status == EmailOutboxStatus.SENT else 1] += 1
+
+    # UPDATE groupé par clé primaire (lignes hétérogènes : regroupées par jeu de colonnes)
+    by_columns: Dict[tuple, list] = {}
+    for values in updates:
+        by_columns.setdefault(tuple(sorted(values)), []).append(values)
+    for group in by_columns.values():
+        await db.execute(update(EmailOutbox), group)
+    if progress:
+        await _update_campaign_progress(db, progress, now)
+    if template_usage:
+        await _update_template_usage(db, template_usage, now)
+    await db.commit()
+
+    logger.info(f"Email outbox batch: {stats}")
+    return stats
+
+
+async def _update_campaign_progress(
+    db: AsyncSession, progress: Dict[int, List[int]], now: datetime
+) -> None:
+    """Incrémente les compteurs des campagnes et clôt celles dont tous les emails sont traités."""
+    for campaign_id, (sent, failed) in progress.items():
+        await db.execute(
+            update(EmailCampaign)
+            .where(EmailCampaign.id == campaign_id)
+            .values(
+                sent_count=EmailCampaign.sent_count + sent,
+                failed_count=EmailCampaign.failed_count + failed,
+            )
+        )
+    await db.execute(
+        update(EmailCampaign)
+        .where(
+            and_(
+                EmailCampaign.id.in_(list(progress)),
+                EmailCampaign.sent_count + EmailCampaign.failed_count
+                >= EmailCampaign.total_recipients,
+            )
+        )
+        .values(status=EmailCampaignStatus.COMPLETED, completed_at=now)
+    )
+
+
+async def _update_template_usage(
+    db: AsyncSession, template_usage: Dict[int, int], now: datetime
+) -> None:
+    """Incrémente usage_count des templates utilisés (ordre des ids : pas d'interblocage entre instances)."""
+    for template_id, count in sorted(template_usage.items()):
+        await db.execute(
+            update(EmailTemplate)
+            .where(EmailTemplate.id == template_id)
+            .values(usage_count=EmailTemplate.usage_count + count, last_used_at=now)
+        )
+
+
+# ── Worker ──────────────────────────────────────────────────────────────────
+
+_worker_task: Optional[asyncio.Task] = None
+_wake_event: Optional[asyncio.Event] = None
+
+
+def wake_email_outbox_worker() -> None:
+    """Réveille le worker sans attendre le prochain intervalle (à appeler après commit)."""
+    if _wake_event is not None:
+        _wake_event.set()
+
+
+async def _drain_outbox() -> None:
+    """Envoie les lots dus les uns après les autres, en respectant la limite de débit."""
+    min_interval = (
+        1 / EMAIL_OUTBOX_MAX_BATCHES_PER_SECOND
+        if EMAIL_OUTBOX_MAX_BATCHES_PER_SECOND > 0
+        else 0
+    )
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        async with AsyncSessionLocal() as db:
+            stats = await deliver_pending_emails(db)
+        if stats["claimed"] < EMAIL_OUTBOX_BATCH_SIZE:
+            return
+        await asyncio.sleep(max(0.0, min_interval - (loop.time() - started)))
+
+
+async def _worker_loop() -> None:
+    while True:
+        _wake_event.clear()
+        try:
+            await _drain_outbox()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                f"Email outbox delivery failed: {type(e).__name__}: {e}", exc_info=True
+            )
+        try:
+            await asyncio.wait_for(
+                _wake_event.wait(), timeout=EMAIL_OUTBOX_POLL_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_email_outbox_worker() -> None:
+    """Démarre le worker de l'outbox (appelé au démarrage de l'application)."""
+    global _worker_task, _wake_event
+    if not EMAIL_OUTBOX_WORKER_ENABLED or _worker_task is not None:
+        return
+    _wake_event = asyncio.Event()
+    _worker_task = asyncio.create_task(_worker_loop())
+    logger.info(
+        f"Email outbox worker started (poll every {EMAIL_OUTBOX_POLL_SECONDS}s)"
+    )
+
+
+async def stop_email_outbox_worker() -> None:
+    """Arrête le worker de l'outbox."""
+    global _worker_task, _wake_event
+    if _worker_task is None:
+        return
+    _worker_task.cancel()
+    try:
+        await _worker_task
+    except asyncio.CancelledError:
+        pass
+    _worker_task = None
+    _wake_event = None
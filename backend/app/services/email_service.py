@@ -4,8 +4,10 @@ Service d'envoi d'emails avec Resend
 import asyncio
 import os
 import logging
-from typing import Optional
-from datetime import datetime, timezone
+from html import escape
+from typing import List, Optional, Tuple
+
+from app.services.template_renderer import render_email_template
 
 # Configuration du logger
 logger = logging.getLogger(__name__)
@@ -23,6 +25,7 @@ except ImportError:
 RESEND_API_KEY = os.getenv("RESEND_API_KEY")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 FROM_EMAIL = os.getenv("FROM_EMAIL", "INTOWORK <noreply@intowork.com>")
+RESEND_BATCH_SIZE = 100  # Limite de l'API batch Resend
 
 
 class EmailService:
@@ -96,110 +99,64 @@ class EmailService:
             logger.error(f"   Exception type: {type(e).__name__}")
             return False
 
-    async def send_from_template(
-        self,
-        template_id: int,
-        to_email: str,
-        variables: dict,
-        db
-    ) -> bool:
+    def render_template(self, template, variables: dict) -> Tuple[str, str]:
         """
-        Envoyer un email en utilisant un template de la base de données
-        
+        Remplacer les variables {nom} dans le sujet et le corps d'un EmailTemplate
+
         Args:
-            template_id: ID du template EmailTemplate dans la base de données
-            to_email: Adresse email du destinataire
+            template: EmailTemplate (ou objet avec subject / body)
             variables: Dictionnaire des variables à remplacer, ex:
                 {
                     "candidate_name": "Jean Dupont",
                     "job_title": "Développeur Python",
                     "company_name": "ACME Corp",
-                    "interview_date": "15 mars 2026",
                     ...
                 }
-            db: Session de base de données (AsyncSession)
-        
+
         Returns:
-            True si l'email a été envoyé avec succès, False sinon
-            
-        Exemple:
-            await email_service.send_from_template(
-                template_id=5,
-                to_email="candidat@example.com",
-                variables={
-                    "candidate_name": "Marie Martin",
-                    "job_title": "Chef de Projet",
-                    "company_name": "TechCorp",
-                    "interview_date": "20 mars 2026",
-                    "interview_time": "14:00",
-                    "interview_location": "Siège social, Paris"
-                },
-                db=db
-            )
+            (sujet, corps HTML)
+
+        Le template compilé est mis en cache par (template_id, updated_at).
         """
-        if not self.enabled:
-            logger.error(f"❌ Cannot send email to {to_email}: Email service is DISABLED")
-            return False
-        
-        from sqlalchemy import select, update
-        from app.models.base import EmailTemplate
-        
-        try:
-            # Récupérer le template depuis la base de données
-            result = await db.execute(
-                select(EmailTemplate).where(EmailTemplate.id == template_id)
-            )
-            template = result.scalar_one_or_none()
-            
-            if not template:
-                logger.error(f"❌ Template {template_id} not found")
-                return False
-            
-            if not template.is_active:
-                logger.warning(f"⚠️ Template {template_id} is inactive but will be used")
-            
-            # Remplacer les variables dans le sujet et le corps
-            subject = template.subject
-            body = template.body
-            
-            for key, value in variables.items():
-                placeholder = f"{{{key}}}"
-                subject = subject.replace(placeholder, str(value))
-                body = body.replace(placeholder, str(value))
-            
-            # Envoyer l'email
-            params = {
-                "from": FROM_EMAIL,
-                "to": [to_email],
-                "subject": subject,
-                "html": body,
-            }
-            
-            logger.info(f"📧 Sending email from template '{template.name}' (ID: {template_id}) to {to_email}")
-            response = await asyncio.to_thread(resend.Emails.send, params)
-            
-            if response and 'id' in response:
-                # Incrémenter le compteur d'utilisation du template
-                await db.execute(
-                    update(EmailTemplate)
-                    .where(EmailTemplate.id == template_id)
-                    .values(
-                        usage_count=EmailTemplate.usage_count + 1,
-                        last_used_at=datetime.now(timezone.utc)
-                    )
-                )
-                await db.commit()
-                
-                logger.info(f"✅ Email sent successfully from template {template_id}. Resend ID: {response.get('id')}")
-                return True
+        return render_email_template(template, variables)
+
+    async def send_batch(self, messages: List[dict], idempotency_key: Optional[str] = None) -> List[Optional[str]]:
+        """
+        Envoyer jusqu'à RESEND_BATCH_SIZE emails en un appel à l'API batch de Resend
+
+        Args:
+            messages: {"to": email, "subject": ..., "html": ...} par email
+            idempotency_key: Clé d'idempotence Resend (un renvoi du même lot n'est pas dupliqué)
+
+        Returns:
+            L'ID Resend de chaque email, None si Resend l'a rejeté
+
+        Raises:
+            Exception: erreur réseau ou API (le lot entier est à retenter)
+        """
+        params = [
+            {"from": FROM_EMAIL, "to": [message["to"]], "subject": message["subject"], "html": message["html"]}
+            for message in messages
+        ]
+        options = {"batch_validation": "permissive"}
+        if idempotency_key:
+            options["idempotency_key"] = idempotency_key
+
+        response = await asyncio.to_thread(resend.Batch.send, params, options)
+
+        # Mode permissif : "data" contient les emails acceptés dans l'ordre, "errors" les index rejetés
+        rejected = {}
+        for error in (response or {}).get("errors") or []:
+            rejected[error.get("index")] = error.get("message")
+        accepted = iter((response or {}).get("data") or [])
+        results: List[Optional[str]] = []
+        for i in range(len(messages)):
+            if i in rejected:
+                logger.warning(f"⚠️ Resend rejected email to {messages[i]['to']}: {rejected[i]}")
+                results.append(None)
             else:
-                logger.error(f"❌ Resend API returned unexpected response: {response}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"❌ Failed to send email from template {template_id}: {str(e)}")
-            logger.error(f"   Exception type: {type(e).__name__}")
-            return False
+                results.append((next(accepted, None) or {}).get("id"))
+        return results
 
     async def send_welcome_credentials_email(
         self,
@@ -247,6 +204,95 @@ class EmailService:
             logger.error(f"❌ Failed to send welcome email to {email}: {str(e)}")
             return False
 
+    async def send_job_alert_digests(self, digests: List[dict]) -> List[bool]:
+        """
+        Envoyer les résumés d'alertes emploi via l'API batch de Resend
+
+        Args:
+            digests: Un dict par alerte :
+                {"email", "first_name", "alert_name", "jobs": [{"id", "title", "company_name", "location", "job_type"}]}
+
+        Returns:
+            Un booléen par résumé (True si accepté par Resend)
+        """
+        if not self.enabled:
+            logger.error(f"❌ Cannot send {len(digests)} job alert digests: Email service is DISABLED")
+            return [False] * len(digests)
+
+        results: List[bool] = []
+        for start in range(0, len(digests), RESEND_BATCH_SIZE):
+            chunk = digests[start:start + RESEND_BATCH_SIZE]
+            messages = [
+                {
+                    "to": digest["email"],
+                    "subject": f"{len(digest['jobs'])} nouvelle(s) offre(s) pour votre alerte « {digest['alert_name']} »",
+                    "html": self._get_job_alert_digest_template(
+                        first_name=digest.get("first_name") or "",
+                        alert_name=digest["alert_name"],
+                        jobs=digest["jobs"],
+                    ),
+                }
+                for digest in chunk
+            ]
+            try:
+                sent = [message_id is not None for message_id in await self.send_batch(messages)]
+                logger.info(f"📧 Job alert digests sent: {sum(sent)}/{len(chunk)}")
+                results.extend(sent)
+            except Exception as e:
+                logger.error(f"❌ Failed to send {len(chunk)} job alert digests: {type(e).__name__}: {e}")
+                results.extend([False] * len(chunk))
+        return results
+
+    def _get_job_alert_digest_template(self, first_name: str, alert_name: str, jobs: List[dict]) -> str:
+        """Template HTML du résumé d'une alerte emploi"""
+        job_items = "".join(
+            f"""
+            <div class="job">
+                <a href="{FRONTEND_URL}/offres/{job['id']}" class="job-title">{escape(job['title'])}</a>
+                <p>{escape(job.get('company_name') or '')} — {escape(job.get('location') or 'Non précisé')}</p>
+            </div>"""
+            for job in jobs
+        )
+        return f"""
+<!DOCTYPE html>
+<html lang="fr">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Nouvelles offres pour votre alerte</title>
+    <style>
+        body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Arial, sans-serif; background-color: #f5f5f5; padding: 20px; margin: 0; }}
+        .container {{ max-width: 600px; margin: 0 auto; background: #ffffff; border-radius: 16px; overflow: hidden; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }}
+        .header {{ background: linear-gradient(135deg, #6B9B5F 0%, #4a7a40 100%); padding: 32px 30px; text-align: center; color: white; }}
+        .header h1 {{ font-size: 24px; font-weight: 700; margin: 0; }}
+        .body {{ padding: 32px 30px; }}
+        .body > p {{ color: #374151; font-size: 15px; line-height: 1.6; margin: 0 0 16px; }}
+        .job {{ border: 1px solid #e5e7eb; border-radius: 10px; padding: 16px; margin: 0 0 12px; }}
+        .job-title {{ color: #4a7a40; font-weight: 700; font-size: 16px; text-decoration: none; }}
+        .job p {{ color: #6b7280; font-size: 13px; margin: 6px 0 0; }}
+        .footer {{ background: #f9fafb; padding: 24px 30px; text-align: center; border-top: 1px solid #e5e7eb; }}
+        .footer p {{ color: #9ca3af; font-size: 12px; margin: 0; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>Nouvelles offres pour « {escape(alert_name)} »</h1>
+        </div>
+        <div class="body">
+            <p>Bonjour <strong>{escape(first_name)}</strong>,</p>
+            <p>Voici les nouvelles offres correspondant à votre alerte emploi :</p>
+            {job_items}
+            <p><a href="{FRONTEND_URL}/dashboard/job-alerts">Gérer mes alertes</a></p>
+        </div>
+        <div class="footer">
+            <p>© 2026 INTOWORK — Plateforme de recrutement B2B2C</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
     def _get_welcome_credentials_template(
         self,
         first_name: str,
@@ -0,0 +1,491 @@
+"""
+Envoi des alertes emploi
+
+Tâche planifiée qui évalue les alertes dues et envoie un résumé par email des
+nouvelles offres correspondantes.
+
+Features:
+- Incrémental : seules les offres d'id > last_matching_job_id sont évaluées
+- Une seule requête pour charger la fenêtre d'offres nouvelles, partagée par
+  toutes les alertes du passage (pas de requête par alerte)
+- Chaque offre de la fenêtre est percolée dans l'index inversé des alertes
+  (app/services/job_alert_index.py) au lieu d'être comparée à chaque alerte
+- Alertes INSTANT déclenchées dès la publication d'une offre, sérialisées
+  avec le passage planifié (même verrou) pour ne jamais envoyer deux fois
+- Offre publiée modifiée : seules les alertes qu'elle satisfait désormais, et
+  pas dans sa version précédente, la reçoivent (même si leur curseur l'a dépassée)
+- Alertes parcourues par fréquence (INSTANT / DAILY / WEEKLY) et par lots
+- Emails envoyés via l'API batch de Resend (EmailService)
+- Compteurs mis à jour en masse (UPDATE groupés par lot)
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.database import AsyncSessionLocal, engine
+from app.models.base import (
+    Candidate,
+    Company,
+    Job,
+    JobAlert,
+    JobAlertFrequency,
+    JobStatus,
+    User,
+)
+from app.services.email_service import email_service
+from app.services.job_alert_index import (
+    IndexedJob,
+    job_alert_index,
+    job_matches_criteria,
+)
+from sqlalchemy import and_, func, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+# Configuration
+JOB_ALERTS_DISPATCHER_ENABLED = (
+    os.getenv("JOB_ALERTS_DISPATCHER_ENABLED", "true").lower() == "true"
+)
+JOB_ALERTS_DISPATCH_INTERVAL_SECONDS = int(
+    os.getenv("JOB_ALERTS_DISPATCH_INTERVAL_SECONDS", "300")
+)
+JOB_ALERTS_BATCH_SIZE = int(os.getenv("JOB_ALERTS_BATCH_SIZE", "500"))
+JOB_ALERTS_MAX_JOBS_PER_EMAIL = int(os.getenv("JOB_ALERTS_MAX_JOBS_PER_EMAIL", "10"))
+JOB_ALERTS_LOOKBACK_DAYS = int(os.getenv("JOB_ALERTS_LOOKBACK_DAYS", "30"))
+
+# Délai minimal entre deux envois selon la fréquence
+FREQUENCY_INTERVALS = {
+    JobAlertFrequency.INSTANT: None,
+    JobAlertFrequency.DAILY: timedelta(days=1),
+    JobAlertFrequency.WEEKLY: timedelta(days=7),
+}
+
+# Clé du verrou consultatif PostgreSQL (une seule instance dispatche à la fois)
+_DISPATCH_LOCK_KEY = 7_302_118
+
+
+def _due_clause(frequency: JobAlertFrequency, now: datetime):
+    """Alertes actives de cette fréquence dont le délai depuis le dernier envoi est écoulé."""
+    clause = and_(JobAlert.is_active == True, JobAlert.frequency == frequency)
+    interval = FREQUENCY_INTERVALS[frequency]
+    if interval is not None:
+        clause = and_(
+            clause,
+            or_(
+                JobAlert.last_sent_at.is_(None), JobAlert.last_sent_at <= now - interval
+            ),
+        )
+    return clause
+
+
+async def _load_job_window(
+    db: AsyncSession, after_id: int, up_to_id: int, now: datetime
+) -> List[IndexedJob]:
+    """Offres publiées d'id dans ]after_id, up_to_id], plus récentes en premier."""
+    result = await db.execute(
+        select(
+            Job.id,
+            Job.title,
+            Job.description,
+            Job.requirements,
+            Job.location,
+            Job.job_type,
+            Job.location_type,
+            Job.salary_min,
+            Job.salary_max,
+            Company.name.label("company_name"),
+        )
+        .outerjoin(Company, Job.company_id == Company.id)
+        .where(
+            Job.status == JobStatus.PUBLISHED,
+            Job.id > after_id,
+            Job.id <= up_to_id,
+            or_(
+                Job.posted_at.is_(None),
+                Job.posted_at >= now - timedelta(days=JOB_ALERTS_LOOKBACK_DAYS),
+            ),
+        )
+        .order_by(Job.id.desc())
+    )
+    return [IndexedJob.from_row(row) for row in result]
+
+
+def _percolate_window(jobs: List[IndexedJob]) -> Dict[int, List[IndexedJob]]:
+    """Offres de la fenêtre correspondant à chaque alerte indexée (plus récentes en premier)."""
+    matches: Dict[int, List[IndexedJob]] = {}
+    for job in jobs:
+        for alert_id in job_alert_index.percolate(job):
+            matches.setdefault(alert_id, []).append(job)
+    return matches
+
+
+async def _dispatch_alerts(
+    db: AsyncSession,
+    alert_clause,
+    jobs: List[IndexedJob],
+    matches: Dict[int, List[IndexedJob]],
+    high_water_mark: int,
+    now: datetime,
+    revisited_job_id: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Évalue et envoie les alertes sélectionnées par alert_clause, par lots de JOB_ALERTS_BATCH_SIZE.
+
+    revisited_job_id : offre modifiée, proposée même aux alertes dont le curseur l'a dépassée.
+    """
+    stats = {"evaluated": 0, "sent": 0, "failed": 0}
+    last_id = 0
+    while True:
+        result = await db.execute(
+            select(
+                JobAlert.id,
+                JobAlert.name,
+                JobAlert.criteria,
+                JobAlert.jobs_sent_count,
+                JobAlert.last_matching_job_id,
+                User.email,
+                User.first_name,
+            )
+            .join(Candidate, JobAlert.candidate_id == Candidate.id)
+            .join(User, Candidate.user_id == User.id)
+            .where(alert_clause, JobAlert.id > last_id, User.is_active == True)
+            .order_by(JobAlert.id)
+            .limit(JOB_ALERTS_BATCH_SIZE)
+        )
+        alerts = result.all()
+        if not alerts:
+            break
+        last_id = alerts[-1].id
+
+        digests, digest_alerts, no_match_ids = [], [], []
+        for alert in alerts:
+            cursor = alert.last_matching_job_id or 0
+            if alert.id in job_alert_index:
+                candidates = matches.get(alert.id, [])
+            else:
+                # Alerte pas encore indexée (créée sur une autre instance) : évaluation directe
+                candidates = [
+                    job
+                    for job in jobs
+                    if job_matches_criteria(job, alert.criteria or {})
+                ]
+            matched = [
+                job
+                for job in candidates
+                if job.id > cursor or job.id == revisited_job_id
+            ][:JOB_ALERTS_MAX_JOBS_PER_EMAIL]
+            if matched:
+                digests.append(
+                    {
+                        "email": alert.email,
+                        "first_name": alert.first_name,
+                        "alert_name": alert.name,
+                        "jobs": [job.to_email() for job in matched],
+                    }
+                )
+                digest_alerts.append(alert)
+            else:
+                no_match_ids.append(alert.id)
+
+        sent_results = (
+            await email_service.send_job_alert_digests(digests) if digests else []
+        )
+
+        # Mises à jour groupées : un UPDATE par clé primaire (executemany) pour les envois,
+        # un UPDATE ... WHERE id IN (...) pour avancer le curseur des alertes sans résultat
+        sent_rows = [
+            {
+                "id": alert.id,
+                "jobs_sent_count": (alert.jobs_sent_count or 0) + len(digest["jobs"]),
+                "last_sent_at": now,
+                "last_matching_job_id": high_water_mark,
+            }
+            for alert, digest, ok in zip(digest_alerts, digests, sent_results)
+            if ok
+        ]
+        if sent_rows:
+            await db.execute(update(JobAlert), sent_rows)
+        if no_match_ids:
+            await db.execute(
+                update(JobAlert)
+                .where(JobAlert.id.in_(no_match_ids))
+                .values(last_matching_job_id=high_water_mark)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+
+        stats["evaluated"] += len(alerts)
+        stats["sent"] += len(sent_rows)
+        stats["failed"] += len(digests) - len(sent_rows)
+
+        if len(alerts) < JOB_ALERTS_BATCH_SIZE:
+            break
+    return stats
+
+
+async def dispatch_job_alerts(
+    db: AsyncSession, now: Optional[datetime] = None
+) -> Dict[str, Dict[str, int]]:
+    """
+    Évalue toutes les alertes dues et envoie les résumés.
+
+    Le curseur last_matching_job_id de chaque alerte évaluée avance jusqu'à la
+    dernière offre publiée au début du passage ; il reste inchangé si l'envoi
+    échoue, pour que l'alerte soit retentée au passage suivant.
+
+    Returns:
+        Statistiques par fréquence : {"daily": {"evaluated", "sent", "failed"}, ...}
+    """
+    now = now or datetime.now(timezone.utc)
+    stats = {
+        frequency.value: {"evaluated": 0, "sent": 0, "failed": 0}
+        for frequency in JobAlertFrequency
+    }
+
+    high_water_mark = (
+        await db.execute(
+            select(func.max(Job.id)).where(Job.status == JobStatus.PUBLISHED)
+        )
+    ).scalar()
+    if high_water_mark is None:
+        return stats
+
+    due_any = or_(*(_due_clause(frequency, now) for frequency in JobAlertFrequency))
+    lowest_cursor = (
+        await db.execute(
+            select(func.min(func.coalesce(JobAlert.last_matching_job_id, 0))).where(
+                due_any
+            )
+        )
+    ).scalar()
+    if lowest_cursor is None or lowest_cursor >= high_water_mark:
+        return stats
+
+    await job_alert_index.ensure_loaded(db)
+    jobs = await _load_job_window(db, lowest_cursor, high_water_mark, now)
+    matches = _percolate_window(jobs)
+    for frequency in JobAlertFrequency:
+        stats[frequency.value] = await _dispatch_alerts(
+            db, _due_clause(frequency, now), jobs, matches, high_water_mark, now
+        )
+
+    logger.info(f"Job alerts dispatched ({len(jobs)} new jobs): {stats}")
+    return stats
+
+
+async def dispatch_instant_alerts_for_job(
+    db: AsyncSession,
+    job_id: int,
+    now: Optional[datetime] = None,
+    previous: Optional[IndexedJob] = None,
+) -> Dict[str, int]:
+    """
+    Envoie immédiatement les alertes INSTANT satisfaites par une offre qui vient d'être publiée.
+
+    Seules les alertes renvoyées par l'index sont chargées ; les autres offres
+    non encore envoyées à ces alertes sont incluses dans le même email.
+
+    previous : version de l'offre avant une modification. Les alertes qu'elle
+    satisfaisait ont déjà reçu l'offre (ou la recevront via leur curseur) et
+    sont ignorées ; les autres la reçoivent même si leur curseur l'a dépassée.
+    """
+    now = now or datetime.now(timezone.utc)
+    stats = {"evaluated": 0, "sent": 0, "failed": 0}
+
+    await job_alert_index.ensure_loaded(db)
+    row = (
+        await db.execute(
+            select(
+                Job.id,
+                Job.title,
+                Job.description,
+                Job.requirements,
+                Job.location,
+                Job.job_type,
+                Job.location_type,
+                Job.salary_min,
+                Job.salary_max,
+                Company.name.label("company_name"),
+            )
+            .outerjoin(Company, Job.company_id == Company.id)
+            .where(Job.id == job_id, Job.status == JobStatus.PUBLISHED)
+        )
+    ).first()
+    if row is None:
+        return stats
+
+    alert_ids = job_alert_index.percolate(
+        IndexedJob.from_row(row), JobAlertFrequency.INSTANT
+    )
+    if previous is not None:
+        alert_ids -= job_alert_index.percolate(previous, JobAlertFrequency.INSTANT)
+    if not alert_ids:
+        return stats
+
+    alert_clause = and_(
+        JobAlert.id.in_(alert_ids),
+        JobAlert.is_active == True,
+        JobAlert.frequency == JobAlertFrequency.INSTANT,
+    )
+    if previous is None:
+        alert_clause = and_(
+            alert_clause, func.coalesce(JobAlert.last_matching_job_id, 0) < job_id
+        )
+    lowest_cursor = (
+        await db.execute(
+            select(func.min(func.coalesce(JobAlert.last_matching_job_id, 0))).where(
+                alert_clause
+            )
+        )
+    ).scalar()
+    if lowest_cursor is None:
+        return stats
+    high_water_mark = (
+        await db.execute(
+            select(func.max(Job.id)).where(Job.status == JobStatus.PUBLISHED)
+        )
+    ).scalar()
+
+    # Une offre modifiée peut être antérieure au curseur de toutes ses alertes
+    after_id = lowest_cursor if previous is None else min(lowest_cursor, job_id - 1)
+    jobs = await _load_job_window(db, after_id, high_water_mark, now)
+    stats = await _dispatch_alerts(
+        db,
+        alert_clause,
+        jobs,
+        _percolate_window(jobs),
+        high_water_mark,
+        now,
+        revisited_job_id=job_id if previous is not None else None,
+    )
+    logger.info(f"Instant job alerts for job {job_id}: {stats}")
+    return stats
+
+
+# ── Planification ───────────────────────────────────────────────────────────
+
+_dispatcher_task: Optional[asyncio.Task] = None
+_instant_tasks: set = set()
+
+# Un seul envoi à la fois dans le processus : les curseurs et compteurs des
+# alertes sont lus puis réécrits, deux envois simultanés enverraient les mêmes offres
+_dispatch_lock = asyncio.Lock()
+
+
+@asynccontextmanager
+async def _locked_dispatch(wait: bool) -> AsyncIterator[bool]:
+    """
+    Sérialise les envois (passage planifié et alertes INSTANT) dans le processus
+    et, sous PostgreSQL, entre instances via un verrou consultatif.
+
+    Avec wait=False, rend False sans attendre si un autre envoi est en cours.
+    """
+    if not wait and _dispatch_lock.locked():
+        yield False
+        return
+    async with _dispatch_lock:
+        if engine.dialect.name != "postgresql":
+            yield True
+            return
+        async with engine.connect() as lock_conn:
+            if wait:
+                await lock_conn.execute(
+                    text("SELECT pg_advisory_lock(:key)"), {"key": _DISPATCH_LOCK_KEY}
+                )
+                locked = True
+            else:
+                locked = (
+                    await lock_conn.execute(
+                        text("SELECT pg_try_advisory_lock(:key)"),
+                        {"key": _DISPATCH_LOCK_KEY},
+                    )
+                ).scalar()
+            try:
+                yield bool(locked)
+            finally:
+                if locked:
+                    await lock_conn.execute(
+                        text("SELECT pg_advisory_unlock(:key)"),
+                        {"key": _DISPATCH_LOCK_KEY},
+                    )
+
+
+async def _run_locked_dispatch() -> None:
+    """Un passage, ignoré si un autre envoi est en cours (dans ce processus ou une autre instance)."""
+    async with _locked_dispatch(wait=False) as locked:
+        if not locked:
+            logger.info("Job alert dispatch skipped: another dispatch holds the lock")
+            return
+        async with AsyncSessionLocal() as db:
+            await dispatch_job_alerts(db)
+
+
+async def _run_instant_dispatch(
+    job_id: int, previous: Optional[IndexedJob] = None
+) -> None:
+    try:
+        # Attend le verrou : l'envoi INSTANT ne doit pas être perdu
+        async with _locked_dispatch(wait=True):
+            async with AsyncSessionLocal() as db:
+                await dispatch_instant_alerts_for_job(db, job_id, previous=previous)
+    except Exception as e:
+        logger.error(
+            f"Instant job alert dispatch failed for job {job_id}: {type(e).__name__}: {e}"
+        )
+    finally:
+        _instant_tasks.discard(asyncio.current_task())
+
+
+def schedule_instant_job_alerts(
+    job_id: int, previous: Optional[IndexedJob] = None
+) -> None:
+    """
+    Déclenche en arrière-plan l'envoi des alertes INSTANT pour une offre publiée
+    (ou modifiée : previous est alors sa version avant modification).
+    """
+    if not JOB_ALERTS_DISPATCHER_ENABLED:
+        return
+    _instant_tasks.add(asyncio.create_task(_run_instant_dispatch(job_id, previous)))
+
+
+async def _dispatcher_loop() -> None:
+    while True:
+        try:
+            await _run_locked_dispatch()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                f"Job alert dispatch failed: {type(e).__name__}: {e}", exc_info=True
+            )
+        await asyncio.sleep(JOB_ALERTS_DISPATCH_INTERVAL_SECONDS)
+
+
+def start_job_alert_dispatcher() -> None:
+    """Démarre la boucle d'envoi des alertes (appelé au démarrage de l'application)."""
+    global _dispatcher_task
+    if not JOB_ALERTS_DISPATCHER_ENABLED or _dispatcher_task is not None:
+        return
+    _dispatcher_task = asyncio.create_task(_dispatcher_loop())
+    logger.info(
+        f"Job alert dispatcher started (every {JOB_ALERTS_DISPATCH_INTERVAL_SECONDS}s)"
+    )
+
+
+async def stop_job_alert_dispatcher() -> None:
+    """Arrête la boucle d'envoi des alertes."""
+    global _dispatcher_task
+    if _dispatcher_task is None:
+        return
+    _dispatcher_task.cancel()
+    try:
+        await _dispatcher_task
+    except asyncio.CancelledError:
+        pass
+    _dispatcher_task = None
@@ -0,0 +1,399 @@
+"""
+Index inversé des critères d'alertes emploi (percolateur)
+
+Au lieu d'évaluer chaque alerte contre chaque nouvelle offre, les critères des
+alertes actives sont indexés ; une offre est ensuite « percolée » pour obtenir
+directement les alertes qu'elle satisfait.
+
+Sémantique des critères :
+- keywords : au moins un mot-clé présent ; un mot-clé de plusieurs mots exige
+  tous ses mots ; chaque mot est un préfixe de token (« dev » → « developpeur »).
+  Des mots-clés dont aucun ne donne de token (mots vides, « C ») ne
+  correspondent à aucune offre : ils ne sont pas traités comme « pas de filtre »
+  « + » et « # » comptent comme des lettres (« C++ » ne correspond pas à « C# »
+  ni à tous les mots en c), voir search_tokens
+- location : sous-chaîne du lieu de l'offre (insensible à la casse)
+- job_types / location_types : valeur de l'offre dans la liste
+- salary_min : salary_min ou salary_max de l'offre >= seuil
+- salary_max : salary_min de l'offre <= plafond
+
+Les mêmes critères sont traduits en SQL pour la prévisualisation (tsquery sur
+le vecteur plein texte des offres, voir compile_keywords_tsquery).
+
+Features:
+- Postings par token de mot-clé, type de contrat et type de localisation
+- Seuils de salaire triés (bisect) : filtrage par intervalle sans parcours
+- Mise à jour incrémentale à la création / modification / désactivation /
+  suppression d'une alerte, resynchronisation complète périodique avec la base
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.models.base import JobAlert
+from app.services.job_matching import tokenize
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+# Configuration
+JOB_ALERT_INDEX_RESYNC_SECONDS = float(
+    os.getenv("JOB_ALERT_INDEX_RESYNC_SECONDS", "600")
+)
+
+_ANY = "*"  # Clé des alertes sans contrainte sur un critère
+
+# Symboles écrits en toutes lettres avant le découpage en tokens : le parseur
+# plein texte de PostgreSQL les traite comme séparateurs (« C++ » donnerait
+# « c », préfixe de tous les mots en c). Même remplacement des deux côtés.
+SEARCH_SYMBOL_WORDS = (("+", "plus"), ("#", "sharp"))
+
+# Vecteur plein texte des offres, identique à l'expression de idx_jobs_alert_fts
+JOB_SEARCH_VECTOR_SQL = (
+    "to_tsvector('simple', replace(replace(f_unaccent("
+    "coalesce(jobs.title, '') || ' ' || coalesce(jobs.description, '') || ' ' || coalesce(jobs.requirements, '')"
+    "), '+', 'plus'), '#', 'sharp'))"
+)
+
+
+def search_tokens(text: Optional[str]) -> List[str]:
+    """Tokens des offres et des mots-clés d'alerte (« c++ » → « cplusplus », « c# » → « csharp »)."""
+    if not text:
+        return []
+    for symbol, word in SEARCH_SYMBOL_WORDS:
+        text = text.replace(symbol, word)
+    return tokenize(text)
+
+
+def _enum_value(value) -> Optional[str]:
+    return value.value if hasattr(value, "value") else value
+
+
+@dataclass
+class IndexedJob:
+    """Offre à percoler (colonnes utiles uniquement)."""
+
+    id: int
+    title: str
+    company_name: Optional[str]
+    location: Optional[str]
+    job_type: Optional[str]
+    location_type: Optional[str]
+    salary_min: Optional[int]
+    salary_max: Optional[int]
+    tokens: FrozenSet[str]
+
+    @classmethod
+    def from_row(cls, row) -> "IndexedJob":
+        """Construit l'offre depuis une ligne Job (ou un objet équivalent)."""
+        text = " ".join(filter(None, (row.title, row.description, row.requirements)))
+        return cls(
+            id=row.id,
+            title=row.title,
+            company_name=getattr(row, "company_name", None),
+            location=row.location,
+            job_type=_enum_value(row.job_type),
+            location_type=_enum_value(row.location_type),
+            salary_min=row.salary_min,
+            salary_max=row.salary_max,
+            tokens=frozenset(search_tokens(text)),
+        )
+
+    def to_email(self) -> dict:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "company_name": self.company_name,
+            "location": self.location,
+            "job_type": self.job_type,
+        }
+
+
+@dataclass
+class AlertCriteria:
+    """Critères compilés d'une alerte."""
+
+    alert_id: int
+    frequency: Optional[str]
+    keyword_groups: Tuple[Tuple[str, ...], ...]
+    # Mots-clés renseignés mais sans aucun token exploitable
+    matches_nothing: bool
+    location: Optional[str]
+    job_types: FrozenSet[str]
+    location_types: FrozenSet[str]
+    salary_min: Optional[int]
+    salary_max: Optional[int]
+
+    @classmethod
+    def compile(cls, alert_id: int, criteria: dict, frequency=None) -> "AlertCriteria":
+        groups = keyword_groups(criteria.get("keywords"))
+        location = (criteria.get("location") or "").strip().lower() or None
+        return cls(
+            alert_id=alert_id,
+            frequency=_enum_value(frequency),
+            keyword_groups=tuple(groups),
+            matches_nothing=not groups
+            and keywords_match_nothing(criteria.get("keywords")),
+            location=location,
+            job_types=frozenset(
+                _enum_value(t) for t in criteria.get("job_types") or []
+            ),
+            location_types=frozenset(
+                _enum_value(t) for t in criteria.get("location_types") or []
+            ),
+            salary_min=criteria.get("salary_min") or None,
+            salary_max=criteria.get("salary_max") or None,
+        )
+
+    def matches(self, job: IndexedJob) -> bool:
+        """Vérification complète d'une offre contre ces critères."""
+        if self.matches_nothing:
+            return False
+        if self.keyword_groups and not any(
+            all(_has_prefix(job.tokens, token) for token in group)
+            for group in self.keyword_groups
+        ):
+            return False
+        if self.location and self.location not in (job.location or "").lower():
+            return False
+        if self.job_types and job.job_type not in self.job_types:
+            return False
+        if self.location_types and job.location_type not in self.location_types:
+            return False
+        if (
+            self.salary_min
+            and max(job.salary_min or 0, job.salary_max or 0) < self.salary_min
+        ):
+            return False
+        if self.salary_max and (
+            job.salary_min is None or job.salary_min > self.salary_max
+        ):
+            return False
+        return True
+
+
+def _has_prefix(tokens: FrozenSet[str], prefix: str) -> bool:
+    return prefix in tokens or any(token.startswith(prefix) for token in tokens)
+
+
+def _prefixes(tokens: Iterable[str]) -> Set[str]:
+    """Tous les préfixes (>= 2 caractères) des tokens d'une offre."""
+    return {token[:i] for token in tokens for i in range(2, len(token) + 1)}
+
+
+def job_matches_criteria(job: IndexedJob, criteria: dict) -> bool:
+    """Évalue une offre contre des critères bruts (sans passer par l'index)."""
+    return AlertCriteria.compile(0, criteria).matches(job)
+
+
+def keyword_groups(keywords: Optional[Iterable[str]]) -> List[Tuple[str, ...]]:
+    """Tokens normalisés de chaque mot-clé (mots-clés vides ignorés)."""
+    return [
+        group
+        for group in (tuple(search_tokens(keyword)) for keyword in keywords or [])
+        if group
+    ]
+
+
+def keywords_match_nothing(keywords: Optional[Iterable[str]]) -> bool:
+    """Vrai si des mots-clés sont renseignés mais qu'aucun ne donne de token."""
+    return any(
+        (keyword or "").strip() for keyword in keywords or []
+    ) and not keyword_groups(keywords)
+
+
+def compile_keywords_tsquery(keywords: Optional[Iterable[str]]) -> Optional[str]:
+    """
+    Compile une liste de mots-clés en une seule expression to_tsquery.
+
+    ["python", "data engineer"] → "'python':* | ('data':* & 'engineer':*)"
+    Les tokens sont normalisés par search_tokens ([a-z0-9], + et # écrits en
+    toutes lettres comme dans JOB_SEARCH_VECTOR_SQL) : les guillemets suffisent
+    à neutraliser la syntaxe tsquery.
+    """
+    parts = []
+    for group in keyword_groups(keywords):
+        terms = " & ".join(f"'{token}':*" for token in group)
+        parts.append(f"({terms})" if len(group) > 1 else terms)
+    return " | ".join(parts) or None
+
+
+class JobAlertIndex:
+    """
+    Index inversé des alertes actives.
+
+    percolate() construit un ensemble de candidats par intersection des
+    postings (mot-clé, type de contrat, type de localisation, salaire), puis
+    vérifie les candidats restants avec AlertCriteria.matches.
+    """
+
+    def __init__(self):
+        self._reset()
+        self._loaded = False
+        self._last_sync = 0.0
+        self._lock = asyncio.Lock()
+
+    def _reset(self) -> None:
+        self._alerts: Dict[int, AlertCriteria] = {}
+        # Premier token de chaque groupe de mots-clés → alertes
+        self._keywords: Dict[str, Set[int]] = {}
+        self._job_types: Dict[str, Set[int]] = {}
+        self._location_types: Dict[str, Set[int]] = {}
+        # Seuils triés [(seuil, alert_id)]
+        self._salary_min: List[Tuple[int, int]] = []
+        self._salary_max: List[Tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def __contains__(self, alert_id: int) -> bool:
+        return alert_id in self._alerts
+
+    # ── Mise à jour ─────────────────────────────────────────────────────────
+
+    def upsert(
+        self, alert_id: int, criteria: dict, frequency=None, is_active: bool = True
+    ) -> None:
+        """Ajoute, remplace ou (si inactive) retire une alerte."""
+        self.remove(alert_id)
+        if not is_active:
+            return
+        compiled = AlertCriteria.compile(alert_id, criteria or {}, frequency)
+        self._alerts[alert_id] = compiled
+        if compiled.matches_nothing:
+            # Conservée (l'alerte est connue de l'index) mais hors de tous les postings
+            return
+
+        for key in {group[0] for group in compiled.keyword_groups} or {_ANY}:
+            self._keywords.setdefault(key, set()).add(alert_id)
+        for key in compiled.job_types or {_ANY}:
+            self._job_types.setdefault(key, set()).add(alert_id)
+        for key in compiled.location_types or {_ANY}:
+            self._location_types.setdefault(key, set()).add(alert_id)
+        if compiled.salary_min:
+            bisect.insort(self._salary_min, (compiled.salary_min, alert_id))
+        if compiled.salary_max:
+            bisect.insort(self._salary_max, (compiled.salary_max, alert_id))
+
+    def upsert_alert(self, alert: JobAlert) -> None:
+        """Met à jour l'index depuis un objet JobAlert."""
+        self.upsert(alert.id, alert.criteria, alert.frequency, bool(alert.is_active))
+
+    def remove(self, alert_id: int) -> None:
+        """Retire une alerte de l'index (no-op si absente)."""
+        compiled = self._alerts.pop(alert_id, None)
+        if compiled is None or compiled.matches_nothing:
+            return
+        for postings, keys in (
+            (self._keywords, {group[0] for group in compiled.keyword_groups} or {_ANY}),
+            (self._job_types, compiled.job_types or {_ANY}),
+            (self._location_types, compiled.location_types or {_ANY}),
+        ):
+            for key in keys:
+                ids = postings.get(key)
+                if ids is not None:
+                    ids.discard(alert_id)
+                    if not ids:
+                        del postings[key]
+        for thresholds, value in (
+            (self._salary_min, compiled.salary_min),
+            (self._salary_max, compiled.salary_max),
+        ):
+            if value:
+                i = bisect.bisect_left(thresholds, (value, alert_id))
+                if i < len(thresholds) and thresholds[i] == (value, alert_id):
+                    del thresholds[i]
+
+    def clear(self) -> None:
+        """Vide l'index."""
+        self._reset()
+
+    # ── Percolation ─────────────────────────────────────────────────────────
+
+    def percolate(self, job: IndexedJob, frequency=None) -> Set[int]:
+        """Ids des alertes actives (de la fréquence donnée, le cas échéant) satisfaites par l'offre."""
+        if not self._alerts:
+            return set()
+
+        candidates = set(self._keywords.get(_ANY, ()))
+        for prefix in _prefixes(job.tokens):
+            ids = self._keywords.get(prefix)
+            if ids:
+                candidates |= ids
+        if not candidates:
+            return set()
+
+        candidates &= self._job_types.get(_ANY, set()) | self._job_types.get(
+            job.job_type, set()
+        )
+        candidates &= self._location_types.get(_ANY, set()) | self._location_types.get(
+            job.location_type, set()
+        )
+        if not candidates:
+            return set()
+
+        # Seuils de salaire non satisfaits (plancher > salaire max de l'offre,
+        # plafond < salaire min de l'offre) : tranches contiguës des listes triées
+        job_max_salary = max(job.salary_min or 0, job.salary_max or 0)
+        above = bisect.bisect_right(self._salary_min, (job_max_salary, float("inf")))
+        below = (
+            len(self._salary_max)
+            if job.salary_min is None
+            else bisect.bisect_left(self._salary_max, (job.salary_min, -1))
+        )
+        for excluded in (self._salary_min[above:], self._salary_max[:below]):
+            # Sinon la vérification finale suffit (moins coûteuse que la tranche)
+            if len(excluded) < len(candidates):
+                candidates.difference_update(alert_id for _, alert_id in excluded)
+
+        target = _enum_value(frequency)
+        return {
+            alert_id
+            for alert_id in candidates
+            if (target is None or self._alerts[alert_id].frequency == target)
+            and self._alerts[alert_id].matches(job)
+        }
+
+    # ── Synchronisation avec la base ────────────────────────────────────────
+
+    async def ensure_loaded(self, db: AsyncSession, force: bool = False) -> None:
+        """
+        Charge (ou recharge) toutes les alertes actives.
+
+        Les mises à jour incrémentales ne couvrent que le processus courant ;
+        la resynchronisation périodique rattrape les autres instances.
+        """
+        if self._fresh() and not force:
+            return
+        async with self._lock:
+            if self._fresh() and not force:
+                return
+            result = await db.execute(
+                select(JobAlert.id, JobAlert.criteria, JobAlert.frequency).where(
+                    JobAlert.is_active == True
+                )
+            )
+            rows = result.all()
+            self.clear()
+            for row in rows:
+                self.upsert(row.id, row.criteria, row.frequency)
+            self._loaded = True
+            self._last_sync = time.monotonic()
+            logger.info(f"Job alert index loaded: {len(self._alerts)} active alerts")
+
+    def _fresh(self) -> bool:
+        return (
+            self._loaded
+            and time.monotonic() - self._last_sync < JOB_ALERT_INDEX_RESYNC_SECONDS
+        )
+
+
+# Index partagé par le processus
+job_alert_index = JobAlertIndex()
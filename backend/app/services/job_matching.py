@@ -0,0 +1,312 @@
+"""
+Pré-classement local des offres d'emploi (BM25)
+
+Avant d'appeler Claude pour /candidate/job-matches, les offres publiées sont
+classées localement par pertinence lexicale avec BM25, et seul le top-K est
+envoyé au LLM pour explication.
+
+Features:
+- Index inversé maintenu incrémentalement (seules les offres nouvelles ou
+  modifiées depuis le dernier rafraîchissement sont re-tokenisées)
+- Matrice terme/document creuse (scipy.sparse CSR), reconstruite uniquement
+  quand l'index a changé
+- Scoring BM25 vectorisé avec NumPy sur toutes les offres en une passe
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from app.models.base import Job, JobStatus
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+# Configuration
+JOB_MATCH_SHORTLIST_SIZE = int(os.getenv("JOB_MATCH_SHORTLIST_SIZE", "15"))
+JOB_INDEX_REFRESH_SECONDS = float(os.getenv("JOB_INDEX_REFRESH_SECONDS", "30"))
+
+# Paramètres BM25 standards
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+_STOPWORDS = frozenset(
+    """
+a au aux avec ce ces dans de des du elle en et eux il je la le les leur lui ma mais me meme mes moi mon
+ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre
+vous est sont etre avoir plus tres tout tous toute toutes chez afin ainsi comme sans sous
+an and are as at be by for from has have in is it its of on or that the their this to was were will with
+you your our we they
+""".split()
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Normalise (minuscules, sans accents ni balises HTML) et découpe un texte en tokens."""
+    if not text:
+        return []
+    text = _HTML_TAG_RE.sub(" ", text)
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in _TOKEN_RE.findall(text) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def job_document_text(
+    title: Optional[str],
+    description: Optional[str],
+    requirements: Optional[str],
+    profil_competences: Optional[str] = None,
+    profil_experience: Optional[str] = None,
+) -> List[str]:
+    """Tokens représentant une offre (le titre compte double)."""
+    tokens = tokenize(title) * 2
+    for field in (requirements, profil_competences, profil_experience, description):
+        tokens.extend(tokenize(field))
+    return tokens
+
+
+def candidate_query_weights(
+    title: Optional[str],
+    summary: Optional[str],
+    skills: Iterable[str],
+    experiences: Iterable[Tuple[Optional[str], Optional[str]]],
+) -> Dict[str, float]:
+    """
+    Construit la requête pondérée d'un candidat.
+
+    Compétences (x3) > titre recherché et intitulés de postes (x2) > résumé et
+    descriptions d'expériences (x1).
+    """
+    weights: Counter = Counter()
+    for skill in skills:
+        for token in tokenize(skill):
+            weights[token] += 3.0
+    for token in tokenize(title):
+        weights[token] += 2.0
+    for exp_title, exp_description in experiences:
+        for token in tokenize(exp_title):
+            weights[token] += 2.0
+        for token in tokenize(exp_description):
+            weights[token] += 1.0
+    for token in tokenize(summary):
+        weights[token] += 1.0
+    return dict(weights)
+
+
+class JobIndex:
+    """
+    Index BM25 des offres publiées, mis à jour incrémentalement.
+
+    Chaque offre est stockée sous forme (colonnes, fréquences) ; la matrice CSR
+    globale n'est réassemblée qu'après une modification.
+    """
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self._docs: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._versions: Dict[int, object] = {}
+        self._doc_freq = np.zeros(0, dtype=np.int64)
+
+        self._matrix: Optional[sparse.csc_matrix] = None
+        self._row_job_ids = np.zeros(0, dtype=np.int64)
+        self._doc_lengths = np.zeros(0, dtype=np.float64)
+        self._dirty = True
+
+        self._last_refresh = 0.0
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ── Mise à jour ─────────────────────────────────────────────────────────
+
+    def upsert(self, job_id: int, tokens: List[str], version: object = None) -> None:
+        """Ajoute ou remplace une offre dans l'index."""
+        self.remove(job_id)
+
+        counts = Counter(tokens)
+        cols = np.empty(len(counts), dtype=np.int64)
+        for i, term in enumerate(counts):
+            col = self.vocabulary.get(term)
+            if col is None:
+                col = len(self.vocabulary)
+                self.vocabulary[term] = col
+            cols[i] = col
+        freqs = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+
+        if len(self.vocabulary) > len(self._doc_freq):
+            grown = np.zeros(
+                max(len(self.vocabulary), 2 * len(self._doc_freq)), dtype=np.int64
+            )
+            grown[: len(self._doc_freq)] = self._doc_freq
+            self._doc_freq = grown
+        self._doc_freq[cols] += 1
+
+        self._docs[job_id] = (cols, freqs)
+        self._versions[job_id] = version
+        self._dirty = True
+
+    def remove(self, job_id: int) -> None:
+        """Retire une offre de l'index (no-op si absente)."""
+        doc = self._docs.pop(job_id, None)
+        self._versions.pop(job_id, None)
+        if doc is not None:
+            self._doc_freq[doc[0]] -= 1
+            self._dirty = True
+
+    def _build_matrix(self) -> None:
+        """Assemble la matrice terme/document à partir des offres indexées."""
+        n_terms = len(self.vocabulary)
+        job_ids = np.fromiter(self._docs.keys(), dtype=np.int64, count=len(self._docs))
+        if len(job_ids):
+            rows = np.concatenate(
+                [
+                    np.full(len(cols), row, dtype=np.int64)
+                    for row, (cols, _) in enumerate(self._docs.values())
+                ]
+            )
+            cols = np.concatenate([cols for cols, _ in self._docs.values()])
+            data = np.concatenate([freqs for _, freqs in self._docs.values()])
+        else:
+            rows = cols = np.zeros(0, dtype=np.int64)
+            data = np.zeros(0, dtype=np.float64)
+
+        matrix = sparse.csr_matrix((data, (rows, cols)), shape=(len(job_ids), n_terms))
+        self._doc_lengths = np.asarray(matrix.sum(axis=1)).ravel()
+        # CSC : extraction rapide des colonnes correspondant aux termes de la requête
+        self._matrix = matrix.tocsc()
+        self._row_job_ids = job_ids
+        self._dirty = False
+
+    # ── Recherche ───────────────────────────────────────────────────────────
+
+    def top_k(self, query_weights: Dict[str, float], k: int) -> List[Tuple[int, float]]:
+        """
+        Retourne les k offres les plus pertinentes [(job_id, score BM25)], par score décroissant.
+
+        Les offres sans aucun terme commun avec la requête sont exclues.
+        """
+        if self._dirty:
+            self._build_matrix()
+
+        n_docs = len(self._row_job_ids)
+        terms = [
+            (self.vocabulary[t], w)
+            for t, w in query_weights.items()
+            if t in self.vocabulary
+        ]
+        if n_docs == 0 or not terms or k <= 0:
+            return []
+
+        cols = np.array([c for c, _ in terms], dtype=np.int64)
+        weights = np.array([w for _, w in terms], dtype=np.float64)
+
+        df = self._doc_freq[cols].astype(np.float64)
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+        sub = self._matrix[:, cols].tocoo()
+        avg_len = self._doc_lengths.mean() or 1.0
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self._doc_lengths[sub.row] / avg_len)
+        contrib = (
+            (sub.data * (BM25_K1 + 1.0) / (sub.data + norm))
+            * idf[sub.col]
+            * weights[sub.col]
+        )
+        scores = np.bincount(sub.row, weights=contrib, minlength=n_docs)
+
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        order = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(self._row_job_ids[i]), float(scores[i])) for i in order]
+
+    def fingerprint(self, job_ids: Iterable[int]) -> str:
+        """Empreinte SHA-256 d'un ensemble d'offres (id + version indexée)."""
+        payload = ";".join(
+            f"{job_id}@{self._versions.get(job_id)}" for job_id in sorted(job_ids)
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    # ── Synchronisation avec la base ────────────────────────────────────────
+
+    async def refresh(self, db: AsyncSession, force: bool = False) -> None:
+        """
+        Synchronise l'index avec les offres publiées.
+
+        Seuls (id, updated_at) sont lus pour toutes les offres ; le texte n'est
+        chargé que pour les offres nouvelles ou modifiées.
+        """
+        if (
+            not force
+            and time.monotonic() - self._last_refresh < JOB_INDEX_REFRESH_SECONDS
+        ):
+            return
+
+        async with self._lock:
+            if (
+                not force
+                and time.monotonic() - self._last_refresh < JOB_INDEX_REFRESH_SECONDS
+            ):
+                return
+
+            result = await db.execute(
+                select(Job.id, Job.updated_at).where(Job.status == JobStatus.PUBLISHED)
+            )
+            published = {row.id: row.updated_at for row in result}
+
+            for job_id in set(self._docs) - set(published):
+                self.remove(job_id)
+
+            changed = [
+                job_id
+                for job_id, version in published.items()
+                if job_id not in self._docs or self._versions.get(job_id) != version
+            ]
+            for start in range(0, len(changed), 500):
+                batch = changed[start : start + 500]
+                rows = await db.execute(
+                    select(
+                        Job.id,
+                        Job.updated_at,
+                        Job.title,
+                        Job.description,
+                        Job.requirements,
+                        Job.profil_competences,
+                        Job.profil_experience,
+                    ).where(Job.id.in_(batch))
+                )
+                for row in rows:
+                    self.upsert(
+                        row.id,
+                        job_document_text(
+                            row.title,
+                            row.description,
+                            row.requirements,
+                            row.profil_competences,
+                            row.profil_experience,
+                        ),
+                        version=row.updated_at,
+                    )
+
+            if changed:
+                logger.info(
+                    f"Job index refreshed: {len(changed)} jobs (re)indexed, {len(self._docs)} total"
+                )
+            self._last_refresh = time.monotonic()
+
+
+# Index partagé par le processus
+job_index = JobIndex()
@@ -0,0 +1,307 @@
+"""
+Scoring local déterministe des candidatures
+
+Moteur de repli quand le service IA est indisponible (ANTHROPIC_API_KEY absente,
+erreur API), et pré-classement des candidatures d'une offre avant que Claude
+n'affine le haut du pipeline.
+
+Critères (mêmes pondérations que le prompt IA) :
+- Compétences : couverture des mots-clés de l'offre par les compétences du candidat (40%)
+- Expérience : années d'expérience vs années exigées par l'offre (30%)
+- Mots-clés : couverture des mots-clés de l'offre par tout le profil (CV inclus) (15%)
+- Localisation : ville du candidat vs lieu de l'offre (télétravail = compatible) (10%)
+- Type de contrat : adéquation stage / séniorité (5%)
+
+Tous les candidats d'une offre sont scorés en une passe vectorisée (NumPy /
+scipy.sparse) : plusieurs milliers de candidatures par seconde.
+"""
+
+import re
+from collections import Counter
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from app.services.job_matching import tokenize
+from scipy import sparse
+
+WEIGHT_SKILLS = 0.40
+WEIGHT_EXPERIENCE = 0.30
+WEIGHT_KEYWORDS = 0.15
+WEIGHT_LOCATION = 0.10
+WEIGHT_JOB_TYPE = 0.05
+
+MAX_JOB_KEYWORDS = 30
+
+_YEARS_RE = re.compile(
+    r"(\d{1,2})\s*\+?\s*(?:ans|an|années|annees|years?|yrs)\b", re.IGNORECASE
+)
+_DATE_RE = re.compile(r"(\d{4})(?:-(\d{1,2}))?")
+
+
+def _enum_value(value) -> Optional[str]:
+    return value.value if hasattr(value, "value") else value
+
+
+def required_years(*texts: Optional[str]) -> float:
+    """Nombre d'années d'expérience exigé par l'offre (0 si non mentionné)."""
+    found = []
+    for text in texts:
+        found.extend(int(n) for n in _YEARS_RE.findall(text or "") if 0 < int(n) <= 20)
+    return float(max(found)) if found else 0.0
+
+
+def _parse_month(value: Optional[str]) -> Optional[int]:
+    """'YYYY-MM' ou 'YYYY' → nombre de mois depuis l'an 0."""
+    if not value:
+        return None
+    match = _DATE_RE.search(value)
+    if not match:
+        return None
+    return int(match.group(1)) * 12 + (int(match.group(2) or 1) - 1)
+
+
+def experience_years(candidate) -> float:
+    """Années d'expérience : valeur déclarée, ou somme des expériences renseignées."""
+    today = date.today()
+    now = today.year * 12 + today.month - 1
+    months = 0
+    for exp in candidate.experiences or []:
+        start = _parse_month(exp.start_date)
+        end = (
+            now
+            if getattr(exp, "is_current", False) or not exp.end_date
+            else _parse_month(exp.end_date)
+        )
+        if start is not None and end is not None and end > start:
+            months += end - start
+    computed = min(months / 12.0, 40.0)
+    return max(float(candidate.years_experience or 0), computed)
+
+
+def _job_keywords(job) -> Dict[str, float]:
+    """Mots-clés pondérés de l'offre (titre x2, exigences et compétences x1)."""
+    counts: Counter = Counter()
+    for token in tokenize(job.title):
+        counts[token] += 2.0
+    focused = (
+        getattr(job, "requirements", None),
+        getattr(job, "profil_competences", None),
+    )
+    focused_tokens = [t for text in focused for t in tokenize(text)]
+    if not focused_tokens:
+        focused_tokens = tokenize(job.description)
+    for token in focused_tokens:
+        counts[token] += 1.0
+    return dict(counts.most_common(MAX_JOB_KEYWORDS))
+
+
+def _candidate_text_tokens(candidate, cv_text: Optional[str]) -> set:
+    tokens = (
+        set(tokenize(candidate.title))
+        | set(tokenize(candidate.summary))
+        | set(tokenize(cv_text))
+    )
+    for skill in candidate.skills or []:
+        tokens.update(tokenize(skill.name))
+    for exp in candidate.experiences or []:
+        tokens.update(tokenize(exp.title))
+        tokens.update(tokenize(exp.description))
+    return tokens
+
+
+def _presence_matrix(
+    token_sets: Sequence[set], vocabulary: Dict[str, int]
+) -> sparse.csr_matrix:
+    """Matrice binaire candidats x mots-clés de l'offre."""
+    rows, cols = [], []
+    for row, tokens in enumerate(token_sets):
+        for token in tokens:
+            col = vocabulary.get(token)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    data = np.ones(len(rows), dtype=np.float64)
+    return sparse.csr_matrix(
+        (data, (rows, cols)), shape=(len(token_sets), len(vocabulary))
+    )
+
+
+def _recommendation(score: float) -> str:
+    if score >= 75:
+        return "shortlist — profil très aligné avec les exigences (scoring local)"
+    if score >= 60:
+        return "interview — bonne adéquation globale (scoring local)"
+    if score >= 40:
+        return (
+            "review — adéquation partielle, analyse manuelle conseillée (scoring local)"
+        )
+    return "reject — faible adéquation avec l'offre (scoring local)"
+
+
+def score_applicants(
+    job, candidates: Sequence, cv_texts: Optional[Sequence[Optional[str]]] = None
+) -> List[Dict]:
+    """
+    Score tous les candidats d'une offre en une passe vectorisée.
+
+    Args:
+        job: Offre (Job ou objet équivalent)
+        candidates: Candidats (Candidate avec skills et experiences chargés)
+        cv_texts: Texte extrait du CV de chaque candidat (optionnel)
+
+    Returns:
+        Un dict par candidat, au même format que AIEvaluationService.score_candidate
+        (+ "engine": "local")
+    """
+    n = len(candidates)
+    if n == 0:
+        return []
+    cv_texts = list(cv_texts) if cv_texts is not None else [None] * n
+
+    keywords = _job_keywords(job)
+    vocabulary = {term: i for i, term in enumerate(keywords)}
+    keyword_weights = np.fromiter(
+        keywords.values(), dtype=np.float64, count=len(keywords)
+    )
+    total_weight = keyword_weights.sum() or 1.0
+    job_tokens = set(
+        tokenize(
+            " ".join(
+                filter(
+                    None,
+                    (
+                        job.title,
+                        job.description,
+                        getattr(job, "requirements", None),
+                        getattr(job, "responsibilities", None),
+                        getattr(job, "profil_competences", None),
+                    ),
+                )
+            )
+        )
+    )
+
+    skill_tokens = [
+        {t for skill in (c.skills or []) for t in tokenize(skill.name)}
+        for c in candidates
+    ]
+    text_tokens = [_candidate_text_tokens(c, cv) for c, cv in zip(candidates, cv_texts)]
+
+    # Compétences et mots-clés : produits matrice creuse x poids
+    skill_presence = _presence_matrix(skill_tokens, vocabulary)
+    text_presence = _presence_matrix(text_tokens, vocabulary)
+    skills_component = (
+        np.asarray(skill_presence @ keyword_weights).ravel() / total_weight
+    )
+    keywords_component = (
+        np.asarray(text_presence @ keyword_weights).ravel() / total_weight
+    )
+    # Les compétences sont rarement exhaustives : 60% de couverture = score plein
+    skills_component = np.clip(skills_component / 0.6, 0.0, 1.0)
+    keywords_component = np.clip(keywords_component / 0.6, 0.0, 1.0)
+
+    # Expérience
+    needed = required_years(
+        getattr(job, "requirements", None),
+        getattr(job, "profil_experience", None),
+        job.description,
+    )
+    years = np.array([experience_years(c) for c in candidates], dtype=np.float64)
+    if needed > 0:
+        experience_component = np.clip(years / needed, 0.0, 1.0)
+    else:
+        experience_component = np.clip(0.6 + years / 10.0, 0.0, 1.0)
+
+    # Localisation
+    location_type = _enum_value(getattr(job, "location_type", None))
+    if location_type == "remote":
+        location_component = np.ones(n)
+    else:
+        job_location = set(tokenize(getattr(job, "location", None)))
+        location_component = np.array(
+            [
+                1.0
+                if not job_location or job_location & set(tokenize(c.location))
+                else 0.3
+                for c in candidates
+            ]
+        )
+
+    # Type de contrat
+    job_type = _enum_value(getattr(job, "job_type", None))
+    if job_type == "internship":
+        job_type_component = np.clip(1.2 - years / 5.0, 0.2, 1.0)
+    else:
+        job_type_component = np.ones(n)
+
+    scores = 100.0 * (
+        WEIGHT_SKILLS * skills_component
+        + WEIGHT_EXPERIENCE * experience_component
+        + WEIGHT_KEYWORDS * keywords_component
+        + WEIGHT_LOCATION * location_component
+        + WEIGHT_JOB_TYPE * job_type_component
+    )
+    scores = np.round(scores, 1)
+
+    # Explications (par candidat, sur des ensembles déjà calculés)
+    requirement_terms = [
+        t for t in keywords if t not in set(tokenize(job.title))
+    ] or list(keywords)
+    results = []
+    for i, candidate in enumerate(candidates):
+        matched = [
+            s.name
+            for s in (candidate.skills or [])
+            if set(tokenize(s.name)) & job_tokens
+        ]
+        missing = [t for t in requirement_terms if t not in text_tokens[i]][:5]
+        strengths, weaknesses = [], []
+        if matched:
+            strengths.append(
+                f"Compétences correspondant à l'offre : {', '.join(matched[:5])}"
+            )
+        if experience_component[i] >= 1.0:
+            strengths.append(f"Expérience suffisante ({years[i]:.0f} ans)")
+        elif needed > 0:
+            weaknesses.append(
+                f"Expérience inférieure aux exigences ({years[i]:.0f} / {needed:.0f} ans)"
+            )
+        if location_component[i] >= 1.0 and location_type != "remote":
+            strengths.append("Localisation compatible avec le poste")
+        elif location_component[i] < 1.0:
+            weaknesses.append("Localisation différente du lieu du poste")
+        if missing:
+            weaknesses.append(
+                f"Mots-clés de l'offre absents du profil : {', '.join(missing)}"
+            )
+
+        score = float(scores[i])
+        results.append(
+            {
+                "score": score,
+                "strengths": strengths,
+                "weaknesses": weaknesses,
+                "skills_match": {
+                    "matched": matched,
+                    "missing": missing,
+                    "percentage": int(round(keywords_component[i] * 100)),
+                },
+                "experience_match": (
+                    f"{years[i]:.0f} an(s) d'expérience"
+                    + (
+                        f" pour {needed:.0f} an(s) exigé(s)."
+                        if needed > 0
+                        else " (aucune exigence explicite)."
+                    )
+                ),
+                "recommendation": _recommendation(score),
+                "engine": "local",
+            }
+        )
+    return results
+
+
+def score_applicant(job, candidate, cv_text: Optional[str] = None) -> Dict:
+    """Score local d'un seul candidat."""
+    return score_applicants(job, [candidate], [cv_text])[0]
@@ -0,0 +1,214 @@
+"""
+Maintenance générique des tables partitionnées par mois — IntoWork
+
+Une table partitionnée par mois sur created_at (partitions <table>_pYYYY_MM
+plus une partition DEFAULT) est décrite par un MonthlyPartitions : nom de la
+table, verrou consultatif, partitions à créer à l'avance, rétention et mode
+de retrait. Une tâche périodique :
+- crée à l'avance les partitions des ahead_months prochains mois (les
+  insertions ne tombent jamais dans la partition DEFAULT)
+- applique la rétention partition par partition : les mois entièrement plus
+  vieux que retention_months sont détachés puis archivés (schéma d'archive,
+  toujours interrogeable) ou supprimés. Aucun DELETE ligne à ligne : pas de
+  bloat ni de VACUUM à rattraper.
+
+Un verrou consultatif garantit qu'une seule instance fait la maintenance.
+Sans PostgreSQL (tests SQLite), la maintenance ne fait rien.
+"""
+
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from app.database import AsyncSessionLocal
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+RETENTION_ARCHIVE = "archive"
+RETENTION_DROP = "drop"
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class MonthlyPartitions:
+    """Partitions mensuelles d'une table : création à l'avance et rétention."""
+
+    def __init__(
+        self,
+        table: str,
+        lock_id: int,
+        ahead_months: int,
+        retention_months: int,
+        retention_mode: str = RETENTION_DROP,
+        archive_schema: Optional[str] = None,
+        on_retired: Optional[Callable[[AsyncSession], Awaitable[object]]] = None,
+    ):
+        if retention_mode == RETENTION_ARCHIVE and not archive_schema:
+            raise ValueError(f"{table}: archive retention requires an archive schema")
+        self.table = table
+        # Identifiant du verrou consultatif (pg_try_advisory_xact_lock)
+        self.lock_id = lock_id
+        self.ahead_months = ahead_months
+        self.retention_months = retention_months
+        self.retention_mode = retention_mode
+        self.archive_schema = archive_schema
+        # Appelé après la validation quand des partitions ont été retirées
+        self.on_retired = on_retired
+        self._partition_re = re.compile(rf"^{re.escape(table)}_p(\d{{4}})_(\d{{2}})$")
+        self._task: Optional[asyncio.Task] = None
+
+    def partition_name(self, month: date) -> str:
+        return f"{self.table}_p{month.year:04d}_{month.month:02d}"
+
+    def partition_month(self, name: str) -> Optional[date]:
+        """Mois couvert par une partition mensuelle (None pour DEFAULT ou un nom inconnu)."""
+        match = self._partition_re.match(name)
+        return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+    def expired_partitions(
+        self, names: Iterable[str], now: datetime, retention_months: int
+    ) -> List[str]:
+        """Partitions dont le mois entier est antérieur à la fenêtre de rétention."""
+        cutoff = add_months(date(now.year, now.month, 1), -retention_months)
+        expired = []
+        for name in names:
+            month = self.partition_month(name)
+            if month is not None and add_months(month, 1) <= cutoff:
+                expired.append(name)
+        return sorted(expired)
+
+    async def list_partitions(self, db: AsyncSession) -> List[str]:
+        result = await db.execute(
+            text(
+                f"""
+            SELECT c.relname
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = '{self.table}'::regclass
+        """
+            )
+        )
+        return [row[0] for row in result.all()]
+
+    async def ensure_future_partitions(
+        self, db: AsyncSession, now: datetime, existing: Iterable[str]
+    ) -> List[str]:
+        """Crée les partitions manquantes du mois courant à M+ahead_months."""
+        existing = set(existing)
+        created = []
+        current = date(now.year, now.month, 1)
+        for offset in range(self.ahead_months + 1):
+            month = add_months(current, offset)
+            name = self.partition_name(month)
+            if name in existing:
+                continue
+            try:
+                async with db.begin_nested():
+                    await db.execute(
+                        text(
+                            f'CREATE TABLE "{name}" PARTITION OF {self.table} '
+                            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                        )
+                    )
+                created.append(name)
+            except Exception as e:
+                # Typiquement : des lignes de ce mois sont déjà dans la partition DEFAULT
+                logger.error(f"Cannot create {self.table} partition {name}: {e}")
+        return created
+
+    async def retire_expired_partitions(
+        self, db: AsyncSession, now: datetime, existing: Iterable[str]
+    ) -> List[str]:
+        """Détache puis archive (ou supprime) les partitions hors rétention."""
+        retired = self.expired_partitions(existing, now, self.retention_months)
+        if not retired:
+            return []
+        archive = self.retention_mode == RETENTION_ARCHIVE
+        if archive:
+            await db.execute(
+                text(f'CREATE SCHEMA IF NOT EXISTS "{self.archive_schema}"')
+            )
+        for name in retired:
+            await db.execute(
+                text(f'ALTER TABLE {self.table} DETACH PARTITION "{name}"')
+            )
+            if archive:
+                await db.execute(
+                    text(f'ALTER TABLE "{name}" SET SCHEMA "{self.archive_schema}"')
+                )
+            else:
+                await db.execute(text(f'DROP TABLE "{name}"'))
+        return retired
+
+    async def run(
+        self, db: AsyncSession, now: Optional[datetime] = None
+    ) -> Dict[str, List[str]]:
+        """Crée les partitions à venir et applique la rétention ; retourne les partitions traitées."""
+        stats: Dict[str, List[str]] = {"created": [], "retired": []}
+        if db.get_bind().dialect.name != "postgresql":
+            return stats
+        now = now or datetime.now(timezone.utc)
+
+        locked = (
+            await db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+                {"lock_id": self.lock_id},
+            )
+        ).scalar()
+        if not locked:
+            return stats
+
+        existing = await self.list_partitions(db)
+        stats["created"] = await self.ensure_future_partitions(db, now, existing)
+        stats["retired"] = await self.retire_expired_partitions(db, now, existing)
+        await db.commit()
+
+        if stats["retired"] and self.on_retired is not None:
+            await self.on_retired(db)
+        return stats
+
+    # ── Tâche périodique ────────────────────────────────────────────────────
+
+    async def _maintenance_loop(self, interval: float) -> None:
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    stats = await self.run(db)
+                if stats["created"] or stats["retired"]:
+                    logger.info(
+                        f"{self.table} partitions: created={stats['created']} "
+                        f"retired={stats['retired']} ({self.retention_mode})"
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(
+                    f"{self.table} partition maintenance failed: {type(e).__name__}: {e}",
+                    exc_info=True,
+                )
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float) -> None:
+        """Démarre la maintenance périodique (sans effet si elle tourne déjà)."""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._maintenance_loop(interval))
+        logger.info(f"{self.table} partition maintenance started (every {interval}s)")
+
+    async def stop(self) -> None:
+        """Arrête la maintenance périodique."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,220 @@
+"""
+Compteur matérialisé des notifications non lues
+
+Le nombre de non lues est lu à chaque polling des clients : il est conservé
+dans Redis (notifications:unread:{user_id}) et ajusté à chaque insertion,
+lecture, « tout marquer comme lu » et suppression, après commit. PostgreSQL
+reste la source de vérité :
+- clé absente (premier accès, expiration, Redis vidé) : recomptée en base puis
+  posée avec SET NX
+- les ajustements ne s'appliquent qu'à une clé existante (jamais de compteur
+  créé à partir d'un simple delta) ; une valeur négative supprime la clé
+- un réconciliateur recompte périodiquement les clés présentes (une requête
+  GROUP BY par lot) pour corriger les dérives dues aux courses ; la correction
+  est un compare-and-set : une clé ajustée entre la lecture et l'écriture est
+  laissée telle quelle (elle sera revue au passage suivant)
+- les clés expirent après NOTIFICATIONS_UNREAD_TTL_SECONDS d'inactivité
+
+Sans Redis, le compte est lu directement en base (index partiel
+idx_notifications_user_unread).
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+from app.cache import cache
+from app.database import AsyncSessionLocal
+from app.models.base import Notification
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+# Configuration
+NOTIFICATIONS_UNREAD_TTL_SECONDS = int(
+    os.getenv("NOTIFICATIONS_UNREAD_TTL_SECONDS", "86400")
+)
+NOTIFICATIONS_UNREAD_RECONCILE_ENABLED = (
+    os.getenv("NOTIFICATIONS_UNREAD_RECONCILE_ENABLED", "true").lower() == "true"
+)
+NOTIFICATIONS_UNREAD_RECONCILE_SECONDS = float(
+    os.getenv("NOTIFICATIONS_UNREAD_RECONCILE_SECONDS", "300")
+)
+# Clés recomptées par requête lors de la réconciliation
+NOTIFICATIONS_UNREAD_RECONCILE_BATCH_SIZE = 500
+
+_KEY_PREFIX = "notifications:unread:"
+
+# INCRBY uniquement si la clé existe ; une valeur négative (dérive) supprime la clé
+_ADJUST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return nil end
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if value < 0 then redis.call('DEL', KEYS[1]) return nil end
+return value
+"""
+
+# SET (TTL conservé) uniquement si la clé vaut toujours ARGV[1] ; rend 1 si écrite
+_COMPARE_AND_SET_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+return 1
+"""
+
+
+def _key(user_id: int) -> str:
+    return f"{_KEY_PREFIX}{user_id}"
+
+
+async def count_unread_in_db(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(
+        select(func.count())
+        .select_from(Notification)
+        .filter(Notification.user_id == user_id, Notification.is_read == False)
+    )
+    return result.scalar()
+
+
+async def get_unread_count(db: AsyncSession, user_id: int) -> int:
+    """Nombre de non lues : lecture Redis O(1), recomptage en base si la clé manque."""
+    if cache.is_available:
+        try:
+            value = await cache.client.get(_key(user_id))
+            if value is not None:
+                return int(value)
+        except Exception as e:
+            logger.warning(f"Unread counter read failed for user_id={user_id}: {e}")
+            return await count_unread_in_db(db, user_id)
+
+    count = await count_unread_in_db(db, user_id)
+    if cache.is_available:
+        try:
+            # NX : ne pas écraser un compteur posé et ajusté entre-temps
+            await cache.client.set(
+                _key(user_id), count, ex=NOTIFICATIONS_UNREAD_TTL_SECONDS, nx=True
+            )
+        except Exception as e:
+            logger.warning(f"Unread counter write failed for user_id={user_id}: {e}")
+    return count
+
+
+async def adjust_unread_counts(deltas: Dict[int, int]) -> None:
+    """Applique des deltas {user_id: ±n} aux compteurs existants (à appeler après commit)."""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas or not cache.is_available:
+        return
+    try:
+        async with cache.client.pipeline(transaction=False) as pipe:
+            for user_id, delta in deltas.items():
+                pipe.eval(_ADJUST_SCRIPT, 1, _key(user_id), delta)
+            await pipe.execute()
+    except Exception as e:
+        # Les clés touchées sont supprimées : prochain accès recompté en base
+        logger.warning(f"Unread counter update failed, invalidating: {e}")
+        await _invalidate(deltas.keys())
+
+
+async def adjust_unread_count(user_id: int, delta: int) -> None:
+    await adjust_unread_counts({user_id: delta})
+
+
+async def _invalidate(user_ids: Iterable[int]) -> None:
+    try:
+        await cache.client.delete(*[_key(user_id) for user_id in user_ids])
+    except Exception:
+        pass
+
+
+# ── Réconciliation ──────────────────────────────────────────────────────────
+
+
+async def reconcile_unread_counters(db: AsyncSession) -> int:
+    """Recompte en base les compteurs présents dans Redis ; retourne le nombre de corrections."""
+    if not cache.is_available:
+        return 0
+    corrected = 0
+    batch: List[int] = []
+    async for key in cache.client.scan_iter(
+        match=f"{_KEY_PREFIX}*", count=NOTIFICATIONS_UNREAD_RECONCILE_BATCH_SIZE
+    ):
+        batch.append(int(key[len(_KEY_PREFIX) :]))
+        if len(batch) >= NOTIFICATIONS_UNREAD_RECONCILE_BATCH_SIZE:
+            corrected += await _reconcile_batch(db, batch)
+            batch = []
+    if batch:
+        corrected += await _reconcile_batch(db, batch)
+    return corrected
+
+
+async def _reconcile_batch(db: AsyncSession, user_ids: List[int]) -> int:
+    # Lecture des compteurs AVANT le recomptage : un ajustement antérieur à
+    # cette lecture suit un commit déjà visible du recomptage, un ajustement
+    # postérieur modifie la clé et fait échouer le compare-and-set
+    cached = await cache.client.mget([_key(user_id) for user_id in user_ids])
+
+    result = await db.execute(
+        select(Notification.user_id, func.count())
+        .filter(Notification.user_id.in_(user_ids), Notification.is_read == False)
+        .group_by(Notification.user_id)
+    )
+    counts = {user_id: 0 for user_id in user_ids}
+    counts.update(dict(result.all()))
+
+    async with cache.client.pipeline(transaction=False) as pipe:
+        drifted = 0
+        for user_id, value in zip(user_ids, cached):
+            # Clé expirée entre-temps : elle sera recomptée au prochain accès
+            if value is not None and int(value) != counts[user_id]:
+                pipe.eval(
+                    _COMPARE_AND_SET_SCRIPT, 1, _key(user_id), value, counts[user_id]
+                )
+                drifted += 1
+        if not drifted:
+            return 0
+        return sum(1 for written in await pipe.execute() if written)
+
+
+_reconciler_task: Optional[asyncio.Task] = None
+
+
+async def _reconciler_loop() -> None:
+    while True:
+        await asyncio.sleep(NOTIFICATIONS_UNREAD_RECONCILE_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                corrected = await reconcile_unread_counters(db)
+            if corrected:
+                logger.info(f"Unread counters reconciled: {corrected} corrected")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                f"Unread counter reconciliation failed: {type(e).__name__}: {e}",
+                exc_info=True,
+            )
+
+
+def start_unread_counter_reconciler() -> None:
+    """Démarre la réconciliation périodique (appelé au démarrage de l'application)."""
+    global _reconciler_task
+    if not NOTIFICATIONS_UNREAD_RECONCILE_ENABLED or _reconciler_task is not None:
+        return
+    _reconciler_task = asyncio.create_task(_reconciler_loop())
+    logger.info(
+        f"Unread counter reconciler started (every {NOTIFICATIONS_UNREAD_RECONCILE_SECONDS}s)"
+    )
+
+
+async def stop_unread_counter_reconciler() -> None:
+    """Arrête la réconciliation périodique."""
+    global _reconciler_task
+    if _reconciler_task is None:
+        return
+    _reconciler_task.cancel()
+    try:
+        await _reconciler_task
+    except asyncio.CancelledError:
+        pass
+    _reconciler_task = None
@@ -0,0 +1,81 @@
+"""
+Maintenance des partitions mensuelles de notifications
+
+La table notifications est partitionnée par mois sur created_at (migration
+a8b9c0d1e2f3). Une tâche quotidienne (MonthlyPartitions) :
+- crée à l'avance les partitions des NOTIFICATIONS_PARTITIONS_AHEAD_MONTHS
+  prochains mois (les insertions ne tombent jamais dans la partition DEFAULT)
+- applique la rétention partition par partition : les mois entièrement plus
+  vieux que NOTIFICATIONS_RETENTION_MONTHS sont détachés puis archivés
+  (schéma notifications_archive, toujours interrogeable) ou supprimés
+  (NOTIFICATIONS_RETENTION_MODE=drop). Aucun DELETE ligne à ligne : pas de
+  bloat ni de VACUUM à rattraper.
+
+Les compteurs de non lues sont recalculés après un retrait de partitions.
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.services.monthly_partitions import (  # noqa: F401 (add_months réexporté)
+    RETENTION_ARCHIVE,
+    RETENTION_DROP,
+    MonthlyPartitions,
+    add_months,
+)
+from app.services.notification_counter import reconcile_unread_counters
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Configuration
+NOTIFICATIONS_PARTITION_MAINTENANCE_ENABLED = (
+    os.getenv("NOTIFICATIONS_PARTITION_MAINTENANCE_ENABLED", "true").lower() == "true"
+)
+NOTIFICATIONS_PARTITION_MAINTENANCE_SECONDS = float(
+    os.getenv("NOTIFICATIONS_PARTITION_MAINTENANCE_SECONDS", "86400")
+)
+NOTIFICATIONS_PARTITIONS_AHEAD_MONTHS = int(
+    os.getenv("NOTIFICATIONS_PARTITIONS_AHEAD_MONTHS", "3")
+)
+NOTIFICATIONS_RETENTION_MONTHS = int(os.getenv("NOTIFICATIONS_RETENTION_MONTHS", "12"))
+# archive : partition détachée et déplacée dans le schéma d'archive ; drop : supprimée
+NOTIFICATIONS_RETENTION_MODE = os.getenv(
+    "NOTIFICATIONS_RETENTION_MODE", "archive"
+).lower()
+
+ARCHIVE_SCHEMA = "notifications_archive"
+
+partitions = MonthlyPartitions(
+    "notifications",
+    lock_id=0x4E4F5449,
+    ahead_months=NOTIFICATIONS_PARTITIONS_AHEAD_MONTHS,
+    retention_months=NOTIFICATIONS_RETENTION_MONTHS,
+    retention_mode=RETENTION_ARCHIVE
+    if NOTIFICATIONS_RETENTION_MODE == RETENTION_ARCHIVE
+    else RETENTION_DROP,
+    archive_schema=ARCHIVE_SCHEMA,
+    # Les non lues des partitions retirées ne comptent plus
+    on_retired=reconcile_unread_counters,
+)
+
+partition_name = partitions.partition_name
+partition_month = partitions.partition_month
+expired_partitions = partitions.expired_partitions
+
+
+async def run_notification_partition_maintenance(
+    db: AsyncSession, now: Optional[datetime] = None
+) -> Dict[str, List[str]]:
+    """Crée les partitions à venir et applique la rétention ; retourne les partitions traitées."""
+    return await partitions.run(db, now)
+
+
+def start_notification_partition_maintenance() -> None:
+    """Démarre la maintenance des partitions (appelé au démarrage de l'application)."""
+    if NOTIFICATIONS_PARTITION_MAINTENANCE_ENABLED:
+        partitions.start(NOTIFICATIONS_PARTITION_MAINTENANCE_SECONDS)
+
+
+async def stop_notification_partition_maintenance() -> None:
+    """Arrête la maintenance des partitions."""
+    await partitions.stop()
@@ -0,0 +1,215 @@
+"""
+Diffusion temps réel des notifications (Server-Sent Events)
+
+Chaque instance de l'API garde une seule connexion Redis pub/sub
+(psubscribe sur notifications:user:*) et redistribue les événements aux
+connexions SSE locales de l'utilisateur concerné, via une asyncio.Queue par
+connexion : une connexion ne coûte qu'une tâche et une file.
+
+Événements publiés sur le canal d'un utilisateur :
+- notification : nouvelle notification (id SSE = id de la notification, ce qui
+  permet la reprise via Last-Event-ID)
+- unread_count : {"delta": ±n} ou {"unread_count": n} (valeur absolue)
+
+Sans Redis (développement, tests), les événements sont distribués directement
+aux connexions du processus courant.
+
+EventSource ne peut pas envoyer d'en-tête Authorization : le client échange
+son token contre un ticket opaque, à usage unique et valable
+NOTIFICATIONS_STREAM_TICKET_SECONDS, passé en paramètre d'URL. Le token
+d'accès n'apparaît ainsi jamais dans les logs des proxys.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+# Configuration
+NOTIFICATIONS_STREAM_KEEPALIVE_SECONDS = float(
+    os.getenv("NOTIFICATIONS_STREAM_KEEPALIVE_SECONDS", "15")
+)
+NOTIFICATIONS_STREAM_REPLAY_LIMIT = int(
+    os.getenv("NOTIFICATIONS_STREAM_REPLAY_LIMIT", "50")
+)
+NOTIFICATIONS_STREAM_QUEUE_SIZE = int(
+    os.getenv("NOTIFICATIONS_STREAM_QUEUE_SIZE", "100")
+)
+NOTIFICATIONS_STREAM_TICKET_SECONDS = int(
+    os.getenv("NOTIFICATIONS_STREAM_TICKET_SECONDS", "60")
+)
+
+_CHANNEL_PREFIX = "notifications:user:"
+_TICKET_PREFIX = "notifications:stream-ticket:"
+
+# Envoyé à une connexion trop lente dont la file a débordé : le client recharge son état
+RESYNC_EVENT = {"event": "resync", "data": {}}
+
+
+def format_sse(event: dict) -> str:
+    """Sérialise un événement au format text/event-stream."""
+    lines = []
+    if event.get("id") is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append(f"data: {json.dumps(event.get('data', {}), default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+# ── Tickets d'ouverture du flux ─────────────────────────────────────────────
+
+# Tickets émis sans Redis : {ticket: (user_id, expiration monotonic)}
+_local_tickets: Dict[str, Tuple[int, float]] = {}
+
+
+async def issue_stream_ticket(user_id: int) -> str:
+    """Émet un ticket d'ouverture du flux SSE, à usage unique et de courte durée."""
+    ticket = secrets.token_urlsafe(32)
+    if cache.is_available:
+        try:
+            await cache.client.set(
+                f"{_TICKET_PREFIX}{ticket}",
+                str(user_id),
+                ex=NOTIFICATIONS_STREAM_TICKET_SECONDS,
+            )
+            return ticket
+        except Exception as e:
+            logger.warning(
+                f"Stream ticket not stored in Redis, local ticket issued: {e}"
+            )
+    now = time.monotonic()
+    for expired in [
+        key for key, (_, expires_at) in _local_tickets.items() if expires_at <= now
+    ]:
+        del _local_tickets[expired]
+    _local_tickets[ticket] = (user_id, now + NOTIFICATIONS_STREAM_TICKET_SECONDS)
+    return ticket
+
+
+async def redeem_stream_ticket(ticket: str) -> Optional[int]:
+    """Consomme un ticket : id de l'utilisateur, ou None s'il est inconnu, expiré ou déjà utilisé."""
+    local = _local_tickets.pop(ticket, None)
+    if local is not None:
+        user_id, expires_at = local
+        return user_id if expires_at > time.monotonic() else None
+    if not cache.is_available:
+        return None
+    key = f"{_TICKET_PREFIX}{ticket}"
+    try:
+        # Lecture et suppression atomiques (MULTI) : un seul appelant obtient le ticket
+        async with cache.client.pipeline(transaction=True) as pipe:
+            pipe.get(key)
+            pipe.delete(key)
+            value, _ = await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Stream ticket lookup failed: {e}")
+        return None
+    return int(value) if value else None
+
+
+# ── Diffusion ───────────────────────────────────────────────────────────────
+
+
+class NotificationBroker:
+    """Fan-out des événements de notifications vers les connexions SSE locales."""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._listener_task: Optional[asyncio.Task] = None
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """Enregistre une connexion SSE ; démarre l'écoute Redis si nécessaire."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=NOTIFICATIONS_STREAM_QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        if cache.is_available and self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    async def publish(self, user_id: int, events: List[dict]) -> None:
+        """Publie des événements sur le canal de l'utilisateur (un seul message Redis)."""
+        if not events:
+            return
+        if cache.is_available:
+            try:
+                await cache.client.publish(
+                    f"{_CHANNEL_PREFIX}{user_id}", json.dumps(events, default=str)
+                )
+                return
+            except Exception as e:
+                logger.warning(f"Notification publish failed, local delivery only: {e}")
+        self._dispatch(user_id, events)
+
+    def _dispatch(self, user_id: int, events: List[dict]) -> None:
+        for queue in list(self._subscribers.get(user_id, ())):
+            for event in events:
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # Client trop lent : on vide sa file et on lui demande de se resynchroniser
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(RESYNC_EVENT)
+                    break
+
+    async def _listen(self) -> None:
+        """Boucle d'écoute Redis (une par processus), reconnectée en cas d'erreur."""
+        delay = 1.0
+        while True:
+            pubsub = cache.client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{_CHANNEL_PREFIX}*")
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    user_id = int(channel[len(_CHANNEL_PREFIX) :])
+                    if user_id in self._subscribers:
+                        self._dispatch(user_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"Notification pub/sub listener error, retrying in {delay:.0f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def stop(self) -> None:
+        """Arrête l'écoute Redis (arrêt de l'application)."""
+        if self._listener_task is None:
+            return
+        self._listener_task.cancel()
+        try:
+            await self._listener_task
+        except asyncio.CancelledError:
+            pass
+        self._listener_task = None
+
+
+# Broker partagé par le processus
+notification_broker = NotificationBroker()
@@ -0,0 +1,295 @@
+"""
+Statistiques plateforme pré-agrégées (table platform_stats)
+
+Les statistiques admin, marché, dashboard admin, rapport PDF admin et landing
+page lisent un rollup (métrique, dimension) -> valeur au lieu de recompter
+users / jobs / job_applications / companies à chaque appel : leur coût ne
+dépend plus de la taille des tables.
+
+Le rollup est reconstruit par une tâche périodique (une requête GROUP BY par
+famille de métriques, remplacement complet dans une transaction). Les
+lectures ne reconstruisent jamais un rollup existant : plus vieux que
+PLATFORM_STATS_MAX_AGE_SECONDS, il est servi tel quel et signalé dans les
+logs. Seul un rollup vide (premier démarrage) est construit à la lecture, au
+plus une fois par PLATFORM_STATS_REFRESH_SECONDS en cas d'échec.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.database import AsyncSessionLocal
+from app.models.base import (
+    Candidate,
+    Company,
+    Job,
+    JobApplication,
+    JobStatus,
+    Notification,
+    PlatformStat,
+    User,
+)
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+# Configuration
+PLATFORM_STATS_REFRESH_ENABLED = (
+    os.getenv("PLATFORM_STATS_REFRESH_ENABLED", "true").lower() == "true"
+)
+PLATFORM_STATS_REFRESH_SECONDS = float(
+    os.getenv("PLATFORM_STATS_REFRESH_SECONDS", "300")
+)
+PLATFORM_STATS_MAX_AGE_SECONDS = float(
+    os.getenv("PLATFORM_STATS_MAX_AGE_SECONDS", "900")
+)
+# Fenêtre des inscriptions récentes
+RECENT_SIGNUPS_DAYS = 7
+
+# Métriques
+USERS_BY_ROLE = "users_by_role"
+USERS_BY_ACTIVE = "users_by_active"
+USERS_RECENT_SIGNUPS = "users_recent_signups"
+COMPANIES = "companies"
+CANDIDATES = "candidates"
+APPLICATIONS = "applications"
+NOTIFICATIONS = "notifications"
+JOBS_BY_STATUS = "jobs_by_status"
+PUBLISHED_JOBS_BY_COUNTRY = "published_jobs_by_country"
+PUBLISHED_JOBS_BY_TYPE = "published_jobs_by_type"
+PUBLISHED_JOBS_BY_LOCATION_TYPE = "published_jobs_by_location_type"
+PUBLISHED_JOBS_BY_INDUSTRY = "published_jobs_by_industry"
+
+# Identifiant du verrou consultatif (une seule reconstruction à la fois)
+_REFRESH_LOCK_ID = 0x53544154
+
+# Longueur de platform_stats.dimension (industrie, pays : texte libre tronqué)
+_DIMENSION_LENGTH = PlatformStat.__table__.c.dimension.type.length
+
+
+@dataclass
+class PlatformStats:
+    """Instantané du rollup : {métrique: {dimension: valeur}}"""
+
+    metrics: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    refreshed_at: Optional[datetime] = None
+
+    def get(self, metric: str, dimension: str = "") -> int:
+        return self.metrics.get(metric, {}).get(dimension, 0)
+
+    def total(self, metric: str) -> int:
+        return sum(self.metrics.get(metric, {}).values())
+
+    def breakdown(
+        self, metric: str, limit: Optional[int] = None
+    ) -> List[Tuple[str, int]]:
+        """Dimensions triées par valeur décroissante"""
+        items = sorted(
+            self.metrics.get(metric, {}).items(), key=lambda item: (-item[1], item[0])
+        )
+        return items[:limit] if limit is not None else items
+
+
+def _value(column_value) -> str:
+    return getattr(column_value, "value", column_value)
+
+
+async def _collect_stats(db: AsyncSession, now: datetime) -> Dict[str, Dict[str, int]]:
+    metrics: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    users = await db.execute(
+        select(User.role, User.is_active, func.count()).group_by(
+            User.role, User.is_active
+        )
+    )
+    for role, is_active, count in users.all():
+        metrics[USERS_BY_ROLE][_value(role)] += count
+        metrics[USERS_BY_ACTIVE]["true" if is_active else "false"] += count
+
+    totals = (
+        await db.execute(
+            select(
+                select(func.count())
+                .select_from(User)
+                .filter(User.created_at >= now - timedelta(days=RECENT_SIGNUPS_DAYS))
+                .scalar_subquery()
+                .label("recent_signups"),
+                select(func.count())
+                .select_from(Company)
+                .scalar_subquery()
+                .label("companies"),
+                select(func.count())
+                .select_from(Candidate)
+                .scalar_subquery()
+                .label("candidates"),
+                select(func.count())
+                .select_from(JobApplication)
+                .scalar_subquery()
+                .label("applications"),
+                select(func.count())
+                .select_from(Notification)
+                .scalar_subquery()
+                .label("notifications"),
+            )
+        )
+    ).one()
+    metrics[USERS_RECENT_SIGNUPS][""] = totals.recent_signups
+    metrics[COMPANIES][""] = totals.companies
+    metrics[CANDIDATES][""] = totals.candidates
+    metrics[APPLICATIONS][""] = totals.applications
+    metrics[NOTIFICATIONS][""] = totals.notifications
+
+    jobs = await db.execute(select(Job.status, func.count()).group_by(Job.status))
+    for job_status, count in jobs.all():
+        metrics[JOBS_BY_STATUS][_value(job_status)] = count
+
+    # Toutes les répartitions des offres publiées en un seul passage
+    published = await db.execute(
+        select(
+            Job.country, Job.job_type, Job.location_type, Company.industry, func.count()
+        )
+        .join(Company, Company.id == Job.company_id)
+        .filter(Job.status == JobStatus.PUBLISHED)
+        .group_by(Job.country, Job.job_type, Job.location_type, Company.industry)
+    )
+    for country, job_type, location_type, industry, count in published.all():
+        if country:
+            metrics[PUBLISHED_JOBS_BY_COUNTRY][country[:_DIMENSION_LENGTH]] += count
+        metrics[PUBLISHED_JOBS_BY_TYPE][_value(job_type)] += count
+        metrics[PUBLISHED_JOBS_BY_LOCATION_TYPE][_value(location_type)] += count
+        if industry:
+            metrics[PUBLISHED_JOBS_BY_INDUSTRY][industry[:_DIMENSION_LENGTH]] += count
+
+    return metrics
+
+
+async def refresh_platform_stats(
+    db: AsyncSession, now: Optional[datetime] = None
+) -> bool:
+    """Reconstruit le rollup ; False si une autre instance le reconstruit déjà."""
+    now = now or datetime.now(timezone.utc)
+    if db.get_bind().dialect.name == "postgresql":
+        locked = (
+            await db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+                {"lock_id": _REFRESH_LOCK_ID},
+            )
+        ).scalar()
+        if not locked:
+            await db.rollback()
+            return False
+
+    metrics = await _collect_stats(db, now)
+    rows = [
+        {"metric": metric, "dimension": dimension, "value": value, "updated_at": now}
+        for metric, dimensions in metrics.items()
+        for dimension, value in dimensions.items()
+    ]
+    await db.execute(delete(PlatformStat))
+    if rows:
+        await db.execute(insert(PlatformStat), rows)
+    await db.commit()
+    return True
+
+
+async def _read_stats(db: AsyncSession) -> PlatformStats:
+    result = await db.execute(
+        select(
+            PlatformStat.metric,
+            PlatformStat.dimension,
+            PlatformStat.value,
+            PlatformStat.updated_at,
+        )
+    )
+    stats = PlatformStats()
+    for metric, dimension, value, updated_at in result.all():
+        stats.metrics.setdefault(metric, {})[dimension] = value
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        if stats.refreshed_at is None or updated_at < stats.refreshed_at:
+            stats.refreshed_at = updated_at
+    return stats
+
+
+# Dernier échec de construction du rollup vide à la lecture (time.monotonic)
+_bootstrap_failed_at: Optional[float] = None
+
+
+async def _bootstrap_stats(db: AsyncSession) -> PlatformStats:
+    """Construit un rollup vide à la lecture ; un échec ne fait pas échouer la requête."""
+    global _bootstrap_failed_at
+    if (
+        _bootstrap_failed_at is not None
+        and time.monotonic() - _bootstrap_failed_at < PLATFORM_STATS_REFRESH_SECONDS
+    ):
+        return PlatformStats()
+    try:
+        await refresh_platform_stats(db)
+    except Exception as e:
+        await db.rollback()
+        _bootstrap_failed_at = time.monotonic()
+        logger.error(f"Platform stats bootstrap failed: {type(e).__name__}: {e}")
+        return PlatformStats()
+    _bootstrap_failed_at = None
+    return await _read_stats(db)
+
+
+async def get_platform_stats(db: AsyncSession) -> PlatformStats:
+    """Lit le rollup (une requête) ; le construit s'il est vide, le sert tel quel s'il est périmé."""
+    stats = await _read_stats(db)
+    if stats.refreshed_at is None:
+        return await _bootstrap_stats(db)
+    age = (datetime.now(timezone.utc) - stats.refreshed_at).total_seconds()
+    if age > PLATFORM_STATS_MAX_AGE_SECONDS:
+        logger.warning(
+            f"Platform stats rollup is stale ({age:.0f}s old), check the refresh task"
+        )
+    return stats
+
+
+_refresh_task: Optional[asyncio.Task] = None
+
+
+async def _refresh_loop() -> None:
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await refresh_platform_stats(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                f"Platform stats refresh failed: {type(e).__name__}: {e}", exc_info=True
+            )
+        await asyncio.sleep(PLATFORM_STATS_REFRESH_SECONDS)
+
+
+def start_platform_stats_refresher() -> None:
+    """Démarre la reconstruction périodique du rollup (appelé au démarrage de l'application)."""
+    global _refresh_task
+    if not PLATFORM_STATS_REFRESH_ENABLED or _refresh_task is not None:
+        return
+    _refresh_task = asyncio.create_task(_refresh_loop())
+    logger.info(
+        f"Platform stats refresher started (every {PLATFORM_STATS_REFRESH_SECONDS}s)"
+    )
+
+
+async def stop_platform_stats_refresher() -> None:
+    """Arrête la reconstruction périodique du rollup."""
+    global _refresh_task
+    if _refresh_task is None:
+        return
+    _refresh_task.cancel()
+    try:
+        await _refresh_task
+    except asyncio.CancelledError:
+        pass
+    _refresh_task = None
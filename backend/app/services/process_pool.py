@@ -0,0 +1,154 @@
+"""
+Pools de processus partagés des services CPU-bound — IntoWork
+
+Un WorkerPool encapsule un ProcessPoolExecutor borné, créé au premier appel
+(ou préchauffé au démarrage) :
+- un worker tué (limite mémoire, crash de librairie) casse le pool : il est
+  abandonné et recréé au prochain appel
+- un travail qui dépasse son délai ne se contente pas de rendre la main à
+  l'appelant : les processus du pool sont terminés et le pool recréé, sinon
+  un document pathologique continuerait d'occuper un worker. Les travaux
+  en cours dans le même pool échouent alors avec BrokenProcessPool.
+
+InflightCalls partage un même calcul entre appels simultanés de même clé.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.context import BaseContext
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """ProcessPoolExecutor borné, recréé après un crash ou un dépassement de délai."""
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: Tuple[Any, ...] = (),
+        mp_context: Optional[BaseContext] = None,
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.initargs = initargs
+        # None : contexte par défaut de la plateforme (fork sous Linux)
+        self.mp_context = mp_context
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def executor(self) -> ProcessPoolExecutor:
+        """Retourne le pool, créé au premier appel."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=self.initializer,
+                initargs=self.initargs,
+                mp_context=self.mp_context,
+            )
+            logger.info(f"{self.name} pool started ({self.max_workers} workers)")
+        return self._executor
+
+    def warm_up(self) -> None:
+        """Démarre tous les workers sans attendre un premier travail."""
+        executor = self.executor()
+        # Un initializer ne s'exécute qu'au lancement d'un worker : une tâche
+        # vide par worker les démarre tous
+        for _ in range(self.max_workers):
+            executor.submit(int)
+
+    def reset(self) -> None:
+        """Abandonne un pool cassé ; un nouveau sera créé au prochain appel."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def recycle(self) -> None:
+        """Termine les processus du pool (travail bloqué) puis l'abandonne."""
+        executor = self._executor
+        if executor is None:
+            return
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            try:
+                process.terminate()
+            except Exception:
+                pass
+        self.reset()
+        logger.warning(f"{self.name} pool recycled")
+
+    def shutdown(self) -> None:
+        """Arrête le pool (appelé à l'arrêt de l'application)."""
+        if self._executor is not None:
+            self.reset()
+            logger.info(f"{self.name} pool stopped")
+
+    async def run(self, timeout: float, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Exécute fn(*args) dans un worker.
+
+        Raises:
+            asyncio.TimeoutError: délai dépassé (le pool a été recyclé)
+            BrokenProcessPool: worker tué (le pool a été abandonné)
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self.executor(), fn, *args)
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.recycle()
+            raise
+        except BrokenProcessPool:
+            self.reset()
+            raise
+
+
+class InflightCalls:
+    """Calculs en cours indexés par clé, partagés entre appels simultanés."""
+
+    def __init__(self):
+        self._futures: Dict[str, asyncio.Future] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._futures
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    async def wait(self, key: str) -> None:
+        """Attend la fin du calcul en cours pour key, quel que soit son résultat."""
+        inflight = self._futures.get(key)
+        if inflight is not None:
+            await asyncio.wait([inflight])
+
+    async def run(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Attend le calcul en cours pour key, ou lance compute() s'il n'y en a pas."""
+        inflight = self._futures.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._futures[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Exception marquée comme lue même sans autre appel en attente
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._futures.pop(key, None)
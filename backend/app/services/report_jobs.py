@@ -0,0 +1,583 @@
+"""
+Rapports PDF asynchrones
+
+POST /api/reports/{kind} met un rapport en file (table report_jobs) et répond
+immédiatement ; un worker en arrière-plan collecte les données, rend le PDF
+dans le pool de report_service et écrit le fichier sur disque, téléchargeable
+jusqu'à expiration. Les endpoints synchrones /api/reports/{kind}/pdf
+utilisent les mêmes collecteurs.
+
+Features:
+- Collecte des listes (offres de l'employeur) en streaming depuis la base
+  (curseur serveur, REPORT_STREAM_CHUNK_SIZE lignes à la fois)
+- Une seule génération en file ou en cours par (utilisateur, type)
+- Plusieurs instances : réservation des rapports (FOR UPDATE SKIP LOCKED),
+  reprise des rapports bloqués en cours au-delà de REPORT_JOBS_STALE_SECONDS
+- Purge des fichiers expirés (REPORT_ARTIFACT_TTL_HOURS)
+
+Avec plusieurs instances, REPORTS_STORAGE_DIR doit être un volume partagé
+(NFS, volume monté sur toutes les instances) : un rapport rendu par une
+instance est téléchargé ou purgé par n'importe quelle autre. Les fichiers
+sont toujours retrouvés par l'id du rapport sous REPORTS_STORAGE_DIR, jamais
+par un chemin absolu propre à l'instance qui les a écrits.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.database import AsyncSessionLocal
+from app.models.base import (
+    ApplicationStatus,
+    Candidate,
+    Company,
+    Education,
+    Employer,
+    Experience,
+    Job,
+    JobApplication,
+    JobStatus,
+    ReportJob,
+    ReportJobStatus,
+    Skill,
+    User,
+    UserRole,
+)
+from app.services.application_stats import (
+    applications_per_job_query,
+    employer_summary_query,
+    response_rate,
+)
+from app.services.platform_stats import (
+    APPLICATIONS,
+    COMPANIES,
+    JOBS_BY_STATUS,
+    USERS_BY_ACTIVE,
+    USERS_BY_ROLE,
+    USERS_RECENT_SIGNUPS,
+    get_platform_stats,
+)
+from app.services.report_service import (
+    generate_admin_report,
+    generate_candidate_report,
+    generate_employer_report,
+)
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+# Configuration
+REPORT_JOBS_WORKER_ENABLED = (
+    os.getenv("REPORT_JOBS_WORKER_ENABLED", "true").lower() == "true"
+)
+REPORT_JOBS_POLL_SECONDS = float(os.getenv("REPORT_JOBS_POLL_SECONDS", "5"))
+REPORT_JOBS_STALE_SECONDS = float(os.getenv("REPORT_JOBS_STALE_SECONDS", "600"))
+REPORT_ARTIFACT_TTL_HOURS = float(os.getenv("REPORT_ARTIFACT_TTL_HOURS", "24"))
+REPORT_STREAM_CHUNK_SIZE = int(os.getenv("REPORT_STREAM_CHUNK_SIZE", "500"))
+REPORTS_STORAGE_DIR = Path(
+    os.getenv(
+        "REPORTS_STORAGE_DIR",
+        str(Path(__file__).parent.parent.parent / "storage" / "reports"),
+    )
+)
+
+# Message enregistré pour un échec inattendu (le détail est seulement journalisé)
+REPORT_FAILED_MESSAGE = "La génération du rapport a échoué."
+
+# Nombre d'offres listées dans le rapport employeur synchrone
+SYNC_EMPLOYER_REPORT_JOBS = 20
+
+
+class ReportDataMissing(LookupError):
+    """Profil nécessaire au rapport introuvable."""
+
+
+# ── Collecte des données ────────────────────────────────────────────────────
+
+
+def _display_name(user: User) -> str:
+    return f"{user.first_name or ''} {user.last_name or ''}".strip() or user.email
+
+
+async def build_candidate_report(db: AsyncSession, user: User) -> bytes:
+    """Rapport du candidat : compteurs, complétion du profil, compétences, parcours."""
+    candidate = (
+        await db.execute(select(Candidate).filter(Candidate.user_id == user.id))
+    ).scalar_one_or_none()
+    if not candidate:
+        raise ReportDataMissing("Profil candidat introuvable")
+
+    # Stats — candidatures + entretiens + offres disponibles en 1 seule requête
+    counts = (
+        await db.execute(
+            select(
+                select(func.count())
+                .select_from(JobApplication)
+                .filter(JobApplication.candidate_id == candidate.id)
+                .scalar_subquery()
+                .label("apps"),
+                select(func.count())
+                .select_from(JobApplication)
+                .filter(
+                    JobApplication.candidate_id == candidate.id,
+                    JobApplication.status == ApplicationStatus.INTERVIEW,
+                )
+                .scalar_subquery()
+                .label("interviews"),
+                select(func.count())
+                .select_from(Job)
+                .filter(Job.status == JobStatus.PUBLISHED)
+                .scalar_subquery()
+                .label("available_jobs"),
+            )
+        )
+    ).one()
+
+    skills = [
+        {
+            "name": row.name,
+            "category": getattr(row.category, "value", row.category),
+            "level": row.level,
+        }
+        for row in await db.execute(
+            select(Skill.name, Skill.category, Skill.level).filter(
+                Skill.candidate_id == candidate.id
+            )
+        )
+    ]
+    experiences = [
+        row._asdict()
+        for row in await db.execute(
+            select(
+                Experience.title,
+                Experience.company,
+                Experience.start_date,
+                Experience.end_date,
+            ).filter(Experience.candidate_id == candidate.id)
+        )
+    ]
+    educations = [
+        row._asdict()
+        for row in await db.execute(
+            select(
+                Education.degree,
+                Education.school,
+                Education.start_date,
+                Education.end_date,
+            ).filter(Education.candidate_id == candidate.id)
+        )
+    ]
+
+    # Complétion profil
+    filled = sum(
+        1
+        for v in [
+            user.first_name,
+            user.last_name,
+            candidate.phone,
+            candidate.location,
+            candidate.title,
+            candidate.summary,
+        ]
+        if v
+    )
+    profile_completion = min(
+        100,
+        int(
+            (filled / 6) * 60
+            + bool(experiences) * 15
+            + bool(educations) * 15
+            + bool(skills) * 10
+        ),
+    )
+
+    stats = [
+        {"title": "Candidatures", "value": str(counts.apps or 0)},
+        {"title": "Entretiens", "value": str(counts.interviews or 0)},
+        {"title": "Offres disponibles", "value": str(counts.available_jobs or 0)},
+        {"title": "Profil", "value": f"{profile_completion}%"},
+    ]
+
+    return await generate_candidate_report(
+        user_name=_display_name(user),
+        email=user.email,
+        title=candidate.title,
+        location=candidate.location,
+        profile_completion=profile_completion,
+        stats=stats,
+        skills=skills,
+        experiences=experiences,
+        educations=educations,
+        activities=[],
+    )
+
+
+async def build_employer_report(
+    db: AsyncSession, user: User, job_limit: Optional[int] = None
+) -> bytes:
+    """Rapport recrutement de l'employeur ; toutes ses offres si job_limit est None."""
+    row = (
+        await db.execute(
+            select(Employer.id, Company.name, Company.industry, Company.size)
+            .join(Company, Company.id == Employer.company_id)
+            .filter(Employer.user_id == user.id)
+        )
+    ).first()
+    if not row:
+        raise ReportDataMissing("Profil employeur introuvable")
+    employer_id, company_name, company_industry, company_size = row
+
+    # Stats lues dans le rollup application_daily_stats, comme le dashboard employeur
+    agg = (await db.execute(employer_summary_query(employer_id))).one()
+
+    stats = [
+        {"title": "Offres actives", "value": str(agg.active_jobs or 0)},
+        {"title": "Candidatures", "value": str(agg.total or 0)},
+        {"title": "Entretiens", "value": str(agg.interviews or 0)},
+        {
+            "title": "Taux de reponse",
+            "value": f"{response_rate(agg.total or 0, agg.responded or 0)}%",
+        },
+    ]
+
+    # Offres et nombre de candidatures (rollup), lues en streaming (aucune liste
+    # complète en mémoire côté driver)
+    per_job = applications_per_job_query(employer_id)
+    jobs_query = (
+        select(
+            Job.title,
+            Job.status,
+            Job.posted_at,
+            func.coalesce(per_job.c.applications, 0).label("applications"),
+        )
+        .outerjoin(per_job, per_job.c.job_id == Job.id)
+        .filter(Job.employer_id == employer_id)
+        .order_by(Job.created_at.desc())
+        .execution_options(yield_per=REPORT_STREAM_CHUNK_SIZE)
+    )
+    if job_limit is not None:
+        jobs_query = jobs_query.limit(job_limit)
+    jobs_summary = []
+    async for job in await db.stream(jobs_query):
+        jobs_summary.append(
+            {
+                "title": job.title,
+                "status": getattr(job.status, "value", job.status),
+                "applications_count": job.applications,
+                "posted_at": job.posted_at.strftime("%d/%m/%Y")
+                if job.posted_at
+                else None,
+            }
+        )
+
+    return await generate_employer_report(
+        user_name=_display_name(user),
+        company_name=company_name,
+        company_industry=company_industry,
+        company_size=company_size,
+        stats=stats,
+        activities=[],
+        jobs_summary=jobs_summary,
+    )
+
+
+async def build_admin_report(db: AsyncSession, user: User) -> bytes:
+    """Rapport plateforme, lu dans le rollup platform_stats."""
+    stats = await get_platform_stats(db)
+    jobs_by_status = {
+        job_status.value: stats.get(JOBS_BY_STATUS, job_status.value)
+        for job_status in (
+            JobStatus.PUBLISHED,
+            JobStatus.DRAFT,
+            JobStatus.CLOSED,
+            JobStatus.ARCHIVED,
+        )
+    }
+
+    return await generate_admin_report(
+        admin_name=_display_name(user),
+        total_users=stats.total(USERS_BY_ROLE),
+        total_candidates=stats.get(USERS_BY_ROLE, UserRole.CANDIDATE.value),
+        total_employers=stats.get(USERS_BY_ROLE, UserRole.EMPLOYER.value),
+        total_companies=stats.get(COMPANIES),
+        total_jobs=stats.total(JOBS_BY_STATUS),
+        total_applications=stats.get(APPLICATIONS),
+        active_users=stats.get(USERS_BY_ACTIVE, "true"),
+        inactive_users=stats.get(USERS_BY_ACTIVE, "false"),
+        jobs_by_status=jobs_by_status,
+        recent_signups=stats.get(USERS_RECENT_SIGNUPS),
+    )
+
+
+# Type de rapport -> (rôle requis, collecteur)
+REPORT_KINDS: Dict[str, tuple] = {
+    "candidate": (UserRole.CANDIDATE, build_candidate_report),
+    "employer": (UserRole.EMPLOYER, build_employer_report),
+    "admin": (UserRole.ADMIN, build_admin_report),
+}
+
+
+# ── File ────────────────────────────────────────────────────────────────────
+
+
+async def _active_report_job(
+    db: AsyncSession, user_id: int, kind: str
+) -> Optional[ReportJob]:
+    return (
+        await db.execute(
+            select(ReportJob)
+            .filter(
+                ReportJob.user_id == user_id,
+                ReportJob.kind == kind,
+                ReportJob.status.in_(
+                    [ReportJobStatus.PENDING, ReportJobStatus.RUNNING]
+                ),
+            )
+            .order_by(ReportJob.id.desc())
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+
+
+async def enqueue_report(db: AsyncSession, user: User, kind: str) -> ReportJob:
+    """
+    Met un rapport en file et valide la transaction.
+
+    Un rapport du même type déjà en file ou en cours pour cet utilisateur est
+    renvoyé tel quel (garanti par l'index unique partiel uq_report_jobs_active_kind).
+    """
+    user_id = user.id
+    existing = await _active_report_job(db, user_id, kind)
+    if existing:
+        return existing
+
+    job = ReportJob(user_id=user_id, kind=kind, status=ReportJobStatus.PENDING)
+    db.add(job)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Demande simultanée du même rapport : celui de l'autre requête est renvoyé
+        await db.rollback()
+        existing = await _active_report_job(db, user_id, kind)
+        if existing is None:
+            raise
+        return existing
+    await db.refresh(job)
+    wake_report_worker()
+    return job
+
+
+def artifact_path(job_id: int) -> Path:
+    """Fichier du rapport sous REPORTS_STORAGE_DIR (volume partagé entre instances)."""
+    return REPORTS_STORAGE_DIR / f"report_{job_id}.pdf"
+
+
+def _write_artifact(path: Path, pdf_bytes: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_bytes(pdf_bytes)
+    tmp_path.replace(path)
+
+
+async def _claim_report_job(db: AsyncSession, now: datetime) -> Optional[int]:
+    """Réserve le plus ancien rapport en file (ou bloqué en cours) ; None si aucun."""
+    query = (
+        select(ReportJob.id)
+        .where(
+            or_(
+                ReportJob.status == ReportJobStatus.PENDING,
+                (ReportJob.status == ReportJobStatus.RUNNING)
+                & (
+                    ReportJob.started_at
+                    < now - timedelta(seconds=REPORT_JOBS_STALE_SECONDS)
+                ),
+            )
+        )
+        .order_by(ReportJob.created_at, ReportJob.id)
+        .limit(1)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    job_id = (await db.execute(query)).scalar_one_or_none()
+    if job_id is None:
+        await db.rollback()
+        return None
+    await db.execute(
+        update(ReportJob)
+        .where(ReportJob.id == job_id)
+        .values(status=ReportJobStatus.RUNNING, started_at=now, error=None)
+    )
+    await db.commit()
+    return job_id
+
+
+async def _mark_failed(db: AsyncSession, job_id: int, error: str) -> None:
+    await db.rollback()
+    await db.execute(
+        update(ReportJob)
+        .where(ReportJob.id == job_id)
+        .values(
+            status=ReportJobStatus.FAILED,
+            error=error,
+            completed_at=datetime.now(timezone.utc),
+        )
+    )
+    await db.commit()
+
+
+async def process_next_report(
+    db: AsyncSession, now: Optional[datetime] = None
+) -> Optional[int]:
+    """
+    Génère le prochain rapport en file.
+
+    Returns:
+        L'id du rapport traité (réussi ou échoué), None si la file est vide
+    """
+    now = now or datetime.now(timezone.utc)
+    job_id = await _claim_report_job(db, now)
+    if job_id is None:
+        return None
+
+    job = await db.get(ReportJob, job_id)
+    kind = job.kind
+    try:
+        user = await db.get(User, job.user_id)
+        role, build = REPORT_KINDS[kind]
+        if user is None or user.role != role:
+            raise ReportDataMissing("Utilisateur introuvable ou rôle incompatible")
+        pdf_bytes = await build(db, user)
+        path = artifact_path(job_id)
+        await asyncio.to_thread(_write_artifact, path, pdf_bytes)
+    except asyncio.CancelledError:
+        raise
+    except ReportDataMissing as e:
+        await _mark_failed(db, job_id, str(e))
+        logger.warning(f"Report {job_id} ({kind}) failed: {e}")
+        return job_id
+    except Exception as e:
+        await _mark_failed(db, job_id, REPORT_FAILED_MESSAGE)
+        logger.error(
+            f"Report {job_id} ({kind}) failed: {type(e).__name__}: {e}", exc_info=True
+        )
+        return job_id
+
+    completed_at = datetime.now(timezone.utc)
+    await db.execute(
+        update(ReportJob)
+        .where(ReportJob.id == job_id)
+        .values(
+            status=ReportJobStatus.COMPLETED,
+            file_path=path.name,
+            size_bytes=len(pdf_bytes),
+            completed_at=completed_at,
+            expires_at=completed_at + timedelta(hours=REPORT_ARTIFACT_TTL_HOURS),
+        )
+    )
+    await db.commit()
+    logger.info(f"Report {job_id} ({kind}) generated: {len(pdf_bytes)} bytes")
+    return job_id
+
+
+async def purge_expired_reports(
+    db: AsyncSession, now: Optional[datetime] = None
+) -> int:
+    """
+    Supprime les fichiers des rapports expirés ; retourne le nombre de rapports purgés.
+
+    Les fichiers sont retrouvés par id sous REPORTS_STORAGE_DIR : n'importe
+    quelle instance partageant le volume purge les rapports des autres.
+    """
+    now = now or datetime.now(timezone.utc)
+    rows = (
+        await db.execute(
+            select(ReportJob.id).where(
+                ReportJob.status == ReportJobStatus.COMPLETED,
+                ReportJob.expires_at <= now,
+            )
+        )
+    ).all()
+    if not rows:
+        return 0
+
+    def _unlink_all():
+        for row in rows:
+            artifact_path(row.id).unlink(missing_ok=True)
+
+    await asyncio.to_thread(_unlink_all)
+    await db.execute(
+        update(ReportJob)
+        .where(ReportJob.id.in_([row.id for row in rows]))
+        .values(status=ReportJobStatus.EXPIRED, file_path=None)
+    )
+    await db.commit()
+    return len(rows)
+
+
+# ── Worker ──────────────────────────────────────────────────────────────────
+
+_worker_task: Optional[asyncio.Task] = None
+_wake_event: Optional[asyncio.Event] = None
+
+
+def wake_report_worker() -> None:
+    """Réveille le worker sans attendre le prochain intervalle (à appeler après commit)."""
+    if _wake_event is not None:
+        _wake_event.set()
+
+
+async def _drain_queue() -> None:
+    """Purge les fichiers expirés puis génère les rapports en file les uns après les autres."""
+    async with AsyncSessionLocal() as db:
+        await purge_expired_reports(db)
+    while True:
+        async with AsyncSessionLocal() as db:
+            if await process_next_report(db) is None:
+                return
+
+
+async def _worker_loop() -> None:
+    while True:
+        _wake_event.clear()
+        try:
+            await _drain_queue()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                f"Report worker failed: {type(e).__name__}: {e}", exc_info=True
+            )
+        try:
+            await asyncio.wait_for(_wake_event.wait(), timeout=REPORT_JOBS_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_report_worker() -> None:
+    """Démarre le worker des rapports asynchrones (appelé au démarrage de l'application)."""
+    global _worker_task, _wake_event
+    if not REPORT_JOBS_WORKER_ENABLED or _worker_task is not None:
+        return
+    _wake_event = asyncio.Event()
+    _worker_task = asyncio.create_task(_worker_loop())
+    logger.info(f"Report worker started (poll every {REPORT_JOBS_POLL_SECONDS}s)")
+
+
+async def stop_report_worker() -> None:
+    """Arrête le worker des rapports asynchrones."""
+    global _worker_task, _wake_event
+    if _worker_task is None:
+        return
+    _worker_task.cancel()
+    try:
+        await _worker_task
+    except asyncio.CancelledError:
+        pass
+    _worker_task = None
+    _wake_event = None
@@ -1,14 +1,34 @@
 """
 Service de génération de rapports PDF — IntoWork
 Utilise WeasyPrint (HTML→PDF) + Jinja2 pour les templates.
+
+Le rendu (Jinja + write_pdf) est CPU-bound et prend plusieurs secondes : il
+est exécuté dans un pool de processus dédié (WorkerPool) dont les workers sont
+préchauffés au démarrage (import de WeasyPrint, templates compilés, polices
+chargées) ; un rendu qui dépasse son délai recycle le pool. Le même pool rend
+les PDF du CV Builder (write_html_pdf).
+Les PDF rendus sont mis en cache par empreinte du contexte : un rapport
+identique redemandé dans REPORT_CACHE_TTL_SECONDS est servi sans rendu, et
+les demandes identiques simultanées partagent le même rendu.
 """
 
-import io
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
+from typing import Optional, Tuple
 
 from jinja2 import Environment, FileSystemLoader
 
+from app.services.process_pool import InflightCalls, WorkerPool
+
 try:
     from weasyprint import HTML as _WeasyHTML
     WEASYPRINT_AVAILABLE = True
@@ -16,7 +36,16 @@ except OSError:
     _WeasyHTML = None  # type: ignore[assignment]
     WEASYPRINT_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
 TEMPLATES_DIR = Path(__file__).parent.parent / "templates" / "reports"
+REPORT_TEMPLATES = ("candidate.html", "employer.html", "admin.html")
+
+# Configuration
+REPORT_RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", "2"))
+REPORT_RENDER_TIMEOUT_SECONDS = float(os.getenv("REPORT_RENDER_TIMEOUT_SECONDS", "60"))
+REPORT_CACHE_TTL_SECONDS = float(os.getenv("REPORT_CACHE_TTL_SECONDS", "300"))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "64"))
 
 _jinja_env = Environment(
     loader=FileSystemLoader(str(TEMPLATES_DIR)),
@@ -24,17 +53,174 @@ _jinja_env = Environment(
 )
 
 
+class ReportRenderError(RuntimeError):
+    """Rendu PDF impossible (WeasyPrint absent, worker tué, délai dépassé)."""
+
+
+# ── Fonctions exécutées dans les workers ────────────────────────────────────
+
+# Configuration des polices du worker, chargée une fois par processus
+_font_config = None
+
+
+def _init_worker() -> None:
+    """Préchauffe un worker : templates compilés, polices chargées, un rendu à blanc."""
+    global _font_config
+    for template_name in REPORT_TEMPLATES:
+        _jinja_env.get_template(template_name)
+    if not WEASYPRINT_AVAILABLE or _WeasyHTML is None:
+        return
+    try:
+        from weasyprint.text.fonts import FontConfiguration
+        _font_config = FontConfiguration()
+    except ImportError:
+        _font_config = None
+    # Le premier write_pdf charge fontconfig / pango : on le paie ici
+    _WeasyHTML(string="<p>warmup</p>").write_pdf(font_config=_font_config)
+
+
 def _render_pdf(template_name: str, context: dict) -> bytes:
-    """Rend un template HTML en PDF via WeasyPrint."""
+    """Rend un template HTML en PDF via WeasyPrint (synchrone, exécuté dans un worker)."""
     if not WEASYPRINT_AVAILABLE or _WeasyHTML is None:
-        raise RuntimeError("WeasyPrint n'est pas disponible sur ce serveur (librairies système manquantes).")
+        raise ReportRenderError("WeasyPrint n'est pas disponible sur ce serveur (librairies système manquantes).")
     template = _jinja_env.get_template(template_name)
     html_content = template.render(**context, generated_at=datetime.now().strftime("%d/%m/%Y à %H:%M"))
-    pdf_bytes = _WeasyHTML(string=html_content).write_pdf()
+    pdf_bytes = _WeasyHTML(string=html_content).write_pdf(font_config=_font_config)
     return pdf_bytes
 
 
-def generate_candidate_report(
+def _write_html_pdf(html_content: str, path: str) -> int:
+    """Rend un HTML déjà construit en PDF et l'écrit atomiquement dans path ; retourne la taille."""
+    if not WEASYPRINT_AVAILABLE or _WeasyHTML is None:
+        raise ReportRenderError("WeasyPrint n'est pas disponible sur ce serveur (librairies système manquantes).")
+    pdf_bytes = _WeasyHTML(string=html_content).write_pdf(font_config=_font_config)
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f"{target.stem}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(pdf_bytes)
+    tmp_path.replace(target)
+    return len(pdf_bytes)
+
+
+# ── Cache des PDF rendus ────────────────────────────────────────────────────
+
+def report_cache_key(template_name: str, context: dict) -> str:
+    """Empreinte SHA-256 du template et du contexte (clés triées)."""
+    payload = json.dumps([template_name, context], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """Cache LRU à durée de vie des PDF rendus, indexé par empreinte du contexte."""
+
+    def __init__(self, ttl: float = REPORT_CACHE_TTL_SECONDS, max_entries: int = REPORT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, pdf_bytes = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return pdf_bytes
+
+    def set(self, key: str, pdf_bytes: bytes) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, pdf_bytes)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Cache partagé par le processus
+report_cache = ReportCache()
+
+# Rendus en cours, partagés entre demandes identiques simultanées
+_inflight = InflightCalls()
+
+
+# ── Gestion du pool ─────────────────────────────────────────────────────────
+
+_pool = WorkerPool("Report render", max_workers=REPORT_RENDER_WORKERS, initializer=_init_worker)
+
+
+def start_report_renderer() -> None:
+    """Démarre le pool et préchauffe tous ses workers (appelé au démarrage de l'application)."""
+    if not WEASYPRINT_AVAILABLE:
+        logger.info("Report render pool not started (WeasyPrint unavailable)")
+        return
+    _pool.warm_up()
+
+
+def shutdown_report_renderer() -> None:
+    """Arrête le pool de rendu (appelé à l'arrêt de l'application)."""
+    _pool.shutdown()
+
+
+async def _render_in_pool(template_name: str, context: dict) -> bytes:
+    try:
+        return await _pool.run(REPORT_RENDER_TIMEOUT_SECONDS, _render_pdf, template_name, context)
+    except asyncio.TimeoutError:
+        # Le pool est recyclé : le worker bloqué sur ce rendu est terminé
+        logger.warning(f"Report rendering timed out after {REPORT_RENDER_TIMEOUT_SECONDS}s ({template_name})")
+        raise ReportRenderError("La génération du rapport a pris trop de temps.")
+    except BrokenProcessPool:
+        logger.warning(f"Report render worker crashed ({template_name})")
+        raise ReportRenderError("La génération du rapport a échoué.")
+
+
+async def write_html_pdf(html_content: str, path: Path, timeout: float) -> int:
+    """
+    Rend un HTML déjà construit (PDF du CV Builder) dans le pool de rendu et
+    l'écrit dans path ; retourne la taille.
+
+    Raises:
+        asyncio.TimeoutError: délai dépassé (le pool a été recyclé)
+        BrokenProcessPool: worker tué (le pool a été abandonné)
+    """
+    return await _pool.run(timeout, _write_html_pdf, html_content, str(path))
+
+
+async def render_report_pdf(template_name: str, context: dict) -> bytes:
+    """
+    Rend un rapport PDF hors de la boucle d'événements, via le cache.
+
+    Raises:
+        ReportRenderError: WeasyPrint indisponible, worker tué ou délai dépassé
+    """
+    if not WEASYPRINT_AVAILABLE:
+        raise ReportRenderError("WeasyPrint n'est pas disponible sur ce serveur (librairies système manquantes).")
+
+    key = report_cache_key(template_name, context)
+    cached = report_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def render() -> bytes:
+        pdf_bytes = await _render_in_pool(template_name, context)
+        report_cache.set(key, pdf_bytes)
+        return pdf_bytes
+
+    return await _inflight.run(key, render)
+
+
+async def generate_candidate_report(
     user_name: str,
     email: str,
     title: str | None,
@@ -47,7 +233,7 @@ def generate_candidate_report(
     activities: list[dict],
 ) -> bytes:
     """Générer le rapport PDF candidat."""
-    return _render_pdf("candidate.html", {
+    return await render_report_pdf("candidate.html", {
         "user_name": user_name,
         "email": email,
         "title": title or "Non renseigné",
@@ -61,7 +247,7 @@ def generate_candidate_report(
     })
 
 
-def generate_employer_report(
+async def generate_employer_report(
     user_name: str,
     company_name: str,
     company_industry: str | None,
@@ -71,7 +257,7 @@ def generate_employer_report(
     jobs_summary: list[dict],
 ) -> bytes:
     """Générer le rapport PDF employeur."""
-    return _render_pdf("employer.html", {
+    return await render_report_pdf("employer.html", {
         "user_name": user_name,
         "company_name": company_name,
         "company_industry": company_industry or "Non renseigné",
@@ -82,7 +268,7 @@ def generate_employer_report(
     })
 
 
-def generate_admin_report(
+async def generate_admin_report(
     admin_name: str,
     total_users: int,
     total_candidates: int,
@@ -96,7 +282,7 @@ def generate_admin_report(
     recent_signups: int,
 ) -> bytes:
     """Générer le rapport PDF admin."""
-    return _render_pdf("admin.html", {
+    return await render_report_pdf("admin.html", {
         "admin_name": admin_name,
         "total_users": total_users,
         "total_candidates": total_candidates,
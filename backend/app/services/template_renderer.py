@@ -0,0 +1,119 @@
+"""
+Rendu compilé des templates d'emails (EmailTemplate)
+
+Un template est découpé une seule fois en segments (texte littéral / variable
+{nom}) ; le rendu est ensuite une simple concaténation en une passe, au lieu
+d'un str.replace par variable sur tout le sujet et le corps.
+
+Features:
+- Cache LRU par template, valide tant que (template_id, updated_at) ne change pas
+- Invalidation explicite à la modification / suppression d'un template
+- Variables inconnues laissées telles quelles ({nom}), comme auparavant
+- Une valeur contenant « {autre} » n'est pas ré-interprétée (rendu en une passe)
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+# Configuration
+EMAIL_TEMPLATE_CACHE_SIZE = int(os.getenv("EMAIL_TEMPLATE_CACHE_SIZE", "512"))
+
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+
+def _compile(text: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Découpe un texte en littéraux et noms de variables alternés.
+
+    "Bonjour {name} !" → littéraux ("Bonjour ", " !"), noms ("name",)
+    """
+    parts = _PLACEHOLDER_RE.split(text or "")
+    return tuple(parts[0::2]), tuple(parts[1::2])
+
+
+def _render(compiled: Tuple[Tuple[str, ...], Tuple[str, ...]], variables: dict) -> str:
+    literals, names = compiled
+    out = [literals[0]]
+    for name, literal in zip(names, literals[1:]):
+        out.append(str(variables[name]) if name in variables else "{" + name + "}")
+        out.append(literal)
+    return "".join(out)
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """Sujet et corps pré-découpés d'un EmailTemplate."""
+
+    template_id: Optional[int]
+    updated_at: Optional[datetime]
+    subject: Tuple[Tuple[str, ...], Tuple[str, ...]]
+    body: Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+    @classmethod
+    def compile(cls, template) -> "CompiledTemplate":
+        return cls(
+            template_id=getattr(template, "id", None),
+            updated_at=getattr(template, "updated_at", None),
+            subject=_compile(template.subject),
+            body=_compile(template.body),
+        )
+
+    def render(self, variables: dict) -> Tuple[str, str]:
+        """(sujet, corps HTML) avec les variables substituées."""
+        return _render(self.subject, variables), _render(self.body, variables)
+
+
+class TemplateCache:
+    """Cache LRU des templates compilés, indexé par template_id."""
+
+    def __init__(self, max_size: int = EMAIL_TEMPLATE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, CompiledTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, template) -> CompiledTemplate:
+        """Template compilé, recompilé si updated_at a changé depuis la mise en cache."""
+        template_id = getattr(template, "id", None)
+        if template_id is None:
+            return CompiledTemplate.compile(template)
+
+        updated_at = getattr(template, "updated_at", None)
+        with self._lock:
+            compiled = self._entries.get(template_id)
+            if compiled is not None and compiled.updated_at == updated_at:
+                self._entries.move_to_end(template_id)
+                return compiled
+
+        compiled = CompiledTemplate.compile(template)
+        with self._lock:
+            self._entries[template_id] = compiled
+            self._entries.move_to_end(template_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def invalidate(self, template_id: int) -> None:
+        """Retire un template du cache (modification / suppression)."""
+        with self._lock:
+            self._entries.pop(template_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Cache partagé par le processus
+template_cache = TemplateCache()
+
+
+def render_email_template(template, variables: dict) -> Tuple[str, str]:
+    """Rend un EmailTemplate via le cache de templates compilés."""
+    return template_cache.get(template).render(variables)
@@ -9,6 +9,15 @@ import os
 # Set NEXTAUTH_SECRET before any app imports that depend on it
 os.environ.setdefault("NEXTAUTH_SECRET", "test-secret-key-for-pytest-minimum-32-chars")
 os.environ.setdefault("FRONTEND_URL", "http://localhost:3000")
+# No background job alert dispatch against the real database
+os.environ.setdefault("JOB_ALERTS_DISPATCHER_ENABLED", "false")
+os.environ.setdefault("EMAIL_OUTBOX_WORKER_ENABLED", "false")
+os.environ.setdefault("NOTIFICATIONS_UNREAD_RECONCILE_ENABLED", "false")
+os.environ.setdefault("NOTIFICATIONS_PARTITION_MAINTENANCE_ENABLED", "false")
+os.environ.setdefault("PLATFORM_STATS_REFRESH_ENABLED", "false")
+os.environ.setdefault("REPORT_JOBS_WORKER_ENABLED", "false")
+os.environ.setdefault("CV_ANALYTICS_FLUSH_ENABLED", "false")
+os.environ.setdefault("CV_ANALYTICS_PARTITION_MAINTENANCE_ENABLED", "false")
 
 import pytest
 import asyncio
@@ -344,7 +353,6 @@ async def test_job(test_db: AsyncSession, employer_user: User) -> Job:
 def mock_email_service(monkeypatch):
     """Prevent real emails from being sent during tests."""
     mock_send = AsyncMock(return_value=True)
-    mock_send_template = AsyncMock(return_value=True)
 
     # Import the email_service module directly (not via app.services.__init__)
     import app.services.email_service as email_svc_module
@@ -354,13 +362,7 @@ def mock_email_service(monkeypatch):
         "send_password_reset_email",
         mock_send,
     )
-    # Also mock send_from_template used in applications
-    if hasattr(email_svc_module.email_service, "send_from_template"):
-        monkeypatch.setattr(
-            email_svc_module.email_service,
-            "send_from_template",
-            mock_send_template,
-        )
+    # Templated emails go through the outbox (rows only, no network)
     return mock_send
 
 
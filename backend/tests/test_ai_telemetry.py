@@ -0,0 +1,147 @@
+"""
+Tests for the instrumented Anthropic client (app/services/ai_telemetry.py).
+
+The underlying messages.create is mocked; Prometheus samples are read from
+the default registry.
+"""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import anthropic
+import httpx
+import pytest
+from app.services import ai_telemetry
+from app.services.ai_telemetry import InstrumentedMessages
+from prometheus_client import REGISTRY
+
+pytestmark = pytest.mark.asyncio
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _message(input_tokens: int = 120, output_tokens: int = 40) -> SimpleNamespace:
+    return SimpleNamespace(
+        content=[SimpleNamespace(text="{}")],
+        usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens),
+    )
+
+
+def _api_error(cls, status_code: int):
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    return cls(
+        "error", response=httpx.Response(status_code, request=request), body=None
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(ai_telemetry, "_retry_delay", lambda error, attempt: 0)
+
+
+class TestInstrumentedMessages:
+    async def test_records_latency_and_tokens(self):
+        create = AsyncMock(return_value=_message(120, 40))
+        messages = InstrumentedMessages(SimpleNamespace(create=create))
+        before_calls = _sample(
+            "intowork_ai_request_duration_seconds_count",
+            operation="t_success",
+            model="m",
+            status="success",
+        )
+        before_spend = _sample(
+            "intowork_ai_company_tokens_spent", company_id="4242", direction="input"
+        )
+
+        await messages.create(
+            operation="t_success", company_id=4242, model="m", max_tokens=10
+        )
+
+        assert create.await_args.kwargs == {"model": "m", "max_tokens": 10}
+        assert (
+            _sample(
+                "intowork_ai_request_duration_seconds_count",
+                operation="t_success",
+                model="m",
+                status="success",
+            )
+            == before_calls + 1
+        )
+        assert (
+            _sample(
+                "intowork_ai_tokens_sum",
+                operation="t_success",
+                model="m",
+                direction="output",
+            )
+            >= 40
+        )
+        assert (
+            _sample(
+                "intowork_ai_company_tokens_spent", company_id="4242", direction="input"
+            )
+            == before_spend + 120
+        )
+
+    async def test_retries_transient_errors(self):
+        create = AsyncMock(
+            side_effect=[_api_error(anthropic.RateLimitError, 429), _message()]
+        )
+        messages = InstrumentedMessages(SimpleNamespace(create=create), max_retries=2)
+        before = _sample(
+            "intowork_ai_retries_total",
+            operation="t_retry",
+            error_type="RateLimitError",
+        )
+
+        await messages.create(operation="t_retry", model="m")
+
+        assert create.await_count == 2
+        assert (
+            _sample(
+                "intowork_ai_retries_total",
+                operation="t_retry",
+                error_type="RateLimitError",
+            )
+            == before + 1
+        )
+
+    async def test_counts_errors_without_retrying_client_errors(self):
+        create = AsyncMock(side_effect=_api_error(anthropic.BadRequestError, 400))
+        messages = InstrumentedMessages(SimpleNamespace(create=create), max_retries=2)
+        before = _sample(
+            "intowork_ai_errors_total",
+            operation="t_error",
+            error_type="BadRequestError",
+        )
+
+        with pytest.raises(anthropic.BadRequestError):
+            await messages.create(operation="t_error", model="m")
+
+        assert create.await_count == 1
+        assert (
+            _sample(
+                "intowork_ai_errors_total",
+                operation="t_error",
+                error_type="BadRequestError",
+            )
+            == before + 1
+        )
+
+    async def test_gives_up_after_max_retries(self):
+        create = AsyncMock(side_effect=_api_error(anthropic.InternalServerError, 529))
+        messages = InstrumentedMessages(SimpleNamespace(create=create), max_retries=2)
+
+        with pytest.raises(anthropic.InternalServerError):
+            await messages.create(operation="t_exhausted", model="m")
+
+        assert create.await_count == 3
+        assert (
+            _sample(
+                "intowork_ai_errors_total",
+                operation="t_exhausted",
+                error_type="InternalServerError",
+            )
+            == 1
+        )
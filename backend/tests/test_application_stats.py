@@ -0,0 +1,251 @@
+"""
+Tests for the application_daily_stats rollup, the application_status_events
+log and the employer endpoints reading them (/api/dashboard,
+/api/dashboard/employer-funnel, /api/dashboard/employer-funnel/timeline).
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.models.base import ApplicationDailyStat, ApplicationStatusEvent, Job, User
+from app.services.application_stats import (
+    METRIC_INTERVIEW,
+    METRIC_RECEIVED,
+    METRIC_SOURCE,
+    METRIC_STATUS,
+    get_stage_durations,
+)
+from httpx import AsyncClient
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _apply(
+    client: AsyncClient, headers: dict, job_id: int, source_ref=None
+) -> int:
+    response = await client.post(
+        "/api/applications/my/applications",
+        headers=headers,
+        json={"job_id": job_id, "cover_letter": "Motivé", "source_ref": source_ref},
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+async def _set_status(
+    client: AsyncClient, headers: dict, application_id: int, status: str
+):
+    response = await client.put(
+        f"/api/applications/employer/applications/{application_id}/status",
+        headers=headers,
+        json={"status": status},
+    )
+    assert response.status_code == 200
+
+
+async def _rollup(db: AsyncSession) -> dict:
+    result = await db.execute(
+        select(
+            ApplicationDailyStat.metric,
+            ApplicationDailyStat.dimension,
+            ApplicationDailyStat.count,
+        )
+    )
+    totals = {}
+    for metric, dimension, count in result.all():
+        totals[(metric, dimension)] = totals.get((metric, dimension), 0) + count
+    return {key: count for key, count in totals.items() if count}
+
+
+class TestApplicationStatsRollup:
+    async def test_write_paths_keep_rollup_in_sync(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        auth_headers_employer: dict,
+        candidate_user: User,
+        test_job: Job,
+        test_db: AsyncSession,
+    ):
+        application_id = await _apply(
+            client, auth_headers_candidate, test_job.id, source_ref="linkedin"
+        )
+        assert await _rollup(test_db) == {
+            (METRIC_RECEIVED, ""): 1,
+            (METRIC_SOURCE, "linkedin"): 1,
+            (METRIC_STATUS, "applied"): 1,
+        }
+
+        await _set_status(client, auth_headers_employer, application_id, "interview")
+        rollup = await _rollup(test_db)
+        assert rollup[(METRIC_STATUS, "interview")] == 1
+        assert (METRIC_STATUS, "applied") not in rollup
+        assert rollup[(METRIC_INTERVIEW, "")] == 1
+
+        response = await client.delete(
+            f"/api/applications/my/applications/{application_id}",
+            headers=auth_headers_candidate,
+        )
+        assert response.status_code == 200
+        rollup = await _rollup(test_db)
+        assert (METRIC_STATUS, "interview") not in rollup
+        # Les flux (reçues, canal, passages en entretien) restent acquis
+        assert rollup[(METRIC_RECEIVED, "")] == 1
+
+
+class TestStatusEvents:
+    async def test_transitions_are_logged(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        auth_headers_employer: dict,
+        candidate_user: User,
+        employer_user: User,
+        test_job: Job,
+        test_db: AsyncSession,
+    ):
+        application_id = await _apply(client, auth_headers_candidate, test_job.id)
+        await _set_status(client, auth_headers_employer, application_id, "shortlisted")
+        # Statut inchangé : pas d'événement
+        await _set_status(client, auth_headers_employer, application_id, "shortlisted")
+
+        result = await test_db.execute(
+            select(
+                ApplicationStatusEvent.from_status,
+                ApplicationStatusEvent.to_status,
+                ApplicationStatusEvent.actor_user_id,
+                ApplicationStatusEvent.job_id,
+            ).order_by(ApplicationStatusEvent.id)
+        )
+        assert result.all() == [
+            (None, "applied", candidate_user.id, test_job.id),
+            ("applied", "shortlisted", employer_user.id, test_job.id),
+        ]
+
+    async def test_stage_durations_use_window_over_log(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        auth_headers_employer: dict,
+        candidate_user: User,
+        test_job: Job,
+        test_db: AsyncSession,
+    ):
+        application_id = await _apply(client, auth_headers_candidate, test_job.id)
+        await _set_status(client, auth_headers_employer, application_id, "shortlisted")
+        await _set_status(client, auth_headers_employer, application_id, "interview")
+
+        # applied : 3 jours, shortlisted : 1 jour
+        now = datetime.now(timezone.utc)
+        for to_status, occurred_at in (
+            ("applied", now - timedelta(days=4)),
+            ("shortlisted", now - timedelta(days=1)),
+        ):
+            await test_db.execute(
+                update(ApplicationStatusEvent)
+                .where(ApplicationStatusEvent.to_status == to_status)
+                .values(occurred_at=occurred_at)
+            )
+        await test_db.commit()
+
+        durations = await get_stage_durations(
+            test_db, test_job.employer_id, now - timedelta(days=30)
+        )
+
+        assert set(durations) == {"applied", "shortlisted"}
+        assert durations["applied"][0] == pytest.approx(3 * 86400, abs=5)
+        assert durations["shortlisted"][0] == pytest.approx(86400, abs=5)
+
+        response = await client.get(
+            "/api/dashboard/employer-funnel", headers=auth_headers_employer
+        )
+        stages = {
+            stage["status"]: stage["avg_days"]
+            for stage in response.json()["stage_durations"]
+        }
+        assert stages == {"applied": 3.0, "shortlisted": 1.0}
+
+    async def test_timeline_endpoint(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        auth_headers_employer: dict,
+        candidate_user: User,
+        test_job: Job,
+    ):
+        application_id = await _apply(client, auth_headers_candidate, test_job.id)
+        await _set_status(client, auth_headers_employer, application_id, "viewed")
+
+        response = await client.get(
+            "/api/dashboard/employer-funnel/timeline?days=7",
+            headers=auth_headers_employer,
+        )
+
+        assert response.status_code == 200
+        timeline = response.json()["timeline"]
+        assert len(timeline) == 1
+        assert timeline[0]["date"] == datetime.now(timezone.utc).date().isoformat()
+        assert timeline[0]["counts"] == {"applied": 1, "viewed": 1}
+
+
+class TestEmployerEndpoints:
+    async def test_dashboard_reads_rollup(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        auth_headers_employer: dict,
+        candidate_user: User,
+        test_job: Job,
+    ):
+        application_id = await _apply(client, auth_headers_candidate, test_job.id)
+        await _set_status(client, auth_headers_employer, application_id, "interview")
+
+        response = await client.get("/api/dashboard", headers=auth_headers_employer)
+
+        stats = {stat["title"]: stat["value"] for stat in response.json()["stats"]}
+        assert stats["Offres actives"] == "1"
+        assert stats["Candidatures reçues"] == "1"
+        assert stats["Entretiens prévus"] == "1"
+        assert stats["Taux de réponse"] == "100%"
+
+    async def test_funnel_reads_rollup(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        auth_headers_employer: dict,
+        candidate_user: User,
+        test_job: Job,
+        test_db: AsyncSession,
+    ):
+        application_id = await _apply(client, auth_headers_candidate, test_job.id)
+        await _set_status(client, auth_headers_employer, application_id, "interview")
+        # Deux jours entre candidature et entretien
+        row = (
+            await test_db.execute(
+                select(ApplicationDailyStat).filter(
+                    ApplicationDailyStat.metric == METRIC_INTERVIEW
+                )
+            )
+        ).scalar_one()
+        row.total_seconds = timedelta(days=2).total_seconds()
+        await test_db.commit()
+
+        response = await client.get(
+            "/api/dashboard/employer-funnel", headers=auth_headers_employer
+        )
+
+        data = response.json()
+        funnel = {step["status"]: step["count"] for step in data["funnel"]}
+        assert funnel == {
+            "applied": 0,
+            "viewed": 0,
+            "shortlisted": 0,
+            "interview": 1,
+            "accepted": 0,
+        }
+        assert data["by_job"] == [
+            {"job_id": test_job.id, "title": test_job.title, "total": 1}
+        ]
+        assert data["avg_days_to_interview"] == 2.0
+        assert data["conversion_rate"] == 0.0
@@ -9,7 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.models.base import (
-    Job, User, Candidate, JobApplication, ApplicationStatus,
+    Job, User, Candidate, JobApplication, ApplicationStatus, Notification, NotificationType,
 )
 
 
@@ -359,6 +359,37 @@ class TestUpdateApplicationStatus:
 
         assert response.status_code == 200
 
+    async def test_status_flow_notifies_both_parties(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        auth_headers_employer: dict,
+        candidate_user: User,
+        employer_user: User,
+        test_job: Job,
+        test_db: AsyncSession,
+    ):
+        """Applying notifies the employer; a status change notifies the candidate."""
+        create_resp = await _apply_to_job(
+            client, auth_headers_candidate, test_job.id
+        )
+        app_id = create_resp.json()["id"]
+
+        await client.put(
+            f"/api/applications/employer/applications/{app_id}/status",
+            headers=auth_headers_employer,
+            json={"status": "shortlisted"},
+        )
+
+        result = await test_db.execute(
+            select(Notification.user_id, Notification.type, Notification.related_application_id)
+            .order_by(Notification.id)
+        )
+        assert result.all() == [
+            (employer_user.id, NotificationType.NEW_APPLICATION, app_id),
+            (candidate_user.id, NotificationType.STATUS_CHANGE, app_id),
+        ]
+
     async def test_candidate_cannot_update_status(
         self,
         client: AsyncClient,
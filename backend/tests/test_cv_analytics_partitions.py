@@ -0,0 +1,50 @@
+"""
+Tests for cv_analytics partition naming and retention selection.
+
+Partition DDL itself is PostgreSQL-only; on the SQLite test database the
+maintenance run is a no-op.
+"""
+from datetime import date, datetime, timezone
+
+import pytest
+from app.services.cv_analytics_partitions import (
+    expired_partitions,
+    partition_month,
+    partition_name,
+    run_cv_analytics_partition_maintenance,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class TestPartitionNames:
+    def test_round_trip(self):
+        assert partition_name(date(2026, 1, 1)) == "cv_analytics_p2026_01"
+        assert partition_month("cv_analytics_p2026_01") == date(2026, 1, 1)
+        assert partition_month("cv_analytics_default") is None
+        assert partition_month("notifications_p2026_01") is None
+
+
+class TestExpiredPartitions:
+    def test_only_whole_months_before_cutoff(self):
+        names = [
+            "cv_analytics_default",
+            "cv_analytics_p2026_02",
+            "cv_analytics_p2026_03",
+            "cv_analytics_p2026_04",
+            "cv_analytics_p2026_10",
+        ]
+        now = datetime(2026, 10, 19, tzinfo=timezone.utc)
+
+        # Rétention de 6 mois : tout ce qui précède avril 2026 expire
+        assert expired_partitions(names, now, 6) == [
+            "cv_analytics_p2026_02",
+            "cv_analytics_p2026_03",
+        ]
+
+
+@pytest.mark.asyncio
+async def test_maintenance_noop_without_postgres(test_db: AsyncSession):
+    assert await run_cv_analytics_partition_maintenance(test_db) == {
+        "created": [],
+        "retired": [],
+    }
@@ -1,15 +1,21 @@
 """
 Tests for CV Builder endpoints (/api/cv-builder/*).
 
-Covers: save, load, list, public access, PDF generation (mocked),
-analytics, toggle-public, delete.
+Covers: save, load, list, public access, PDF generation (pool mocked),
+HTML templates, analytics (buffered views), toggle-public, delete.
 """
+import asyncio
+from datetime import datetime, timezone
+
 import pytest
-from unittest.mock import patch, MagicMock
 from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete as sql_delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.models.base import CVDocument, CVTemplate, User
+from app.api import cv_builder
+from app.models.base import CVAnalytics, CVAnalyticsDaily, CVDocument, CVTemplate, User
+from app.services import cv_analytics, cv_pdf
+from app.services.cv_renderer import render_cv_html
 
 
 pytestmark = pytest.mark.asyncio
@@ -91,6 +97,29 @@ async def _create_cv(
     return resp.json()
 
 
+@pytest.fixture(autouse=True)
+def empty_analytics_buffer(monkeypatch):
+    """Each test starts with an empty in-process view buffer."""
+    monkeypatch.setattr(cv_analytics, "_events", [])
+    monkeypatch.setattr(cv_analytics, "_pending", {})
+    monkeypatch.setattr(cv_analytics, "_flushing", {})
+
+
+@pytest.fixture
+def pdf_renderer(monkeypatch, tmp_path) -> list:
+    """Replace the WeasyPrint pool with a fake writer; returns the rendered keys."""
+    rendered = []
+
+    async def fake_render(html_content: str, path):
+        rendered.append(path.stem)
+        path.write_bytes(b"%PDF-1.4 fake")
+
+    monkeypatch.setattr(cv_pdf, "WEASYPRINT_AVAILABLE", True)
+    monkeypatch.setattr(cv_pdf, "CV_PDF_STORAGE_DIR", tmp_path)
+    monkeypatch.setattr(cv_pdf, "_render_in_pool", fake_render)
+    return rendered
+
+
 # ===========================================================================
 # Save CV
 # ===========================================================================
@@ -316,55 +345,140 @@ class TestGeneratePDF:
         assert response.status_code == 404
 
     async def test_generate_pdf_weasyprint_not_installed(
-        self, client: AsyncClient, auth_headers_candidate: dict
+        self, client: AsyncClient, auth_headers_candidate: dict, monkeypatch
     ):
-        """When WeasyPrint is not installed, returns 503."""
+        """When WeasyPrint is not available, returns 503."""
+        monkeypatch.setattr(cv_pdf, "WEASYPRINT_AVAILABLE", False)
         await _create_cv(client, auth_headers_candidate)
 
-        # The default import of weasyprint will fail with ImportError,
-        # which the endpoint handles by returning 503.
-        # We patch the import to ensure it raises ImportError.
-        with patch.dict("sys.modules", {"weasyprint": None}):
-            response = await client.post(
-                "/api/cv-builder/generate-pdf",
-                headers=auth_headers_candidate,
-            )
-            assert response.status_code == 503
+        response = await client.post(
+            "/api/cv-builder/generate-pdf",
+            headers=auth_headers_candidate,
+        )
+        assert response.status_code == 503
 
     async def test_generate_pdf_success_mocked(
-        self, client: AsyncClient, auth_headers_candidate: dict
+        self, client: AsyncClient, auth_headers_candidate: dict, pdf_renderer: list
     ):
-        """With WeasyPrint mocked, PDF generation succeeds."""
-        from pathlib import Path
+        """The PDF prerendered after save is served without a second render."""
+        await _create_cv(client, auth_headers_candidate)
+        await asyncio.sleep(0)
+
+        response = await client.post(
+            "/api/cv-builder/generate-pdf",
+            headers=auth_headers_candidate,
+        )
+        assert response.status_code == 200
+        assert response.content == b"%PDF-1.4 fake"
+        assert len(pdf_renderer) == 1
+
+    async def test_identical_cvs_share_pdf(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        auth_headers_employer: dict,
+        pdf_renderer: list,
+    ):
+        """Same content and template map to the same stored PDF."""
+        await _create_cv(client, auth_headers_candidate)
+        await _create_cv(client, auth_headers_employer)
+
+        for headers in (auth_headers_candidate, auth_headers_employer):
+            response = await client.post("/api/cv-builder/generate-pdf", headers=headers)
+            assert response.status_code == 200
+        assert len(pdf_renderer) == 1
+
+    async def test_edit_renders_new_pdf_and_drops_old(
+        self, client: AsyncClient, auth_headers_candidate: dict, pdf_renderer: list
+    ):
+        await _create_cv(client, auth_headers_candidate)
+        await asyncio.sleep(0)
+        first_key = pdf_renderer[0]
+
+        await _create_cv(client, auth_headers_candidate, template="bold")
+        await asyncio.sleep(0)
+
+        assert len(pdf_renderer) == 2
+        assert pdf_renderer[1] != first_key
+        assert not cv_pdf.cv_pdf_path(first_key).exists()
+        assert cv_pdf.cv_pdf_path(pdf_renderer[1]).exists()
+
+    async def test_resave_during_render_does_not_leak_pdf(
+        self, client: AsyncClient, test_db: AsyncSession, auth_headers_candidate: dict, monkeypatch, tmp_path,
+    ):
+        """The PDF of abandoned content still rendering is removed once the render ends."""
+        release = asyncio.Event()
+        started = []
+
+        async def slow_render(html_content: str, path):
+            started.append(path.stem)
+            await release.wait()
+            path.write_bytes(b"%PDF-1.4 fake")
+
+        monkeypatch.setattr(cv_pdf, "WEASYPRINT_AVAILABLE", True)
+        monkeypatch.setattr(cv_pdf, "CV_PDF_STORAGE_DIR", tmp_path)
+        monkeypatch.setattr(cv_pdf, "_render_in_pool", slow_render)
+        monkeypatch.setattr(cv_builder, "AsyncSessionLocal", async_sessionmaker(test_db.bind, expire_on_commit=False))
+
+        await _create_cv(client, auth_headers_candidate)
+        await asyncio.sleep(0)
+        await _create_cv(client, auth_headers_candidate, template="bold")
+        await asyncio.sleep(0)
+        assert len(started) == 2
+        assert cv_pdf._discard_tasks
+
+        release.set()
+        await asyncio.gather(*cv_pdf._prerender_tasks.values(), *cv_pdf._discard_tasks)
+
+        assert not cv_pdf.cv_pdf_path(started[0]).exists()
+        assert cv_pdf.cv_pdf_path(started[1]).exists()
+
+    async def test_identical_content_found_by_hash(
+        self, client: AsyncClient, test_db: AsyncSession, auth_headers_candidate: dict, pdf_renderer: list,
+    ):
+        await _create_cv(client, auth_headers_candidate)
+
+        cv = (await test_db.execute(select(CVDocument))).scalar_one()
+        assert cv.content_hash == cv_pdf.cv_content_hash(cv.cv_data)
+
+    async def test_key_depends_on_renderer_version(self, monkeypatch):
+        cv_data = _cv_save_payload()["cv_data"]
+        key = cv_pdf.cv_pdf_key(cv_data, "elegance")
+
+        assert cv_pdf.cv_pdf_key(dict(reversed(list(cv_data.items()))), "elegance") == key
+        assert cv_pdf.cv_pdf_key(cv_data, "bold") != key
+        monkeypatch.setattr(cv_pdf, "CV_RENDERER_VERSION", "test")
+        assert cv_pdf.cv_pdf_key(cv_data, "elegance") != key
 
-        saved = await _create_cv(client, auth_headers_candidate)
-        slug = saved["slug"]
-        pdf_dir = Path(__file__).parent.parent / "uploads" / "pdfs"
-        pdf_dir.mkdir(parents=True, exist_ok=True)
-        pdf_path = pdf_dir / f"{slug}.pdf"
-
-        def _fake_write_pdf(path: str, **kwargs) -> None:
-            """Create a minimal fake PDF file so FileResponse finds it."""
-            Path(path).write_bytes(b"%PDF-1.4 fake")
-
-        mock_html_instance = MagicMock()
-        mock_html_instance.write_pdf = MagicMock(side_effect=_fake_write_pdf)
-        mock_html_class = MagicMock(return_value=mock_html_instance)
-        mock_weasyprint = MagicMock()
-        mock_weasyprint.HTML = mock_html_class
-
-        try:
-            with patch.dict("sys.modules", {"weasyprint": mock_weasyprint}):
-                response = await client.post(
-                    "/api/cv-builder/generate-pdf",
-                    headers=auth_headers_candidate,
-                )
-                assert response.status_code == 200
-                assert mock_html_class.called
-        finally:
-            # Clean up the fake PDF
-            if pdf_path.exists():
-                pdf_path.unlink()
+
+class TestRenderCVHTML:
+    """Jinja CV templates (app/templates/cv)"""
+
+    async def test_user_content_is_escaped(self):
+        cv_data = _cv_save_payload(first_name="<script>alert(1)</script>")["cv_data"]
+
+        html = render_cv_html(cv_data, "elegance")
+
+        assert "<script>" not in html
+        assert "&lt;script&gt;alert(1)&lt;/script&gt; Dupont" in html
+        assert "ACME" in html and "Python" in html and "Francais" in html
+
+    async def test_template_palette_and_fallback(self):
+        cv_data = _cv_save_payload()["cv_data"]
+
+        assert "#6B46C1" in render_cv_html(cv_data, "bold")
+        assert "#1e3a5f" in render_cv_html(cv_data, "executive")
+        assert render_cv_html(cv_data, "unknown") == render_cv_html(cv_data, "elegance")
+
+    async def test_current_position_and_empty_sections(self):
+        cv_data = _cv_save_payload()["cv_data"]
+        cv_data["experiences"][0]["current"] = True
+        cv_data["educations"] = []
+
+        html = render_cv_html(cv_data, "minimal")
+
+        assert "2020-01 - Present" in html
+        assert "Formation" not in html
 
 
 # ===========================================================================
@@ -412,6 +526,128 @@ class TestAnalytics:
         assert data["total_views"] >= 2
 
 
+class TestAnalyticsBuffer:
+    """Public views are buffered, then written by flush_cv_analytics."""
+
+    async def test_views_are_buffered_then_flushed(
+        self, client: AsyncClient, auth_headers_candidate: dict, test_db: AsyncSession
+    ):
+        saved = await _create_cv(client, auth_headers_candidate, is_public=True)
+        for _ in range(3):
+            await client.get(f"/api/cv-builder/public/{saved['slug']}")
+        resp = await client.post(f"/api/cv-builder/track-view/{saved['slug']}")
+
+        # Counter is exact before any write
+        assert resp.json()["views_count"] == 4
+        assert await test_db.scalar(select(func.count()).select_from(CVAnalytics)) == 0
+
+        assert await cv_analytics.flush_cv_analytics(test_db) == 4
+
+        cv = await test_db.get(CVDocument, saved["id"])
+        assert cv.views_count == 4
+        assert await test_db.scalar(select(func.count()).select_from(CVAnalytics)) == 4
+        assert cv_analytics.pending_views(saved["id"]) == 0
+
+        resp = await client.get(f"/api/cv-builder/public/{saved['slug']}")
+        assert resp.json()["views_count"] == 5
+
+    async def test_flush_maintains_daily_rollup(
+        self, client: AsyncClient, auth_headers_candidate: dict, test_db: AsyncSession, pdf_renderer: list
+    ):
+        saved = await _create_cv(client, auth_headers_candidate, is_public=True)
+        await client.get(f"/api/cv-builder/public/{saved['slug']}")
+        await client.post("/api/cv-builder/generate-pdf", headers=auth_headers_candidate)
+        cv_analytics.record_cv_view(saved["id"], country="GA")
+
+        await cv_analytics.flush_cv_analytics(test_db)
+        # Un second lot incrémente les mêmes lignes du rollup
+        await client.get(f"/api/cv-builder/public/{saved['slug']}")
+        await cv_analytics.flush_cv_analytics(test_db)
+
+        result = await test_db.execute(
+            select(CVAnalyticsDaily.event_type, CVAnalyticsDaily.country, CVAnalyticsDaily.count)
+        )
+        assert sorted(result.all()) == [("download", "", 1), ("view", "", 2), ("view", "GA", 1)]
+
+        # Les statistiques viennent du rollup, même sans événements bruts
+        await test_db.execute(sql_delete(CVAnalytics))
+        await test_db.commit()
+        data = (await client.get("/api/cv-builder/analytics", headers=auth_headers_candidate)).json()
+        assert data["total_views"] == 3
+        assert data["total_downloads"] == 1
+        assert data["views_by_date"] == [{"date": datetime.now(timezone.utc).date().isoformat(), "count": 3}]
+        assert data["views_by_country"] == [{"country": "GA", "count": 1}]
+        assert data["recent_views"] == []
+
+    async def test_flush_splits_statements(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        auth_headers_employer: dict,
+        test_db: AsyncSession,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(cv_analytics, "_STATEMENT_ROWS", 1)
+        first = await _create_cv(client, auth_headers_candidate)
+        second = await _create_cv(client, auth_headers_employer)
+        for cv_id in (first["id"], second["id"], second["id"]):
+            cv_analytics.record_cv_view(cv_id, country="GA")
+        cv_analytics.record_cv_download(second["id"])
+
+        assert await cv_analytics.flush_cv_analytics(test_db) == 4
+
+        counters = (await test_db.execute(
+            select(CVDocument.id, CVDocument.views_count, CVDocument.downloads_count).order_by(CVDocument.id)
+        )).all()
+        assert [tuple(row) for row in counters] == [(first["id"], 1, 0), (second["id"], 2, 1)]
+        assert await test_db.scalar(select(func.sum(CVAnalyticsDaily.count))) == 4
+
+    async def test_views_of_deleted_cv_are_dropped(
+        self, client: AsyncClient, auth_headers_candidate: dict, test_db: AsyncSession
+    ):
+        saved = await _create_cv(client, auth_headers_candidate, is_public=True)
+        await client.get(f"/api/cv-builder/public/{saved['slug']}")
+        await client.delete("/api/cv-builder/delete", headers=auth_headers_candidate)
+
+        assert await cv_analytics.flush_cv_analytics(test_db) == 0
+        assert await test_db.scalar(select(func.count()).select_from(CVAnalytics)) == 0
+
+    async def test_failed_flush_keeps_buffer(self, monkeypatch):
+        cv_analytics.record_cv_view(42, referrer="https://example.com")
+
+        class BrokenSession:
+            async def scalars(self, *args, **kwargs):
+                raise RuntimeError("database down")
+
+            async def rollback(self):
+                pass
+
+        with pytest.raises(RuntimeError):
+            await cv_analytics.flush_cv_analytics(BrokenSession())
+
+        assert cv_analytics.pending_views(42) == 1
+        assert len(cv_analytics._events) == 1
+
+
+    async def test_cancelled_flush_keeps_buffer(self):
+        cv_analytics.record_cv_view(42)
+
+        class HangingSession:
+            async def scalars(self, *args, **kwargs):
+                await asyncio.Event().wait()
+
+            async def rollback(self):
+                pass
+
+        flush = asyncio.create_task(cv_analytics.flush_cv_analytics(HangingSession()))
+        await asyncio.sleep(0)
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+
+        assert cv_analytics.pending_views(42) == 1
+        assert len(cv_analytics._events) == 1
+
 # ===========================================================================
 # Toggle public
 # ===========================================================================
@@ -0,0 +1,183 @@
+"""
+Tests for the CV text extraction service (app/services/cv_parser.py).
+
+Covers: format detection, PDF/DOCX extraction, max_chars truncation,
+process-pool execution, pool recycling on timeout, graceful failure on
+unreadable documents.
+"""
+import asyncio
+import io
+import time
+
+import pytest
+from app.services import cv_parser
+from app.services.process_pool import WorkerPool
+
+pytestmark = pytest.mark.asyncio
+
+
+def _make_docx(paragraphs: list[str]) -> bytes:
+    """Build an in-memory DOCX document."""
+    import docx
+
+    document = docx.Document()
+    for text in paragraphs:
+        document.add_paragraph(text)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _make_pdf(pages: list[str]) -> bytes:
+    """Build a minimal PDF with one line of Helvetica text per page."""
+    font_id = 3 + 2 * len(pages)
+    page_ids = [3 + 2 * i for i in range(len(pages))]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids ["
+        + b" ".join(b"%d 0 R" % i for i in page_ids)
+        + b"] /Count %d >>" % len(pages),
+        font_id: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for page_id, text in zip(page_ids, pages):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode("latin-1") + b") Tj ET"
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (font_id, page_id + 1)
+        )
+        objects[page_id + 1] = (
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(output)
+        output += b"%d 0 obj\n" % object_id + objects[object_id] + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for object_id in sorted(objects):
+        output += b"%010d 00000 n \n" % offsets[object_id]
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    return bytes(output)
+
+
+class TestParseDocument:
+    """Synchronous parsing (what runs inside the worker)."""
+
+    def test_docx_skips_empty_paragraphs(self):
+        content = _make_docx(["Jean Dupont", "", "Développeur Python"])
+        assert cv_parser.parse_document(content) == "Jean Dupont\nDéveloppeur Python"
+
+    def test_docx_stops_at_max_chars(self):
+        content = _make_docx([f"Paragraphe {i} " + "x" * 50 for i in range(100)])
+        extracted = cv_parser.parse_document(content, max_chars=200)
+        assert len(extracted) == 200
+        assert extracted.startswith("Paragraphe 0")
+
+    def test_pdf_extracts_pages_in_order(self):
+        content = _make_pdf(["Jean Dupont", "Developpeur Python"])
+        assert cv_parser.parse_document(content) == "Jean Dupont\nDeveloppeur Python"
+
+    def test_pdf_stops_reading_pages_at_max_chars(self):
+        content = _make_pdf([f"Page {i} " + "x" * 40 for i in range(10)])
+        pages_read = []
+        original = cv_parser.iter_pdf_pages
+
+        def counting_pages(file_bytes):
+            for text in original(file_bytes):
+                pages_read.append(text)
+                yield text
+
+        cv_parser.iter_pdf_pages = counting_pages
+        try:
+            extracted = cv_parser.parse_document(content, max_chars=100)
+        finally:
+            cv_parser.iter_pdf_pages = original
+        assert len(extracted) == 100
+        assert extracted.startswith("Page 0")
+        assert len(pages_read) == 3
+
+    def test_pdf_page_limit(self):
+        content = _make_pdf([f"Page {i}" for i in range(5)])
+        assert list(cv_parser.iter_pdf_pages(content, max_pages=2)) == [
+            "Page 0",
+            "Page 1",
+        ]
+
+    def test_legacy_doc_filters_binary(self):
+        content = b"\xd0\xcf\x11\xe0Jean\x00\x01Dupont"
+        extracted = cv_parser.parse_document(content)
+        assert "Jean" in extracted
+        assert "Dupont" in extracted
+        assert "\x00" not in extracted
+
+
+class TestParseCvBytes:
+    """Async entry point backed by the process pool."""
+
+    async def test_empty_bytes(self):
+        assert await cv_parser.parse_cv_bytes(b"") == ""
+
+    async def test_runs_in_pool(self):
+        content = _make_docx(["Compétences: Python, FastAPI"])
+        try:
+            extracted = await cv_parser.parse_cv_bytes(content)
+        finally:
+            cv_parser.shutdown_cv_parser()
+        assert extracted == "Compétences: Python, FastAPI"
+
+    async def test_corrupted_pdf_returns_empty(self):
+        try:
+            extracted = await cv_parser.parse_cv_bytes(b"%PDF-1.4 not really a pdf")
+        finally:
+            cv_parser.shutdown_cv_parser()
+        assert extracted == ""
+
+    async def test_pdf_runs_in_pool(self):
+        try:
+            extracted = await cv_parser.parse_cv_bytes(
+                _make_pdf(["Competences: Python"])
+            )
+        finally:
+            cv_parser.shutdown_cv_parser()
+        assert extracted == "Competences: Python"
+
+    @pytest.mark.skipif(
+        not cv_parser.RESOURCE_AVAILABLE, reason="resource module is Unix-only"
+    )
+    async def test_workers_cap_data_segment(self):
+        import resource
+
+        try:
+            soft, _ = await cv_parser._pool.run(
+                10, resource.getrlimit, resource.RLIMIT_DATA
+            )
+        finally:
+            cv_parser.shutdown_cv_parser()
+        assert soft == cv_parser.CV_PARSER_MEMORY_LIMIT_MB * 1024 * 1024
+        assert cv_parser._pool.mp_context.get_start_method() == "spawn"
+
+
+class TestWorkerPool:
+    """Pool recycling when a job outlives its timeout."""
+
+    async def test_timeout_terminates_workers(self):
+        pool = WorkerPool("Test", max_workers=1)
+        try:
+            assert await pool.run(10, abs, -1) == 1
+            processes = list(pool.executor()._processes.values())
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.run(0.5, time.sleep, 30)
+            assert not pool.started
+            for process in processes:
+                process.join(timeout=5)
+                assert not process.is_alive()
+            # A fresh pool answers right away
+            assert await pool.run(10, abs, -3) == 3
+        finally:
+            pool.shutdown()
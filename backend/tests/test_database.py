@@ -0,0 +1,35 @@
+"""
+Tests for app.database helpers.
+
+The concurrent path of gather_reads needs a pooled PostgreSQL engine; on the
+SQLite StaticPool test engine the reads run in sequence on the request
+session.
+"""
+import pytest
+from app.database import gather_reads
+from app.models.base import User
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_gather_reads_keeps_order(
+    test_db: AsyncSession, candidate_user: User, employer_user: User
+):
+    sessions = []
+
+    async def read_email(session: AsyncSession, user_id: int):
+        sessions.append(session)
+        return (
+            await session.execute(select(User.email).filter(User.id == user_id))
+        ).scalar_one()
+
+    results = await gather_reads(
+        test_db,
+        lambda session: read_email(session, employer_user.id),
+        lambda session: read_email(session, candidate_user.id),
+    )
+
+    assert results == [employer_user.email, candidate_user.email]
+    assert sessions == [test_db, test_db]
@@ -0,0 +1,185 @@
+"""
+Tests for bulk email campaigns (/api/email-campaigns) and their delivery
+progress through the email outbox worker.
+"""
+from unittest.mock import AsyncMock
+
+import pytest
+from app.models.base import (
+    ApplicationStatus,
+    Candidate,
+    EmailOutbox,
+    EmailTemplate,
+    EmailTemplateType,
+    Employer,
+    Job,
+    JobApplication,
+    User,
+    UserRole,
+)
+from app.services.email_outbox import deliver_pending_emails
+from app.services.email_service import email_service
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _add_applicants(db: AsyncSession, job: Job, statuses) -> None:
+    for i, application_status in enumerate(statuses):
+        user = User(
+            email=f"applicant{i}@test.com",
+            role=UserRole.CANDIDATE,
+            first_name=f"Prénom{i}",
+            last_name="Nom",
+            is_active=True,
+        )
+        db.add(user)
+        await db.flush()
+        candidate = Candidate(user_id=user.id)
+        db.add(candidate)
+        await db.flush()
+        db.add(
+            JobApplication(
+                job_id=job.id, candidate_id=candidate.id, status=application_status
+            )
+        )
+    await db.commit()
+
+
+async def _create_template(db: AsyncSession, employer_user: User) -> EmailTemplate:
+    employer = (
+        await db.execute(select(Employer).filter(Employer.user_id == employer_user.id))
+    ).scalar_one()
+    template = EmailTemplate(
+        company_id=employer.company_id,
+        created_by_user_id=employer_user.id,
+        name="Rejet groupé",
+        type=EmailTemplateType.APPLICATION_REJECTED,
+        subject="{job_title} - réponse",
+        body="<p>Bonjour {candidate_first_name}, merci de l'intérêt porté à {company_name}.</p>",
+        is_active=True,
+        usage_count=0,
+    )
+    db.add(template)
+    await db.commit()
+    await db.refresh(template)
+    return template
+
+
+class TestEmailCampaigns:
+    async def test_campaign_enqueues_and_tracks_progress(
+        self,
+        client: AsyncClient,
+        auth_headers_employer: dict,
+        employer_user: User,
+        test_job: Job,
+        test_db: AsyncSession,
+        monkeypatch,
+    ):
+        await _add_applicants(
+            test_db,
+            test_job,
+            [
+                ApplicationStatus.REJECTED,
+                ApplicationStatus.REJECTED,
+                ApplicationStatus.SHORTLISTED,
+            ],
+        )
+        template = await _create_template(test_db, employer_user)
+
+        response = await client.post(
+            "/api/email-campaigns",
+            headers=auth_headers_employer,
+            json={
+                "job_id": test_job.id,
+                "template_id": template.id,
+                "application_status": "rejected",
+            },
+        )
+
+        assert response.status_code == 201, response.text
+        campaign = response.json()
+        assert campaign["total_recipients"] == 2
+        assert campaign["pending_count"] == 2
+        assert campaign["status"] == "sending"
+
+        rows = (
+            (await test_db.execute(select(EmailOutbox).order_by(EmailOutbox.id)))
+            .scalars()
+            .all()
+        )
+        assert [row.to_email for row in rows] == [
+            "applicant0@test.com",
+            "applicant1@test.com",
+        ]
+        assert rows[0].subject == f"{test_job.title} - réponse"
+        assert (
+            "Bonjour Prénom0, merci de l'intérêt porté à Test Company" in rows[0].html
+        )
+        assert {row.campaign_id for row in rows} == {campaign["id"]}
+
+        monkeypatch.setattr(email_service, "enabled", True)
+        monkeypatch.setattr(
+            email_service,
+            "send_batch",
+            AsyncMock(
+                side_effect=lambda messages, idempotency_key=None: ["re_1", None]
+            ),
+        )
+        await deliver_pending_emails(test_db)
+
+        progress = (
+            await client.get(
+                f"/api/email-campaigns/{campaign['id']}", headers=auth_headers_employer
+            )
+        ).json()
+        assert (
+            progress["sent_count"],
+            progress["failed_count"],
+            progress["pending_count"],
+        ) == (1, 1, 0)
+        assert progress["status"] == "completed"
+
+        listed = (
+            await client.get(
+                "/api/email-campaigns",
+                params={"job_id": test_job.id},
+                headers=auth_headers_employer,
+            )
+        ).json()
+        assert [c["id"] for c in listed] == [campaign["id"]]
+
+    async def test_no_recipients(
+        self,
+        client: AsyncClient,
+        auth_headers_employer: dict,
+        employer_user: User,
+        test_job: Job,
+        test_db: AsyncSession,
+    ):
+        template = await _create_template(test_db, employer_user)
+
+        response = await client.post(
+            "/api/email-campaigns",
+            headers=auth_headers_employer,
+            json={
+                "job_id": test_job.id,
+                "template_id": template.id,
+                "application_status": "shortlisted",
+            },
+        )
+
+        assert response.status_code == 400
+
+    async def test_candidate_forbidden(
+        self, client: AsyncClient, auth_headers_candidate: dict
+    ):
+        response = await client.post(
+            "/api/email-campaigns",
+            headers=auth_headers_candidate,
+            json={"job_id": 1, "template_id": 1, "application_status": "rejected"},
+        )
+
+        assert response.status_code == 403
@@ -0,0 +1,238 @@
+"""
+Tests for the transactional email outbox (app/services/email_outbox.py).
+
+Resend is mocked at EmailService.send_batch: we check which rows are written
+by the endpoints and how the worker updates them.
+"""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+from app.models.base import (
+    EmailOutbox,
+    EmailOutboxStatus,
+    EmailTemplate,
+    EmailTemplateType,
+    Employer,
+    Job,
+    User,
+)
+from app.services import email_outbox
+from app.services.email_outbox import deliver_pending_emails, enqueue_email
+from app.services.email_service import email_service
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _create_default_template(
+    db: AsyncSession, employer_user: User, template_type: EmailTemplateType
+) -> EmailTemplate:
+    employer = (
+        await db.execute(select(Employer).filter(Employer.user_id == employer_user.id))
+    ).scalar_one()
+    template = EmailTemplate(
+        company_id=employer.company_id,
+        created_by_user_id=employer_user.id,
+        name="Défaut",
+        type=template_type,
+        subject="Candidature {job_title}",
+        body="<p>Bonjour {candidate_first_name}, merci pour votre candidature chez {company_name}.</p>",
+        is_active=True,
+        is_default=True,
+        usage_count=0,
+    )
+    db.add(template)
+    await db.commit()
+    await db.refresh(template)
+    return template
+
+
+async def _outbox_rows(db: AsyncSession):
+    return (
+        (await db.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars().all()
+    )
+
+
+@pytest.fixture
+def send_batch(monkeypatch) -> AsyncMock:
+    mock = AsyncMock(
+        side_effect=lambda messages, idempotency_key=None: [
+            f"re_{i}" for i in range(len(messages))
+        ]
+    )
+    monkeypatch.setattr(email_service, "send_batch", mock)
+    monkeypatch.setattr(email_service, "enabled", True)
+    return mock
+
+
+# ===========================================================================
+# Endpoints write to the outbox
+# ===========================================================================
+
+
+class TestEndpointsEnqueue:
+    async def test_application_queues_confirmation_in_same_transaction(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        test_job: Job,
+        employer_user: User,
+        candidate_user: User,
+        test_db: AsyncSession,
+        send_batch: AsyncMock,
+    ):
+        template = await _create_default_template(
+            test_db, employer_user, EmailTemplateType.APPLICATION_RECEIVED
+        )
+
+        response = await client.post(
+            "/api/applications/my/applications",
+            headers=auth_headers_candidate,
+            json={"job_id": test_job.id},
+        )
+
+        assert response.status_code in (200, 201), response.text
+        send_batch.assert_not_awaited()
+        [row] = await _outbox_rows(test_db)
+        assert row.to_email == candidate_user.email
+        assert row.subject == f"Candidature {test_job.title}"
+        assert row.status == EmailOutboxStatus.PENDING
+        assert row.dedup_key == f"application:{response.json()['id']}:received"
+        assert row.template_id == template.id
+        # Counted by the worker once sent, not in the application transaction
+        await test_db.refresh(template)
+        assert template.usage_count == 0
+
+        await deliver_pending_emails(test_db)
+
+        await test_db.refresh(template)
+        assert template.usage_count == 1
+        assert template.last_used_at is not None
+
+    async def test_status_change_queues_template_email(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        auth_headers_employer: dict,
+        test_job: Job,
+        employer_user: User,
+        test_db: AsyncSession,
+    ):
+        await _create_default_template(
+            test_db, employer_user, EmailTemplateType.APPLICATION_REJECTED
+        )
+        app_id = (
+            await client.post(
+                "/api/applications/my/applications",
+                headers=auth_headers_candidate,
+                json={"job_id": test_job.id},
+            )
+        ).json()["id"]
+
+        response = await client.put(
+            f"/api/applications/employer/applications/{app_id}/status",
+            headers=auth_headers_employer,
+            json={"status": "rejected"},
+        )
+
+        assert response.status_code == 200
+        assert len(await _outbox_rows(test_db)) == 1
+
+    async def test_no_template_no_email(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        test_job: Job,
+        test_db: AsyncSession,
+    ):
+        await client.post(
+            "/api/applications/my/applications",
+            headers=auth_headers_candidate,
+            json={"job_id": test_job.id},
+        )
+
+        assert await _outbox_rows(test_db) == []
+
+
+# ===========================================================================
+# Worker
+# ===========================================================================
+
+
+class TestDeliverPendingEmails:
+    async def test_dedup_key_enqueues_once(self, test_db: AsyncSession):
+        assert await enqueue_email(
+            test_db, "a@test.com", "Sujet", "<p>1</p>", dedup_key="k"
+        )
+        assert not await enqueue_email(
+            test_db, "a@test.com", "Sujet", "<p>2</p>", dedup_key="k"
+        )
+        await test_db.commit()
+
+        assert len(await _outbox_rows(test_db)) == 1
+
+    async def test_sends_in_one_batch(
+        self, test_db: AsyncSession, send_batch: AsyncMock
+    ):
+        for i in range(3):
+            await enqueue_email(test_db, f"user{i}@test.com", "Sujet", "<p>Bonjour</p>")
+        await test_db.commit()
+
+        stats = await deliver_pending_emails(test_db)
+
+        assert stats == {"claimed": 3, "sent": 3, "retried": 0, "failed": 0}
+        assert send_batch.await_count == 1
+        assert send_batch.await_args.kwargs["idempotency_key"].startswith(
+            "email-outbox-"
+        )
+        rows = await _outbox_rows(test_db)
+        assert [row.status for row in rows] == [EmailOutboxStatus.SENT] * 3
+        assert rows[0].provider_message_id == "re_0"
+
+        assert (await deliver_pending_emails(test_db))["claimed"] == 0
+
+    async def test_transient_failure_backs_off_then_gives_up(
+        self,
+        test_db: AsyncSession,
+        send_batch: AsyncMock,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(email_outbox, "EMAIL_OUTBOX_MAX_ATTEMPTS", 2)
+        send_batch.side_effect = ConnectionError("timeout")
+        await enqueue_email(test_db, "a@test.com", "Sujet", "<p>Bonjour</p>")
+        await test_db.commit()
+        now = datetime.now(timezone.utc)
+
+        assert (await deliver_pending_emails(test_db, now=now))["retried"] == 1
+        [row] = await _outbox_rows(test_db)
+        assert row.attempts == 1 and row.status == EmailOutboxStatus.PENDING
+        assert "timeout" in row.last_error
+
+        # Pas encore dû : rien n'est repris
+        assert (await deliver_pending_emails(test_db, now=now))["claimed"] == 0
+
+        later = now + timedelta(
+            seconds=email_outbox.EMAIL_OUTBOX_RETRY_BASE_SECONDS + 1
+        )
+        assert (await deliver_pending_emails(test_db, now=later))["failed"] == 1
+        await test_db.refresh(row)
+        assert row.status == EmailOutboxStatus.FAILED
+
+    async def test_rejected_email_is_not_retried(
+        self, test_db: AsyncSession, send_batch: AsyncMock
+    ):
+        send_batch.side_effect = lambda messages, idempotency_key=None: ["re_ok", None]
+        await enqueue_email(test_db, "ok@test.com", "Sujet", "<p>1</p>")
+        await enqueue_email(test_db, "invalid", "Sujet", "<p>2</p>")
+        await test_db.commit()
+
+        stats = await deliver_pending_emails(test_db)
+
+        assert stats["sent"] == 1 and stats["failed"] == 1
+        assert [row.status for row in await _outbox_rows(test_db)] == [
+            EmailOutboxStatus.SENT,
+            EmailOutboxStatus.FAILED,
+        ]
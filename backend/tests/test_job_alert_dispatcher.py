@@ -0,0 +1,382 @@
+"""
+Tests for the job alert dispatcher (app/services/job_alert_dispatcher.py).
+
+Email sending is mocked: we check which digests are built and how alert
+counters and cursors are updated.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+from app.models.base import (
+    Candidate,
+    Employer,
+    Job,
+    JobAlert,
+    JobAlertFrequency,
+    JobLocation,
+    JobStatus,
+    JobType,
+    User,
+)
+from app.services import job_alert_dispatcher
+from app.services.email_service import email_service
+from app.services.job_alert_dispatcher import (
+    dispatch_instant_alerts_for_job,
+    dispatch_job_alerts,
+)
+from app.services.job_alert_index import IndexedJob, JobAlertIndex
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+pytestmark = pytest.mark.asyncio
+
+
+# ---------------------------------------------------------------------------
+# Reusable helpers
+# ---------------------------------------------------------------------------
+
+
+async def _create_job(
+    db: AsyncSession, employer_user: User, title: str, **overrides
+) -> Job:
+    employer = (
+        await db.execute(select(Employer).filter(Employer.user_id == employer_user.id))
+    ).scalar_one()
+    fields = dict(
+        employer_id=employer.id,
+        company_id=employer.company_id,
+        title=title,
+        description="Poste à pourvoir",
+        location="Libreville",
+        location_type=JobLocation.ON_SITE,
+        job_type=JobType.FULL_TIME,
+        status=JobStatus.PUBLISHED,
+        posted_at=datetime.now(timezone.utc),
+    )
+    fields.update(overrides)
+    job = Job(**fields)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+async def _create_alert(
+    db: AsyncSession, candidate_user: User, criteria: dict, **overrides
+) -> JobAlert:
+    candidate = (
+        await db.execute(
+            select(Candidate).filter(Candidate.user_id == candidate_user.id)
+        )
+    ).scalar_one()
+    fields = dict(
+        candidate_id=candidate.id,
+        name="Alerte test",
+        criteria=criteria,
+        frequency=JobAlertFrequency.INSTANT,
+        jobs_sent_count=0,
+        last_matching_job_id=0,
+    )
+    fields.update(overrides)
+    alert = JobAlert(**fields)
+    db.add(alert)
+    await db.commit()
+    await db.refresh(alert)
+    return alert
+
+
+@pytest.fixture
+def send_digests(monkeypatch) -> AsyncMock:
+    mock = AsyncMock(side_effect=lambda digests: [True] * len(digests))
+    monkeypatch.setattr(email_service, "send_job_alert_digests", mock)
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def fresh_alert_index(monkeypatch):
+    """Each test gets an empty process-wide alert index (loaded from the test DB)."""
+    index = JobAlertIndex()
+    monkeypatch.setattr(job_alert_dispatcher, "job_alert_index", index)
+    return index
+
+
+# ===========================================================================
+# Dispatch
+# ===========================================================================
+
+
+class TestDispatchJobAlerts:
+    async def test_sends_new_matching_jobs_once(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        employer_user: User,
+        send_digests: AsyncMock,
+    ):
+        old = await _create_job(test_db, employer_user, "Python legacy")
+        alert = await _create_alert(
+            test_db,
+            candidate_user,
+            {"keywords": ["python"]},
+            last_matching_job_id=old.id,
+        )
+        match = await _create_job(test_db, employer_user, "Développeur Python")
+        other = await _create_job(test_db, employer_user, "Comptable")
+
+        stats = await dispatch_job_alerts(test_db)
+
+        assert stats["instant"] == {"evaluated": 1, "sent": 1, "failed": 0}
+        digests = send_digests.await_args.args[0]
+        assert [job["id"] for job in digests[0]["jobs"]] == [match.id]
+        assert digests[0]["email"] == candidate_user.email
+
+        await test_db.refresh(alert)
+        assert alert.jobs_sent_count == 1
+        assert alert.last_matching_job_id == other.id
+        assert alert.last_sent_at is not None
+
+        # Aucune nouvelle offre : rien n'est renvoyé
+        await dispatch_job_alerts(test_db)
+        assert send_digests.await_count == 1
+
+    async def test_no_match_advances_cursor_without_email(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        employer_user: User,
+        send_digests: AsyncMock,
+    ):
+        alert = await _create_alert(test_db, candidate_user, {"keywords": ["rust"]})
+        job = await _create_job(test_db, employer_user, "Développeur Python")
+
+        await dispatch_job_alerts(test_db)
+
+        send_digests.assert_not_awaited()
+        await test_db.refresh(alert)
+        assert alert.last_matching_job_id == job.id
+        assert alert.jobs_sent_count == 0
+
+    async def test_daily_alert_not_due(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        employer_user: User,
+        send_digests: AsyncMock,
+    ):
+        await _create_alert(
+            test_db,
+            candidate_user,
+            {"keywords": ["python"]},
+            frequency=JobAlertFrequency.DAILY,
+            last_sent_at=datetime.now(timezone.utc) - timedelta(hours=2),
+        )
+        await _create_job(test_db, employer_user, "Développeur Python")
+
+        stats = await dispatch_job_alerts(test_db)
+
+        assert stats["daily"]["evaluated"] == 0
+        send_digests.assert_not_awaited()
+
+    async def test_inactive_alert_ignored(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        employer_user: User,
+        send_digests: AsyncMock,
+    ):
+        await _create_alert(
+            test_db, candidate_user, {"keywords": ["python"]}, is_active=False
+        )
+        await _create_job(test_db, employer_user, "Développeur Python")
+
+        await dispatch_job_alerts(test_db)
+
+        send_digests.assert_not_awaited()
+
+    async def test_alert_missing_from_index_is_evaluated_directly(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        employer_user: User,
+        send_digests: AsyncMock,
+        fresh_alert_index: JobAlertIndex,
+    ):
+        await _create_job(test_db, employer_user, "Comptable")
+        await fresh_alert_index.ensure_loaded(test_db)
+        # Créée après le chargement de l'index (ex. sur une autre instance)
+        await _create_alert(test_db, candidate_user, {"keywords": ["python"]})
+        await _create_job(test_db, employer_user, "Développeur Python")
+
+        stats = await dispatch_job_alerts(test_db)
+
+        assert stats["instant"]["sent"] == 1
+
+    async def test_instant_dispatch_for_new_job(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        employer_user: User,
+        send_digests: AsyncMock,
+    ):
+        instant = await _create_alert(test_db, candidate_user, {"keywords": ["python"]})
+        await _create_alert(
+            test_db,
+            candidate_user,
+            {"keywords": ["python"]},
+            frequency=JobAlertFrequency.DAILY,
+        )
+        await _create_alert(test_db, candidate_user, {"keywords": ["java"]})
+        job = await _create_job(test_db, employer_user, "Développeur Python")
+
+        stats = await dispatch_instant_alerts_for_job(test_db, job.id)
+
+        assert stats == {"evaluated": 1, "sent": 1, "failed": 0}
+        await test_db.refresh(instant)
+        assert instant.last_matching_job_id == job.id
+
+        # Déjà envoyée : un second déclenchement ne renvoie rien
+        assert (await dispatch_instant_alerts_for_job(test_db, job.id))[
+            "evaluated"
+        ] == 0
+
+    async def test_instant_dispatch_for_updated_job(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        employer_user: User,
+        send_digests: AsyncMock,
+    ):
+        job = await _create_job(test_db, employer_user, "Développeur Python")
+        already_notified = await _create_alert(
+            test_db,
+            candidate_user,
+            {"keywords": ["python"]},
+            last_matching_job_id=job.id,
+        )
+        newly_matching = await _create_alert(
+            test_db,
+            candidate_user,
+            {"keywords": ["django"]},
+            last_matching_job_id=job.id,
+        )
+        previous = IndexedJob.from_row(job)
+        job.title = "Développeur Python Django"
+        await test_db.commit()
+        await test_db.refresh(job)
+
+        stats = await dispatch_instant_alerts_for_job(
+            test_db, job.id, previous=previous
+        )
+
+        # Only the alert the previous version did not match gets the job, despite its cursor
+        assert stats == {"evaluated": 1, "sent": 1, "failed": 0}
+        digests = send_digests.await_args.args[0]
+        assert [job_["id"] for job_ in digests[0]["jobs"]] == [job.id]
+        await test_db.refresh(newly_matching)
+        await test_db.refresh(already_notified)
+        assert newly_matching.jobs_sent_count == 1
+        assert already_notified.jobs_sent_count == 0
+
+    async def test_job_update_schedules_instant_alerts(
+        self,
+        client,
+        auth_headers_employer: dict,
+        test_job: Job,
+        monkeypatch,
+    ):
+        from app.api import jobs as jobs_api
+
+        scheduled = []
+        monkeypatch.setattr(
+            jobs_api,
+            "schedule_instant_job_alerts",
+            lambda job_id, previous=None: scheduled.append((job_id, previous)),
+        )
+        job_id, original_title = test_job.id, test_job.title
+        payload = {
+            "title": test_job.title,
+            "description": test_job.description,
+            "location": test_job.location,
+            "location_type": test_job.location_type.value,
+            "job_type": test_job.job_type.value,
+            "requirements": test_job.requirements,
+            "salary_min": test_job.salary_min,
+            "salary_max": test_job.salary_max,
+        }
+
+        # Unchanged matching fields: nothing to send
+        assert (
+            await client.put(
+                f"/api/jobs/{job_id}", headers=auth_headers_employer, json=payload
+            )
+        ).status_code == 200
+        assert scheduled == []
+
+        payload["title"] = "Développeur Python senior"
+        assert (
+            await client.put(
+                f"/api/jobs/{job_id}", headers=auth_headers_employer, json=payload
+            )
+        ).status_code == 200
+        assert [
+            (scheduled_id, previous.title) for scheduled_id, previous in scheduled
+        ] == [(job_id, original_title)]
+
+    async def test_concurrent_instant_dispatches_send_once(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        employer_user: User,
+        monkeypatch,
+    ):
+        async def slow_send(digests):
+            await asyncio.sleep(0.01)
+            return [True] * len(digests)
+
+        send = AsyncMock(side_effect=slow_send)
+        monkeypatch.setattr(email_service, "send_job_alert_digests", send)
+        monkeypatch.setattr(job_alert_dispatcher, "engine", test_db.bind)
+        monkeypatch.setattr(
+            job_alert_dispatcher,
+            "AsyncSessionLocal",
+            async_sessionmaker(test_db.bind, expire_on_commit=False),
+        )
+        monkeypatch.setattr(job_alert_dispatcher, "_dispatch_lock", asyncio.Lock())
+        alert = await _create_alert(test_db, candidate_user, {"keywords": ["python"]})
+        first = await _create_job(test_db, employer_user, "Développeur Python")
+        second = await _create_job(test_db, employer_user, "Data engineer Python")
+
+        await asyncio.gather(
+            job_alert_dispatcher._run_instant_dispatch(first.id),
+            job_alert_dispatcher._run_instant_dispatch(second.id),
+            job_alert_dispatcher._run_locked_dispatch(),
+        )
+
+        assert send.await_count == 1
+        await test_db.refresh(alert)
+        assert alert.jobs_sent_count == 2
+        assert alert.last_matching_job_id == second.id
+
+    async def test_failed_send_keeps_cursor(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        employer_user: User,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(
+            email_service,
+            "send_job_alert_digests",
+            AsyncMock(side_effect=lambda d: [False] * len(d)),
+        )
+        alert = await _create_alert(test_db, candidate_user, {"keywords": ["python"]})
+        await _create_job(test_db, employer_user, "Développeur Python")
+
+        stats = await dispatch_job_alerts(test_db)
+
+        assert stats["instant"]["failed"] == 1
+        await test_db.refresh(alert)
+        assert alert.last_matching_job_id == 0
+        assert alert.last_sent_at is None
@@ -0,0 +1,321 @@
+"""
+Tests for the job alert reverse index (app/services/job_alert_index.py), its
+incremental maintenance by the /api/job-alerts endpoints and the SQL matching
+used by the preview endpoint.
+"""
+from datetime import datetime, timezone
+
+import pytest
+from app.api.job_alerts import match_jobs_to_criteria
+from app.models.base import Employer, Job, JobLocation, JobStatus, JobType, User
+from app.services.job_alert_index import (
+    JOB_SEARCH_VECTOR_SQL,
+    IndexedJob,
+    JobAlertIndex,
+    compile_keywords_tsquery,
+    job_matches_criteria,
+)
+from app.services.job_matching import tokenize
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.asyncio
+
+
+def _job(**overrides) -> IndexedJob:
+    fields = dict(
+        id=1,
+        title="Développeur Python",
+        company_name="ACME",
+        location="Libreville",
+        job_type="full_time",
+        location_type="remote",
+        salary_min=500000,
+        salary_max=800000,
+        tokens=frozenset(tokenize("Développeur Python backend FastAPI")),
+    )
+    fields.update(overrides)
+    return IndexedJob(**fields)
+
+
+# ===========================================================================
+# Criteria semantics
+# ===========================================================================
+
+
+class TestJobMatchesCriteria:
+    def test_keywords_any_with_prefix(self):
+        assert job_matches_criteria(_job(), {"keywords": ["java", "Python"]})
+        assert job_matches_criteria(_job(), {"keywords": ["dév"]})
+        assert not job_matches_criteria(_job(), {"keywords": ["java"]})
+
+    def test_multi_word_keyword_needs_all_words(self):
+        assert job_matches_criteria(_job(), {"keywords": ["python backend"]})
+        assert not job_matches_criteria(_job(), {"keywords": ["python frontend"]})
+
+    def test_keywords_without_tokens_match_nothing(self):
+        assert not job_matches_criteria(_job(), {"keywords": ["C"]})
+        assert not job_matches_criteria(_job(), {"keywords": ["le", "de"]})
+        assert job_matches_criteria(_job(), {"keywords": ["C", "python"]})
+        assert job_matches_criteria(_job(), {"keywords": ["  "]})
+
+    def test_filters(self):
+        assert job_matches_criteria(
+            _job(), {"location": "libre", "job_types": ["full_time"]}
+        )
+        assert not job_matches_criteria(_job(), {"location_types": ["on_site"]})
+        assert job_matches_criteria(_job(), {"salary_min": 700000})
+        assert not job_matches_criteria(_job(), {"salary_max": 400000})
+        assert not job_matches_criteria(_job(salary_min=None), {"salary_max": 400000})
+
+
+class TestCompileKeywordsTsquery:
+    def test_single_query_with_prefix_terms(self):
+        assert (
+            compile_keywords_tsquery(["Python", "data engineer"])
+            == "'python':* | ('data':* & 'engineer':*)"
+        )
+
+    def test_normalizes_and_skips_empty_keywords(self):
+        assert (
+            compile_keywords_tsquery(["Développeur", "  ", "l'été"])
+            == "'developpeur':* | 'ete':*"
+        )
+        assert compile_keywords_tsquery(["& | !"]) is None
+        assert compile_keywords_tsquery(None) is None
+
+    def test_symbols_spelled_out_like_the_search_vector(self):
+        # PostgreSQL's parser splits on + and #: both sides spell them out first
+        assert compile_keywords_tsquery(["C++", "c#"]) == "'cplusplus':* | 'csharp':*"
+        assert (
+            "'+', 'plus'" in JOB_SEARCH_VECTOR_SQL
+            and "'#', 'sharp'" in JOB_SEARCH_VECTOR_SQL
+        )
+
+
+# ===========================================================================
+# Index
+# ===========================================================================
+
+
+class TestJobAlertIndex:
+    def test_percolate_returns_matching_alerts(self):
+        index = JobAlertIndex()
+        index.upsert(1, {"keywords": ["python"]}, "instant")
+        index.upsert(2, {"keywords": ["java"]}, "instant")
+        index.upsert(3, {"job_types": ["part_time"]}, "daily")
+        index.upsert(4, {}, "daily")
+        index.upsert(5, {"location_types": ["remote"], "salary_min": 900000}, "weekly")
+        index.upsert(6, {"salary_min": 600000, "salary_max": 600000}, "weekly")
+
+        assert index.percolate(_job()) == {1, 4, 6}
+        assert index.percolate(_job(), frequency="instant") == {1}
+        assert index.percolate(_job(salary_max=1000000)) == {1, 4, 5, 6}
+
+    def test_unmatchable_keywords_are_not_indexed_as_any(self):
+        index = JobAlertIndex()
+        index.upsert(1, {"keywords": ["C"]}, "instant")
+        assert 1 in index
+        assert index.percolate(_job()) == set()
+
+        index.upsert(1, {"keywords": ["python"]}, "instant")
+        assert index.percolate(_job()) == {1}
+
+    def test_percolate_agrees_with_direct_evaluation(self):
+        criteria = [
+            {"keywords": ["python"], "location": "port"},
+            {"keywords": ["fast"], "salary_max": 500000},
+            {"location_types": ["remote", "hybrid"], "salary_min": 800000},
+            {"keywords": ["data engineer", "backend"], "job_types": ["full_time"]},
+        ]
+        index = JobAlertIndex()
+        for alert_id, c in enumerate(criteria):
+            index.upsert(alert_id, c)
+        for job in (
+            _job(),
+            _job(location="Port-Gentil", salary_min=None),
+            _job(job_type="contract"),
+        ):
+            expected = {
+                i for i, c in enumerate(criteria) if job_matches_criteria(job, c)
+            }
+            assert index.percolate(job) == expected
+
+    def test_incremental_updates(self):
+        index = JobAlertIndex()
+        index.upsert(1, {"keywords": ["python"], "salary_min": 100})
+        index.upsert(1, {"keywords": ["java"]})
+        assert index.percolate(_job()) == set()
+
+        index.upsert(1, {"keywords": ["python"]}, is_active=False)
+        assert 1 not in index
+
+        index.upsert(2, {"salary_max": 900000})
+        index.remove(2)
+        assert len(index) == 0
+        assert index.percolate(_job()) == set()
+
+
+# ===========================================================================
+# Endpoints keep the index in sync
+# ===========================================================================
+
+
+class TestIndexMaintenance:
+    @pytest.fixture(autouse=True)
+    def fresh_alert_index(self, monkeypatch):
+        index = JobAlertIndex()
+        monkeypatch.setattr("app.api.job_alerts.job_alert_index", index)
+        return index
+
+    async def test_create_toggle_update_delete(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        fresh_alert_index: JobAlertIndex,
+    ):
+        payload = {
+            "name": "Python",
+            "criteria": {"keywords": ["python"]},
+            "frequency": "instant",
+        }
+        response = await client.post(
+            "/api/job-alerts", json=payload, headers=auth_headers_candidate
+        )
+        assert response.status_code == 201, response.text
+        alert_id = response.json()["id"]
+        assert fresh_alert_index.percolate(_job()) == {alert_id}
+
+        await client.post(
+            f"/api/job-alerts/{alert_id}/toggle", headers=auth_headers_candidate
+        )
+        assert alert_id not in fresh_alert_index
+        await client.post(
+            f"/api/job-alerts/{alert_id}/toggle", headers=auth_headers_candidate
+        )
+        assert alert_id in fresh_alert_index
+
+        await client.patch(
+            f"/api/job-alerts/{alert_id}",
+            json={"criteria": {"keywords": ["java"]}},
+            headers=auth_headers_candidate,
+        )
+        assert fresh_alert_index.percolate(_job()) == set()
+
+        await client.delete(
+            f"/api/job-alerts/{alert_id}", headers=auth_headers_candidate
+        )
+        assert len(fresh_alert_index) == 0
+
+    async def test_rejects_keywords_without_tokens(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        fresh_alert_index: JobAlertIndex,
+    ):
+        payload = {
+            "name": "C",
+            "criteria": {"keywords": ["C", "le"]},
+            "frequency": "instant",
+        }
+        response = await client.post(
+            "/api/job-alerts", json=payload, headers=auth_headers_candidate
+        )
+        assert response.status_code == 400
+        assert len(fresh_alert_index) == 0
+
+
+# ===========================================================================
+# SQL matching (preview)
+# ===========================================================================
+
+
+class TestMatchJobsToCriteria:
+    async def test_matches_published_jobs_only(
+        self, test_db: AsyncSession, employer_user: User
+    ):
+        employer = (
+            await test_db.execute(
+                select(Employer).filter(Employer.user_id == employer_user.id)
+            )
+        ).scalar_one()
+        for title, job_status, location in (
+            ("Python backend", JobStatus.PUBLISHED, "Libreville"),
+            ("Python data", JobStatus.DRAFT, "Libreville"),
+            ("Comptable", JobStatus.PUBLISHED, "Libreville"),
+            ("Python senior", JobStatus.PUBLISHED, "Port-Gentil"),
+        ):
+            test_db.add(
+                Job(
+                    employer_id=employer.id,
+                    company_id=employer.company_id,
+                    title=title,
+                    description="Poste",
+                    location=location,
+                    location_type=JobLocation.ON_SITE,
+                    job_type=JobType.FULL_TIME,
+                    status=job_status,
+                    posted_at=datetime.now(timezone.utc),
+                )
+            )
+        await test_db.commit()
+
+        jobs = await match_jobs_to_criteria(
+            test_db, {"keywords": ["python"], "location": "libre"}
+        )
+        assert [job.title for job in jobs] == ["Python backend"]
+
+        jobs = await match_jobs_to_criteria(
+            test_db, {"keywords": ["comptable", "python senior"]}
+        )
+        assert {job.title for job in jobs} == {"Comptable", "Python senior"}
+
+        assert await match_jobs_to_criteria(test_db, {"location": "%"}) == []
+        assert await match_jobs_to_criteria(test_db, {"keywords": ["C"]}) == []
+
+    async def test_symbol_keywords_agree_with_percolator(
+        self, test_db: AsyncSession, employer_user: User
+    ):
+        employer = (
+            await test_db.execute(
+                select(Employer).filter(Employer.user_id == employer_user.id)
+            )
+        ).scalar_one()
+        titles = (
+            "Développeur C++ embarqué",
+            "Développeur C# .NET",
+            "Chef cuisinier",
+            "Comptable",
+        )
+        for title in titles:
+            test_db.add(
+                Job(
+                    employer_id=employer.id,
+                    company_id=employer.company_id,
+                    title=title,
+                    description="Poste",
+                    location="Libreville",
+                    location_type=JobLocation.ON_SITE,
+                    job_type=JobType.FULL_TIME,
+                    status=JobStatus.PUBLISHED,
+                    posted_at=datetime.now(timezone.utc),
+                )
+            )
+        await test_db.commit()
+        jobs = (await test_db.execute(select(Job))).scalars().all()
+
+        for keyword, expected in (
+            ("c++", ["Développeur C++ embarqué"]),
+            ("C#", ["Développeur C# .NET"]),
+        ):
+            criteria = {"keywords": [keyword]}
+            sql_titles = sorted(
+                job.title for job in await match_jobs_to_criteria(test_db, criteria)
+            )
+            percolated = sorted(
+                job.title
+                for job in jobs
+                if job_matches_criteria(IndexedJob.from_row(job), criteria)
+            )
+            assert sql_titles == percolated == expected
@@ -0,0 +1,279 @@
+"""
+Tests for local job pre-ranking (app/services/job_matching.py) and its use
+by GET /api/ai-scoring/candidate/job-matches.
+
+The Anthropic client is mocked: we only check which jobs reach the prompt.
+"""
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from app.models.base import (
+    Candidate,
+    Employer,
+    Job,
+    JobLocation,
+    JobStatus,
+    JobType,
+    Skill,
+    SkillCategory,
+    User,
+)
+from app.services import job_matching
+from app.services.job_matching import JobIndex, job_document_text, tokenize
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.asyncio
+
+
+# ---------------------------------------------------------------------------
+# Reusable helpers
+# ---------------------------------------------------------------------------
+
+
+async def _create_job(
+    db: AsyncSession,
+    employer_user: User,
+    title: str,
+    description: str,
+    status: JobStatus = JobStatus.PUBLISHED,
+) -> Job:
+    """Insert a job owned by the employer fixture."""
+    employer = (
+        await db.execute(select(Employer).filter(Employer.user_id == employer_user.id))
+    ).scalar_one()
+    job = Job(
+        employer_id=employer.id,
+        company_id=employer.company_id,
+        title=title,
+        description=description,
+        location="Libreville",
+        location_type=JobLocation.ON_SITE,
+        job_type=JobType.FULL_TIME,
+        status=status,
+        posted_at=datetime.now(timezone.utc),
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+def _mock_ai_service(monkeypatch, job_ids: list[int]) -> AsyncMock:
+    """Patch get_ai_service in the router and return the mocked messages.create."""
+    create = AsyncMock(
+        return_value=SimpleNamespace(
+            content=[
+                SimpleNamespace(
+                    text=json.dumps(
+                        {
+                            "matches": [
+                                {
+                                    "job_id": job_id,
+                                    "match_score": 80,
+                                    "match_reasons": ["ok"],
+                                    "missing_skills": [],
+                                }
+                                for job_id in job_ids
+                            ]
+                        }
+                    )
+                )
+            ]
+        )
+    )
+    service = SimpleNamespace(
+        model="test-model",
+        client=SimpleNamespace(messages=SimpleNamespace(create=create)),
+    )
+    monkeypatch.setattr("app.api.ai_scoring.get_ai_service", lambda: service)
+    return create
+
+
+@pytest.fixture(autouse=True)
+def fresh_job_index(monkeypatch):
+    """Each test gets an empty process-wide index."""
+    index = JobIndex()
+    monkeypatch.setattr(job_matching, "job_index", index)
+    monkeypatch.setattr("app.api.ai_scoring.job_index", index)
+    return index
+
+
+# ===========================================================================
+# Index unit tests
+# ===========================================================================
+
+
+class TestJobIndex:
+    def test_tokenize_strips_accents_html_and_stopwords(self):
+        assert tokenize("<p>Développeur <b>Python</b> et DevOps</p>") == [
+            "developpeur",
+            "python",
+            "devops",
+        ]
+
+    def test_ranks_relevant_jobs_first(self):
+        index = JobIndex()
+        index.upsert(
+            1, job_document_text("Comptable senior", "Gestion de la paie", None)
+        )
+        index.upsert(
+            2,
+            job_document_text(
+                "Développeur Python", "Backend FastAPI PostgreSQL", "Python"
+            ),
+        )
+        index.upsert(
+            3, job_document_text("Data engineer", "Pipelines Python et SQL", None)
+        )
+
+        ranked = index.top_k({"python": 3.0, "fastapi": 3.0}, k=5)
+
+        assert [job_id for job_id, _ in ranked] == [2, 3]
+        assert ranked[0][1] > ranked[1][1]
+
+    def test_upsert_and_remove_are_incremental(self):
+        index = JobIndex()
+        index.upsert(1, ["python"])
+        index.upsert(2, ["java"])
+        assert index.top_k({"python": 1.0}, k=5)[0][0] == 1
+
+        index.upsert(1, ["java"])
+        index.remove(2)
+
+        assert index.top_k({"python": 1.0}, k=5) == []
+        assert [job_id for job_id, _ in index.top_k({"java": 1.0}, k=5)] == [1]
+        assert len(index) == 1
+
+    async def test_refresh_indexes_only_published_jobs(
+        self, test_db: AsyncSession, employer_user: User
+    ):
+        published = await _create_job(
+            test_db, employer_user, "Python developer", "Django"
+        )
+        await _create_job(
+            test_db, employer_user, "Python intern", "Draft", status=JobStatus.DRAFT
+        )
+
+        index = JobIndex()
+        await index.refresh(test_db, force=True)
+
+        assert [job_id for job_id, _ in index.top_k({"python": 1.0}, k=5)] == [
+            published.id
+        ]
+
+
+# ===========================================================================
+# Endpoint
+# ===========================================================================
+
+
+class TestCandidateJobMatches:
+    """GET /api/ai-scoring/candidate/job-matches"""
+
+    async def test_only_shortlist_is_sent_to_llm(
+        self,
+        client: AsyncClient,
+        test_db: AsyncSession,
+        monkeypatch,
+        candidate_user: User,
+        employer_user: User,
+        auth_headers_candidate: dict,
+    ):
+        monkeypatch.setattr("app.api.ai_scoring.JOB_MATCH_SHORTLIST_SIZE", 2)
+        candidate = (
+            await test_db.execute(
+                select(Candidate).filter(Candidate.user_id == candidate_user.id)
+            )
+        ).scalar_one()
+        test_db.add(
+            Skill(
+                candidate_id=candidate.id,
+                name="FastAPI",
+                level=4,
+                category=SkillCategory.TECHNICAL,
+            )
+        )
+        await test_db.commit()
+
+        relevant = await _create_job(
+            test_db, employer_user, "Backend FastAPI", "API FastAPI en Python"
+        )
+        for i in range(5):
+            await _create_job(
+                test_db, employer_user, f"Comptable {i}", "Comptabilité générale"
+            )
+        create = _mock_ai_service(monkeypatch, [relevant.id])
+
+        response = await client.get(
+            "/api/ai-scoring/candidate/job-matches?limit=1",
+            headers=auth_headers_candidate,
+        )
+
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert [m["job_id"] for m in data["matches"]] == [relevant.id]
+        assert data["total_jobs_analyzed"] == 6
+        prompt = create.await_args.kwargs["messages"][0]["content"]
+        assert f"[JOB_{relevant.id}]" in prompt
+        assert prompt.count("[JOB_") == 1
+
+    async def test_cached_until_profile_changes(
+        self,
+        client: AsyncClient,
+        test_db: AsyncSession,
+        monkeypatch,
+        candidate_user: User,
+        employer_user: User,
+        auth_headers_candidate: dict,
+    ):
+        job = await _create_job(
+            test_db, employer_user, "Software Engineer", "Python backend"
+        )
+        create = _mock_ai_service(monkeypatch, [job.id])
+        url = "/api/ai-scoring/candidate/job-matches?limit=3"
+
+        first = await client.get(url, headers=auth_headers_candidate)
+        second = await client.get(url, headers=auth_headers_candidate)
+        # A smaller limit is served from the same cached result
+        smaller = await client.get(
+            "/api/ai-scoring/candidate/job-matches?limit=1",
+            headers=auth_headers_candidate,
+        )
+
+        assert first.status_code == second.status_code == smaller.status_code == 200
+        assert second.json() == first.json()
+        assert create.await_count == 1
+
+        candidate = (
+            await test_db.execute(
+                select(Candidate).filter(Candidate.user_id == candidate_user.id)
+            )
+        ).scalar_one()
+        test_db.add(
+            Skill(
+                candidate_id=candidate.id,
+                name="Django",
+                level=3,
+                category=SkillCategory.TECHNICAL,
+            )
+        )
+        await test_db.commit()
+        test_db.expire_all()
+
+        third = await client.get(url, headers=auth_headers_candidate)
+
+        assert third.status_code == 200
+        assert create.await_count == 2
+
+    async def test_employer_forbidden(
+        self, client: AsyncClient, auth_headers_employer: dict
+    ):
+        response = await client.get(
+            "/api/ai-scoring/candidate/job-matches", headers=auth_headers_employer
+        )
+        assert response.status_code == 403
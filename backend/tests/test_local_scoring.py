@@ -0,0 +1,307 @@
+"""
+Tests for the deterministic local scorer (app/services/local_scoring.py) and
+its use as fallback / pre-ranking by the AI scoring endpoints.
+"""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from app.models.base import (
+    ApplicationStatus,
+    Candidate,
+    Job,
+    JobApplication,
+    Skill,
+    SkillCategory,
+    User,
+)
+from app.services.local_scoring import required_years, score_applicant, score_applicants
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.asyncio
+
+
+# ---------------------------------------------------------------------------
+# Reusable helpers
+# ---------------------------------------------------------------------------
+
+
+def _job(**overrides) -> SimpleNamespace:
+    fields = dict(
+        title="Développeur Python",
+        description="Backend FastAPI et PostgreSQL",
+        requirements="3 ans d'expérience minimum, Python, FastAPI, PostgreSQL",
+        responsibilities=None,
+        profil_competences=None,
+        profil_experience=None,
+        location="Libreville",
+        location_type="on_site",
+        job_type="full_time",
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+def _candidate(
+    skills=(), years=0, location="Libreville", experiences=()
+) -> SimpleNamespace:
+    return SimpleNamespace(
+        title=None,
+        summary=None,
+        location=location,
+        years_experience=years,
+        skills=[SimpleNamespace(name=name) for name in skills],
+        experiences=list(experiences),
+    )
+
+
+def _mock_ai_service(monkeypatch, score: float = 90.0) -> AsyncMock:
+    """Patch get_ai_service in the router and return the mocked score_candidate."""
+    score_candidate = AsyncMock(
+        return_value={
+            "score": score,
+            "strengths": [],
+            "weaknesses": [],
+            "skills_match": {"matched": [], "missing": [], "percentage": 0},
+            "experience_match": "ok",
+            "recommendation": "interview",
+        }
+    )
+    monkeypatch.setattr(
+        "app.api.ai_scoring.get_ai_service",
+        lambda: SimpleNamespace(score_candidate=score_candidate),
+    )
+    return score_candidate
+
+
+def _ai_unavailable(monkeypatch) -> None:
+    def _raise():
+        raise ValueError("ANTHROPIC_API_KEY n'est pas définie")
+
+    monkeypatch.setattr("app.api.ai_scoring.get_ai_service", _raise)
+
+
+async def _apply(
+    db: AsyncSession, job: Job, candidate_user: User, skills=()
+) -> JobApplication:
+    candidate = (
+        await db.execute(
+            select(Candidate).filter(Candidate.user_id == candidate_user.id)
+        )
+    ).scalar_one()
+    for name in skills:
+        db.add(
+            Skill(
+                candidate_id=candidate.id,
+                name=name,
+                level=4,
+                category=SkillCategory.TECHNICAL,
+            )
+        )
+    application = JobApplication(
+        job_id=job.id, candidate_id=candidate.id, status=ApplicationStatus.APPLIED
+    )
+    db.add(application)
+    await db.commit()
+    await db.refresh(application)
+    return application
+
+
+# ===========================================================================
+# Scorer unit tests
+# ===========================================================================
+
+
+class TestScoreApplicants:
+    def test_required_years(self):
+        assert required_years("5+ years experience in Python") == 5
+        assert required_years("Minimum 3 ans d'expérience", None) == 3
+        assert required_years("Aucune exigence") == 0
+
+    def test_ranks_matching_profile_first(self):
+        job = _job()
+        strong = _candidate(skills=["Python", "FastAPI", "PostgreSQL"], years=4)
+        weak = _candidate(skills=["Comptabilité"], years=1, location="Port-Gentil")
+
+        results = score_applicants(job, [weak, strong])
+
+        assert results[1]["score"] > results[0]["score"]
+        assert results[1]["skills_match"]["matched"] == [
+            "Python",
+            "FastAPI",
+            "PostgreSQL",
+        ]
+        assert results[0]["weaknesses"]
+        assert all(r["engine"] == "local" for r in results)
+        assert all(0 <= r["score"] <= 100 for r in results)
+
+    def test_result_has_ai_format(self):
+        result = score_applicant(
+            _job(), _candidate(skills=["Python"]), cv_text="FastAPI"
+        )
+        assert {
+            "score",
+            "strengths",
+            "weaknesses",
+            "skills_match",
+            "experience_match",
+            "recommendation",
+        } <= set(result)
+        assert set(result["skills_match"]) == {"matched", "missing", "percentage"}
+
+    def test_experience_computed_from_history(self):
+        job = _job()
+        history = [
+            SimpleNamespace(
+                title="Dev",
+                description=None,
+                start_date="2015-01",
+                end_date="2020-01",
+                is_current=False,
+            )
+        ]
+        declared_zero = score_applicant(
+            job, _candidate(skills=["Python"], experiences=history)
+        )
+        no_history = score_applicant(job, _candidate(skills=["Python"]))
+        assert declared_zero["score"] > no_history["score"]
+
+    def test_remote_job_ignores_location(self):
+        job = _job(location_type="remote")
+        here = score_applicant(job, _candidate(location="Libreville"))
+        elsewhere = score_applicant(job, _candidate(location="Dakar"))
+        assert here["score"] == elsewhere["score"]
+
+    def test_deterministic_and_batch_consistent(self):
+        job = _job()
+        candidates = [_candidate(skills=["Python"], years=i) for i in range(50)]
+        batch = score_applicants(job, candidates)
+        assert batch == score_applicants(job, candidates)
+        assert batch[7] == score_applicant(job, candidates[7])
+
+    def test_empty(self):
+        assert score_applicants(_job(), []) == []
+
+
+# ===========================================================================
+# Endpoints
+# ===========================================================================
+
+
+class TestScoringFallback:
+    async def test_single_uses_local_when_ai_unavailable(
+        self,
+        client: AsyncClient,
+        test_db: AsyncSession,
+        monkeypatch,
+        candidate_user: User,
+        test_job: Job,
+        auth_headers_employer: dict,
+    ):
+        _ai_unavailable(monkeypatch)
+        application = await _apply(test_db, test_job, candidate_user, skills=["Python"])
+
+        response = await client.post(
+            "/api/ai-scoring/score-application",
+            json={"application_id": application.id},
+            headers=auth_headers_employer,
+        )
+
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["ai_score_details"]["engine"] == "local"
+        assert data["ai_score"] is not None
+
+    async def test_single_prefers_ai(
+        self,
+        client: AsyncClient,
+        test_db: AsyncSession,
+        monkeypatch,
+        candidate_user: User,
+        test_job: Job,
+        auth_headers_employer: dict,
+    ):
+        score_candidate = _mock_ai_service(monkeypatch, score=91.0)
+        application = await _apply(test_db, test_job, candidate_user)
+
+        response = await client.post(
+            "/api/ai-scoring/score-application",
+            json={"application_id": application.id},
+            headers=auth_headers_employer,
+        )
+
+        assert response.status_code == 200, response.text
+        assert response.json()["ai_score"] == 91.0
+        assert score_candidate.await_count == 1
+
+    async def test_bulk_refines_only_top_slice(
+        self,
+        client: AsyncClient,
+        test_db: AsyncSession,
+        monkeypatch,
+        candidate_user: User,
+        test_job: Job,
+        auth_headers_employer: dict,
+    ):
+        monkeypatch.setattr("app.api.ai_scoring.AI_SCORING_REFINE_TOP_N", 0)
+        score_candidate = _mock_ai_service(monkeypatch)
+        application = await _apply(test_db, test_job, candidate_user, skills=["Python"])
+
+        response = await client.post(
+            "/api/ai-scoring/score-job-applications",
+            json={"job_id": test_job.id},
+            headers=auth_headers_employer,
+        )
+
+        assert response.status_code == 200, response.text
+        assert response.json()["scored_count"] == 1
+        assert score_candidate.await_count == 0
+        await test_db.refresh(application)
+        assert application.ai_score is not None
+        assert application.ai_score_details["engine"] == "local"
+
+    async def test_bulk_refines_local_scores_on_next_run(
+        self,
+        client: AsyncClient,
+        test_db: AsyncSession,
+        monkeypatch,
+        candidate_user: User,
+        test_job: Job,
+        auth_headers_employer: dict,
+    ):
+        _ai_unavailable(monkeypatch)
+        application = await _apply(test_db, test_job, candidate_user, skills=["Python"])
+        application_id, job_id = application.id, test_job.id
+
+        first = await client.post(
+            "/api/ai-scoring/score-job-applications",
+            json={"job_id": job_id},
+            headers=auth_headers_employer,
+        )
+        assert first.status_code == 200, first.text
+
+        score_candidate = _mock_ai_service(monkeypatch, score=77.0)
+        second = await client.post(
+            "/api/ai-scoring/score-job-applications",
+            json={"job_id": job_id},
+            headers=auth_headers_employer,
+        )
+
+        assert second.status_code == 200, second.text
+        assert second.json()["scored_count"] == 1
+        assert score_candidate.await_count == 1
+        test_db.expire_all()
+        application = await test_db.get(JobApplication, application_id)
+        assert application.ai_score == 77.0
+        assert "engine" not in application.ai_score_details
+
+        # AI scores are not picked up again
+        third = await client.post(
+            "/api/ai-scoring/score-job-applications",
+            json={"job_id": job_id},
+            headers=auth_headers_employer,
+        )
+        assert third.json()["scored_count"] == 0
+        assert score_candidate.await_count == 1
@@ -0,0 +1,235 @@
+"""
+Tests for the materialized unread notification counter.
+
+Redis is replaced by a minimal in-memory client implementing the handful of
+commands the counter uses (the adjust script semantics included).
+"""
+import fnmatch
+
+import pytest
+from app.api.notifications import publish_notifications, stage_notification
+from app.cache import cache
+from app.models.base import Notification, NotificationType, User
+from app.services import notification_counter
+from app.services.notification_counter import (
+    get_unread_count,
+    reconcile_unread_counters,
+)
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.asyncio
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def eval(self, script, numkeys, key, *args):
+        if script == notification_counter._COMPARE_AND_SET_SCRIPT:
+            self._calls.append(lambda: self._client.compare_and_set(key, *args))
+        else:
+            self._calls.append(lambda: self._client.adjust(key, int(args[0])))
+
+    def set(self, key, value, **kwargs):
+        self._calls.append(lambda: self._client.set_now(key, value, **kwargs))
+
+    async def execute(self):
+        return [call() for call in self._calls]
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def adjust(self, key, delta):
+        if key not in self.data:
+            return None
+        value = int(self.data[key]) + delta
+        if value < 0:
+            del self.data[key]
+            return None
+        self.data[key] = str(value)
+        return value
+
+    def compare_and_set(self, key, expected, value):
+        if self.data.get(key) != str(expected):
+            return 0
+        self.data[key] = str(value)
+        return 1
+
+    def set_now(self, key, value, nx=False, xx=False, **kwargs):
+        if (nx and key in self.data) or (xx and key not in self.data):
+            return None
+        self.data[key] = str(value)
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, **kwargs):
+        return self.set_now(key, value, **kwargs)
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def scan_iter(self, match, count=None):
+        for key in list(self.data):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = _FakeRedis()
+    monkeypatch.setattr(cache, "client", client)
+    monkeypatch.setattr(cache, "_is_available", True)
+    return client
+
+
+async def _add(db: AsyncSession, user_id: int, is_read: bool = False) -> Notification:
+    notification = Notification(
+        user_id=user_id,
+        type=NotificationType.SYSTEM,
+        title="t",
+        message="m",
+        is_read=is_read,
+    )
+    db.add(notification)
+    await db.commit()
+    await db.refresh(notification)
+    return notification
+
+
+async def _create_and_publish(db: AsyncSession, user_id: int) -> Notification:
+    notification = await stage_notification(
+        db, user_id, NotificationType.SYSTEM, "t", "m"
+    )
+    await db.commit()
+    await publish_notifications([notification])
+    return notification
+
+
+class TestUnreadCounter:
+    async def test_counter_follows_insert_read_and_delete(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        candidate_user: User,
+        test_db: AsyncSession,
+        fake_redis: _FakeRedis,
+    ):
+        first = await _add(test_db, candidate_user.id)
+        await _add(test_db, candidate_user.id, is_read=True)
+        key = f"notifications:unread:{candidate_user.id}"
+
+        # Premier accès : recomptage en base puis mise en cache
+        response = await client.get(
+            "/api/notifications/unread-count", headers=auth_headers_candidate
+        )
+        assert response.json() == {"unread_count": 1}
+        assert fake_redis.data[key] == "1"
+
+        second = await _create_and_publish(test_db, candidate_user.id)
+        assert fake_redis.data[key] == "2"
+
+        await client.put(
+            f"/api/notifications/{first.id}/read", headers=auth_headers_candidate
+        )
+        # Deuxième lecture de la même notification : pas de double décrément
+        await client.put(
+            f"/api/notifications/{first.id}/read", headers=auth_headers_candidate
+        )
+        assert fake_redis.data[key] == "1"
+
+        await client.delete(
+            f"/api/notifications/{second.id}", headers=auth_headers_candidate
+        )
+        assert fake_redis.data[key] == "0"
+
+        listed = await client.get("/api/notifications", headers=auth_headers_candidate)
+        assert listed.json()["unread_count"] == 0
+        assert listed.json()["total"] == 2
+
+    async def test_mark_all_read_subtracts_updated_rows(
+        self,
+        client: AsyncClient,
+        auth_headers_candidate: dict,
+        candidate_user: User,
+        test_db: AsyncSession,
+        fake_redis: _FakeRedis,
+    ):
+        for _ in range(3):
+            await _add(test_db, candidate_user.id)
+        assert await get_unread_count(test_db, candidate_user.id) == 3
+
+        await client.put(
+            "/api/notifications/mark-all-read", headers=auth_headers_candidate
+        )
+
+        assert fake_redis.data[f"notifications:unread:{candidate_user.id}"] == "0"
+
+    async def test_reconcile_corrects_drift(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        employer_user: User,
+        fake_redis: _FakeRedis,
+    ):
+        await _add(test_db, candidate_user.id)
+        await _add(test_db, candidate_user.id)
+        fake_redis.data[f"notifications:unread:{candidate_user.id}"] = "7"
+        fake_redis.data[f"notifications:unread:{employer_user.id}"] = "0"
+
+        corrected = await reconcile_unread_counters(test_db)
+
+        assert corrected == 1
+        assert fake_redis.data[f"notifications:unread:{candidate_user.id}"] == "2"
+        assert fake_redis.data[f"notifications:unread:{employer_user.id}"] == "0"
+
+    async def test_reconcile_keeps_concurrent_adjustment(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        fake_redis: _FakeRedis,
+        monkeypatch,
+    ):
+        key = f"notifications:unread:{candidate_user.id}"
+        await _add(test_db, candidate_user.id)
+        fake_redis.data[key] = "7"
+        mget = fake_redis.mget
+
+        async def mget_then_publish(keys):
+            values = await mget(keys)
+            # A notification committed and counted right after the reconciler read the key
+            await _create_and_publish(test_db, candidate_user.id)
+            return values
+
+        monkeypatch.setattr(fake_redis, "mget", mget_then_publish)
+
+        corrected = await reconcile_unread_counters(test_db)
+
+        # The key changed since it was read: left for the next pass
+        assert corrected == 0
+        assert fake_redis.data[key] == "8"
+
+    async def test_adjust_never_creates_key(
+        self, test_db: AsyncSession, candidate_user: User, fake_redis: _FakeRedis
+    ):
+        await _create_and_publish(test_db, candidate_user.id)
+
+        assert fake_redis.data == {}
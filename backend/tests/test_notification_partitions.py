@@ -0,0 +1,54 @@
+"""
+Tests for notification partition naming and retention selection.
+
+Partition DDL itself is PostgreSQL-only; on the SQLite test database the
+maintenance run is a no-op.
+"""
+from datetime import date, datetime, timezone
+
+import pytest
+from app.services.notification_partitions import (
+    add_months,
+    expired_partitions,
+    partition_month,
+    partition_name,
+    run_notification_partition_maintenance,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class TestPartitionNames:
+    def test_round_trip(self):
+        assert partition_name(date(2026, 1, 1)) == "notifications_p2026_01"
+        assert partition_month("notifications_p2026_01") == date(2026, 1, 1)
+        assert partition_month("notifications_default") is None
+
+    def test_add_months_across_years(self):
+        assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+        assert add_months(date(2026, 1, 1), -13) == date(2024, 12, 1)
+
+
+class TestExpiredPartitions:
+    def test_only_whole_months_before_cutoff(self):
+        names = [
+            "notifications_default",
+            "notifications_p2025_08",
+            "notifications_p2025_09",
+            "notifications_p2025_10",
+            "notifications_p2026_10",
+        ]
+        now = datetime(2026, 10, 19, tzinfo=timezone.utc)
+
+        # Rétention de 12 mois : tout ce qui précède octobre 2025 expire
+        assert expired_partitions(names, now, 12) == [
+            "notifications_p2025_08",
+            "notifications_p2025_09",
+        ]
+
+
+@pytest.mark.asyncio
+async def test_maintenance_noop_without_postgres(test_db: AsyncSession):
+    assert await run_notification_partition_maintenance(test_db) == {
+        "created": [],
+        "retired": [],
+    }
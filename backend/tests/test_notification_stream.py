@@ -0,0 +1,197 @@
+"""
+Tests for the real-time notification stream (/api/notifications/stream).
+
+The SSE generator is driven directly (httpx's ASGI transport buffers streamed
+responses); Redis is unavailable in tests, so the broker dispatches locally.
+"""
+import asyncio
+import json
+
+import pytest
+from app.api.notifications import (
+    _event_stream,
+    _require_stream_user,
+    publish_notifications,
+    stage_notification,
+    stream_notifications,
+)
+from app.models.base import Notification, NotificationType, User
+from app.services.notification_stream import (
+    RESYNC_EVENT,
+    NotificationBroker,
+    format_sse,
+    issue_stream_ticket,
+    notification_broker,
+    redeem_stream_ticket,
+)
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.asyncio
+
+
+class _FakeRequest:
+    """Requête minimale : en-têtes et détection de déconnexion."""
+
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+def _parse(chunk: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+    return {
+        "id": fields.get("id"),
+        "event": fields["event"],
+        "data": json.loads(fields["data"]),
+    }
+
+
+async def _read_events(body, count: int):
+    events = []
+    while len(events) < count:
+        chunk = await asyncio.wait_for(body.__anext__(), timeout=2)
+        if chunk.startswith("retry:") or chunk.startswith(":"):
+            continue
+        events.append(_parse(chunk))
+    return events
+
+
+class TestNotificationBroker:
+    async def test_format_sse(self):
+        assert format_sse({"event": "notification", "id": 7, "data": {"a": 1}}) == (
+            'id: 7\nevent: notification\ndata: {"a": 1}\n\n'
+        )
+
+    async def test_publish_dispatches_to_user_queues_only(self):
+        broker = NotificationBroker()
+        mine, other = broker.subscribe(1), broker.subscribe(2)
+
+        await broker.publish(1, [{"event": "unread_count", "data": {"delta": 1}}])
+
+        assert mine.get_nowait()["data"] == {"delta": 1}
+        assert other.empty()
+        broker.unsubscribe(1, mine)
+        broker.unsubscribe(2, other)
+        assert broker.connection_count == 0
+
+    async def test_overflow_resyncs_slow_client(self, monkeypatch):
+        monkeypatch.setattr(
+            "app.services.notification_stream.NOTIFICATIONS_STREAM_QUEUE_SIZE", 2
+        )
+        broker = NotificationBroker()
+        queue = broker.subscribe(1)
+
+        await broker.publish(1, [{"event": "unread_count", "data": {"delta": 1}}] * 3)
+
+        assert queue.qsize() == 1
+        assert queue.get_nowait() is RESYNC_EVENT
+
+
+class TestNotificationStream:
+    async def test_stream_replays_then_pushes_live_events(
+        self, test_db: AsyncSession, candidate_user: User
+    ):
+        seen = Notification(
+            user_id=candidate_user.id,
+            type=NotificationType.SYSTEM,
+            title="Ancienne",
+            message="m",
+            is_read=True,
+        )
+        missed = Notification(
+            user_id=candidate_user.id,
+            type=NotificationType.SYSTEM,
+            title="Manquée",
+            message="m",
+        )
+        test_db.add_all([seen, missed])
+        await test_db.commit()
+
+        request = _FakeRequest(headers={"last-event-id": str(seen.id)})
+        response = await stream_notifications(
+            request, last_event_id=None, current_user=candidate_user, db=test_db
+        )
+        body = response.body_iterator
+
+        replay = await _read_events(body, 2)
+        assert [e["event"] for e in replay] == ["notification", "unread_count"]
+        assert replay[0]["id"] == str(missed.id)
+        assert replay[0]["data"]["title"] == "Manquée"
+        assert replay[1]["data"] == {"unread_count": 1}
+
+        created = await stage_notification(
+            test_db,
+            candidate_user.id,
+            NotificationType.NEW_APPLICATION,
+            "Nouvelle",
+            "Nouvelle candidature",
+        )
+        await test_db.commit()
+        await publish_notifications([created])
+        live = await _read_events(body, 2)
+        assert live[0]["id"] == str(created.id)
+        assert live[0]["data"]["type"] == "new_application"
+        assert live[1] == {"id": None, "event": "unread_count", "data": {"delta": 1}}
+
+        request.disconnected = True
+        await body.aclose()
+        assert notification_broker.connection_count == 0
+
+    async def test_replayed_notification_not_sent_twice(self, candidate_user: User):
+        queue = notification_broker.subscribe(candidate_user.id)
+        replayed = {"event": "notification", "id": 5, "data": {}}
+        body = _event_stream(_FakeRequest(), candidate_user.id, queue, [replayed])
+
+        await notification_broker.publish(
+            candidate_user.id,
+            [
+                replayed,
+                {"event": "notification", "id": 6, "data": {}},
+            ],
+        )
+        events = await _read_events(body, 2)
+
+        assert [e["id"] for e in events] == ["5", "6"]
+        await body.aclose()
+
+
+class TestStreamTicket:
+    async def test_ticket_opens_stream_once(
+        self,
+        client: AsyncClient,
+        test_db: AsyncSession,
+        candidate_user: User,
+        auth_headers_candidate: dict,
+    ):
+        response = await client.post(
+            "/api/notifications/stream-ticket", headers=auth_headers_candidate
+        )
+        assert response.status_code == 200, response.text
+        ticket = response.json()["ticket"]
+
+        user = await _require_stream_user(None, test_db, ticket=ticket)
+        assert user.id == candidate_user.id
+
+        with pytest.raises(HTTPException) as exc_info:
+            await _require_stream_user(None, test_db, ticket=ticket)
+        assert exc_info.value.status_code == 401
+
+    async def test_expired_or_unknown_ticket_rejected(
+        self, test_db: AsyncSession, candidate_user: User, monkeypatch
+    ):
+        monkeypatch.setattr(
+            "app.services.notification_stream.NOTIFICATIONS_STREAM_TICKET_SECONDS", 0
+        )
+        ticket = await issue_stream_ticket(candidate_user.id)
+
+        assert await redeem_stream_ticket(ticket) is None
+        assert await redeem_stream_ticket("unknown") is None
+
+    async def test_ticket_requires_authentication(self, client: AsyncClient):
+        response = await client.post("/api/notifications/stream-ticket")
+        assert response.status_code in (401, 403)
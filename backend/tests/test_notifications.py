@@ -1,12 +1,14 @@
 """
 Tests for notification endpoints (/api/notifications/*).
 
-Covers: list, unread-count, mark as read, mark all as read, delete.
+Covers: list, unread-count, mark as read, mark all as read, delete, staging.
 """
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.notifications import stage_notifications
 from app.models.base import User, Notification, NotificationType
 
 
@@ -423,3 +425,46 @@ class TestDeleteNotification:
         )
 
         assert response.status_code == 404
+
+
+# ---------------------------------------------------------------------------
+# stage_notifications
+# ---------------------------------------------------------------------------
+
+
+class TestStageNotifications:
+    async def test_fan_out_in_caller_transaction(
+        self,
+        candidate_user: User,
+        employer_user: User,
+        test_db: AsyncSession,
+    ):
+        """One staged row per user, committed with the caller's transaction."""
+        staged = await stage_notifications(
+            test_db,
+            [candidate_user.id, employer_user.id],
+            NotificationType.SYSTEM,
+            "Maintenance",
+            "Maintenance prévue ce soir",
+        )
+
+        assert [n.user_id for n in staged] == [candidate_user.id, employer_user.id]
+        assert all(n.id is not None and n.is_read is False for n in staged)
+
+        await test_db.commit()
+        result = await test_db.execute(select(func.count()).select_from(Notification))
+        assert result.scalar() == 2
+
+    async def test_rollback_discards_staged(
+        self,
+        candidate_user: User,
+        test_db: AsyncSession,
+    ):
+        """Nothing is committed on the caller's behalf."""
+        await stage_notifications(
+            test_db, [candidate_user.id], NotificationType.SYSTEM, "t", "m"
+        )
+        await test_db.rollback()
+
+        result = await test_db.execute(select(func.count()).select_from(Notification))
+        assert result.scalar() == 0
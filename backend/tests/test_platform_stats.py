@@ -0,0 +1,156 @@
+"""
+Tests for the platform_stats rollup and the endpoints reading it
+(/api/jobs/stats/market, /api/stats/public, /api/admin/stats).
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.models.base import Company, Job, JobStatus, PlatformStat, User
+from app.services import platform_stats
+from app.services.platform_stats import (
+    JOBS_BY_STATUS,
+    PUBLISHED_JOBS_BY_COUNTRY,
+    USERS_BY_ROLE,
+    get_platform_stats,
+    refresh_platform_stats,
+)
+from httpx import AsyncClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestPlatformStatsRollup:
+    async def test_refresh_counts_every_dimension(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        test_job: Job,
+    ):
+        await test_db.execute(update(Company).values(industry="Tech"))
+        await test_db.commit()
+
+        await refresh_platform_stats(test_db)
+        stats = await get_platform_stats(test_db)
+
+        assert stats.get(USERS_BY_ROLE, "candidate") == 1
+        assert stats.get(USERS_BY_ROLE, "employer") == 1
+        assert stats.get(JOBS_BY_STATUS, "published") == 1
+        assert stats.breakdown(PUBLISHED_JOBS_BY_COUNTRY) == [("GA", 1)]
+        assert stats.metrics["published_jobs_by_type"] == {"full_time": 1}
+        assert stats.metrics["published_jobs_by_location_type"] == {"remote": 1}
+        assert stats.metrics["published_jobs_by_industry"] == {"Tech": 1}
+
+    async def test_reads_never_recount_existing_snapshot(
+        self,
+        test_db: AsyncSession,
+        candidate_user: User,
+        employer_user: User,
+    ):
+        # Empty rollup: built on first read
+        assert (await get_platform_stats(test_db)).total(USERS_BY_ROLE) == 2
+
+        test_db.add(
+            User(
+                email="late@test.com",
+                role=candidate_user.role,
+                first_name="L",
+                last_name="T",
+            )
+        )
+        await test_db.commit()
+        assert (await get_platform_stats(test_db)).total(USERS_BY_ROLE) == 2
+
+        # Stale rollup: still served, the periodic task rebuilds it
+        await test_db.execute(
+            update(PlatformStat).values(
+                updated_at=datetime.now(timezone.utc) - timedelta(hours=1)
+            )
+        )
+        await test_db.commit()
+        assert (await get_platform_stats(test_db)).total(USERS_BY_ROLE) == 2
+
+        await refresh_platform_stats(test_db)
+        assert (await get_platform_stats(test_db)).total(USERS_BY_ROLE) == 3
+
+    async def test_long_dimensions_are_truncated(
+        self, test_db: AsyncSession, test_job: Job
+    ):
+        industry = "Industrie " + "x" * 200
+        await test_db.execute(update(Company).values(industry=industry))
+        await test_db.commit()
+
+        await refresh_platform_stats(test_db)
+        stats = await get_platform_stats(test_db)
+
+        assert stats.metrics["published_jobs_by_industry"] == {industry[:100]: 1}
+
+    async def test_failed_bootstrap_serves_empty_stats(
+        self, test_db: AsyncSession, monkeypatch
+    ):
+        async def failing_collect(db, now):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(platform_stats, "_collect_stats", failing_collect)
+        monkeypatch.setattr(platform_stats, "_bootstrap_failed_at", None)
+
+        stats = await get_platform_stats(test_db)
+
+        assert stats.metrics == {}
+        assert platform_stats._bootstrap_failed_at is not None
+
+
+class TestStatsEndpoints:
+    async def test_market_stats(
+        self, client: AsyncClient, test_job: Job, test_db: AsyncSession
+    ):
+        draft = Job(
+            employer_id=test_job.employer_id,
+            company_id=test_job.company_id,
+            title="Brouillon",
+            description="d",
+            location_type=test_job.location_type,
+            job_type=test_job.job_type,
+            country="CM",
+            status=JobStatus.DRAFT,
+        )
+        test_db.add(draft)
+        await test_db.commit()
+
+        response = await client.get("/api/jobs/stats/market")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_jobs"] == 1
+        assert data["total_companies"] == 1
+        assert data["jobs_by_country"] == [{"label": "GA", "count": 1}]
+        assert data["jobs_by_type"] == [{"label": "full_time", "count": 1}]
+
+    async def test_public_stats(
+        self, client: AsyncClient, candidate_user: User, test_job: Job
+    ):
+        response = await client.get("/api/stats/public")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "candidates": 1,
+            "companies": 1,
+            "active_jobs": 1,
+            "applications": 0,
+        }
+
+    async def test_admin_stats(
+        self,
+        client: AsyncClient,
+        auth_headers_admin: dict,
+        candidate_user: User,
+        test_job: Job,
+    ):
+        response = await client.get("/api/admin/stats", headers=auth_headers_admin)
+
+        data = response.json()
+        assert data["total_users"] == 3
+        assert data["total_jobs"] == 1
+        assert data["jobs_by_status"] == {"published": 1}
+        assert data["recent_signups"] == 3
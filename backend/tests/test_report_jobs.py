@@ -0,0 +1,250 @@
+"""
+Tests for asynchronous report generation (POST /api/reports/{kind},
+GET /api/reports/{id}, GET /api/reports/{id}/download) and its worker.
+
+The PDF rendering pool is replaced by a stub recording the template context.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.models.base import Job, ReportJob, ReportJobStatus, User
+from app.services import report_jobs, report_service
+from app.services.report_jobs import process_next_report, purge_expired_reports
+from app.services.report_service import ReportCache
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def rendered(monkeypatch, tmp_path):
+    """Rendu PDF simulé et stockage des rapports dans un dossier temporaire."""
+    contexts = []
+
+    async def fake_render(template_name, context):
+        contexts.append((template_name, context))
+        return b"%PDF-1.7 " + template_name.encode()
+
+    monkeypatch.setattr(report_service, "WEASYPRINT_AVAILABLE", True)
+    monkeypatch.setattr(report_service, "_render_in_pool", fake_render)
+    monkeypatch.setattr(report_service, "report_cache", ReportCache(ttl=0))
+    monkeypatch.setattr(report_jobs, "REPORTS_STORAGE_DIR", tmp_path)
+    return contexts
+
+
+class TestRequestReport:
+    async def test_enqueue_is_idempotent_while_pending(
+        self, client: AsyncClient, auth_headers_admin: dict
+    ):
+        first = await client.post("/api/reports/admin", headers=auth_headers_admin)
+        second = await client.post("/api/reports/admin", headers=auth_headers_admin)
+
+        assert first.status_code == 202
+        assert first.json()["status"] == "pending"
+        assert second.json()["id"] == first.json()["id"]
+
+    async def test_concurrent_enqueue_returns_existing_job(
+        self,
+        test_db: AsyncSession,
+        admin_user: User,
+        monkeypatch,
+    ):
+        # Simulates two requests that both pass the lookup before either inserts
+        first = await report_jobs.enqueue_report(test_db, admin_user, "admin")
+        first_id = first.id
+        lookup = report_jobs._active_report_job
+        calls = []
+
+        async def racing_lookup(db, user_id, kind):
+            calls.append(kind)
+            return None if len(calls) == 1 else await lookup(db, user_id, kind)
+
+        monkeypatch.setattr(report_jobs, "_active_report_job", racing_lookup)
+
+        second = await report_jobs.enqueue_report(test_db, admin_user, "admin")
+
+        assert second.id == first_id
+        assert await test_db.scalar(select(func.count()).select_from(ReportJob)) == 1
+
+    async def test_kind_must_match_role(
+        self, client: AsyncClient, auth_headers_employer: dict
+    ):
+        assert (
+            await client.post("/api/reports/candidate", headers=auth_headers_employer)
+        ).status_code == 403
+        assert (
+            await client.post("/api/reports/unknown", headers=auth_headers_employer)
+        ).status_code == 404
+
+    async def test_other_users_cannot_read_report(
+        self,
+        client: AsyncClient,
+        auth_headers_admin: dict,
+        auth_headers_candidate: dict,
+    ):
+        report_id = (
+            await client.post("/api/reports/admin", headers=auth_headers_admin)
+        ).json()["id"]
+
+        response = await client.get(
+            f"/api/reports/{report_id}", headers=auth_headers_candidate
+        )
+
+        assert response.status_code == 404
+
+
+class TestReportWorker:
+    async def test_employer_report_generated_and_downloadable(
+        self,
+        client: AsyncClient,
+        test_db: AsyncSession,
+        auth_headers_employer: dict,
+        test_job: Job,
+        rendered,
+    ):
+        job_title = test_job.title
+        report_id = (
+            await client.post("/api/reports/employer", headers=auth_headers_employer)
+        ).json()["id"]
+
+        assert await process_next_report(test_db) == report_id
+        assert await process_next_report(test_db) is None
+
+        status_response = await client.get(
+            f"/api/reports/{report_id}", headers=auth_headers_employer
+        )
+        data = status_response.json()
+        assert data["status"] == "completed"
+        assert data["download_url"] == f"/api/reports/{report_id}/download"
+
+        download = await client.get(data["download_url"], headers=auth_headers_employer)
+        assert download.status_code == 200
+        assert download.content == b"%PDF-1.7 employer.html"
+
+        template_name, context = rendered[0]
+        assert context["company_name"] == "Test Company"
+        assert [job["title"] for job in context["jobs_summary"]] == [job_title]
+
+    async def test_employer_report_stats_match_dashboard(
+        self,
+        client: AsyncClient,
+        test_db: AsyncSession,
+        auth_headers_candidate: dict,
+        auth_headers_employer: dict,
+        candidate_user: User,
+        test_job: Job,
+        rendered,
+    ):
+        applied = await client.post(
+            "/api/applications/my/applications",
+            headers=auth_headers_candidate,
+            json={"job_id": test_job.id, "cover_letter": "Motivé"},
+        )
+        await client.put(
+            f"/api/applications/employer/applications/{applied.json()['id']}/status",
+            headers=auth_headers_employer,
+            json={"status": "interview"},
+        )
+        await client.post("/api/reports/employer", headers=auth_headers_employer)
+        await process_next_report(test_db)
+
+        dashboard = (
+            await client.get("/api/dashboard", headers=auth_headers_employer)
+        ).json()
+        dashboard_stats = {stat["title"]: stat["value"] for stat in dashboard["stats"]}
+        _, context = rendered[0]
+        report_stats = {stat["title"]: stat["value"] for stat in context["stats"]}
+
+        # Both read the same rollup query
+        assert (
+            report_stats["Offres actives"] == dashboard_stats["Offres actives"] == "1"
+        )
+        assert (
+            report_stats["Candidatures"]
+            == dashboard_stats["Candidatures reçues"]
+            == "1"
+        )
+        assert report_stats["Entretiens"] == dashboard_stats["Entretiens prévus"] == "1"
+        assert (
+            report_stats["Taux de reponse"]
+            == dashboard_stats["Taux de réponse"]
+            == "100%"
+        )
+        assert context["jobs_summary"][0]["applications_count"] == 1
+
+    async def test_failed_render_is_recorded(
+        self,
+        client: AsyncClient,
+        test_db: AsyncSession,
+        auth_headers_admin: dict,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(report_service, "WEASYPRINT_AVAILABLE", False)
+        report_id = (
+            await client.post("/api/reports/admin", headers=auth_headers_admin)
+        ).json()["id"]
+
+        await process_next_report(test_db)
+
+        data = (
+            await client.get(f"/api/reports/{report_id}", headers=auth_headers_admin)
+        ).json()
+        assert data["status"] == "failed"
+        assert data["error"] == report_jobs.REPORT_FAILED_MESSAGE
+        download = await client.get(
+            f"/api/reports/{report_id}/download", headers=auth_headers_admin
+        )
+        assert download.status_code == 409
+
+    async def test_expired_artifacts_are_purged(
+        self,
+        client: AsyncClient,
+        test_db: AsyncSession,
+        admin_user: User,
+        auth_headers_admin: dict,
+        rendered,
+    ):
+        report_id = (
+            await client.post("/api/reports/admin", headers=auth_headers_admin)
+        ).json()["id"]
+        await process_next_report(test_db)
+        job = await test_db.get(ReportJob, report_id)
+        await test_db.refresh(job)
+        file_path = job.file_path
+
+        purged = await purge_expired_reports(
+            test_db, now=datetime.now(timezone.utc) + timedelta(days=2)
+        )
+
+        assert purged == 1
+        await test_db.refresh(job)
+        assert job.status == ReportJobStatus.EXPIRED
+        assert job.file_path is None
+        assert not (
+            report_jobs.REPORTS_STORAGE_DIR / file_path.rsplit("/", 1)[-1]
+        ).exists()
+
+    async def test_artifact_resolved_from_shared_storage_dir(
+        self,
+        client: AsyncClient,
+        test_db: AsyncSession,
+        auth_headers_admin: dict,
+        rendered,
+    ):
+        # Written by another instance that mounts the shared volume elsewhere
+        report_id = (
+            await client.post("/api/reports/admin", headers=auth_headers_admin)
+        ).json()["id"]
+        await process_next_report(test_db)
+        job = await test_db.get(ReportJob, report_id)
+        job.file_path = "/mnt/other-host/reports/report.pdf"
+        await test_db.commit()
+
+        download = await client.get(
+            f"/api/reports/{report_id}/download", headers=auth_headers_admin
+        )
+
+        assert download.status_code == 200
+        assert download.content == b"%PDF-1.7 admin.html"
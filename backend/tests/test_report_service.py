@@ -0,0 +1,127 @@
+"""
+Tests for PDF report rendering: context-hash cache, in-flight sharing and the
+503 returned when rendering is impossible.
+
+WeasyPrint needs system libraries (pango) that may be missing on CI, so the
+process pool is replaced by a counting stub where rendering itself is needed.
+"""
+import asyncio
+import time
+from datetime import date
+
+import pytest
+from app.services import report_service
+from app.services.process_pool import WorkerPool
+from app.services.report_service import (
+    ReportCache,
+    ReportRenderError,
+    render_report_pdf,
+    report_cache_key,
+)
+from httpx import AsyncClient
+
+
+def _stuck_render(template_name, context):
+    """Stand-in for a pathological render (runs in a worker process)."""
+    time.sleep(30)
+
+
+class TestReportCacheKey:
+    def test_key_ignores_dict_order(self):
+        assert report_cache_key(
+            "admin.html", {"a": 1, "b": [date(2026, 1, 1)]}
+        ) == report_cache_key("admin.html", {"b": [date(2026, 1, 1)], "a": 1})
+
+    def test_key_depends_on_template_and_context(self):
+        key = report_cache_key("admin.html", {"a": 1})
+        assert key != report_cache_key("employer.html", {"a": 1})
+        assert key != report_cache_key("admin.html", {"a": 2})
+
+
+class TestReportCache:
+    def test_entries_expire(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(report_service.time, "monotonic", lambda: now[0])
+        cache = ReportCache(ttl=60, max_entries=4)
+
+        cache.set("k", b"pdf")
+        assert cache.get("k") == b"pdf"
+        now[0] += 61
+        assert cache.get("k") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ReportCache(ttl=60, max_entries=2)
+        cache.set("a", b"1")
+        cache.set("b", b"2")
+        cache.get("a")
+        cache.set("c", b"3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"1"
+        assert cache.get("c") == b"3"
+
+
+@pytest.fixture
+def counting_renderer(monkeypatch):
+    """Remplace le rendu en pool par un stub qui compte les appels."""
+    calls = []
+
+    async def fake_render(template_name, context):
+        calls.append((template_name, context))
+        await asyncio.sleep(0.01)
+        return f"%PDF {template_name} {len(calls)}".encode()
+
+    monkeypatch.setattr(report_service, "WEASYPRINT_AVAILABLE", True)
+    monkeypatch.setattr(report_service, "_render_in_pool", fake_render)
+    monkeypatch.setattr(
+        report_service, "report_cache", ReportCache(ttl=60, max_entries=8)
+    )
+    return calls
+
+
+@pytest.mark.asyncio
+class TestRenderReportPdf:
+    async def test_identical_report_served_from_cache(self, counting_renderer):
+        first = await render_report_pdf("admin.html", {"total_users": 3})
+        second = await render_report_pdf("admin.html", {"total_users": 3})
+        other = await render_report_pdf("admin.html", {"total_users": 4})
+
+        assert first == second
+        assert other != first
+        assert len(counting_renderer) == 2
+
+    async def test_concurrent_identical_requests_share_one_render(
+        self, counting_renderer
+    ):
+        results = await asyncio.gather(
+            *(render_report_pdf("admin.html", {"total_users": 3}) for _ in range(5))
+        )
+
+        assert len(set(results)) == 1
+        assert len(counting_renderer) == 1
+
+    async def test_timeout_recycles_render_pool(self, monkeypatch):
+        pool = WorkerPool("Test report render", max_workers=1)
+        monkeypatch.setattr(report_service, "_pool", pool)
+        monkeypatch.setattr(report_service, "_render_pdf", _stuck_render)
+        monkeypatch.setattr(report_service, "REPORT_RENDER_TIMEOUT_SECONDS", 0.5)
+        try:
+            with pytest.raises(ReportRenderError):
+                await report_service._render_in_pool("admin.html", {})
+            assert not pool.started
+        finally:
+            pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_export_returns_503_without_weasyprint(
+    client: AsyncClient,
+    auth_headers_admin: dict,
+    monkeypatch,
+):
+    monkeypatch.setattr(report_service, "WEASYPRINT_AVAILABLE", False)
+
+    response = await client.get("/api/reports/admin/pdf", headers=auth_headers_admin)
+
+    assert response.status_code == 503
@@ -0,0 +1,91 @@
+"""
+Tests for compiled email template rendering (app/services/template_renderer.py).
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from app.services.template_renderer import (
+    TemplateCache,
+    render_email_template,
+    template_cache,
+)
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+def _template(**overrides) -> SimpleNamespace:
+    fields = dict(
+        id=1,
+        updated_at=datetime(2026, 3, 1, tzinfo=timezone.utc),
+        subject="Entretien - {job_title}",
+        body="<p>Bonjour {candidate_name},</p><p>{job_title} chez {company_name}</p>",
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+class TestRender:
+    def test_substitutes_all_occurrences(self):
+        subject, body = render_email_template(
+            _template(id=None),
+            {"job_title": "Dev", "candidate_name": "Marie", "company_name": "ACME"},
+        )
+        assert subject == "Entretien - Dev"
+        assert body == "<p>Bonjour Marie,</p><p>Dev chez ACME</p>"
+
+    def test_unknown_variables_kept_and_values_not_reinterpreted(self):
+        _, body = render_email_template(
+            _template(id=None), {"candidate_name": "{job_title}", "job_title": 42}
+        )
+        assert body == "<p>Bonjour {job_title},</p><p>42 chez {company_name}</p>"
+
+
+class TestTemplateCache:
+    def test_reuses_compiled_template_until_updated(self):
+        cache = TemplateCache()
+        template = _template()
+        first = cache.get(template)
+        assert cache.get(template) is first
+
+        template.subject = "Nouveau sujet"
+        template.updated_at += timedelta(seconds=1)
+        assert cache.get(template).render({})[0] == "Nouveau sujet"
+
+    def test_lru_eviction(self):
+        cache = TemplateCache(max_size=2)
+        for template_id in (1, 2, 3):
+            cache.get(_template(id=template_id))
+        assert len(cache) == 2
+
+
+class TestInvalidationOnUpdate:
+    async def test_update_endpoint_invalidates_cache(
+        self, client: AsyncClient, auth_headers_employer: dict
+    ):
+        created = (
+            await client.post(
+                "/api/email-templates",
+                headers=auth_headers_employer,
+                json={
+                    "name": "Rejet",
+                    "type": "application_rejected",
+                    "subject": "Réponse",
+                    "body": "<p>Avant</p>",
+                },
+            )
+        ).json()
+        template = SimpleNamespace(**created)
+        template_cache.get(template)
+
+        response = await client.patch(
+            f"/api/email-templates/{created['id']}",
+            headers=auth_headers_employer,
+            json={"body": "<p>Après</p>"},
+        )
+
+        assert response.status_code == 200
+        # Même updated_at (résolution à la seconde) : seule l'invalidation garantit le nouveau rendu
+        template.body = "<p>Après</p>"
+        assert template_cache.get(template).render({})[1] == "<p>Après</p>"